@@ -0,0 +1,79 @@
+"""search_terms
+
+Инвертированный индекс полнотекстового поиска (app.services.search)
+и его первичное заполнение. Токенизация (\\w+, нижний регистр, ё → е,
+длина 2–64) и веса полей повторены здесь, чтобы ревизия не зависела
+от кода приложения.
+
+Revision ID: a2b3c4d5e6f7
+Revises: f6a1b2c3d4e5
+Create Date: 2026-05-14 10:00:00.000000
+
+"""
+import re
+from collections import defaultdict
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+revision: str = 'a2b3c4d5e6f7'
+down_revision: Union[str, None] = 'f6a1b2c3d4e5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH = 1000
+# таблица → (entity_type, {поле: вес})
+SOURCES = {
+    'tickets':         ('ticket',    {'number': 5, 'title': 3, 'description': 1}),
+    'ticket_comments': ('comment',   {'text': 1}),
+    'clients':         ('client',    {'name': 3, 'inn': 5, 'city': 1}),
+    'equipment':       ('equipment', {'serial_number': 5, 'location': 1, 'notes': 1}),
+}
+_WORD = re.compile(r'\w+')
+
+
+def upgrade() -> None:
+    op.create_table(
+        'search_terms',
+        sa.Column('term', sa.String(64).with_variant(mysql.VARCHAR(64, collation='utf8mb4_bin'), 'mysql'),
+                  nullable=False),
+        sa.Column('entity_type', sa.String(16), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('weight', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('term', 'entity_type', 'entity_id'),
+    )
+    op.create_index('ix_search_terms_entity', 'search_terms', ['entity_type', 'entity_id'])
+    _backfill()
+
+
+def downgrade() -> None:
+    op.drop_index('ix_search_terms_entity', table_name='search_terms')
+    op.drop_table('search_terms')
+
+
+def _backfill() -> None:
+    conn = op.get_bind()
+    terms = sa.table('search_terms', sa.column('term'), sa.column('entity_type'),
+                     sa.column('entity_id'), sa.column('weight'))
+    for table, (entity_type, fields) in SOURCES.items():
+        source = sa.table(table, sa.column('id'), *[sa.column(f) for f in fields])
+        rows = []
+        for record in conn.execute(sa.select(source.c.id, *[source.c[f] for f in fields])):
+            weights: dict[str, int] = defaultdict(int)
+            for field, weight in fields.items():
+                for term in _tokenize(record._mapping[field]):
+                    weights[term] += weight
+            rows += [{'term': term, 'entity_type': entity_type, 'entity_id': record.id, 'weight': weight}
+                     for term, weight in weights.items()]
+            if len(rows) >= BATCH:
+                conn.execute(terms.insert(), rows)
+                rows = []
+        if rows:
+            conn.execute(terms.insert(), rows)
+
+
+def _tokenize(text) -> list[str]:
+    words = _WORD.findall((text or '').lower().replace('ё', 'е'))
+    return [w[:64] for w in words if len(w) >= 2]
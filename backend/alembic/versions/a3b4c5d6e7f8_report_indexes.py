@@ -0,0 +1,31 @@
+"""report_indexes
+
+Индексы отчётов загрузки инженеров, расхода запчастей и выручки
+(app.services.reports): выборка актов и счетов по диапазону дат
+без полного скана таблиц.
+
+Revision ID: a3b4c5d6e7f8
+Revises: f7a1b2c3d4e5
+Create Date: 2026-06-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = 'a3b4c5d6e7f8'
+down_revision: Union[str, None] = 'f7a1b2c3d4e5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_work_acts_created_engineer', 'work_acts', ['created_at', 'engineer_id', 'total_time_minutes'])
+    op.create_index('ix_work_act_items_act_type', 'work_act_items', ['work_act_id', 'item_type'])
+    op.create_index('ix_invoices_issue_client', 'invoices', ['issue_date', 'client_id', 'status'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_invoices_issue_client', table_name='invoices')
+    op.drop_index('ix_work_act_items_act_type', table_name='work_act_items')
+    op.drop_index('ix_work_acts_created_engineer', table_name='work_acts')
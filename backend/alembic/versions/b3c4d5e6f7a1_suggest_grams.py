@@ -0,0 +1,39 @@
+"""suggest_grams
+
+Триграммы для автодополнения серийных номеров, артикулов и названий
+клиентов (app.services.suggest). Заполняются в c5d6e7f8a1b2
+(suggest_gram_counts) вместе со значениями и частотами.
+
+Revision ID: b3c4d5e6f7a1
+Revises: a2b3c4d5e6f7
+Create Date: 2026-05-15 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+revision: str = 'b3c4d5e6f7a1'
+down_revision: Union[str, None] = 'a2b3c4d5e6f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'suggest_grams',
+        sa.Column('entity_type', sa.String(16), nullable=False),
+        sa.Column('gram', sa.String(3).with_variant(mysql.VARCHAR(3, collation='utf8mb4_bin'), 'mysql'),
+                  nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('entity_type', 'gram', 'entity_id'),
+    )
+    op.create_index('ix_suggest_grams_entity', 'suggest_grams', ['entity_type', 'entity_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_suggest_grams_entity', table_name='suggest_grams')
+    op.drop_table('suggest_grams')
+
@@ -0,0 +1,41 @@
+"""suggest_values
+
+Нормализованные значения автодополнения (app.services.suggest): префикс
+ищется диапазоном индекса (entity_type, length, value) в порядке выдачи,
+для подстроки триграммы только сужают выборку — точное вхождение, порядок
+и LIMIT выполняются в запросе. Триграммы (без маркеров начала строки) и
+значения заполняются в c5d6e7f8a1b2 (suggest_gram_counts) вместе с частотами.
+
+Revision ID: b4c5d6e7f8a1
+Revises: a3b4c5d6e7f8
+Create Date: 2026-06-22 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+revision: str = 'b4c5d6e7f8a1'
+down_revision: Union[str, None] = 'a3b4c5d6e7f8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'suggest_values',
+        sa.Column('entity_type', sa.String(16), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('value', sa.String(255).with_variant(mysql.VARCHAR(255, collation='utf8mb4_bin'), 'mysql'),
+                  nullable=False),
+        sa.Column('length', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('entity_type', 'entity_id'),
+    )
+    op.create_index('ix_suggest_values_order', 'suggest_values', ['entity_type', 'length', 'value'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_suggest_values_order', table_name='suggest_values')
+    op.drop_table('suggest_values')
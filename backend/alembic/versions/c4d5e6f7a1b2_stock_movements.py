@@ -0,0 +1,58 @@
+"""stock_movements
+
+Журнал движений остатков (app.services.stock). Текущие остатки
+warehouse_stock заносятся в журнал начальными записями (reason=opening),
+чтобы сумма журнала сходилась с проекцией с первого дня.
+
+Revision ID: c4d5e6f7a1b2
+Revises: b3c4d5e6f7a1
+Create Date: 2026-05-22 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'c4d5e6f7a1b2'
+down_revision: Union[str, None] = 'b3c4d5e6f7a1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+REASONS = ('opening', 'receipt', 'transfer', 'work_act', 'adjust')
+
+
+def upgrade() -> None:
+    op.create_table(
+        'stock_movements',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('warehouse_id', sa.Integer(), nullable=False),
+        sa.Column('part_id', sa.Integer(), nullable=False),
+        sa.Column('delta', sa.Integer(), nullable=False),
+        sa.Column('balance_after', sa.Integer(), nullable=False),
+        sa.Column('reason', sa.Enum(*REASONS, name='stock_movement_reason_enum'), nullable=False),
+        sa.Column('doc_id', sa.Integer(), nullable=True),
+        sa.Column('note', sa.String(255), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+        sa.ForeignKeyConstraint(['warehouse_id'], ['warehouses.id'], ondelete='RESTRICT'),
+        sa.ForeignKeyConstraint(['part_id'], ['spare_parts.id'], ondelete='RESTRICT'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_stock_movements_wh_part_created', 'stock_movements',
+                    ['warehouse_id', 'part_id', 'created_at'])
+    op.create_index('ix_stock_movements_part_created', 'stock_movements', ['part_id', 'created_at'])
+    op.create_index('ix_stock_movements_doc', 'stock_movements', ['reason', 'doc_id'])
+    op.execute(
+        "INSERT INTO stock_movements (warehouse_id, part_id, delta, balance_after, reason, created_at) "
+        "SELECT warehouse_id, part_id, quantity, quantity, 'opening', CURRENT_TIMESTAMP "
+        "FROM warehouse_stock WHERE quantity <> 0"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_stock_movements_doc', table_name='stock_movements')
+    op.drop_index('ix_stock_movements_part_created', table_name='stock_movements')
+    op.drop_index('ix_stock_movements_wh_part_created', table_name='stock_movements')
+    op.drop_table('stock_movements')
@@ -0,0 +1,76 @@
+"""suggest_gram_counts
+
+Частоты триграмм автодополнения (app.services.suggest): самая редкая
+триграмма запроса выбирается одним чтением по ключу вместо подсчёта строк
+suggest_grams на каждый запрос. Заполняет suggest_grams, suggest_values и
+частоты из текущих серийных номеров, артикулов и названий клиентов —
+нормализация (нижний регистр, ё → е) повторена здесь, чтобы ревизия не
+зависела от кода приложения.
+
+Revision ID: c5d6e7f8a1b2
+Revises: b4c5d6e7f8a1
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+revision: str = 'c5d6e7f8a1b2'
+down_revision: Union[str, None] = 'b4c5d6e7f8a1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH = 1000
+SOURCES = (('serial', 'equipment', 'serial_number'), ('sku', 'spare_parts', 'sku'), ('client', 'clients', 'name'))
+
+
+def upgrade() -> None:
+    op.create_table(
+        'suggest_gram_counts',
+        sa.Column('entity_type', sa.String(16), nullable=False),
+        sa.Column('gram', sa.String(3).with_variant(mysql.VARCHAR(3, collation='utf8mb4_bin'), 'mysql'),
+                  nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('entity_type', 'gram'),
+    )
+    _backfill()
+
+
+def downgrade() -> None:
+    op.drop_table('suggest_gram_counts')
+
+
+def _backfill() -> None:
+    conn = op.get_bind()
+    grams = sa.table('suggest_grams', sa.column('entity_type'), sa.column('gram'), sa.column('entity_id'))
+    values = sa.table('suggest_values', sa.column('entity_type'), sa.column('entity_id'),
+                      sa.column('value'), sa.column('length'))
+    counts = sa.table('suggest_gram_counts', sa.column('entity_type'), sa.column('gram'), sa.column('count'))
+    conn.execute(sa.delete(grams))
+    conn.execute(sa.delete(values))
+    for kind, table, column in SOURCES:
+        source = sa.table(table, sa.column('id'), sa.column(column))
+        gram_rows, value_rows = [], []
+        for entity_id, value in conn.execute(sa.select(source.c.id, source.c[column])):
+            value = (value or '').lower().replace('ё', 'е')
+            gram_rows += [{'entity_type': kind, 'gram': g, 'entity_id': entity_id}
+                          for g in {value[i:i + 3] for i in range(len(value) - 2)}]
+            value_rows.append({'entity_type': kind, 'entity_id': entity_id, 'value': value, 'length': len(value)})
+            if len(value_rows) >= BATCH:
+                _insert(conn, grams, gram_rows)
+                _insert(conn, values, value_rows)
+                gram_rows, value_rows = [], []
+        _insert(conn, grams, gram_rows)
+        _insert(conn, values, value_rows)
+    conn.execute(counts.insert().from_select(
+        ['entity_type', 'gram', 'count'],
+        sa.select(grams.c.entity_type, grams.c.gram, sa.func.count()).group_by(grams.c.entity_type, grams.c.gram),
+    ))
+
+
+def _insert(conn, table, rows: list[dict]) -> None:
+    if rows:
+        conn.execute(table.insert(), rows)
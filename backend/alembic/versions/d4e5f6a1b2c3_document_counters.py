@@ -0,0 +1,31 @@
+"""document_counters
+
+Revision ID: d4e5f6a1b2c3
+Revises: c3d4e5f6a1b2
+Create Date: 2026-05-04 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'd4e5f6a1b2c3'
+down_revision: Union[str, None] = 'c3d4e5f6a1b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Счётчики засеваются лениво при первом номере периода (app/services/numbering.py)
+    op.create_table(
+        'document_counters',
+        sa.Column('key', sa.String(32), nullable=False),
+        sa.Column('value', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('NOW()'), nullable=False),
+        sa.PrimaryKeyConstraint('key'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('document_counters')
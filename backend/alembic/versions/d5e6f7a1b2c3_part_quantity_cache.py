@@ -0,0 +1,59 @@
+"""part_quantity_cache
+
+spare_parts.quantity становится кэшем суммы warehouse_stock по складам
+компании. Количество запчастей, у которых нет ни одной строки на складе
+компании, переносится на основной склад начальными записями журнала,
+после чего кэш пересчитывается одним UPDATE (как reconcile_part_quantities
+в app.services.stock, но без импорта кода приложения).
+
+Revision ID: d5e6f7a1b2c3
+Revises: c4d5e6f7a1b2
+Create Date: 2026-05-29 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'd5e6f7a1b2c3'
+down_revision: Union[str, None] = 'c4d5e6f7a1b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_ORPHANS = (
+    "FROM spare_parts p WHERE p.quantity > 0 AND NOT EXISTS ("
+    " SELECT 1 FROM warehouse_stock ws JOIN warehouses w ON w.id = ws.warehouse_id"
+    " WHERE ws.part_id = p.id AND w.type = 'company')"
+)
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    main_id = conn.execute(sa.text(
+        "SELECT id FROM warehouses WHERE type = 'company' AND is_active ORDER BY id LIMIT 1"
+    )).scalar()
+    if main_id is not None:
+        params = {"wh": main_id}
+        # журнал первым: после вставки остатков запчасти уже не «сироты»
+        conn.execute(sa.text(
+            "INSERT INTO stock_movements (warehouse_id, part_id, delta, balance_after, reason, note, created_at) "
+            "SELECT :wh, p.id, p.quantity, p.quantity, 'opening', 'Перенос из карточки запчасти', CURRENT_TIMESTAMP "
+            + _ORPHANS
+        ), params)
+        conn.execute(sa.text(
+            "INSERT INTO warehouse_stock (warehouse_id, part_id, quantity, unit_price_snapshot) "
+            "SELECT :wh, p.id, p.quantity, p.unit_price " + _ORPHANS
+        ), params)
+    conn.execute(sa.text(
+        "UPDATE spare_parts SET quantity = ("
+        " SELECT COALESCE(SUM(ws.quantity), 0) FROM warehouse_stock ws"
+        " JOIN warehouses w ON w.id = ws.warehouse_id"
+        " WHERE ws.part_id = spare_parts.id AND w.type = 'company')"
+    ))
+
+
+def downgrade() -> None:
+    # данные не откатываются: кэш остаётся согласованным со складами
+    pass
+
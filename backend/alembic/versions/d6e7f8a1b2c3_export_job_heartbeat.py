@@ -0,0 +1,28 @@
+"""export_job_heartbeat
+
+Отметка прогресса выполняющейся выгрузки (app.services.exports):
+повторно доставленная задача забирает задание, чей воркер перестал
+отмечаться дольше EXPORT_JOB_HEARTBEAT_MINUTES, не дожидаясь таймаута.
+
+Revision ID: d6e7f8a1b2c3
+Revises: c5d6e7f8a1b2
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'd6e7f8a1b2c3'
+down_revision: Union[str, None] = 'c5d6e7f8a1b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('export_jobs', sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('export_jobs', 'heartbeat_at')
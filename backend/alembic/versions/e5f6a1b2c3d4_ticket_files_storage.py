@@ -0,0 +1,65 @@
+"""ticket_files_storage
+
+Revision ID: e5f6a1b2c3d4
+Revises: d4e5f6a1b2c3
+Create Date: 2026-05-05 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'e5f6a1b2c3d4'
+down_revision: Union[str, None] = 'd4e5f6a1b2c3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('ticket_files', sa.Column('storage_key', sa.String(64), nullable=True))
+    op.create_index('ix_ticket_files_storage_key', 'ticket_files', ['storage_key'])
+    _drain_blobs()
+
+
+def downgrade() -> None:
+    _restore_blobs()
+    op.drop_index('ix_ticket_files_storage_key', table_name='ticket_files')
+    op.drop_column('ticket_files', 'storage_key')
+
+
+def _drain_blobs() -> None:
+    """Перенести file_data в хранилище по одному файлу — в памяти не больше одного BLOB."""
+    from app.core.storage import get_storage
+
+    bind = op.get_bind()
+    storage = get_storage()
+    ids = [row[0] for row in bind.execute(sa.text(
+        "SELECT id FROM ticket_files WHERE file_data IS NOT NULL AND storage_key IS NULL"
+    ))]
+    for file_id in ids:
+        data = bind.execute(
+            sa.text("SELECT file_data FROM ticket_files WHERE id = :id"), {"id": file_id}
+        ).scalar()
+        with storage.writer() as writer:
+            writer.write(data)
+            stored = writer.commit()
+        bind.execute(
+            sa.text("UPDATE ticket_files SET storage_key = :key, file_size = :size, file_data = NULL WHERE id = :id"),
+            {"key": stored.key, "size": stored.size, "id": file_id},
+        )
+
+
+def _restore_blobs() -> None:
+    from app.core.storage import get_storage
+
+    bind = op.get_bind()
+    storage = get_storage()
+    rows = bind.execute(sa.text(
+        "SELECT id, storage_key FROM ticket_files WHERE storage_key IS NOT NULL AND file_data IS NULL"
+    )).fetchall()
+    for file_id, key in rows:
+        bind.execute(
+            sa.text("UPDATE ticket_files SET file_data = :data WHERE id = :id"),
+            {"data": storage.read(key), "id": file_id},
+        )
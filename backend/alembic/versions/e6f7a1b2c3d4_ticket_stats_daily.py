@@ -0,0 +1,54 @@
+"""ticket_stats_daily
+
+Дневной срез заявок для отчёта (app.services.ticket_stats) и индекс
+tickets.updated_at под его инкрементальный пересчёт. Срез заполняется
+первым запуском задачи refresh_ticket_stats или вручную:
+python scripts/ticket_stats.py backfill
+
+Revision ID: e6f7a1b2c3d4
+Revises: d5e6f7a1b2c3
+Create Date: 2026-06-05 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'e6f7a1b2c3d4'
+down_revision: Union[str, None] = 'd5e6f7a1b2c3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'ticket_stats_daily',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('client_id', sa.Integer(), nullable=False),
+        sa.Column('assigned_to', sa.Integer(), nullable=True),
+        sa.Column('type', sa.String(32), nullable=False),
+        sa.Column('priority', sa.String(16), nullable=False),
+        sa.Column('status', sa.String(32), nullable=False),
+        sa.Column('tickets', sa.Integer(), nullable=False),
+        sa.Column('reaction_total', sa.Integer(), nullable=False),
+        sa.Column('reaction_violated', sa.Integer(), nullable=False),
+        sa.Column('resolution_total', sa.Integer(), nullable=False),
+        sa.Column('resolution_violated', sa.Integer(), nullable=False),
+        sa.Column('resolved', sa.Integer(), nullable=False),
+        sa.Column('resolution_seconds', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_ticket_stats_daily_day', 'ticket_stats_daily', ['day', 'client_id', 'assigned_to'])
+    op.create_index('ix_tickets_updated', 'tickets', ['updated_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tickets_updated', table_name='tickets')
+    op.drop_index('ix_ticket_stats_daily_day', table_name='ticket_stats_daily')
+    op.drop_table('ticket_stats_daily')
+    settings = sa.table('system_settings', sa.column('key'))
+    op.execute(settings.delete().where(
+        settings.c.key.in_(['ticket_stats_updated_at', 'ticket_stats_sla_checked_at'])
+    ))
@@ -0,0 +1,64 @@
+"""list_composite_indexes
+
+Составные индексы под фильтры и сортировку списков заявок, журнала аудита
+и уведомлений. Одиночные индексы audit_log по user_id / entity_type /
+action заменяются составными (префикс нового индекса их покрывает).
+
+Revision ID: f6a1b2c3d4e5
+Revises: e5f6a1b2c3d4
+Create Date: 2026-05-12 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = 'f6a1b2c3d4e5'
+down_revision: Union[str, None] = 'e5f6a1b2c3d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_tickets_active_created', 'tickets', ['is_deleted', 'created_at']),
+    ('ix_tickets_client_created', 'tickets', ['client_id', 'is_deleted', 'created_at']),
+    ('ix_tickets_assignee_created', 'tickets', ['assigned_to', 'is_deleted', 'created_at']),
+    ('ix_tickets_equipment_created', 'tickets', ['equipment_id', 'is_deleted', 'created_at']),
+    ('ix_tickets_status_created', 'tickets', ['status', 'is_deleted', 'created_at']),
+    ('ix_tickets_priority_created', 'tickets', ['priority', 'is_deleted', 'created_at']),
+    ('ix_notifications_user_created', 'notifications', ['user_id', 'created_at']),
+    ('ix_notifications_user_read_created', 'notifications', ['user_id', 'is_read', 'created_at']),
+    ('ix_audit_log_user_created', 'audit_log', ['user_id', 'created_at']),
+    ('ix_audit_log_entity_created', 'audit_log', ['entity_type', 'created_at']),
+    ('ix_audit_log_action_created', 'audit_log', ['action', 'created_at']),
+]
+
+SUPERSEDED = [
+    ('ix_audit_log_user_id', 'audit_log', ['user_id']),
+    ('ix_audit_log_entity_type', 'audit_log', ['entity_type']),
+    ('ix_audit_log_action', 'audit_log', ['action']),
+]
+
+# MySQL молча удаляет автоматический индекс внешнего ключа, когда появляется
+# составной с тем же первым столбцом; при откате его нужно вернуть до удаления
+FK_FALLBACK = [
+    ('ix_tickets_client_id', 'tickets', ['client_id']),
+    ('ix_tickets_assigned_to', 'tickets', ['assigned_to']),
+    ('ix_tickets_equipment_id', 'tickets', ['equipment_id']),
+    ('ix_notifications_user_id', 'notifications', ['user_id']),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+    # старые индексы удаляются после создания новых: FK audit_log.user_id
+    # в MySQL не может остаться без индекса
+    for name, table, _ in SUPERSEDED:
+        op.drop_index(name, table_name=table, if_exists=True)
+
+
+def downgrade() -> None:
+    for name, table, columns in SUPERSEDED + FK_FALLBACK:
+        op.create_index(name, table, columns, if_not_exists=True)
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
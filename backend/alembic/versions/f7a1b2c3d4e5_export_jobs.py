@@ -0,0 +1,52 @@
+"""export_jobs
+
+Фоновые выгрузки (app.services.exports): задание, прогресс и ключ
+готового файла в хранилище. Индекс по хэшу параметров — под поиск
+готовой выгрузки для повторной отдачи.
+
+Revision ID: f7a1b2c3d4e5
+Revises: e6f7a1b2c3d4
+Create Date: 2026-06-12 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'f7a1b2c3d4e5'
+down_revision: Union[str, None] = 'e6f7a1b2c3d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'export_jobs',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('kind', sa.String(32), nullable=False),
+        sa.Column('params', sa.JSON(), nullable=False),
+        sa.Column('params_hash', sa.String(64), nullable=False),
+        sa.Column('status', sa.Enum('pending', 'running', 'done', 'failed', name='export_job_status_enum'),
+                  nullable=False, server_default='pending'),
+        sa.Column('progress', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('rows', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('file_name', sa.String(255), nullable=True),
+        sa.Column('storage_key', sa.String(64), nullable=True),
+        sa.Column('file_size', sa.BigInteger(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_by', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['created_by'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_export_jobs_hash_status', 'export_jobs', ['params_hash', 'status', 'created_at'])
+    op.create_index('ix_export_jobs_user_created', 'export_jobs', ['created_by', 'created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_export_jobs_user_created', table_name='export_jobs')
+    op.drop_index('ix_export_jobs_hash_status', table_name='export_jobs')
+    op.drop_table('export_jobs')
@@ -1,26 +1,16 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import FrozenSet, Optional
 import json
-import redis as _redis_lib
 
-from app.core.config import settings
+from app.core.auth_cache import is_revoked, load_principal
 from app.core.database import get_db
 from app.core.security import decode_token
 from app.models import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
-_redis_client: Optional[_redis_lib.Redis] = None
-
-
-def _get_redis() -> _redis_lib.Redis:
-    global _redis_client
-    if _redis_client is None:
-        _redis_client = _redis_lib.from_url(settings.redis_url, decode_responses=True)
-    return _redis_client
-
 
 def get_current_user(
     token: str = Depends(oauth2_scheme),
@@ -38,43 +28,50 @@ def get_current_user(
             raise credentials_exception
         # проверяем блоклист отозванных токенов
         jti = payload.get("jti")
-        if jti:
-            try:
-                if _get_redis().get(f"revoked_jti:{jti}"):
-                    raise credentials_exception
-            except _redis_lib.RedisError:
-                pass  # Redis недоступен — не блокируем, продолжаем
+        if jti and is_revoked(jti):
+            raise credentials_exception
+        user_id = int(user_id)
     except HTTPException:
         raise
     except Exception:
         raise credentials_exception
 
-    user = (
-        db.query(User)
-        .filter(User.id == int(user_id), User.is_active.is_(True), User.is_deleted.is_(False))
-        .first()
-    )
+    # FastAPI кэширует зависимость в пределах запроса: require_roles и
+    # get_client_scope получают этот же объект, токен разбирается один раз.
+    # Повторные запросы с тем же токеном обслуживаются из кэша без SELECT.
+    user = load_principal(db, user_id, jti)
     if user is None:
         raise credentials_exception
     return user
 
 
-def _get_user_roles(user: User) -> List[str]:
-    roles = user.roles
+def _get_user_roles(user: User) -> FrozenSet[str]:
+    """Роли пользователя; разбираются один раз на объект User.
+
+    Результат запоминается на объекте вместе с исходным значением roles —
+    присвоение нового списка ролей сбрасывает запомненный набор.
+    """
+    raw = user.roles
+    cached = user.__dict__.get("_role_set")
+    if cached is not None and cached[0] is raw:
+        return cached[1]
+    roles = raw
     if isinstance(roles, str):
         try:
             roles = json.loads(roles)
         except Exception:
             roles = [roles]
-    return roles if isinstance(roles, list) else []
+    role_set = frozenset(roles) if isinstance(roles, list) else frozenset()
+    user._role_set = (raw, role_set)
+    return role_set
 
 
 def require_roles(*roles: str):
     """Factory: returns a dependency that checks the user has one of the given roles."""
+    allowed = frozenset(roles)
 
     def _check(current_user: User = Depends(get_current_user)) -> User:
-        user_roles = _get_user_roles(current_user)
-        if not any(r in user_roles for r in roles):
+        if allowed.isdisjoint(_get_user_roles(current_user)):
             raise HTTPException(
                 status_code=403,
                 detail={"error": "FORBIDDEN", "message": "Недостаточно прав"},
@@ -90,7 +87,21 @@ def get_client_scope(current_user: User = Depends(get_current_user)) -> Optional
     Endpoints use this to enforce row-level filtering: when not None, only
     records belonging to that client_id are visible.
     """
-    user_roles = _get_user_roles(current_user)
-    if "client_user" in user_roles:
+    if "client_user" in _get_user_roles(current_user):
         return current_user.client_id
     return None
+
+
+_ALL_TICKETS_ROLES = frozenset({"admin", "svc_mgr", "director", "manager", "sales_mgr"})
+
+
+def get_engineer_scope(current_user: User = Depends(get_current_user)) -> Optional[int]:
+    """Return the user's id if they only see tickets assigned to them, else None.
+
+    Applies to engineers; client users are scoped by get_client_scope instead.
+    """
+    if get_client_scope(current_user) is not None:
+        return None
+    if _ALL_TICKETS_ROLES.isdisjoint(_get_user_roles(current_user)):
+        return current_user.id
+    return None
@@ -6,10 +6,11 @@ from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
 from fastapi import Request
+from app.core.auth_cache import invalidate_user, revoke_token
 from app.core.database import get_db
 from app.core.security import verify_password, create_access_token, decode_token, hash_password
 from app.models import User
-from app.api.deps import get_current_user, _get_redis, oauth2_scheme
+from app.api.deps import get_current_user, oauth2_scheme
 from pydantic import Field
 from app.services.audit import log_action, extract_ip
 
@@ -93,8 +94,7 @@ def logout(
         jti = payload.get("jti")
         exp = payload.get("exp")
         if jti and exp:
-            ttl = max(1, int(exp - datetime.utcnow().timestamp()))
-            _get_redis().setex(f"revoked_jti:{jti}", ttl, "1")
+            revoke_token(jti, exp)
     except Exception:
         pass
 
@@ -121,12 +121,12 @@ def change_password(
         jti = payload.get("jti")
         exp = payload.get("exp")
         if jti and exp:
-            ttl = max(1, int(exp - datetime.utcnow().timestamp()))
-            _get_redis().setex(f"revoked_jti:{jti}", ttl, "1")
+            revoke_token(jti, exp)
     except Exception:
         pass
     log_action(db, user_id=current_user.id, action="CHANGE_PASSWORD", entity_type="user", entity_id=current_user.id)
     db.commit()
+    invalidate_user(current_user.id)
 
 
 @router.get("/me")
@@ -5,10 +5,12 @@ from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session, joinedload
 
+from app.core.auth_cache import invalidate_user
 from app.core.database import get_db
 from app.core.security import hash_password
 from app.models import AuditLog, Client, ClientContact, Equipment, Ticket, User
 from app.api.deps import get_current_user, require_roles, get_client_scope, _get_user_roles
+from app.api.pagination import paginate
 from app.services.audit import log_action
 from app.schemas import (
     ClientContactCreate,
@@ -480,6 +482,7 @@ def grant_portal_access(
         },
     )
     db.commit()
+    invalidate_user(portal_user.id)
     db.refresh(contact)
 
     result = ClientContactPortalGrantResponse.model_validate(contact)
@@ -518,15 +521,21 @@ def revoke_portal_access(
         new_values={"portal_access": False, "portal_role": None},
     )
     db.commit()
+    if contact.portal_user_id:
+        invalidate_user(contact.portal_user_id)
     db.refresh(contact)
     return contact
 
 
 # ── Equipment & Tickets (read-only sub-resources) ─────────────────────────────
 
-@router.get("/{client_id}/equipment", response_model=list[EquipmentResponse])
+@router.get("/{client_id}/equipment", response_model=PaginatedResponse[EquipmentResponse])
 def list_client_equipment(
     client_id: int,
+    page: int = Query(1, ge=1),
+    size: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="Курсорный режим: пустая строка — первая страница"),
+    with_total: bool = Query(False),
     db: Session = Depends(get_db),
     _: User = Depends(get_current_user),
     client_scope: Optional[int] = Depends(get_client_scope),
@@ -537,17 +546,23 @@ def list_client_equipment(
             detail={"error": "NOT_FOUND", "message": "Клиент не найден"},
         )
     _get_active_client(db, client_id)
-    return (
+    # Equipment.client берётся из identity map (клиент загружен выше) — join не нужен
+    q = (
         db.query(Equipment)
         .options(joinedload(Equipment.model))
         .filter(Equipment.client_id == client_id, Equipment.is_deleted.is_(False))
-        .all()
     )
+    return paginate(q, (Equipment.id,), page=page, size=size,
+                    cursor=cursor, with_total=with_total, descending=False)
 
 
-@router.get("/{client_id}/tickets", response_model=list[TicketResponse])
+@router.get("/{client_id}/tickets", response_model=PaginatedResponse[TicketResponse])
 def list_client_tickets(
     client_id: int,
+    page: int = Query(1, ge=1),
+    size: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="Курсорный режим: пустая строка — первая страница"),
+    with_total: bool = Query(False),
     db: Session = Depends(get_db),
     _: User = Depends(get_current_user),
     client_scope: Optional[int] = Depends(get_client_scope),
@@ -558,10 +573,15 @@ def list_client_tickets(
             detail={"error": "NOT_FOUND", "message": "Клиент не найден"},
         )
     _get_active_client(db, client_id)
-    return (
+    # всё, что сериализует TicketResponse, кроме client (он уже в identity map)
+    q = (
         db.query(Ticket)
-        .options(joinedload(Ticket.client))
+        .options(
+            joinedload(Ticket.assignee),
+            joinedload(Ticket.creator),
+            joinedload(Ticket.equipment).joinedload(Equipment.model),
+        )
         .filter(Ticket.client_id == client_id, Ticket.is_deleted.is_(False))
-        .order_by(Ticket.created_at.desc())
-        .all()
     )
+    return paginate(q, (Ticket.created_at, Ticket.id), page=page, size=size,
+                    cursor=cursor, with_total=with_total)
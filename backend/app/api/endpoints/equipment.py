@@ -1,12 +1,14 @@
 from datetime import date
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.orm import Session, joinedload
 
 from app.core.database import get_db
+from app.core.http_cache import conditional_json
 from app.models import Equipment, EquipmentModel, MaintenanceSchedule, User, Ticket
 from app.api.deps import get_current_user, require_roles, get_client_scope
+from app.api.pagination import paginate
 from app.services.audit import log_action
 from app.schemas import (
     EquipmentCreate, EquipmentUpdate, EquipmentResponse,
@@ -23,6 +25,7 @@ _ADMIN = ("admin",)
 
 @router.get("/models", response_model=list[EquipmentModelResponse])
 def list_equipment_models(
+    request: Request,
     include_inactive: bool = Query(False),
     db: Session = Depends(get_db),
     _: User = Depends(get_current_user),
@@ -30,7 +33,7 @@ def list_equipment_models(
     q = db.query(EquipmentModel)
     if not include_inactive:
         q = q.filter(EquipmentModel.is_active.is_(True))
-    return q.order_by(EquipmentModel.name).all()
+    return conditional_json(request, q.order_by(EquipmentModel.name).all(), list[EquipmentModelResponse])
 
 
 @router.post("/models", response_model=EquipmentModelResponse, status_code=status.HTTP_201_CREATED)
@@ -135,6 +138,8 @@ def list_equipment(
     eq_status: Optional[str] = Query(None, alias="status"),
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="Курсорный режим: пустая строка — первая страница"),
+    with_total: bool = Query(False),
     db: Session = Depends(get_db),
     _: User = Depends(get_current_user),
     client_scope: Optional[int] = Depends(get_client_scope),
@@ -146,11 +151,8 @@ def list_equipment(
         q = q.filter(Equipment.client_id == effective_client_id)
     if eq_status:
         q = q.filter(Equipment.status == eq_status)
-    total = q.count()
-    skip = (page - 1) * size
-    items = q.order_by(Equipment.id).offset(skip).limit(size).all()
-    pages = max(1, (total + size - 1) // size)
-    return PaginatedResponse(items=items, total=total, page=page, size=size, pages=pages)
+    return paginate(q, (Equipment.id,), page=page, size=size,
+                    cursor=cursor, with_total=with_total, descending=False)
 
 
 @router.post("", response_model=EquipmentResponse, status_code=status.HTTP_201_CREATED)
@@ -0,0 +1,125 @@
+"""
+Фоновые выгрузки: постановка задания, опрос прогресса, скачивание файла.
+"""
+import logging
+from typing import Optional
+from urllib.parse import quote
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_current_user, _get_user_roles
+from app.api.pagination import paginate
+from app.celery_app import celery_app
+from app.core.database import get_db
+from app.core.storage import get_storage
+from app.models import ExportJob, User
+from app.schemas import ExportJobCreate, ExportJobResponse, PaginatedResponse
+from app.services import exports
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+def _check_kind_access(kind: str, user: User) -> exports.ExportKind:
+    export_kind = exports.EXPORTS[kind]
+    if set(export_kind.roles).isdisjoint(_get_user_roles(user)):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail={"error": "FORBIDDEN", "message": "Недостаточно прав"},
+        )
+    return export_kind
+
+
+def _get_job(db: Session, job_id: int, user: User) -> ExportJob:
+    """Задание доступно всем, кому доступен его вид: по кэшу его получают и другие пользователи."""
+    job = db.get(ExportJob, job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"error": "NOT_FOUND", "message": "Выгрузка не найдена"},
+        )
+    _check_kind_access(job.kind, user)
+    return job
+
+
+@router.post("", response_model=ExportJobResponse, status_code=status.HTTP_202_ACCEPTED)
+def create_export(
+    data: ExportJobCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Поставить выгрузку в очередь; готовая с теми же параметрами отдаётся сразу (status=done)."""
+    _check_kind_access(data.kind, current_user)
+    try:
+        params = exports.normalize_params(data.kind, data.params)
+    except ValidationError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={"error": "VALIDATION_ERROR",
+                    "message": f"Неверные параметры выгрузки: {exc.errors()[0]['msg']}"},
+        )
+    job, enqueue = exports.create_job(db, current_user, data.kind, params)
+    if enqueue:
+        try:
+            celery_app.send_task("app.tasks.exports.run_export", args=[job.id])
+        except Exception:
+            # иначе повторные запросы с теми же параметрами ждали бы задание, которое никто не выполнит
+            logger.exception("Выгрузка %s (задание %s) не поставлена в очередь", job.kind, job.id)
+            exports.fail_job(db, job, "Очередь выгрузок недоступна")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail={"error": "QUEUE_UNAVAILABLE", "message": "Очередь выгрузок недоступна, повторите позже"},
+            )
+    return job
+
+
+@router.get("", response_model=PaginatedResponse[ExportJobResponse])
+def list_exports(
+    page: int = Query(1, ge=1),
+    size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Курсорный режим: пустая строка — первая страница"),
+    with_total: bool = Query(False),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    q = db.query(ExportJob).filter(ExportJob.created_by == current_user.id)
+    return paginate(q, (ExportJob.created_at, ExportJob.id), page=page, size=size,
+                    cursor=cursor, with_total=with_total)
+
+
+@router.get("/{job_id}", response_model=ExportJobResponse)
+def get_export(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    return _get_job(db, job_id, current_user)
+
+
+@router.get("/{job_id}/download")
+def download_export(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    job = _get_job(db, job_id, current_user)
+    if job.status != "done":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"error": "STATUS_ERROR", "message": "Выгрузка ещё не готова"},
+        )
+    storage = get_storage()
+    if job.storage_key is None or not storage.exists(job.storage_key):
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail={"error": "NOT_FOUND", "message": "Файл выгрузки удалён по истечении срока, запустите выгрузку заново"},
+        )
+    media_type = exports.EXPORTS[job.kind].media_type
+    headers = {"Content-Disposition": f"attachment; filename*=UTF-8''{quote(job.file_name, safe='')}"}
+    path = storage.path(job.storage_key)
+    if path is not None:
+        return FileResponse(path, media_type=media_type, headers=headers)
+    return StreamingResponse(storage.iter_chunks(job.storage_key), media_type=media_type, headers=headers)
@@ -6,10 +6,13 @@ from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
-from app.models import Invoice, InvoiceItem, User, Ticket, WorkAct, WorkActItem, Warehouse
+from app.core.warehouse_cache import warehouses
+from app.models import Invoice, InvoiceItem, User, Ticket, WorkAct, WorkActItem
 from app.api.deps import get_current_user, require_roles, get_client_scope
+from app.api.pagination import paginate
 from app.schemas import InvoiceCreate, InvoiceUpdate, InvoiceResponse, PaginatedResponse
 from app.services.audit import log_action
+from app.services.numbering import next_number
 
 router = APIRouter()
 
@@ -20,8 +23,7 @@ _ADMIN = ("admin",)
 
 def _next_invoice_number(db: Session) -> str:
     year = datetime.utcnow().year
-    count = db.query(Invoice).filter(Invoice.number.like(f"INV-{year}-%")).count()
-    return f"INV-{year}-{count + 1:05d}"
+    return next_number(db, f"INV-{year}", 5, Invoice.number)
 
 
 def _recalculate(invoice: Invoice) -> None:
@@ -41,6 +43,8 @@ def list_invoices(
     ticket_id: Optional[int] = Query(None),
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="Курсорный режим: пустая строка — первая страница"),
+    with_total: bool = Query(False),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_roles(*_READ_ROLES)),
     client_scope: Optional[int] = Depends(get_client_scope),
@@ -53,11 +57,15 @@ def list_invoices(
         q = q.filter(Invoice.status == inv_status)
     if ticket_id is not None:
         q = q.filter(Invoice.ticket_id == ticket_id)
-    total = q.count()
-    skip = (page - 1) * size
-    items = q.order_by(Invoice.issue_date.desc()).offset(skip).limit(size).all()
-    pages = max(1, (total + size - 1) // size)
-    return PaginatedResponse(items=items, total=total, page=page, size=size, pages=pages)
+    if cursor is None:
+        total = q.count()
+        skip = (page - 1) * size
+        items = q.order_by(Invoice.issue_date.desc()).offset(skip).limit(size).all()
+        pages = max(1, (total + size - 1) // size)
+        return PaginatedResponse(items=items, total=total, page=page, size=size, pages=pages)
+    # курсор идёт по времени создания: issue_date не уникальна и может быть задана задним числом
+    return paginate(q, (Invoice.created_at, Invoice.id), page=page, size=size,
+                    cursor=cursor, with_total=with_total)
 
 
 @router.post("", response_model=InvoiceResponse, status_code=status.HTTP_201_CREATED)
@@ -271,7 +279,7 @@ def create_invoice_from_act(
         unit_price = act_item.unit_price
         total = act_item.total
         if act_item.item_type == "part" and act_item.warehouse_id:
-            wh = db.query(Warehouse).filter(Warehouse.id == act_item.warehouse_id).first()
+            wh = warehouses.get(db, act_item.warehouse_id)
             if wh and wh.type == "bank":
                 unit_price = Decimal("0")
                 total = Decimal("0")
@@ -10,6 +10,7 @@ from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.models import Notification, NotificationSetting, User
 from app.api.deps import get_current_user
+from app.api.pagination import paginate
 from app.schemas import (
     NotificationResponse, NotificationSettingResponse,
     NotificationSettingUpdate, PaginatedResponse,
@@ -62,17 +63,16 @@ def list_notifications(
     is_read: Optional[bool] = Query(None),
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Курсорный режим: пустая строка — первая страница"),
+    with_total: bool = Query(False),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     q = db.query(Notification).filter(Notification.user_id == current_user.id)
     if is_read is not None:
         q = q.filter(Notification.is_read == is_read)
-    total = q.count()
-    skip = (page - 1) * size
-    items = q.order_by(Notification.created_at.desc()).offset(skip).limit(size).all()
-    pages = max(1, (total + size - 1) // size)
-    return PaginatedResponse(items=items, total=total, page=page, size=size, pages=pages)
+    return paginate(q, (Notification.created_at, Notification.id), page=page, size=size,
+                    cursor=cursor, with_total=with_total)
 
 
 @router.get("/unread-count")
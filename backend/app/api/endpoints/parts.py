@@ -4,13 +4,14 @@ from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
-from app.models import SparePart, PriceHistory, User, WarehouseStock, Warehouse
-from app.api.deps import get_current_user, require_roles, get_client_scope
+from app.models import SparePart, PriceHistory, User
+from app.api.deps import get_current_user, require_roles, get_client_scope, _get_user_roles
 from app.schemas import (
     SparePartCreate, SparePartUpdate, SparePartResponse,
     SparePartPriceUpdate, PriceHistoryResponse,
     StockAdjust, PaginatedResponse,
 )
+from app.services import stock as stock_service
 
 router = APIRouter()
 
@@ -19,6 +20,30 @@ _WRITE_ROLES = ("admin", "warehouse")
 _ADMIN = ("admin",)
 
 
+def _adjust_company_stock(db: Session, part: SparePart, delta: int, reason: str, user: User, note: str) -> None:
+    """Изменить количество запчасти движением по складу компании.
+
+    SparePart.quantity — кэш суммы по складам компании, напрямую не пишется.
+    """
+    if not delta:
+        return
+    warehouse_id = stock_service.company_warehouse_for(db, part.id)
+    if warehouse_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={"error": "VALIDATION_ERROR", "message": "Нет активного склада компании"},
+        )
+    try:
+        stock_service.apply_movements(
+            db, [(warehouse_id, part.id, delta)], reason, user_id=user.id, note=note[:255],
+        )
+    except stock_service.InsufficientStock as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"error": "BR_VIOLATION", "message": str(e)},
+        )
+
+
 @router.get("", response_model=PaginatedResponse[SparePartResponse])
 def list_parts(
     category: Optional[str] = Query(None),
@@ -53,15 +78,18 @@ def list_parts(
 def create_part(
     data: SparePartCreate,
     db: Session = Depends(get_db),
-    _: User = Depends(require_roles(*_WRITE_ROLES)),
+    current_user: User = Depends(require_roles(*_WRITE_ROLES)),
 ):
     if db.query(SparePart).filter(SparePart.sku == data.sku).first():
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail={"error": "CONFLICT", "message": "SKU уже используется"},
         )
-    part = SparePart(**data.model_dump())
+    part = SparePart(**data.model_dump(exclude={"quantity"}), quantity=0)
     db.add(part)
+    db.flush()
+    # начальное количество — приход на основной склад компании
+    _adjust_company_stock(db, part, data.quantity, "opening", current_user, "Начальный остаток")
     db.commit()
     db.refresh(part)
     return part
@@ -93,7 +121,7 @@ def update_part(
     part_id: int,
     data: SparePartUpdate,
     db: Session = Depends(get_db),
-    _: User = Depends(require_roles(*_WRITE_ROLES)),
+    current_user: User = Depends(require_roles(*_WRITE_ROLES)),
 ):
     part = db.query(SparePart).filter(SparePart.id == part_id).first()
     if not part:
@@ -109,8 +137,11 @@ def update_part(
                 status_code=status.HTTP_409_CONFLICT,
                 detail={"error": "CONFLICT", "message": "SKU уже используется"},
             )
+    new_qty = update_data.pop("quantity", None)
     for k, v in update_data.items():
         setattr(part, k, v)
+    if new_qty is not None:
+        _adjust_company_stock(db, part, new_qty - part.quantity, "adjust", current_user, "Правка карточки запчасти")
     db.commit()
     db.refresh(part)
     return part
@@ -137,7 +168,7 @@ def adjust_stock(
     part_id: int,
     data: StockAdjust,
     db: Session = Depends(get_db),
-    _: User = Depends(require_roles(*_WRITE_ROLES)),
+    current_user: User = Depends(require_roles(*_WRITE_ROLES)),
 ):
     part = db.query(SparePart).filter(SparePart.id == part_id).first()
     if not part:
@@ -154,15 +185,7 @@ def adjust_stock(
                 "message": f"Недостаточно на складе: доступно {part.quantity} {part.unit}",
             },
         )
-    part.quantity = new_qty
-    company_stock = (
-        db.query(WarehouseStock)
-        .join(Warehouse, WarehouseStock.warehouse_id == Warehouse.id)
-        .filter(WarehouseStock.part_id == part_id, Warehouse.type == "company")
-        .first()
-    )
-    if company_stock:
-        company_stock.quantity = new_qty
+    _adjust_company_stock(db, part, data.delta, "adjust", current_user, data.reason)
     db.commit()
     db.refresh(part)
     return part
@@ -206,11 +229,7 @@ def get_part_price_history(
     current_user: User = Depends(get_current_user),
 ):
     """Получить историю изменений цены матценности. Недоступно для client_user."""
-    import json as _json
-    _roles = current_user.roles
-    if isinstance(_roles, str):
-        _roles = _json.loads(_roles)
-    if "client_user" in (_roles or []):
+    if "client_user" in _get_user_roles(current_user):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail={"error": "FORBIDDEN", "message": "Нет доступа"},
@@ -5,8 +5,9 @@ from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session, joinedload
 
 from app.core.database import get_db
+from app.core.warehouse_cache import warehouses
 from app.models import (
-    PartsTransfer, PartsTransferItem, Warehouse, WarehouseStock, SparePart, User,
+    PartsTransfer, PartsTransferItem, WarehouseStock, SparePart, User,
 )
 from app.api.deps import get_current_user, require_roles
 from app.schemas import (
@@ -14,6 +15,8 @@ from app.schemas import (
     PartsTransferItemResponse, PaginatedResponse,
 )
 from app.services.audit import log_action
+from app.services.numbering import next_number
+from app.services import stock as stock_service
 
 router = APIRouter()
 
@@ -22,10 +25,7 @@ _WRITE = ("admin", "svc_mgr")
 
 def _next_transfer_number(db: Session) -> str:
     year = date.today().year
-    count = db.query(PartsTransfer).filter(
-        PartsTransfer.transfer_number.like(f"TRF-{year}-%")
-    ).count()
-    return f"TRF-{year}-{count + 1:04d}"
+    return next_number(db, f"TRF-{year}", 4, PartsTransfer.transfer_number)
 
 
 def _build_response(transfer: PartsTransfer, db: Session) -> PartsTransferResponse:
@@ -106,9 +106,9 @@ def create_transfer(
     db: Session = Depends(get_db),
     current_user: User = Depends(require_roles(*_WRITE)),
 ):
-    from_wh = db.query(Warehouse).filter(Warehouse.id == data.from_warehouse_id, Warehouse.is_active.is_(True)).first()
-    to_wh = db.query(Warehouse).filter(Warehouse.id == data.to_warehouse_id, Warehouse.is_active.is_(True)).first()
-    if not from_wh or not to_wh:
+    from_wh = warehouses.get(db, data.from_warehouse_id)
+    to_wh = warehouses.get(db, data.to_warehouse_id)
+    if not (from_wh and from_wh.is_active and to_wh and to_wh.is_active):
         raise HTTPException(status.HTTP_404_NOT_FOUND,
                             detail={"error": "NOT_FOUND", "message": "Склад не найден"})
 
@@ -206,63 +206,26 @@ def post_transfer(
         raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY,
                             detail={"error": "VALIDATION",
                                     "message": "Склад-источник и получатель должны быть разными"})
-    to_wh = db.query(Warehouse).filter(Warehouse.id == transfer.to_warehouse_id).first()
+    to_wh = warehouses.get(db, transfer.to_warehouse_id)
     if not to_wh or to_wh.type != "bank":
         raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY,
                             detail={"error": "VALIDATION", "message": "Получатель должен быть складом банка"})
-    from_wh = db.query(Warehouse).filter(Warehouse.id == transfer.from_warehouse_id).first()
 
-    # lock source stock rows
     for item in transfer.items:
         if item.quantity < 1:
             raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY,
                                 detail={"error": "VALIDATION", "message": "Количество должно быть не менее 1"})
-        src_stock = (
-            db.query(WarehouseStock)
-            .filter(WarehouseStock.warehouse_id == transfer.from_warehouse_id,
-                    WarehouseStock.part_id == item.part_id)
-            .with_for_update()
-            .first()
-        )
-        available = src_stock.quantity if src_stock else 0
-        if available < item.quantity:
-            part_name = item.part.name if item.part else str(item.part_id)
-            raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY,
-                                detail={"error": "INSUFFICIENT_STOCK",
-                                        "message": f"Недостаточно запчастей {part_name} на складе-источнике: "
-                                                   f"доступно {available}, запрошено {item.quantity}"})
-
-    # apply
+    lines = [(transfer.from_warehouse_id, item.part_id, -item.quantity) for item in transfer.items]
+    lines += [(transfer.to_warehouse_id, item.part_id, item.quantity) for item in transfer.items]
+    try:
+        stocks = stock_service.apply_movements(db, lines, "transfer", doc_id=transfer.id, user_id=current_user.id)
+    except stock_service.InsufficientStock as e:
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail={"error": "INSUFFICIENT_STOCK", "message": str(e)})
     for item in transfer.items:
-        src_stock = (
-            db.query(WarehouseStock)
-            .filter(WarehouseStock.warehouse_id == transfer.from_warehouse_id,
-                    WarehouseStock.part_id == item.part_id)
-            .first()
-        )
-        src_stock.quantity -= item.quantity
-
-        dst_stock = (
-            db.query(WarehouseStock)
-            .filter(WarehouseStock.warehouse_id == transfer.to_warehouse_id,
-                    WarehouseStock.part_id == item.part_id)
-            .first()
-        )
-        if dst_stock:
-            dst_stock.quantity += item.quantity
-        else:
-            db.add(WarehouseStock(
-                warehouse_id=transfer.to_warehouse_id,
-                part_id=item.part_id,
-                quantity=item.quantity,
-                unit_price_snapshot=item.unit_price_snapshot,
-            ))
-
-        # sync SparePart.quantity for company warehouse
-        if from_wh and from_wh.type == "company":
-            part = db.query(SparePart).filter(SparePart.id == item.part_id).first()
-            if part:
-                part.quantity = max(0, part.quantity - item.quantity)
+        dst_stock = stocks[transfer.to_warehouse_id, item.part_id]
+        if dst_stock.unit_price_snapshot is None:
+            dst_stock.unit_price_snapshot = item.unit_price_snapshot
 
     transfer.status = "posted"
     transfer.posted_by = current_user.id
@@ -1,19 +1,28 @@
-from datetime import date, datetime, time, timedelta
-from io import BytesIO
+from datetime import date
 from typing import Optional
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Path, Query
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session
 
-from app.api.deps import get_db, require_roles
-from app.models import Ticket, User
-from app.schemas import TicketReportResponse
+from app.api.deps import require_roles
+from app.core.database import get_read_db
+from app.models import User
+from app.schemas import (
+    EngineerUtilizationReport, PartsConsumptionReport, RevenueReport, TicketReportResponse,
+)
+from app.services import reports as report_service
+from app.services import spreadsheet, ticket_stats
 
 router = APIRouter()
 _ROLES = ("director", "svc_mgr", "admin")
+_PARTS_ROLES = ("director", "svc_mgr", "warehouse", "admin")
+_REVENUE_ROLES = ("director", "accountant", "admin")
 
-FINAL_STATUSES = {"completed", "closed", "cancelled"}
+
+def _filter(date_from: date, date_to: date, engineer_id: Optional[int],
+            client_id: Optional[int]) -> report_service.TicketReportFilter:
+    return report_service.TicketReportFilter(date_from, date_to, engineer_id, client_id)
 
 
 def _build_report(
@@ -23,96 +32,10 @@ def _build_report(
     engineer_id: Optional[int],
     client_id: Optional[int],
 ) -> dict:
-    q = (
-        db.query(Ticket)
-        .options(joinedload(Ticket.assignee), joinedload(Ticket.client))
-        .filter(
-            Ticket.is_deleted.is_(False),
-            Ticket.created_at >= datetime.combine(date_from, time.min),
-            Ticket.created_at <= datetime.combine(date_to, time.max),
-        )
-    )
-    if engineer_id:
-        q = q.filter(Ticket.assigned_to == engineer_id)
-    if client_id:
-        q = q.filter(Ticket.client_id == client_id)
-
-    rows = q.all()
-    total = len(rows)
-
-    by_status: dict[str, int] = {}
-    by_type: dict[str, int] = {}
-    by_priority: dict[str, int] = {}
-    by_engineer: dict[str, int] = {}
-
-    reaction_total = reaction_violated = 0
-    resolution_total = resolution_violated = 0
-    resolution_times: list[float] = []
-
-    now = datetime.utcnow()
-
-    for t in rows:
-        by_status[t.status] = by_status.get(t.status, 0) + 1
-        by_type[t.type] = by_type.get(t.type, 0) + 1
-        by_priority[t.priority] = by_priority.get(t.priority, 0) + 1
-
-        if t.assigned_to and t.assignee:
-            name = t.assignee.full_name
-            by_engineer[name] = by_engineer.get(name, 0) + 1
-
-        # SLA reaction compliance
-        if t.sla_reaction_deadline is not None:
-            reaction_total += 1
-            if t.sla_reaction_violated:
-                reaction_violated += 1
-        elif t.sla_deadline is not None:
-            # fallback to old sla_deadline for tickets created before new SLA system
-            reaction_total += 1
-            if t.sla_deadline < now and t.status not in FINAL_STATUSES:
-                reaction_violated += 1
-
-        # SLA resolution compliance
-        if t.sla_resolution_deadline is not None:
-            resolution_total += 1
-            if t.sla_resolution_violated:
-                resolution_violated += 1
-        elif t.sla_deadline is not None:
-            resolution_total += 1
-            if t.sla_deadline < now and t.status not in FINAL_STATUSES:
-                resolution_violated += 1
-
-        # Average resolution time (for closed/completed tickets)
-        if t.status in ("closed", "completed") and t.closed_at and t.created_at:
-            delta = (t.closed_at - t.created_at).total_seconds() / 3600
-            resolution_times.append(delta)
-
-    sla_reaction_pct = (
-        None if reaction_total == 0
-        else round(100 * (reaction_total - reaction_violated) / reaction_total, 2)
-    )
-    sla_resolution_pct = (
-        None if resolution_total == 0
-        else round(100 * (resolution_total - resolution_violated) / resolution_total, 2)
-    )
-    avg_resolution_hours = (
-        None if not resolution_times
-        else round(sum(resolution_times) / len(resolution_times), 1)
-    )
-
-    return {
-        "total": total,
-        "by_status": by_status,
-        "by_type": by_type,
-        "by_priority": by_priority,
-        "by_engineer": by_engineer,
-        "sla_reaction_compliance_pct": sla_reaction_pct,
-        "sla_resolution_compliance_pct": sla_resolution_pct,
-        "sla_compliance_pct": sla_resolution_pct,  # backward compat
-        "avg_resolution_hours": avg_resolution_hours,
-        "rows": rows,
-        "period_from": date_from,
-        "period_to": date_to,
-    }
+    """Сводка по заявкам периода: из дневного среза, пока он не заполнен — по заявкам (в БД)."""
+    data = ticket_stats.report_summary(db, _filter(date_from, date_to, engineer_id, client_id))
+    data.update(period_from=date_from, period_to=date_to)
+    return data
 
 
 @router.get("/tickets", response_model=TicketReportResponse)
@@ -121,7 +44,7 @@ def report_tickets(
     date_to: date = Query(...),
     engineer_id: Optional[int] = None,
     client_id: Optional[int] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _: User = Depends(require_roles(*_ROLES)),
 ):
     data = _build_report(db, date_from, date_to, engineer_id, client_id)
@@ -146,63 +69,119 @@ def export_tickets_xlsx(
     date_to: date = Query(...),
     engineer_id: Optional[int] = None,
     client_id: Optional[int] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _: User = Depends(require_roles(*_ROLES)),
 ):
-    from openpyxl import Workbook
-    from openpyxl.styles import Font
-
+    """XLSX-выгрузка: write_only-книга во временный файл, отдаётся частями."""
+    flt = _filter(date_from, date_to, engineer_id, client_id)
     data = _build_report(db, date_from, date_to, engineer_id, client_id)
-    wb = Workbook()
-
-    ws = wb.active
-    ws.title = "Заявки"
-    headers = ["Номер", "Создана", "Клиент", "Тип", "Приоритет", "Статус",
-               "Инженер", "SLA реакция нарушена", "SLA решение нарушено"]
-    ws.append(headers)
-    for cell in ws[1]:
-        cell.font = Font(bold=True)
-
-    for t in data["rows"]:
-        ws.append([
-            t.number,
-            t.created_at.strftime("%d.%m.%Y %H:%M") if t.created_at else "",
-            t.client.name if t.client else "",
-            t.type,
-            t.priority,
-            t.status,
-            t.assignee.full_name if t.assignee else "",
-            "Да" if t.sla_reaction_violated else "Нет",
-            "Да" if t.sla_resolution_violated else "Нет",
-        ])
-
-    ws2 = wb.create_sheet("Сводка")
-    ws2.append(["Показатель", "Значение"])
-    ws2.append(["Период с", str(date_from)])
-    ws2.append(["Период по", str(date_to)])
-    ws2.append(["Всего заявок", data["total"]])
-    ws2.append(["% соблюдения SLA реакции",
-                data["sla_reaction_compliance_pct"] if data["sla_reaction_compliance_pct"] is not None else "N/A"])
-    ws2.append(["% соблюдения SLA решения",
-                data["sla_resolution_compliance_pct"] if data["sla_resolution_compliance_pct"] is not None else "N/A"])
-    ws2.append(["Среднее время решения (ч)",
-                data["avg_resolution_hours"] if data["avg_resolution_hours"] is not None else "N/A"])
-    ws2.append([])
-    ws2.append(["По статусам"])
-    for k, v in data["by_status"].items():
-        ws2.append([k, v])
-    ws2.append([])
-    ws2.append(["По инженерам"])
-    for k, v in data["by_engineer"].items():
-        ws2.append([k, v])
-
-    buf = BytesIO()
-    wb.save(buf)
-    buf.seek(0)
+    fh = report_service.tickets_xlsx(db, flt, data)
 
     fname = f"tickets_report_{date_from}_{date_to}.xlsx"
     return StreamingResponse(
-        buf,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        spreadsheet.iter_file(fh),
+        media_type=spreadsheet.MEDIA_TYPE,
         headers={"Content-Disposition": f"attachment; filename={fname}"},
     )
+
+
+def _table_export(db: Session, report: report_service.TableReport, fmt: str, name: str) -> StreamingResponse:
+    """Выгрузка табличного отчёта: файл пишется во временный файл, пока сессия открыта, и отдаётся частями."""
+    headers = {"Content-Disposition": f"attachment; filename={name}.{fmt}"}
+    if fmt == "csv":
+        return StreamingResponse(spreadsheet.iter_file(report_service.table_csv(db, report)),
+                                 media_type="text/csv; charset=utf-8", headers=headers)
+    return StreamingResponse(spreadsheet.iter_file(report_service.table_xlsx(db, report)),
+                             media_type=spreadsheet.MEDIA_TYPE, headers=headers)
+
+
+# ─── Engineer utilization ─────────────────────────────────────────────────────
+
+def _utilization(date_from: date, date_to: date, engineer_id: Optional[int], hours_per_day: int):
+    capacity = report_service.working_minutes(date_from, date_to, hours_per_day)
+    return capacity, report_service.engineer_utilization(date_from, date_to, capacity, engineer_id)
+
+
+@router.get("/engineers", response_model=EngineerUtilizationReport)
+def report_engineers(
+    date_from: date = Query(...),
+    date_to: date = Query(...),
+    engineer_id: Optional[int] = None,
+    hours_per_day: int = Query(8, ge=1, le=24),
+    db: Session = Depends(get_read_db),
+    _: User = Depends(require_roles(*_ROLES)),
+):
+    capacity, report = _utilization(date_from, date_to, engineer_id, hours_per_day)
+    return EngineerUtilizationReport(period_from=date_from, period_to=date_to, capacity_hours=capacity // 60,
+                                     rows=report_service.table_rows(db, report))
+
+
+@router.get("/engineers/export/{fmt}")
+def export_engineers(
+    fmt: str = Path(..., pattern="^(xlsx|csv)$"),
+    date_from: date = Query(...),
+    date_to: date = Query(...),
+    engineer_id: Optional[int] = None,
+    hours_per_day: int = Query(8, ge=1, le=24),
+    db: Session = Depends(get_read_db),
+    _: User = Depends(require_roles(*_ROLES)),
+):
+    _, report = _utilization(date_from, date_to, engineer_id, hours_per_day)
+    return _table_export(db, report, fmt, f"engineers_{date_from}_{date_to}")
+
+
+# ─── Parts consumption ────────────────────────────────────────────────────────
+
+@router.get("/parts", response_model=PartsConsumptionReport)
+def report_parts(
+    date_from: date = Query(...),
+    date_to: date = Query(...),
+    warehouse_id: Optional[int] = None,
+    part_id: Optional[int] = None,
+    db: Session = Depends(get_read_db),
+    _: User = Depends(require_roles(*_PARTS_ROLES)),
+):
+    report = report_service.parts_consumption(date_from, date_to, warehouse_id, part_id)
+    return PartsConsumptionReport(period_from=date_from, period_to=date_to,
+                                  rows=report_service.table_rows(db, report))
+
+
+@router.get("/parts/export/{fmt}")
+def export_parts(
+    fmt: str = Path(..., pattern="^(xlsx|csv)$"),
+    date_from: date = Query(...),
+    date_to: date = Query(...),
+    warehouse_id: Optional[int] = None,
+    part_id: Optional[int] = None,
+    db: Session = Depends(get_read_db),
+    _: User = Depends(require_roles(*_PARTS_ROLES)),
+):
+    report = report_service.parts_consumption(date_from, date_to, warehouse_id, part_id)
+    return _table_export(db, report, fmt, f"parts_{date_from}_{date_to}")
+
+
+# ─── Revenue ──────────────────────────────────────────────────────────────────
+
+@router.get("/revenue", response_model=RevenueReport)
+def report_revenue(
+    date_from: date = Query(...),
+    date_to: date = Query(...),
+    client_id: Optional[int] = None,
+    db: Session = Depends(get_read_db),
+    _: User = Depends(require_roles(*_REVENUE_ROLES)),
+):
+    report = report_service.revenue(date_from, date_to, client_id)
+    return RevenueReport(period_from=date_from, period_to=date_to, rows=report_service.table_rows(db, report))
+
+
+@router.get("/revenue/export/{fmt}")
+def export_revenue(
+    fmt: str = Path(..., pattern="^(xlsx|csv)$"),
+    date_from: date = Query(...),
+    date_to: date = Query(...),
+    client_id: Optional[int] = None,
+    db: Session = Depends(get_read_db),
+    _: User = Depends(require_roles(*_REVENUE_ROLES)),
+):
+    return _table_export(db, report_service.revenue(date_from, date_to, client_id), fmt,
+                         f"revenue_{date_from}_{date_to}")
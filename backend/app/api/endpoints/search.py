@@ -0,0 +1,76 @@
+"""
+Единый поиск по заявкам (вместе с комментариями), клиентам и оборудованию;
+автодополнение серийных номеров, артикулов и названий клиентов.
+"""
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session, joinedload
+
+from app.api.deps import get_current_user, get_client_scope, get_engineer_scope
+from app.core.database import get_read_db
+from app.models import Client, Equipment, Ticket, User
+from app.schemas import SearchHitResponse, SuggestionResponse
+from app.services import search as search_service
+from app.services import suggest as suggest_service
+
+router = APIRouter()
+
+
+def _hit_titles(db: Session, hits: list[tuple[str, int, int]]) -> dict[tuple[str, int], tuple[str, Optional[str]]]:
+    """(type, id) → (title, subtitle); по одному запросу на тип."""
+    ids: dict[str, list[int]] = {"ticket": [], "client": [], "equipment": []}
+    for entity_type, entity_id, _ in hits:
+        ids[entity_type].append(entity_id)
+
+    titles = {}
+    if ids["ticket"]:
+        for t in db.query(Ticket).filter(Ticket.id.in_(ids["ticket"])):
+            titles["ticket", t.id] = (t.title, t.number)
+    if ids["client"]:
+        for c in db.query(Client).filter(Client.id.in_(ids["client"])):
+            titles["client", c.id] = (c.name, c.inn)
+    if ids["equipment"]:
+        query = db.query(Equipment).options(joinedload(Equipment.model)).filter(Equipment.id.in_(ids["equipment"]))
+        for e in query:
+            titles["equipment", e.id] = (e.serial_number, e.model.name if e.model else None)
+    return titles
+
+
+@router.get("", response_model=List[SearchHitResponse])
+def search(
+    q: str = Query(..., min_length=2, max_length=255),
+    types: Optional[List[Literal["ticket", "client", "equipment"]]] = Query(None, alias="type"),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_read_db),
+    _: User = Depends(get_current_user),
+    client_scope: Optional[int] = Depends(get_client_scope),
+    engineer_scope: Optional[int] = Depends(get_engineer_scope),
+):
+    hits = search_service.search(
+        db, q, types=types, client_scope=client_scope, assigned_to=engineer_scope, limit=limit,
+    )
+    titles = _hit_titles(db, hits)
+    return [
+        SearchHitResponse(type=entity_type, id=entity_id, title=titles[entity_type, entity_id][0],
+                          subtitle=titles[entity_type, entity_id][1], score=score)
+        for entity_type, entity_id, score in hits
+    ]
+
+
+@router.get("/suggest", response_model=List[SuggestionResponse])
+def suggest(
+    field: Literal["serial", "sku", "client"] = Query(...),
+    q: str = Query(..., min_length=1, max_length=128, description="1–2 символа — поиск по началу, от 3 — и по подстроке"),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_read_db),
+    _: User = Depends(get_current_user),
+    client_scope: Optional[int] = Depends(get_client_scope),
+):
+    if field == "sku" and client_scope is not None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail={"error": "FORBIDDEN", "message": "Нет доступа к складу запчастей"},
+        )
+    rows = suggest_service.suggest(db, field, q, client_scope=client_scope, limit=limit)
+    return [SuggestionResponse(type=field, id=entity_id, value=value) for entity_id, value in rows]
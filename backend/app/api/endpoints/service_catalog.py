@@ -1,9 +1,10 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
+from app.core.http_cache import conditional_json
 from app.models import ServiceCatalog, WorkActItem, InvoiceItem, User
 from app.api.deps import get_current_user, require_roles
 from app.schemas import (
@@ -18,6 +19,7 @@ _WRITE_ROLES = ("admin", "svc_mgr")
 
 @router.get("", response_model=PaginatedResponse[ServiceCatalogResponse])
 def list_service_catalog(
+    request: Request,
     include_inactive: bool = Query(False),
     category: Optional[str] = Query(None),
     page: int = Query(1, ge=1),
@@ -34,7 +36,11 @@ def list_service_catalog(
     skip = (page - 1) * size
     items = q.order_by(ServiceCatalog.name).offset(skip).limit(size).all()
     pages = max(1, (total + size - 1) // size)
-    return PaginatedResponse(items=items, total=total, page=page, size=size, pages=pages)
+    return conditional_json(
+        request,
+        PaginatedResponse(items=items, total=total, page=page, size=size, pages=pages),
+        PaginatedResponse[ServiceCatalogResponse],
+    )
 
 
 @router.post("", response_model=ServiceCatalogResponse, status_code=status.HTTP_201_CREATED)
@@ -1,11 +1,13 @@
 import math
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy import func, desc, tuple_
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_db, get_current_user, require_roles
+from app.core.database import pool_status
+from app.core.http_cache import conditional_json
 from app.models import SystemSetting, User, ExchangeRate
 from app.schemas import (
     CurrencySettingResponse, CurrencySettingUpdate,
@@ -27,11 +29,12 @@ def _get_setting(db: Session, key: str) -> str:
 
 
 @router.get("/currency", response_model=CurrencySettingResponse, summary="Получить системную валюту")
-def get_currency(db: Session = Depends(get_db), _: User = Depends(get_current_user)):
-    return CurrencySettingResponse(
+def get_currency(request: Request, db: Session = Depends(get_db), _: User = Depends(get_current_user)):
+    currency = CurrencySettingResponse(
         currency_code=_get_setting(db, _CURRENCY_CODE_KEY),
         currency_name=_get_setting(db, _CURRENCY_NAME_KEY),
     )
+    return conditional_json(request, currency, CurrencySettingResponse)
 
 
 @router.put("/currency", response_model=CurrencySettingResponse, summary="Изменить системную валюту")
@@ -66,6 +69,7 @@ def update_currency(
     summary="Текущие курсы всех валют",
 )
 def list_exchange_rates(
+    request: Request,
     db: Session = Depends(get_db),
     _: User = Depends(get_current_user),
 ):
@@ -99,7 +103,7 @@ def list_exchange_rates(
         .order_by(ExchangeRate.currency)
         .all()
     )
-    return rows
+    return conditional_json(request, rows, list[ExchangeRateResponse])
 
 
 @router.post(
@@ -171,3 +175,9 @@ def get_exchange_rate_history(
         size=size,
         pages=math.ceil(total / size),
     )
+
+
+@router.get("/db-pool", summary="Состояние пула соединений БД")
+def get_db_pool(_: User = Depends(require_roles("admin"))):
+    """Счётчики ожидания соединения и заполненность пула текущего процесса (профиль DB_PROFILE)."""
+    return pool_status()
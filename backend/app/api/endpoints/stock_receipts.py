@@ -5,13 +5,16 @@ from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session, joinedload
 
 from app.core.database import get_db
-from app.models import StockReceipt, StockReceiptItem, Warehouse, WarehouseStock, SparePart, User
+from app.core.warehouse_cache import warehouses
+from app.models import StockReceipt, StockReceiptItem, SparePart, User
 from app.api.deps import get_current_user, require_roles
 from app.schemas import (
     StockReceiptCreate, StockReceiptUpdate, StockReceiptResponse,
     StockReceiptItemResponse, PaginatedResponse,
 )
 from app.services.audit import log_action
+from app.services.numbering import next_number
+from app.services import stock as stock_service
 
 router = APIRouter()
 
@@ -20,10 +23,7 @@ _WRITE = ("admin", "svc_mgr")
 
 def _next_receipt_number(db: Session) -> str:
     year = date.today().year
-    count = db.query(StockReceipt).filter(
-        StockReceipt.receipt_number.like(f"RCP-{year}-%")
-    ).count()
-    return f"RCP-{year}-{count + 1:04d}"
+    return next_number(db, f"RCP-{year}", 4, StockReceipt.receipt_number)
 
 
 def _build_response(receipt: StockReceipt) -> StockReceiptResponse:
@@ -84,8 +84,8 @@ def create_receipt(
     db: Session = Depends(get_db),
     current_user: User = Depends(require_roles(*_WRITE)),
 ):
-    wh = db.query(Warehouse).filter(Warehouse.id == data.warehouse_id, Warehouse.is_active.is_(True)).first()
-    if not wh:
+    wh = warehouses.get(db, data.warehouse_id)
+    if not wh or not wh.is_active:
         raise HTTPException(status.HTTP_404_NOT_FOUND,
                             detail={"error": "NOT_FOUND", "message": "Склад не найден"})
     receipt = StockReceipt(
@@ -187,8 +187,8 @@ def post_receipt(
     if not receipt.items:
         raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY,
                             detail={"error": "VALIDATION", "message": "Добавьте хотя бы одну запчасть"})
-    wh = db.query(Warehouse).filter(Warehouse.id == receipt.warehouse_id, Warehouse.is_active.is_(True)).first()
-    if not wh:
+    wh = warehouses.get(db, receipt.warehouse_id)
+    if not wh or not wh.is_active:
         raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY,
                             detail={"error": "VALIDATION", "message": "Склад недоступен"})
 
@@ -196,29 +196,15 @@ def post_receipt(
         if item.quantity < 1:
             raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY,
                                 detail={"error": "VALIDATION", "message": "Количество должно быть не менее 1"})
-        stock = (
-            db.query(WarehouseStock)
-            .filter(WarehouseStock.warehouse_id == receipt.warehouse_id,
-                    WarehouseStock.part_id == item.part_id)
-            .with_for_update()
-            .first()
-        )
-        if stock:
-            stock.quantity += item.quantity
-            stock.unit_price_snapshot = item.unit_price
-        else:
-            db.add(WarehouseStock(
-                warehouse_id=receipt.warehouse_id,
-                part_id=item.part_id,
-                quantity=item.quantity,
-                unit_price_snapshot=item.unit_price,
-            ))
-        # keep SparePart.quantity in sync for company warehouse
-        if wh.type == "company":
-            part = db.query(SparePart).filter(SparePart.id == item.part_id).first()
-            if part:
-                part.quantity += item.quantity
-                part.unit_price = item.unit_price
+
+    stocks = stock_service.apply_movements(
+        db, [(receipt.warehouse_id, item.part_id, item.quantity) for item in receipt.items],
+        "receipt", doc_id=receipt.id, user_id=current_user.id,
+    )
+    for item in receipt.items:
+        stocks[receipt.warehouse_id, item.part_id].unit_price_snapshot = item.unit_price
+        if wh.type == "company" and item.part:
+            item.part.unit_price = item.unit_price
 
     receipt.status = "posted"
     db.commit()
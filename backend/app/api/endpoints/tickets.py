@@ -2,23 +2,26 @@
 Ticket management endpoint — full CRUD + sub-resources.
 """
 
+import hashlib
 from datetime import datetime, timedelta
 from decimal import Decimal
-from typing import Optional
+from typing import Literal, Optional, Union
 from urllib.parse import quote
 
 import magic as _magic
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, UploadFile, File, status
-from fastapi.responses import Response
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, UploadFile, File, status
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from sqlalchemy.orm import Session, joinedload, load_only
 
 from app.core.config import settings
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
+from app.core.http_cache import IMMUTABLE, dump_json, http_date, is_not_modified, not_modified, strong_etag
+from app.core.storage import get_storage
+from app.core.warehouse_cache import warehouses
 from app.models import (
-    Ticket, TicketComment, TicketFile, WorkAct, WorkActItem, User,
+    Ticket, TicketComment, TicketFile, WorkAct, WorkActItem, User, Client,
     Equipment, EquipmentModel, TicketStatusHistory, Invoice, InvoiceItem,
-    Warehouse, WarehouseStock, SparePart,
 )
 
 # MIME-типы, запрещённые к загрузке (хранимый XSS через SVG/HTML/JS)
@@ -39,6 +42,10 @@ _SAFE_INLINE_TYPES = frozenset({
     "application/pdf",
 })
 
+# Сколько байт из начала файла отдаётся libmagic для определения типа
+_MIME_SNIFF_BYTES = 64 * 1024
+_UPLOAD_CHUNK_BYTES = 1024 * 1024
+
 
 def _validate_and_detect_mime(data: bytes) -> str:
     """Определить реальный MIME по содержимому файла. Отклонить опасные типы."""
@@ -65,17 +72,20 @@ def _validate_and_detect_mime(data: bytes) -> str:
     return detected
 
 
-from app.api.deps import get_current_user, require_roles, _get_user_roles, get_client_scope
+from app.api.deps import get_current_user, require_roles, _get_user_roles, get_client_scope, get_engineer_scope
+from app.api.pagination import paginate
 from app.core.email import send_email
 
 
 from app.services.sla import compute_sla_deadlines
 from app.services.audit import log_action
+from app.services.numbering import next_number
+from app.services import stock as stock_service
 from app.schemas import (
     TicketCreate, TicketUpdate, TicketResponse, TicketAssign,
     TicketStatusChange, CommentCreate, CommentResponse,
     WorkActCreate, WorkActUpdate, WorkActResponse, PaginatedResponse,
-    TicketStatusHistoryResponse,
+    TicketStatusHistoryResponse, TicketListRow,
 )
 
 router = APIRouter()
@@ -105,8 +115,7 @@ _REOPEN_SOURCES = frozenset({"closed", "completed"})
 
 def _next_ticket_number(db: Session) -> str:
     today = datetime.utcnow().strftime("%Y%m%d")
-    count = db.query(Ticket).filter(Ticket.number.like(f"T-{today}-%")).count()
-    return f"T-{today}-{count + 1:04d}"
+    return next_number(db, f"T-{today}", 4, Ticket.number)
 
 
 def _calc_sla(priority: str, created_at: datetime) -> datetime:
@@ -116,7 +125,18 @@ def _calc_sla(priority: str, created_at: datetime) -> datetime:
 
 # ─── Tickets ─────────────────────────────────────────────────────────────────
 
-@router.get("", response_model=PaginatedResponse[TicketResponse])
+_COMPACT_COLUMNS = (
+    Ticket.id, Ticket.number, Ticket.title, Ticket.type, Ticket.priority, Ticket.status,
+    Ticket.client_id, Client.name.label("client_name"),
+    Ticket.equipment_id, Equipment.serial_number.label("equipment_serial"),
+    Ticket.assigned_to, User.full_name.label("engineer_name"),
+    Ticket.sla_resolution_deadline, Ticket.sla_reaction_violated, Ticket.sla_resolution_violated,
+    Ticket.created_at,
+)
+
+
+# view=compact отдаёт TicketListRow: в схеме OpenAPI — оба варианта, сериализация — по view
+@router.get("", response_model=PaginatedResponse[Union[TicketResponse, TicketListRow]])
 def list_tickets(
     ticket_status: Optional[str] = Query(None, alias="status"),
     priority: Optional[str] = Query(None),
@@ -127,19 +147,24 @@ def list_tickets(
     search: Optional[str] = Query(None),
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=200),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    cursor: Optional[str] = Query(None, description="Курсорный режим: пустая строка — первая страница"),
+    with_total: bool = Query(False),
+    view: Literal["full", "compact"] = Query(
+        "full", description="compact — плоские строки TicketListRow без вложенных объектов",
+    ),
+    db: Session = Depends(get_read_db),
+    _: User = Depends(get_current_user),
     client_scope: Optional[int] = Depends(get_client_scope),
+    engineer_scope: Optional[int] = Depends(get_engineer_scope),
 ):
-    user_roles = _get_user_roles(current_user)
-    q = db.query(Ticket).options(joinedload(Ticket.client), joinedload(Ticket.assignee), joinedload(Ticket.creator), joinedload(Ticket.equipment).joinedload(Equipment.model)).filter(Ticket.is_deleted.is_(False))
+    q = db.query(Ticket).filter(Ticket.is_deleted.is_(False))
 
     # client_user sees only their organisation's tickets
     if client_scope is not None:
         q = q.filter(Ticket.client_id == client_scope)
     # Engineers see only their own tickets
-    elif not any(r in user_roles for r in ("admin", "svc_mgr", "director", "manager", "sales_mgr")):
-        q = q.filter(Ticket.assigned_to == current_user.id)
+    elif engineer_scope is not None:
+        q = q.filter(Ticket.assigned_to == engineer_scope)
 
     if ticket_status:
         q = q.filter(Ticket.status == ticket_status)
@@ -170,11 +195,24 @@ def list_tickets(
     if search:
         q = q.filter(Ticket.title.ilike(f"%{search}%"))
 
-    total = q.count()
-    skip = (page - 1) * size
-    items = q.order_by(Ticket.created_at.desc()).offset(skip).limit(size).all()
-    pages = max(1, (total + size - 1) // size)
-    return PaginatedResponse(items=items, total=total, page=page, size=size, pages=pages)
+    if view == "compact":
+        # только колонки строки списка: без гидратации ORM и вложенных схем
+        q = (
+            q.join(Client, Client.id == Ticket.client_id)
+            .outerjoin(Equipment, Equipment.id == Ticket.equipment_id)
+            .outerjoin(User, User.id == Ticket.assigned_to)
+            .with_entities(*_COMPACT_COLUMNS)
+        )
+        result = paginate(q, (Ticket.created_at, Ticket.id), page=page, size=size,
+                          cursor=cursor, with_total=with_total)
+        return Response(content=dump_json(result, PaginatedResponse[TicketListRow]),
+                        media_type="application/json")
+
+    q = q.options(joinedload(Ticket.client), joinedload(Ticket.assignee), joinedload(Ticket.creator), joinedload(Ticket.equipment).joinedload(Equipment.model))
+    result = paginate(q, (Ticket.created_at, Ticket.id), page=page, size=size,
+                      cursor=cursor, with_total=with_total)
+    return Response(content=dump_json(result, PaginatedResponse[TicketResponse]),
+                    media_type="application/json")
 
 
 @router.post("", response_model=TicketResponse, status_code=status.HTTP_201_CREATED)
@@ -355,7 +393,7 @@ def change_ticket_status(
         )
     # BR-F-125: возобновление заявки — только привилегированные роли
     if data.status == "in_progress" and ticket.status in _REOPEN_SOURCES:
-        user_roles = set(_get_user_roles(current_user))
+        user_roles = _get_user_roles(current_user)
         if not user_roles & _REOPEN_ROLES:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -397,7 +435,7 @@ def change_ticket_status(
             recipients.append(ticket.assignee.email)
         # Инициатор-менеджер/admin также получает копию, если не дублирует
         if current_user.email and current_user.email not in recipients:
-            initiator_roles = set(_get_user_roles(current_user))
+            initiator_roles = _get_user_roles(current_user)
             if initiator_roles & {"admin", "svc_mgr"}:
                 recipients.append(current_user.email)
         subject = f"Заявка {ticket.number} возобновлена"
@@ -486,23 +524,30 @@ async def upload_attachment(
 ):
     _require_ticket(db, ticket_id, client_scope)
     max_bytes = settings.max_file_size_mb * 1024 * 1024
-    data = await file.read(max_bytes + 1)   # читаем не более max+1 байт — защита от DoS
-    if len(data) > max_bytes:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail={
-                "error": "VALIDATION_ERROR",
-                "message": f"Файл превышает максимальный размер {settings.max_file_size_mb} МБ",
-            },
-        )
-    detected_mime = _validate_and_detect_mime(data)
+    head = await file.read(_MIME_SNIFF_BYTES)
+    detected_mime = _validate_and_detect_mime(head)
+    # Потоковая запись в хранилище: в памяти не больше одного чанка
+    with get_storage().writer() as writer:
+        chunk = head
+        while chunk:
+            writer.write(chunk)
+            if writer.size > max_bytes:   # защита от DoS — дальше не читаем
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail={
+                        "error": "VALIDATION_ERROR",
+                        "message": f"Файл превышает максимальный размер {settings.max_file_size_mb} МБ",
+                    },
+                )
+            chunk = await file.read(_UPLOAD_CHUNK_BYTES)
+        stored = writer.commit()
     attachment = TicketFile(
         ticket_id=ticket_id,
         uploaded_by=current_user.id,
         file_name=file.filename or "file",
         file_type=detected_mime,
-        file_size=len(data),
-        file_data=data,
+        file_size=stored.size,
+        storage_key=stored.key,
     )
     db.add(attachment)
     db.commit()
@@ -529,7 +574,7 @@ def list_attachments(
 ):
     _require_ticket(db, ticket_id, client_scope)
     files = (
-        db.query(TicketFile)
+        _attachment_meta_query(db)
         .filter(TicketFile.ticket_id == ticket_id)
         .order_by(TicketFile.created_at)
         .all()
@@ -553,29 +598,24 @@ def list_attachments(
 
 @router.get("/{ticket_id}/attachments/{file_id}")
 def download_attachment(
+    request: Request,
     ticket_id: int,
     file_id: int,
     db: Session = Depends(get_db),
     _: User = Depends(get_current_user),
 ):
-    f = db.query(TicketFile).filter(TicketFile.id == file_id, TicketFile.ticket_id == ticket_id).first()
+    f = _attachment_meta_query(db).filter(TicketFile.id == file_id, TicketFile.ticket_id == ticket_id).first()
     if not f:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail={"error": "NOT_FOUND", "message": "Файл не найден"},
         )
-    mime = f.file_type or "application/octet-stream"
-    disposition = "inline" if mime in _SAFE_INLINE_TYPES else "attachment"
-    encoded_name = quote(f.file_name, safe="")
-    return Response(
-        content=f.file_data,
-        media_type=mime,
-        headers={"Content-Disposition": f"{disposition}; filename*=UTF-8''{encoded_name}"},
-    )
+    return _attachment_response(request, f)
 
 
 @router.get("/{ticket_id}/attachments/{file_id}/download")
 def download_attachment_direct(
+    request: Request,
     ticket_id: int,
     file_id: int,
     db: Session = Depends(get_db),
@@ -584,84 +624,76 @@ def download_attachment_direct(
 ):
     """Download attachment. Requires authentication via Authorization header."""
     _require_ticket(db, ticket_id, client_scope)
-    f = db.query(TicketFile).filter(TicketFile.id == file_id, TicketFile.ticket_id == ticket_id).first()
+    f = _attachment_meta_query(db).filter(TicketFile.id == file_id, TicketFile.ticket_id == ticket_id).first()
     if not f:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail={"error": "NOT_FOUND", "message": "Файл не найден"},
         )
+    return _attachment_response(request, f)
+
+
+def _attachment_meta_query(db: Session):
+    """Запрос вложений только по метаданным — содержимое файла (file_data) не выбирается."""
+    return db.query(TicketFile).options(load_only(
+        TicketFile.id, TicketFile.ticket_id, TicketFile.uploaded_by, TicketFile.file_name,
+        TicketFile.file_type, TicketFile.file_size, TicketFile.storage_key, TicketFile.created_at,
+    ))
+
+
+def _attachment_response(request: Request, f: TicketFile) -> Response:
+    """Отдать вложение из хранилища потоково (FileResponse для локального диска).
+
+    Содержимое вложения неизменно, поэтому ETag — sha256 файла (он же
+    storage_key): повторный запрос с If-None-Match получает 304 без
+    обращения к хранилищу.
+    """
+    validators = {"Cache-Control": IMMUTABLE, "Last-Modified": http_date(f.created_at)}
+    data = None
+    if f.storage_key is None:
+        # файл загружен до переноса в хранилище и ещё лежит в BLOB
+        data = f.file_data
+        validators["ETag"] = strong_etag(hashlib.sha256(data).hexdigest())
+    else:
+        validators["ETag"] = strong_etag(f.storage_key)
+    if is_not_modified(request, validators["ETag"], f.created_at):
+        return not_modified(validators)
+
     mime = f.file_type or "application/octet-stream"
     # Только явно безопасные типы открываются inline; всё остальное — attachment
     disposition = "inline" if mime in _SAFE_INLINE_TYPES else "attachment"
     # RFC 5987: encode non-ASCII filename so Cyrillic/etc. don't crash latin-1 header encoding
     encoded_name = quote(f.file_name, safe="")
-    content_disposition = f"{disposition}; filename*=UTF-8''{encoded_name}"
-    return Response(
-        content=f.file_data,
-        media_type=mime,
-        headers={"Content-Disposition": content_disposition},
-    )
+    headers = {"Content-Disposition": f"{disposition}; filename*=UTF-8''{encoded_name}", **validators}
+    if data is not None:
+        return Response(content=data, media_type=mime, headers=headers)
+    storage = get_storage()
+    path = storage.path(f.storage_key)
+    if path is not None:
+        return FileResponse(path, media_type=mime, headers=headers)
+    return StreamingResponse(storage.iter_chunks(f.storage_key), media_type=mime, headers=headers)
 
 
 # ─── Work Act stock helpers ───────────────────────────────────────────────────
 
-def _deduct_act_stock(db: Session, items: list) -> None:
-    """Списать WarehouseStock по позициям акта (только item_type=part с warehouse_id)."""
-    for item in items:
-        if item.item_type != "part" or not item.part_id or not item.warehouse_id:
-            continue
-        qty = int(item.quantity)
-        stock = (
-            db.query(WarehouseStock)
-            .filter(
-                WarehouseStock.warehouse_id == item.warehouse_id,
-                WarehouseStock.part_id == item.part_id,
-            )
-            .with_for_update()
-            .first()
-        )
-        available = stock.quantity if stock else 0
-        if available < qty:
-            wh = db.query(Warehouse).filter(Warehouse.id == item.warehouse_id).first()
-            wh_name = wh.name if wh else f"id={item.warehouse_id}"
-            raise HTTPException(
-                status.HTTP_422_UNPROCESSABLE_ENTITY,
-                detail={
-                    "error": "INSUFFICIENT_STOCK",
-                    "message": (
-                        f"На складе «{wh_name}» доступно {available} шт. «{item.name}», "
-                        f"запрошено {qty}"
-                    ),
-                },
-            )
-        stock.quantity -= qty
-        # синхронизируем SparePart.quantity для основного склада компании
-        wh = db.query(Warehouse).filter(Warehouse.id == item.warehouse_id).first()
-        if wh and wh.type == "company":
-            part = db.query(SparePart).filter(SparePart.id == item.part_id).first()
-            if part:
-                part.quantity = max(0, part.quantity - qty)
-
-
-def _restore_act_stock(db: Session, part_stock: list) -> None:
-    """Вернуть остатки WarehouseStock по списку (warehouse_id, part_id, qty)."""
-    for warehouse_id, part_id, qty in part_stock:
-        stock = (
-            db.query(WarehouseStock)
-            .filter(
-                WarehouseStock.warehouse_id == warehouse_id,
-                WarehouseStock.part_id == part_id,
-            )
-            .first()
+def _act_stock_lines(items: list, sign: int) -> list[tuple[int, int, int]]:
+    """Движения склада по позициям акта (только item_type=part с warehouse_id)."""
+    return [
+        (item.warehouse_id, item.part_id, sign * int(item.quantity))
+        for item in items
+        if item.item_type == "part" and item.part_id and item.warehouse_id
+    ]
+
+
+def _apply_act_stock(db: Session, act: WorkAct, lines: list[tuple[int, int, int]], user: User) -> None:
+    """Применить движения одним пакетом; при нехватке — 422 INSUFFICIENT_STOCK."""
+    try:
+        stock_service.apply_movements(db, lines, "work_act", doc_id=act.id, user_id=user.id)
+    except stock_service.InsufficientStock as e:
+        raise HTTPException(
+            status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={"error": "INSUFFICIENT_STOCK", "message": str(e)},
         )
-        if stock:
-            stock.quantity += qty
-        # синхронизируем SparePart.quantity для основного склада
-        wh = db.query(Warehouse).filter(Warehouse.id == warehouse_id).first()
-        if wh and wh.type == "company":
-            part = db.query(SparePart).filter(SparePart.id == part_id).first()
-            if part:
-                part.quantity += qty
 
 
 # ─── Work Acts ────────────────────────────────────────────────────────────────
@@ -710,7 +742,7 @@ def create_work_act(
         created_items.append(act_item)
 
     # Списание запасов по WarehouseStock
-    _deduct_act_stock(db, created_items)
+    _apply_act_stock(db, act, _act_stock_lines(created_items, -1), current_user)
 
     log_action(db, user_id=current_user.id, action="CREATE", entity_type="work_act", entity_id=act.id,
                new={"ticket_id": ticket_id})
@@ -748,9 +780,7 @@ def _calc_act_total(items: list) -> Decimal:
 
 def _is_bank_warehouse(db: Session, warehouse_id: Optional[int]) -> bool:
     """True если склад типа bank."""
-    if not warehouse_id:
-        return False
-    wh = db.query(Warehouse).filter(Warehouse.id == warehouse_id).first()
+    wh = warehouses.get(db, warehouse_id)
     return wh is not None and wh.type == "bank"
 
 
@@ -814,7 +844,7 @@ def update_work_act(
         )
 
     # Guard 2: счёт существует → только admin (BR-F-126)
-    user_roles = set(_get_user_roles(current_user))
+    user_roles = _get_user_roles(current_user)
     all_invoices = (
         db.query(Invoice)
         .filter(Invoice.ticket_id == ticket_id)
@@ -842,12 +872,8 @@ def update_work_act(
 
     new_act_items: list = []   # заполняется ниже при изменении позиций
     if data.items is not None:
-        # Сохраняем старые позиции-запчасти для обратного списания
-        old_part_stock = [
-            (it.warehouse_id, it.part_id, int(it.quantity))
-            for it in act.items
-            if it.item_type == "part" and it.part_id and it.warehouse_id
-        ]
+        # Старые позиции-запчасти возвращаются на склад
+        old_part_stock = _act_stock_lines(act.items, +1)
 
         db.query(WorkActItem).filter(WorkActItem.work_act_id == act.id).delete()
         for i, item_data in enumerate(data.items):
@@ -869,9 +895,8 @@ def update_work_act(
             new_act_items.append(item)
         db.flush()
 
-        # Возврат старых остатков, затем новое списание
-        _restore_act_stock(db, old_part_stock)
-        _deduct_act_stock(db, new_act_items)
+        # Возврат старых и списание новых — одним пакетом, применяется только чистая разница
+        _apply_act_stock(db, act, old_part_stock + _act_stock_lines(new_act_items, -1), current_user)
 
     # Синхронизация счётов (только если изменились позиции)
     if data.items is not None:
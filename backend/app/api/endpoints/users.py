@@ -3,6 +3,7 @@ from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
+from app.core.auth_cache import invalidate_user
 from app.core.database import get_db
 from app.core.security import hash_password
 from app.models import User
@@ -111,6 +112,7 @@ def update_user(
     log_action(db, user_id=current_user.id, action="UPDATE", entity_type="user", entity_id=user.id,
                old=old_vals, new={k: v for k, v in update_data.items()})
     db.commit()
+    invalidate_user(user.id)
     db.refresh(user)
     return user
 
@@ -137,3 +139,4 @@ def delete_user(
     log_action(db, user_id=current_user.id, action="DELETE", entity_type="user", entity_id=user.id,
                old={"email": user.email, "full_name": user.full_name})
     db.commit()
+    invalidate_user(user.id)
@@ -1,24 +1,34 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import List, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
-from app.core.database import get_db
-from app.models import Warehouse, WarehouseStock, SparePart, User
+from app.core.database import get_db, get_read_db
+from app.core.http_cache import conditional_json
+from app.core import warehouse_cache
+from app.models import Warehouse, WarehouseStock, StockMovement, SparePart, User
 from app.api.deps import get_current_user, require_roles
+from app.api.pagination import paginate
 from app.schemas import (
     WarehouseCreate, WarehouseUpdate, WarehouseResponse,
     WarehouseStockResponse, PaginatedResponse,
+    StockMatrixResponse, StockMatrixRow, StockMatrixWarehouse,
+    StockMovementResponse, StockBalanceAtResponse,
 )
+from app.services import stock as stock_service
 
 router = APIRouter()
 
 _ADMIN = ("admin",)
 _WRITE = ("admin", "svc_mgr")
+_JOURNAL = ("admin", "svc_mgr", "warehouse")
 
 
 @router.get("", response_model=List[WarehouseResponse])
 def list_warehouses(
+    request: Request,
     type: Optional[str] = Query(None),
     active_only: bool = Query(True),
     db: Session = Depends(get_db),
@@ -29,7 +39,7 @@ def list_warehouses(
         q = q.filter(Warehouse.is_active.is_(True))
     if type:
         q = q.filter(Warehouse.type == type)
-    return q.order_by(Warehouse.type, Warehouse.name).all()
+    return conditional_json(request, q.order_by(Warehouse.type, Warehouse.name).all(), List[WarehouseResponse])
 
 
 @router.post("", response_model=WarehouseResponse, status_code=status.HTTP_201_CREATED)
@@ -41,6 +51,7 @@ def create_warehouse(
     wh = Warehouse(**data.model_dump())
     db.add(wh)
     db.commit()
+    warehouse_cache.invalidate()
     db.refresh(wh)
     return wh
 
@@ -69,27 +80,54 @@ def update_warehouse(
     if not wh:
         raise HTTPException(status.HTTP_404_NOT_FOUND,
                             detail={"error": "NOT_FOUND", "message": "Склад не найден"})
+    old_type = wh.type
     for k, v in data.model_dump(exclude_none=True).items():
         setattr(wh, k, v)
+    if wh.type != old_type:
+        # склад вошёл в остатки компании или вышел из них — пересчитать кэш его запчастей
+        db.flush()
+        stock_service.refresh_part_quantities(
+            db, select(WarehouseStock.part_id).where(WarehouseStock.warehouse_id == warehouse_id)
+        )
     db.commit()
+    warehouse_cache.invalidate()
     db.refresh(wh)
     return wh
 
 
 # ── Stock view ────────────────────────────────────────────────────────────────
 
+# Одна строка остатка целиком из SELECT-а (без ленивой загрузки склада и запчасти)
+_STOCK_COLUMNS = (
+    WarehouseStock.id,
+    WarehouseStock.warehouse_id,
+    Warehouse.name.label("warehouse_name"),
+    Warehouse.type.label("warehouse_type"),
+    WarehouseStock.part_id,
+    SparePart.sku.label("part_sku"),
+    SparePart.name.label("part_name"),
+    SparePart.unit.label("part_unit"),
+    SparePart.category.label("part_category"),
+    SparePart.min_quantity.label("part_min_quantity"),
+    WarehouseStock.quantity,
+    WarehouseStock.unit_price_snapshot,
+)
+
+
 @router.get("/stock/list", response_model=PaginatedResponse[WarehouseStockResponse])
 def list_warehouse_stock(
     warehouse_id: Optional[int] = Query(None),
     part_id: Optional[int] = Query(None),
+    category: Optional[str] = Query(None),
     low_stock: bool = Query(False),
     page: int = Query(1, ge=1),
     size: int = Query(50, ge=1, le=200),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _: User = Depends(get_current_user),
 ):
     q = (
-        db.query(WarehouseStock)
+        db.query(*_STOCK_COLUMNS)
+        .select_from(WarehouseStock)
         .join(Warehouse, WarehouseStock.warehouse_id == Warehouse.id)
         .join(SparePart, WarehouseStock.part_id == SparePart.id)
         .filter(Warehouse.is_active.is_(True), SparePart.is_active.is_(True))
@@ -98,28 +136,136 @@ def list_warehouse_stock(
         q = q.filter(WarehouseStock.warehouse_id == warehouse_id)
     if part_id:
         q = q.filter(WarehouseStock.part_id == part_id)
+    if category:
+        q = q.filter(SparePart.category == category)
     if low_stock:
         q = q.filter(WarehouseStock.quantity <= SparePart.min_quantity)
 
     total = q.count()
     skip = (page - 1) * size
-    rows = q.order_by(SparePart.name).offset(skip).limit(size).all()
+    rows = q.order_by(SparePart.name, WarehouseStock.id).offset(skip).limit(size).all()
     pages = max(1, (total + size - 1) // size)
 
-    items = []
-    for row in rows:
-        items.append(WarehouseStockResponse(
-            id=row.id,
-            warehouse_id=row.warehouse_id,
-            warehouse_name=row.warehouse.name,
-            warehouse_type=row.warehouse.type,
-            part_id=row.part_id,
-            part_sku=row.part.sku,
-            part_name=row.part.name,
-            part_unit=row.part.unit,
-            part_category=row.part.category,
-            part_min_quantity=row.part.min_quantity,
-            quantity=row.quantity,
-            unit_price_snapshot=row.unit_price_snapshot,
-        ))
+    items = [WarehouseStockResponse.model_validate(row._mapping) for row in rows]
     return PaginatedResponse(items=items, total=total, page=page, size=size, pages=pages)
+
+
+@router.get("/stock/matrix", response_model=StockMatrixResponse)
+def stock_matrix(
+    warehouse_type: Optional[Literal["company", "bank"]] = Query(None),
+    category: Optional[str] = Query(None),
+    low_stock: bool = Query(False, description="Сумма по складам матрицы не выше минимального остатка"),
+    page: int = Query(1, ge=1),
+    size: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_read_db),
+    _: User = Depends(get_current_user),
+):
+    """Запчасти × склады: строка — запчасть, столбец — активный склад.
+
+    Постраничность по запчастям; итог по строке считается в том же SELECT-е,
+    ячейки страницы — одним запросом по её part_id.
+    """
+    wh_filter = [Warehouse.is_active.is_(True)]
+    if warehouse_type:
+        wh_filter.append(Warehouse.type == warehouse_type)
+
+    stock = (
+        select(WarehouseStock.part_id, WarehouseStock.warehouse_id, WarehouseStock.quantity)
+        .join(Warehouse, WarehouseStock.warehouse_id == Warehouse.id)
+        .where(*wh_filter)
+        .subquery()
+    )
+    total_qty = func.coalesce(func.sum(stock.c.quantity), 0)
+    q = (
+        db.query(
+            SparePart.id, SparePart.sku, SparePart.name, SparePart.unit, SparePart.category,
+            SparePart.min_quantity, total_qty.label("total"),
+        )
+        .outerjoin(stock, stock.c.part_id == SparePart.id)
+        .filter(SparePart.is_active.is_(True))
+        .group_by(SparePart.id)
+    )
+    if category:
+        q = q.filter(SparePart.category == category)
+    if low_stock:
+        q = q.having(total_qty <= SparePart.min_quantity)
+
+    total = q.count()
+    skip = (page - 1) * size
+    parts = q.order_by(SparePart.name, SparePart.id).offset(skip).limit(size).all()
+    pages = max(1, (total + size - 1) // size)
+
+    items = {
+        p.id: StockMatrixRow(part_id=p.id, sku=p.sku, name=p.name, unit=p.unit, category=p.category,
+                             min_quantity=p.min_quantity, total=p.total)
+        for p in parts
+    }
+    if items:
+        cells = db.execute(select(stock.c.part_id, stock.c.warehouse_id, stock.c.quantity)
+                           .where(stock.c.part_id.in_(items)))
+        for part_id, wh_id, qty in cells:
+            items[part_id].quantities[wh_id] = qty
+
+    warehouses = (
+        db.query(Warehouse.id, Warehouse.name, Warehouse.type)
+        .filter(*wh_filter)
+        .order_by(Warehouse.type, Warehouse.name)
+        .all()
+    )
+    return StockMatrixResponse(
+        items=list(items.values()), total=total, page=page, size=size, pages=pages,
+        warehouses=[StockMatrixWarehouse.model_validate(w._mapping) for w in warehouses],
+    )
+
+
+# ── Stock journal ─────────────────────────────────────────────────────────────
+
+@router.get("/stock/movements", response_model=PaginatedResponse[StockMovementResponse])
+def list_stock_movements(
+    warehouse_id: Optional[int] = Query(None),
+    part_id: Optional[int] = Query(None),
+    reason: Optional[Literal["opening", "receipt", "transfer", "work_act", "adjust"]] = Query(None),
+    date_from: Optional[datetime] = Query(None),
+    date_to: Optional[datetime] = Query(None),
+    page: int = Query(1, ge=1),
+    size: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="Курсорный режим: пустая строка — первая страница"),
+    with_total: bool = Query(False),
+    db: Session = Depends(get_read_db),
+    _: User = Depends(require_roles(*_JOURNAL)),
+):
+    q = db.query(StockMovement)
+    if warehouse_id:
+        q = q.filter(StockMovement.warehouse_id == warehouse_id)
+    if part_id:
+        q = q.filter(StockMovement.part_id == part_id)
+    if reason:
+        q = q.filter(StockMovement.reason == reason)
+    if date_from:
+        q = q.filter(StockMovement.created_at >= date_from)
+    if date_to:
+        q = q.filter(StockMovement.created_at <= date_to)
+    return paginate(q, (StockMovement.id,), page=page, size=size, cursor=cursor, with_total=with_total)
+
+
+@router.get("/{warehouse_id}/stock-at", response_model=List[StockBalanceAtResponse])
+def stock_at(
+    warehouse_id: int,
+    at: datetime = Query(..., description="Момент времени, на который нужен остаток"),
+    part_id: Optional[int] = Query(None),
+    db: Session = Depends(get_read_db),
+    _: User = Depends(require_roles(*_JOURNAL)),
+):
+    """Остатки склада на момент at по журналу движений (только ненулевые)."""
+    balances = stock_service.balances_at(db, warehouse_id, at, part_ids=[part_id] if part_id else None)
+    if not balances:
+        return []
+    parts = (
+        db.query(SparePart.id, SparePart.sku, SparePart.name)
+        .filter(SparePart.id.in_(balances))
+        .order_by(SparePart.name, SparePart.id)
+    )
+    return [
+        StockBalanceAtResponse(part_id=p.id, part_sku=p.sku, part_name=p.name, quantity=balances[p.id])
+        for p in parts
+    ]
@@ -0,0 +1,118 @@
+"""
+Пагинация списков: классическая (page/size + OFFSET) и курсорная (keyset).
+
+Курсорный режим включается параметром cursor= (пустая строка — первая
+страница). Вместо OFFSET запрос продолжается с последней выданной строки
+по ключу сортировки, например (created_at, id), поэтому глубокие страницы
+не медленнее первой. Ответ содержит next_cursor (None — страниц больше
+нет); total и pages считаются только при with_total=true.
+"""
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Optional, Sequence
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import InstrumentedAttribute, Query
+
+from app.schemas import PaginatedResponse
+
+# значения ключей сортировки, которые может нести курсор (после _load)
+CURSOR_TYPES = (str, int, float, type(None), datetime, date, Decimal)
+
+
+def paginate(
+    q: Query,
+    keys: Sequence[InstrumentedAttribute],
+    *,
+    page: int,
+    size: int,
+    cursor: Optional[str] = None,
+    with_total: bool = False,
+    descending: bool = True,
+) -> PaginatedResponse:
+    """Выполнить запрос постранично.
+
+    keys — колонки сортировки, последняя должна быть уникальной (id);
+    в обоих режимах порядок одинаковый: ORDER BY keys [DESC].
+    """
+    order = [k.desc() if descending else k.asc() for k in keys]
+    if cursor is None:
+        total = _count(q)
+        items = q.order_by(*order).offset((page - 1) * size).limit(size).all()
+        pages = max(1, (total + size - 1) // size)
+        return PaginatedResponse(items=items, total=total, page=page, size=size, pages=pages)
+
+    total = pages = None
+    if with_total:
+        total = _count(q)
+        pages = max(1, (total + size - 1) // size)
+    if cursor:
+        q = q.filter(_after(keys, decode_cursor(cursor, len(keys)), descending))
+    rows = q.order_by(*order).limit(size + 1).all()
+    next_cursor = None
+    if len(rows) > size:
+        rows = rows[:size]
+        next_cursor = encode_cursor([getattr(rows[-1], k.key) for k in keys])
+    return PaginatedResponse(
+        items=rows, total=total, page=1, size=size, pages=pages, next_cursor=next_cursor,
+    )
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([_dump(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, length: int) -> list[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        values = [_load(v) for v in values] if isinstance(values, list) else None
+    except (ValueError, TypeError, InvalidOperation):
+        values = None
+    if values is None or len(values) != length or not all(isinstance(v, CURSOR_TYPES) for v in values):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"error": "INVALID_CURSOR", "message": "Некорректный курсор пагинации"},
+        )
+    return values
+
+
+def _count(q: Query) -> int:
+    # joinedload-и в COUNT не нужны — без них подзапрос дешевле
+    return q.enable_eagerloads(False).order_by(None).count()
+
+
+def _after(keys: Sequence[InstrumentedAttribute], values: Sequence[Any], descending: bool):
+    """(k1, k2, ...) < (v1, v2, ...) в раскрытой форме — так MySQL использует индекс."""
+    clauses = []
+    for i, key in enumerate(keys):
+        equal = [keys[j] == values[j] for j in range(i)]
+        beyond = key < values[i] if descending else key > values[i]
+        clauses.append(and_(*equal, beyond))
+    return or_(*clauses)
+
+
+def _dump(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"dec": str(value)}
+    return value
+
+
+def _load(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+        if "dec" in value:
+            return Decimal(value["dec"])
+        raise ValueError(value)
+    return value
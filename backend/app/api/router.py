@@ -17,6 +17,8 @@ from app.api.endpoints import (
     warehouses,
     stock_receipts,
     parts_transfers,
+    search,
+    exports,
 )
 
 api_router = APIRouter()
@@ -38,3 +40,5 @@ api_router.include_router(service_catalog.router,  prefix="/service-catalog",  t
 api_router.include_router(settings.router,         prefix="/settings",         tags=["Настройки"])
 api_router.include_router(audit_log.router,        prefix="/audit-log",        tags=["Аудит-лог"])
 api_router.include_router(reports.router,          prefix="/reports",          tags=["Отчёты"])
+api_router.include_router(search.router,           prefix="/search",           tags=["Поиск"])
+api_router.include_router(exports.router,          prefix="/exports",          tags=["Выгрузки"])
@@ -1,7 +1,10 @@
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import worker_process_init
 
 from app.core.config import settings
+import app.services.search  # noqa: F401 — индексы поиска обновляются на flush, в т.ч. из задач
+import app.services.suggest  # noqa: F401 — регистрирует обработчики flush для триграмм подсказок в воркерах
 
 celery_app = Celery(
     "servicedesk",
@@ -10,9 +13,23 @@ celery_app = Celery(
     include=[
         "app.tasks.sla",
         "app.tasks.maintenance",
+        "app.tasks.stock",
+        "app.tasks.reports",
+        "app.tasks.exports",
     ],
 )
 
+
+@worker_process_init.connect
+def _reset_db_pool(**_):
+    # соединения, открытые до fork, принадлежат родителю — дочерний процесс заводит свои
+    from app.core.database import engine, read_engine
+
+    engine.dispose(close=False)
+    if read_engine is not None:
+        read_engine.dispose(close=False)
+
+
 celery_app.conf.timezone = "Europe/Moscow"
 celery_app.conf.enable_utc = True
 
@@ -25,4 +42,28 @@ celery_app.conf.beat_schedule = {
         "task": "app.tasks.maintenance.run_maintenance_scheduler",
         "schedule": crontab(hour=8, minute=0),
     },
+    "stock-ledger-check-daily-0330": {
+        "task": "app.tasks.stock.verify_stock_ledger",
+        "schedule": crontab(hour=3, minute=30),
+    },
+    "part-quantity-reconcile-daily-0345": {
+        "task": "app.tasks.stock.reconcile_part_quantities",
+        "schedule": crontab(hour=3, minute=45),
+    },
+    "ticket-stats-refresh-every-5-min": {
+        "task": "app.tasks.reports.refresh_ticket_stats",
+        "schedule": crontab(minute="*/5"),
+    },
+    "ticket-stats-check-daily-0400": {
+        "task": "app.tasks.reports.check_ticket_stats",
+        "schedule": crontab(hour=4, minute=0),
+    },
+    "exports-expire-stale-every-5-min": {
+        "task": "app.tasks.exports.expire_stale_exports",
+        "schedule": crontab(minute="*/5"),
+    },
+    "exports-purge-expired-every-15-min": {
+        "task": "app.tasks.exports.purge_expired_exports",
+        "schedule": crontab(minute="*/15"),
+    },
 }
@@ -0,0 +1,260 @@
+"""
+Кэш аутентифицированных пользователей и блоклист отозванных токенов.
+
+get_current_user вызывается на каждый API-запрос (страница SPA — 5–10
+запросов), поэтому:
+
+  • принципал (снимок колонок users) кэшируется в памяти процесса по ключу
+    (sub, jti) на AUTH_CACHE_TTL_SECONDS; при изменении пользователя
+    (деактивация, роли, пароль, портальный доступ) вызывается
+    invalidate_user() — запись удаляется локально и событие рассылается
+    остальным воркерам через Redis pub/sub;
+  • отозванные jti хранятся в локальном множестве, которое фоновый поток
+    синхронизирует с Redis (начальная загрузка ключей revoked_jti:* и
+    подписка на канал). Пока синхронизация не установлена (Redis
+    недоступен или AUTH_CACHE_SYNC=false), проверка идёт прямым GET
+    в Redis, как раньше.
+"""
+import copy
+import json
+import logging
+import threading
+import time
+from typing import Any, Optional
+
+import redis as _redis_lib
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.core.config import settings
+from app.models import User
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "auth:events"
+_RECONNECT_DELAY = 5
+
+_redis_client: Optional[_redis_lib.Redis] = None
+
+
+def get_redis() -> _redis_lib.Redis:
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = _redis_lib.from_url(settings.redis_url, decode_responses=True)
+    return _redis_client
+
+
+# ── Принципалы ────────────────────────────────────────────────────────────────
+
+class PrincipalCache:
+    """(sub, jti) → снимок колонок User с ограниченным временем жизни."""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: dict[tuple[int, str], tuple[float, dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, jti: str) -> Optional[dict[str, Any]]:
+        entry = self._entries.get((user_id, jti))
+        if entry is None:
+            return None
+        expires_at, snapshot = entry
+        if expires_at < time.monotonic():
+            with self._lock:
+                self._entries.pop((user_id, jti), None)
+            return None
+        return snapshot
+
+    def put(self, user_id: int, jti: str, snapshot: dict[str, Any]) -> None:
+        if self.ttl <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries = {k: v for k, v in self._entries.items() if v[0] >= now}
+                while len(self._entries) >= self.max_entries:
+                    self._entries.pop(next(iter(self._entries)))  # самая старая запись
+            self._entries[(user_id, jti)] = (now + self.ttl, snapshot)
+
+    def drop_user(self, user_id: int) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == user_id]:
+                del self._entries[key]
+
+    def drop_token(self, jti: str) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if k[1] == jti]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# ── Отозванные токены ─────────────────────────────────────────────────────────
+
+class RevokedTokens:
+    """Локальная копия блоклиста revoked_jti:* (jti → момент истечения токена)."""
+
+    def __init__(self):
+        self._jtis: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.synced = False
+
+    def add(self, jti: str, expires_at: float) -> None:
+        with self._lock:
+            self._jtis[jti] = expires_at
+
+    def __contains__(self, jti: str) -> bool:
+        expires_at = self._jtis.get(jti)
+        return expires_at is not None and expires_at > time.time()
+
+    def prune(self) -> None:
+        now = time.time()
+        with self._lock:
+            self._jtis = {j: exp for j, exp in self._jtis.items() if exp > now}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._jtis.clear()
+            self.synced = False
+
+
+principals = PrincipalCache(settings.auth_cache_ttl_seconds, settings.auth_cache_max_entries)
+revoked = RevokedTokens()
+
+
+def load_principal(db: Session, user_id: int, jti: Optional[str]) -> Optional[User]:
+    """Активный пользователь по id: из кэша (без SELECT) или из БД с записью в кэш."""
+    snapshot = principals.get(user_id, jti) if jti else None
+    if snapshot is not None:
+        return _attach(db, snapshot)
+    user = (
+        db.query(User)
+        .filter(User.id == user_id, User.is_active.is_(True), User.is_deleted.is_(False))
+        .first()
+    )
+    if user is not None and jti:
+        principals.put(user_id, jti, _snapshot(user))
+    return user
+
+
+def _snapshot(user: User) -> dict[str, Any]:
+    return {attr.key: copy.deepcopy(getattr(user, attr.key)) for attr in sa_inspect(User).column_attrs}
+
+
+def _attach(db: Session, snapshot: dict[str, Any]) -> User:
+    # Объект уже в сессии — берём его (его состояние не старее снимка)
+    existing = db.identity_map.get(sa_inspect(User).identity_key_from_primary_key((snapshot["id"],)))
+    if existing is not None:
+        return existing
+    user = User(**copy.deepcopy(snapshot))
+    make_transient_to_detached(user)
+    # load=False: объект присоединяется к сессии без SELECT; связи грузятся лениво
+    return db.merge(user, load=False)
+
+
+def is_revoked(jti: str) -> bool:
+    if jti in revoked:
+        return True
+    if revoked.synced:
+        return False
+    # синхронизация не установлена — спрашиваем Redis напрямую
+    try:
+        return bool(get_redis().get(f"revoked_jti:{jti}"))
+    except _redis_lib.RedisError:
+        return False  # Redis недоступен — не блокируем, продолжаем
+
+
+def revoke_token(jti: str, exp: float) -> None:
+    """Отозвать токен до момента его истечения exp (unix time)."""
+    revoked.add(jti, exp)
+    principals.drop_token(jti)
+    ttl = max(1, int(exp - time.time()))
+    try:
+        r = get_redis()
+        r.setex(f"revoked_jti:{jti}", ttl, "1")
+        r.publish(CHANNEL, json.dumps({"event": "revoke", "jti": jti, "exp": exp}))
+    except _redis_lib.RedisError:
+        logger.warning("Redis недоступен: отзыв токена %s сохранён только локально", jti)
+
+
+def invalidate_user(user_id: int) -> None:
+    """Сбросить кэш пользователя во всех воркерах — вызывать после commit."""
+    principals.drop_user(user_id)
+    try:
+        get_redis().publish(CHANNEL, json.dumps({"event": "user", "id": user_id}))
+    except _redis_lib.RedisError:
+        logger.warning("Redis недоступен: кэш пользователя %s сброшен только локально", user_id)
+
+
+# ── Синхронизация через Redis pub/sub ─────────────────────────────────────────
+
+_sync_thread: Optional[threading.Thread] = None
+_stop = threading.Event()
+
+
+def start_sync() -> None:
+    global _sync_thread
+    if not settings.auth_cache_sync or (_sync_thread is not None and _sync_thread.is_alive()):
+        return
+    _stop.clear()
+    _sync_thread = threading.Thread(target=_sync_loop, name="auth-cache-sync", daemon=True)
+    _sync_thread.start()
+
+
+def stop_sync() -> None:
+    global _sync_thread
+    _stop.set()
+    if _sync_thread is not None:
+        _sync_thread.join(timeout=_RECONNECT_DELAY)
+        _sync_thread = None
+    revoked.synced = False
+
+
+def _sync_loop() -> None:
+    while not _stop.is_set():
+        try:
+            _listen()
+        except _redis_lib.RedisError as exc:
+            logger.warning("Синхронизация блоклиста токенов прервана: %s", exc)
+        # пропущенные события неизвестны — до переподключения проверяем Redis напрямую
+        revoked.synced = False
+        principals.clear()
+        _stop.wait(_RECONNECT_DELAY)
+
+
+def _listen() -> None:
+    r = _redis_lib.from_url(settings.redis_url, decode_responses=True)
+    pubsub = r.pubsub(ignore_subscribe_messages=True)
+    # сначала подписка, потом загрузка — события между ними не теряются
+    pubsub.subscribe(CHANNEL)
+    try:
+        now = time.time()
+        for key in r.scan_iter("revoked_jti:*", count=1000):
+            ttl = r.ttl(key)
+            if ttl > 0:
+                revoked.add(key.split(":", 1)[1], now + ttl)
+        revoked.synced = True
+        while not _stop.is_set():
+            message = pubsub.get_message(timeout=1.0)
+            if message is None:
+                revoked.prune()
+                continue
+            _handle(message["data"])
+    finally:
+        pubsub.close()
+        r.close()
+
+
+def _handle(data: str) -> None:
+    try:
+        event = json.loads(data)
+        if event["event"] == "revoke":
+            revoked.add(event["jti"], float(event["exp"]))
+            principals.drop_token(event["jti"])
+        elif event["event"] == "user":
+            principals.drop_user(int(event["id"]))
+    except (ValueError, KeyError, TypeError):
+        logger.warning("Некорректное событие в канале %s: %r", CHANNEL, data)
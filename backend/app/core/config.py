@@ -7,9 +7,33 @@ class Settings(BaseSettings):
     debug: bool = False
     enable_docs: bool = False  # Swagger/ReDoc — только при явном ENABLE_DOCS=true
     database_url: str
+    # Пул соединений (см. app/core/database.py). DB_PROFILE: api | worker | beat
+    db_profile: str = "api"
+    db_pool_size: int = 10
+    db_max_overflow: int = 30
+    db_worker_pool_size: int = 1
+    db_worker_max_overflow: int = 2
+    db_pool_timeout: int = 30
+    db_pool_recycle: int = 3600
+    db_pool_slow_checkout_ms: int = 200
+    # Реплика для тяжёлых чтений (отчёты, журнал аудита, списки); пусто — всё на primary
+    database_read_url: Optional[str] = None
+    db_replica_max_lag_seconds: int = 30
+    db_replica_check_interval_seconds: int = 5
+    # Dev-режим: лог эндпоинтов с большим числом SQL-запросов / N+1 (app/core/query_counter.py)
+    query_debug: bool = False
+    query_debug_max_queries: int = 30
+    query_debug_repeat_threshold: int = 5
     secret_key: str
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 480
+    # Кэш пользователя по (sub, jti) в памяти процесса; 0 — отключить
+    auth_cache_ttl_seconds: int = 30
+    auth_cache_max_entries: int = 10000
+    auth_cache_sync: bool = True  # фоновая синхронизация блоклиста через Redis pub/sub
+    # Справочник складов в памяти процесса (app/core/warehouse_cache.py); TTL — пока нет синхронизации
+    warehouse_cache_ttl_seconds: int = 60
+    warehouse_cache_sync: bool = True
     redis_url: str = "redis://redis:6379/0"
     smtp_host: Optional[str] = None
     smtp_port: int = 587
@@ -17,6 +41,20 @@ class Settings(BaseSettings):
     smtp_password: Optional[str] = None
     telegram_bot_token: Optional[str] = None
     max_file_size_mb: int = 20
+    # Хранилище вложений: local (каталог storage_path) или s3 (MinIO и совместимые, нужен boto3)
+    storage_backend: str = "local"
+    storage_path: str = "storage"
+    s3_endpoint_url: Optional[str] = None
+    s3_bucket: str = "servicedesk"
+    s3_access_key: Optional[str] = None
+    s3_secret_key: Optional[str] = None
+    s3_region: Optional[str] = None
+    # Фоновые выгрузки (app/services/exports.py): готовый файл с теми же параметрами
+    # отдаётся повторно export_cache_ttl_minutes; зависшее задание не блокирует новое дольше таймаута
+    export_cache_ttl_minutes: int = 15
+    export_job_timeout_minutes: int = 60
+    # выполняющееся задание без отметки прогресса дольше этого считается брошенным (воркер погиб)
+    export_job_heartbeat_minutes: int = 5
     # CORS: укажите реальный домен фронтенда в .env, например:
     # ALLOWED_ORIGINS=https://crm.example.com
     # Для локальной разработки: ALLOWED_ORIGINS=http://localhost,http://localhost:5173
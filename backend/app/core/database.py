@@ -1,15 +1,130 @@
-from sqlalchemy import create_engine
+"""
+Движок SQLAlchemy и фабрика сессий.
+
+Параметры пула задаются в Settings (DB_POOL_*) отдельно для каждого
+профиля процесса (DB_PROFILE):
+  api    — uvicorn-воркер: синхронные эндпоинты выполняются в пуле потоков
+           FastAPI (до 40 потоков), поэтому size + overflow рассчитаны на
+           него, а не на дефолтные 5 + 10;
+  worker — процесс Celery prefork: задача выполняется одна на процесс,
+           достаточно 1–2 соединений;
+  beat   — планировщик в БД почти не ходит, пул не держим (NullPool).
+
+Время ожидания соединения из пула собирается в pool_stats и отдаётся
+администратору в GET /api/v1/settings/db-pool; ожидания дольше DB_POOL_SLOW_CHECKOUT_MS пишутся в лог.
+
+Если задан DATABASE_READ_URL, тяжёлые читающие эндпоинты (отчёты,
+журнал аудита, список заявок, остатки) получают сессию реплики через
+get_read_db. Защита от устаревших данных: отставание реплики
+проверяется не чаще раза в DB_REPLICA_CHECK_INTERVAL_SECONDS, и если оно
+больше DB_REPLICA_MAX_LAG_SECONDS или неизвестно — чтение идёт с primary.
+"""
+import logging
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool, QueuePool
 from app.core.config import settings
 
-engine = create_engine(
-    settings.database_url,
-    pool_pre_ping=True,
-    pool_recycle=3600,
+logger = logging.getLogger(__name__)
+
+
+class PoolStats:
+    """Счётчики ожидания соединения из пула (мс)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.wait_total_ms = 0.0
+            self.wait_max_ms = 0.0
+
+    def record(self, wait_ms: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total_ms += wait_ms
+            self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(self.wait_total_ms / self.checkouts, 2) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max_ms, 2),
+            }
+
+
+pool_stats = PoolStats()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool, замеряющий время ожидания свободного соединения."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            pool_stats.record((time.perf_counter() - started) * 1000, timed_out=True)
+            logger.error("Пул соединений исчерпан: %s", self.status())
+            raise
+        wait_ms = (time.perf_counter() - started) * 1000
+        pool_stats.record(wait_ms)
+        if wait_ms >= settings.db_pool_slow_checkout_ms:
+            logger.warning("Ожидание соединения из пула %.0f мс: %s", wait_ms, self.status())
+        return conn
+
+
+def pool_options(profile: str) -> dict:
+    """Аргументы create_engine для профиля процесса (api / worker / beat)."""
+    if profile == "beat":
+        return {"poolclass": NullPool}
+    if profile == "worker":
+        size, overflow = settings.db_worker_pool_size, settings.db_worker_max_overflow
+    else:
+        size, overflow = settings.db_pool_size, settings.db_max_overflow
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": size,
+        "max_overflow": overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+    }
+
+
+def create_db_engine(url: str, profile: str) -> Engine:
+    return create_engine(url, pool_pre_ping=True, **pool_options(profile))
+
+
+def pool_status() -> dict:
+    pool = engine.pool
+    status = {"profile": settings.db_profile, **pool_stats.snapshot()}
+    if isinstance(pool, QueuePool):
+        status.update(size=pool.size(), checked_out=pool.checkedout(), overflow=pool.overflow())
+    return status
+
+
+engine = create_db_engine(settings.database_url, settings.db_profile)
+read_engine = (
+    create_db_engine(settings.database_read_url, settings.db_profile)
+    if settings.database_read_url else None
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine) if read_engine else None
 Base = declarative_base()
 
 
@@ -19,3 +134,81 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+class ReplicaGuard:
+    """Кэширует результат проверки отставания реплики."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checked_at = float("-inf")
+        self._fresh = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self._checked_at = float("-inf")
+            self._fresh = False
+
+    def is_fresh(self, session_factory: sessionmaker) -> bool:
+        now = time.monotonic()
+        if now - self._checked_at < settings.db_replica_check_interval_seconds:
+            return self._fresh
+        with self._lock:
+            if now - self._checked_at >= settings.db_replica_check_interval_seconds:
+                lag = replica_lag_seconds(session_factory)
+                self._fresh = lag is not None and lag <= settings.db_replica_max_lag_seconds
+                if not self._fresh:
+                    logger.warning("Реплика отстаёт (%s с) — чтение переключено на primary", lag)
+                self._checked_at = now
+        return self._fresh
+
+
+replica_guard = ReplicaGuard()
+
+
+# MySQL: «Access denied; you need (at least one of) the ... privilege(s)»
+ER_SPECIFIC_ACCESS_DENIED = 1227
+
+
+def replica_lag_seconds(session_factory: sessionmaker) -> Optional[float]:
+    """Отставание реплики в секундах; None — неизвестно (ошибка, репликация остановлена)."""
+    try:
+        with session_factory() as db:
+            if db.bind.dialect.name != "mysql":
+                db.execute(text("SELECT 1"))
+                return 0.0
+            row = db.execute(text("SHOW REPLICA STATUS")).mappings().first()
+    except DBAPIError as exc:
+        if exc.orig is not None and exc.orig.args[:1] == (ER_SPECIFIC_ACCESS_DENIED,):
+            logger.error("Пользователю DATABASE_READ_URL нужна привилегия REPLICATION CLIENT "
+                         "(см. scripts/init.sql) — чтения идут на primary")
+        else:
+            logger.exception("Не удалось проверить состояние реплики")
+        return None
+    except Exception:
+        logger.exception("Не удалось проверить состояние реплики")
+        return None
+    if row is None:
+        return 0.0  # не реплика (DATABASE_READ_URL указывает на primary)
+    lag = row.get("Seconds_Behind_Source")
+    return float(lag) if lag is not None else None
+
+
+def read_session_factory() -> sessionmaker:
+    """Фабрика сессий для тяжёлых чтений: реплика, если она настроена и не отстаёт, иначе primary."""
+    if ReadSessionLocal is not None and replica_guard.is_fresh(ReadSessionLocal):
+        return ReadSessionLocal
+    return SessionLocal
+
+
+def get_read_db():
+    """Сессия для тяжёлых чтений (read_session_factory).
+
+    Только для эндпоинтов, которые ничего не пишут — реплика доступна
+    лишь на чтение.
+    """
+    db = read_session_factory()()
+    try:
+        yield db
+    finally:
+        db.close()
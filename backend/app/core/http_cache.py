@@ -0,0 +1,92 @@
+"""
+Условные GET-запросы (ETag / Last-Modified → 304 Not Modified).
+
+Справочники (модели оборудования, склады, прайс услуг, валюта, курсы)
+отдаются со слабым ETag — хэшем сериализованного JSON — и
+Cache-Control: private, no-cache: браузер хранит ответ, но каждый раз
+перепроверяет его, так что изменения видны сразу, а неизменённый
+справочник возвращается пустым 304.
+
+Вложения неизменяемы (новый файл — новая запись), поэтому для них
+используется сильный ETag — sha256 содержимого — и долгий max-age.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+REVALIDATE = "private, no-cache"
+IMMUTABLE = "private, max-age=31536000, immutable"
+
+_adapters: dict[Any, TypeAdapter] = {}
+
+
+def strong_etag(digest: str) -> str:
+    return f'"{digest}"'
+
+
+def http_date(dt: datetime) -> str:
+    # даты в БД хранятся в UTC без tzinfo
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return format_datetime(dt.astimezone(timezone.utc), usegmt=True)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """Проверить If-None-Match / If-Modified-Since (RFC 9110, 13.1).
+
+    If-None-Match сравнивается слабо (W/ игнорируется); при его наличии
+    If-Modified-Since не учитывается.
+    """
+    inm = request.headers.get("if-none-match")
+    if inm is not None:
+        if inm.strip() == "*":
+            return True
+        wanted = _opaque(etag)
+        return any(_opaque(tag) == wanted for tag in inm.split(","))
+    ims = request.headers.get("if-modified-since")
+    if ims and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(ims)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        modified = last_modified if last_modified.tzinfo else last_modified.replace(tzinfo=timezone.utc)
+        # у HTTP-даты точность — секунда
+        return modified.replace(microsecond=0) <= since
+    return False
+
+
+def not_modified(headers: dict[str, str]) -> Response:
+    return Response(status_code=304, headers=headers)
+
+
+def dump_json(content: Any, response_model: Any) -> bytes:
+    """Провалидировать content (ORM-объекты, Row) по response_model и сериализовать в JSON."""
+    adapter = _adapters.get(response_model)
+    if adapter is None:
+        adapter = _adapters[response_model] = TypeAdapter(response_model)
+    return adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+
+
+def conditional_json(request: Request, content: Any, response_model: Any) -> Response:
+    """Сериализовать content по response_model и отдать со слабым ETag или 304.
+
+    Эндпоинт сохраняет response_model в декораторе для OpenAPI, но возвращает
+    готовый Response — валидация и сериализация выполняются здесь.
+    """
+    body = dump_json(content, response_model)
+    etag = f'W/"{hashlib.sha256(body).hexdigest()[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": REVALIDATE}
+    if is_not_modified(request, etag):
+        return not_modified(headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
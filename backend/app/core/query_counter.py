@@ -0,0 +1,180 @@
+"""
+Счётчик SQL-запросов и детектор N+1.
+
+Каждый выполненный движком запрос записывается в активные журналы
+(QueryLog): журнал текущего HTTP-запроса (contextvar, его ставит
+QueryDebugMiddleware) и журналы count_queries() — они глобальные для
+процесса, потому что TestClient выполняет приложение в другом потоке.
+
+Повторы считаются по «форме» запроса: SQL с плейсхолдерами, списки IN
+схлопнуты. Одна и та же форма много раз за запрос — типичный N+1
+(ленивая загрузка связи в цикле сериализации).
+
+В тестах: фикстура assert_max_queries (tests/conftest.py) или
+декоратор / контекстный менеджер assert_max_queries(n). В разработке:
+QUERY_DEBUG=true — эндпоинты, превысившие порог, пишутся в лог вместе
+с местом вызова повторяющегося запроса.
+"""
+import logging
+import os
+import re
+import sys
+import threading
+from collections import Counter
+from contextlib import ContextDecorator, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.middleware.base import BaseHTTPMiddleware
+
+logger = logging.getLogger(__name__)
+
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_THIS_FILE = os.path.abspath(__file__)
+_IN_LIST = re.compile(r"IN \((?:\?|%s|:\w+)(?:, (?:\?|%s|:\w+))*\)")
+_SPACES = re.compile(r"\s+")
+
+
+@dataclass
+class Statement:
+    sql: str
+    shape: str
+    site: Optional[str]
+
+
+class QueryLog:
+    """Запросы, выполненные за время жизни журнала."""
+
+    def __init__(self, with_sites: bool = True):
+        self.with_sites = with_sites
+        self.statements: list[Statement] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.statements)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def add(self, sql: str) -> None:
+        site = _call_site() if self.with_sites else None
+        with self._lock:
+            self.statements.append(Statement(sql, statement_shape(sql), site))
+
+    def repeated(self, threshold: int) -> list[tuple[str, int, list[str]]]:
+        """Формы, выполненные не меньше threshold раз: [(форма, сколько, места вызова)]."""
+        counts = Counter(s.shape for s in self.statements)
+        result = []
+        for shape, n in counts.most_common():
+            if n < threshold:
+                break
+            sites = sorted({s.site for s in self.statements if s.shape == shape and s.site})
+            result.append((shape, n, sites))
+        return result
+
+    def report(self, limit: int = 5) -> str:
+        lines = [f"{self.count} SQL-запросов"]
+        for shape, n, sites in self.repeated(2)[:limit]:
+            lines.append(f"  {n}× {shape[:200]}")
+            lines += [f"      ← {site}" for site in sites[:3]]
+        return "\n".join(lines)
+
+
+def statement_shape(sql: str) -> str:
+    return _IN_LIST.sub("IN (?)", _SPACES.sub(" ", sql).strip())
+
+
+def _call_site() -> Optional[str]:
+    """Ближайший кадр стека из кода приложения (не SQLAlchemy и не этот модуль)."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        path = frame.f_code.co_filename
+        if path.startswith(_APP_DIR) and path != _THIS_FILE:
+            return f"{os.path.relpath(path, os.path.dirname(_APP_DIR))}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+_request_log: ContextVar[Optional[QueryLog]] = ContextVar("query_log", default=None)
+_captures: list[QueryLog] = []
+_captures_lock = threading.Lock()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _record(conn, cursor, statement, parameters, context, executemany) -> None:
+    log = _request_log.get()
+    if log is not None:
+        log.add(statement)
+    if _captures:
+        for capture in list(_captures):
+            capture.add(statement)
+
+
+@contextmanager
+def count_queries(with_sites: bool = True) -> Iterator[QueryLog]:
+    """Записывать все запросы процесса, выполненные внутри блока."""
+    log = QueryLog(with_sites)
+    with _captures_lock:
+        _captures.append(log)
+    try:
+        yield log
+    finally:
+        with _captures_lock:
+            _captures.remove(log)
+
+
+class assert_max_queries(ContextDecorator):
+    """Не больше n запросов и (если задано) не больше max_repeats повторов одной формы.
+
+        with assert_max_queries(4):
+            client.get("/api/v1/warehouses/1/stock")
+
+        @assert_max_queries(10, max_repeats=2)
+        def test_something(...): ...
+    """
+
+    def __init__(self, n: int, *, max_repeats: Optional[int] = None):
+        self.n = n
+        self.max_repeats = max_repeats
+        self._ctx = None
+        self.log: Optional[QueryLog] = None
+
+    def __enter__(self) -> QueryLog:
+        self._ctx = count_queries()
+        self.log = self._ctx.__enter__()
+        return self.log
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self._ctx.__exit__(exc_type, exc, tb)
+        if exc_type is not None:
+            return False
+        if self.log.count > self.n:
+            raise AssertionError(f"Ожидалось не больше {self.n} запросов, выполнено {self.log.report()}")
+        if self.max_repeats is not None and self.log.repeated(self.max_repeats + 1):
+            raise AssertionError(f"Повторяющиеся запросы (N+1), допустимо {self.max_repeats}×: {self.log.report()}")
+        return False
+
+
+class QueryDebugMiddleware(BaseHTTPMiddleware):
+    """Dev-режим: пишет в лог эндпоинты с большим числом запросов или N+1."""
+
+    def __init__(self, app, max_queries: int, repeat_threshold: int):
+        super().__init__(app)
+        self.max_queries = max_queries
+        self.repeat_threshold = repeat_threshold
+
+    async def dispatch(self, request, call_next):
+        log = QueryLog()
+        token = _request_log.set(log)
+        try:
+            response = await call_next(request)
+        finally:
+            _request_log.reset(token)
+        if log.count > self.max_queries or log.repeated(self.repeat_threshold):
+            logger.warning("%s %s: %s", request.method, request.url.path, log.report())
+        response.headers["X-Query-Count"] = str(log.count)
+        return response
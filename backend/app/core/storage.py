@@ -0,0 +1,185 @@
+"""
+Файловое хранилище вложений с адресацией по содержимому (sha256).
+
+Бэкенды (STORAGE_BACKEND в .env):
+  local — каталог STORAGE_PATH, объекты раскладываются как ab/cd/<sha256>
+  s3    — S3-совместимое хранилище (MinIO, Yandex Object Storage и т.п.),
+          требует пакет boto3
+
+Ключ объекта — sha256 содержимого, поэтому одинаковые файлы хранятся
+один раз (дедупликация). Запись идёт потоково во временный файл с
+подсчётом хэша; в хранилище объект попадает только после commit().
+"""
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Iterator, NamedTuple, Optional
+
+from app.core.config import settings
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class StoredObject(NamedTuple):
+    key: str
+    size: int
+
+
+class StorageWriter:
+    """Потоковая запись объекта: write() по частям, затем commit().
+
+    Используется как контекстный менеджер — если commit() не вызван
+    (ошибка валидации, превышение размера), временный файл удаляется.
+    """
+
+    def __init__(self, storage: "BaseStorage", tmp: BinaryIO):
+        self._storage = storage
+        self._tmp = tmp
+        self._hash = hashlib.sha256()
+        self.size = 0
+        self._committed = False
+
+    def write(self, chunk: bytes) -> None:
+        self._hash.update(chunk)
+        self._tmp.write(chunk)
+        self.size += len(chunk)
+
+    def commit(self) -> StoredObject:
+        self._tmp.flush()
+        key = self._hash.hexdigest()
+        self._storage._store(key, self._tmp)
+        self._committed = True
+        return StoredObject(key=key, size=self.size)
+
+    def __enter__(self) -> "StorageWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._storage._discard(self._tmp, self._committed)
+
+
+class BaseStorage:
+    def writer(self) -> StorageWriter:
+        raise NotImplementedError
+
+    def path(self, key: str) -> Optional[Path]:
+        """Локальный путь к объекту (для FileResponse) или None для удалённых бэкендов."""
+        return None
+
+    def iter_chunks(self, key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def read(self, key: str) -> bytes:
+        return b"".join(self.iter_chunks(key))
+
+    def delete(self, key: str) -> None:
+        """Удалить объект (отсутствующий — не ошибка). Ссылки на ключ проверяет вызывающий."""
+        raise NotImplementedError
+
+    def _store(self, key: str, tmp: BinaryIO) -> None:
+        raise NotImplementedError
+
+    def _discard(self, tmp: BinaryIO, committed: bool) -> None:
+        tmp.close()
+
+
+class LocalStorage(BaseStorage):
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self._tmp_dir = self.root / "tmp"
+        self._tmp_dir.mkdir(parents=True, exist_ok=True)
+
+    def _object_path(self, key: str) -> Path:
+        return self.root / key[:2] / key[2:4] / key
+
+    def writer(self) -> StorageWriter:
+        # временный файл в том же разделе — os.replace() атомарен
+        tmp = tempfile.NamedTemporaryFile(dir=self._tmp_dir, delete=False)
+        return StorageWriter(self, tmp)
+
+    def _store(self, key: str, tmp: BinaryIO) -> None:
+        dest = self._object_path(key)
+        tmp.close()
+        if dest.exists():
+            os.unlink(tmp.name)  # дедупликация: объект уже есть
+            return
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp.name, dest)
+
+    def _discard(self, tmp: BinaryIO, committed: bool) -> None:
+        tmp.close()
+        if not committed and os.path.exists(tmp.name):
+            os.unlink(tmp.name)
+
+    def path(self, key: str) -> Optional[Path]:
+        return self._object_path(key)
+
+    def exists(self, key: str) -> bool:
+        return self._object_path(key).is_file()
+
+    def delete(self, key: str) -> None:
+        self._object_path(key).unlink(missing_ok=True)
+
+    def iter_chunks(self, key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        with open(self._object_path(key), "rb") as fh:
+            while chunk := fh.read(chunk_size):
+                yield chunk
+
+
+class S3Storage(BaseStorage):
+    def __init__(self):
+        import boto3  # опциональная зависимость — только для STORAGE_BACKEND=s3
+
+        self.bucket = settings.s3_bucket
+        self._client = boto3.client(
+            "s3",
+            endpoint_url=settings.s3_endpoint_url,
+            aws_access_key_id=settings.s3_access_key,
+            aws_secret_access_key=settings.s3_secret_key,
+            region_name=settings.s3_region,
+        )
+
+    def writer(self) -> StorageWriter:
+        return StorageWriter(self, tempfile.TemporaryFile())
+
+    def _store(self, key: str, tmp: BinaryIO) -> None:
+        if self.exists(key):
+            return
+        tmp.seek(0)
+        self._client.upload_fileobj(tmp, self.bucket, key)
+
+    def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self._client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError:
+            return False
+
+    def delete(self, key: str) -> None:
+        self._client.delete_object(Bucket=self.bucket, Key=key)
+
+    def iter_chunks(self, key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        body = self._client.get_object(Bucket=self.bucket, Key=key)["Body"]
+        try:
+            yield from body.iter_chunks(chunk_size)
+        finally:
+            body.close()
+
+
+_storage: Optional[BaseStorage] = None
+
+
+def get_storage() -> BaseStorage:
+    global _storage
+    if _storage is None:
+        if settings.storage_backend == "s3":
+            _storage = S3Storage()
+        else:
+            _storage = LocalStorage(settings.storage_path)
+    return _storage
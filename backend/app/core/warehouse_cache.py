@@ -0,0 +1,162 @@
+"""
+Справочник складов в памяти процесса.
+
+Тип и название склада нужны в циклах по позициям (цена позиции склада
+банка в счёте, проверка получателя передачи, синхронизация остатка
+компании), а склады меняются редко. Поэтому все склады загружаются
+одним SELECT-ом и держатся в памяти воркера:
+
+  • create_warehouse / update_warehouse после commit вызывают
+    invalidate() — справочник сбрасывается локально, а событие
+    рассылается остальным воркерам через Redis pub/sub;
+  • у справочника есть версия: каждый сброс её увеличивает, и загрузка,
+    начатая до сброса, не попадает в кэш (старые данные не перетирают
+    сброс, случившийся во время SELECT-а);
+  • склад, которого нет в справочнике (создан другим воркером, событие
+    ещё не дошло), вызывает перезагрузку;
+  • пока подписка не установлена (Redis недоступен или
+    WAREHOUSE_CACHE_SYNC=false), справочник живёт не дольше
+    WAREHOUSE_CACHE_TTL_SECONDS.
+"""
+import json
+import logging
+import threading
+import time
+from typing import Iterable, NamedTuple, Optional
+
+import redis as _redis_lib
+from sqlalchemy.orm import Session
+
+from app.core.auth_cache import get_redis
+from app.core.config import settings
+from app.models import Warehouse
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "warehouse:events"
+_RECONNECT_DELAY = 5
+
+
+class WarehouseInfo(NamedTuple):
+    id: int
+    name: str
+    type: str
+    client_id: Optional[int]
+    is_active: bool
+
+
+class WarehouseDirectory:
+    """id → WarehouseInfo по всем складам; версия растёт с каждым сбросом."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.version = 0
+        self.synced = False
+        self._by_id: Optional[dict[int, WarehouseInfo]] = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def get_many(self, db: Session, ids: Iterable[Optional[int]]) -> dict[int, WarehouseInfo]:
+        """Склады по id (без SELECT, если все есть в справочнике); неизвестные id пропускаются."""
+        wanted = {i for i in ids if i}
+        by_id = self._current()
+        if by_id is None or not wanted <= by_id.keys():
+            by_id = self._load(db)
+        return {i: by_id[i] for i in wanted if i in by_id}
+
+    def get(self, db: Session, warehouse_id: Optional[int]) -> Optional[WarehouseInfo]:
+        return self.get_many(db, [warehouse_id]).get(warehouse_id)
+
+    def all(self, db: Session) -> list[WarehouseInfo]:
+        by_id = self._current()
+        if by_id is None:
+            by_id = self._load(db)
+        return sorted(by_id.values())
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.version += 1
+            self._by_id = None
+
+    def _current(self) -> Optional[dict[int, WarehouseInfo]]:
+        if not self.synced and self._expires_at < time.monotonic():
+            return None
+        return self._by_id
+
+    def _load(self, db: Session) -> dict[int, WarehouseInfo]:
+        version = self.version
+        by_id = {
+            row.id: WarehouseInfo(*row)
+            for row in db.query(Warehouse.id, Warehouse.name, Warehouse.type, Warehouse.client_id,
+                                Warehouse.is_active)
+        }
+        with self._lock:
+            if self.version == version:
+                self._by_id = by_id
+                self._expires_at = time.monotonic() + self.ttl
+        return by_id
+
+
+warehouses = WarehouseDirectory(settings.warehouse_cache_ttl_seconds)
+
+
+def invalidate() -> None:
+    """Сбросить справочник складов во всех воркерах — вызывать после commit."""
+    warehouses.invalidate()
+    try:
+        get_redis().publish(CHANNEL, json.dumps({"event": "warehouse"}))
+    except _redis_lib.RedisError:
+        logger.warning("Redis недоступен: справочник складов сброшен только локально")
+
+
+# ── Синхронизация через Redis pub/sub ─────────────────────────────────────────
+
+_sync_thread: Optional[threading.Thread] = None
+_stop = threading.Event()
+
+
+def start_sync() -> None:
+    global _sync_thread
+    if not settings.warehouse_cache_sync or (_sync_thread is not None and _sync_thread.is_alive()):
+        return
+    _stop.clear()
+    _sync_thread = threading.Thread(target=_sync_loop, name="warehouse-cache-sync", daemon=True)
+    _sync_thread.start()
+
+
+def stop_sync() -> None:
+    global _sync_thread
+    _stop.set()
+    if _sync_thread is not None:
+        _sync_thread.join(timeout=_RECONNECT_DELAY)
+        _sync_thread = None
+    warehouses.synced = False
+
+
+def _sync_loop() -> None:
+    while not _stop.is_set():
+        try:
+            _listen()
+        except _redis_lib.RedisError as exc:
+            logger.warning("Синхронизация справочника складов прервана: %s", exc)
+        # пропущенные события неизвестны — до переподключения справочник живёт по TTL
+        warehouses.synced = False
+        warehouses.invalidate()
+        _stop.wait(_RECONNECT_DELAY)
+
+
+def _listen() -> None:
+    r = _redis_lib.from_url(settings.redis_url, decode_responses=True)
+    pubsub = r.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(CHANNEL)
+    try:
+        # события до подписки могли быть пропущены — начинаем с чистого справочника
+        warehouses.invalidate()
+        warehouses.synced = True
+        while not _stop.is_set():
+            message = pubsub.get_message(timeout=1.0)
+            if message is not None:
+                warehouses.invalidate()
+    finally:
+        pubsub.close()
+        r.close()
@@ -1,16 +1,31 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from app.core import auth_cache, warehouse_cache
+from app.core.query_counter import QueryDebugMiddleware
 from app.core.config import settings
 from app.api.router import api_router
 import app.models  # noqa: F401 — ensure all models are registered with SQLAlchemy
 
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    auth_cache.start_sync()
+    warehouse_cache.start_sync()
+    yield
+    warehouse_cache.stop_sync()
+    auth_cache.stop_sync()
+
+
 app = FastAPI(
     title=settings.app_name,
     version="2.0.0",
     docs_url="/docs" if settings.enable_docs else None,
     redoc_url="/redoc" if settings.enable_docs else None,
     redirect_slashes=False,
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -21,6 +36,13 @@ app.add_middleware(
     allow_headers=["Authorization", "Content-Type"],
 )
 
+if settings.query_debug:
+    app.add_middleware(
+        QueryDebugMiddleware,
+        max_queries=settings.query_debug_max_queries,
+        repeat_threshold=settings.query_debug_repeat_threshold,
+    )
+
 
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
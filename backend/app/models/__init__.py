@@ -9,9 +9,10 @@ from decimal import Decimal
 from typing import Optional, List, Any
 
 from sqlalchemy import (
-    Integer, String, Text, Boolean, DateTime, Date,
-    Enum, DECIMAL, ForeignKey, JSON, LargeBinary, func, UniqueConstraint,
+    Integer, BigInteger, String, Text, Boolean, DateTime, Date,
+    Enum, DECIMAL, ForeignKey, Index, JSON, LargeBinary, func, UniqueConstraint,
 )
+from sqlalchemy.dialects import mysql
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.core.database import Base
@@ -226,6 +227,18 @@ class Ticket(Base):
     created_at:       Mapped[datetime]       = mapped_column(DateTime, default=func.now(), nullable=False)
     updated_at:       Mapped[datetime]       = mapped_column(DateTime, default=func.now(), onupdate=func.now(), nullable=False)
 
+    # Под фильтры list_tickets: равенство по полю + is_deleted, сортировка
+    # по created_at DESC (id InnoDB добавляет в конец индекса сам).
+    __table_args__ = (
+        Index("ix_tickets_active_created", "is_deleted", "created_at"),
+        Index("ix_tickets_client_created", "client_id", "is_deleted", "created_at"),
+        Index("ix_tickets_assignee_created", "assigned_to", "is_deleted", "created_at"),
+        Index("ix_tickets_equipment_created", "equipment_id", "is_deleted", "created_at"),
+        Index("ix_tickets_status_created", "status", "is_deleted", "created_at"),
+        Index("ix_tickets_priority_created", "priority", "is_deleted", "created_at"),
+        Index("ix_tickets_updated", "updated_at"),  # водяной знак ticket_stats_daily
+    )
+
     client:        Mapped["Client"]              = relationship("Client", back_populates="tickets")
     equipment:     Mapped[Optional["Equipment"]] = relationship("Equipment", back_populates="tickets")
     assignee:      Mapped[Optional["User"]]      = relationship("User", foreign_keys=[assigned_to], back_populates="assigned_tickets")
@@ -279,7 +292,9 @@ class TicketFile(Base):
     file_name:   Mapped[str]           = mapped_column(String(255), nullable=False)
     file_type:   Mapped[Optional[str]] = mapped_column(String(128))
     file_size:   Mapped[Optional[int]] = mapped_column(Integer)
-    file_data:   Mapped[Optional[bytes]] = mapped_column(LargeBinary(length=4294967295))
+    storage_key: Mapped[Optional[str]] = mapped_column(String(64), index=True)  # sha256 в app.core.storage
+    # legacy, до миграции в хранилище; deferred — не выбирается, пока к полю не обратились явно
+    file_data:   Mapped[Optional[bytes]] = mapped_column(LargeBinary(length=4294967295), deferred=True)
     created_at:  Mapped[datetime]      = mapped_column(DateTime, default=func.now(), nullable=False)
 
     ticket:   Mapped["Ticket"] = relationship("Ticket", back_populates="files")
@@ -300,6 +315,10 @@ class WorkAct(Base):
     signed_at:           Mapped[Optional[datetime]] = mapped_column(DateTime)
     created_at:          Mapped[datetime]       = mapped_column(DateTime, default=func.now(), nullable=False)
 
+    __table_args__ = (
+        Index("ix_work_acts_created_engineer", "created_at", "engineer_id", "total_time_minutes"),  # отчёт загрузки
+    )
+
     ticket:   Mapped["Ticket"]          = relationship("Ticket", back_populates="work_act")
     engineer: Mapped["User"]            = relationship("User", foreign_keys=[engineer_id], back_populates="work_acts_engineer")
     signer:   Mapped[Optional["User"]]  = relationship("User", foreign_keys=[signed_by], back_populates="work_acts_signed")
@@ -352,6 +371,10 @@ class WorkActItem(Base):
     sort_order:   Mapped[int]           = mapped_column(Integer, default=0, nullable=False)
     warehouse_id: Mapped[Optional[int]] = mapped_column(ForeignKey("warehouses.id", ondelete="SET NULL"), nullable=True)
 
+    __table_args__ = (
+        Index("ix_work_act_items_act_type", "work_act_id", "item_type"),  # отчёт расхода запчастей
+    )
+
     work_act:  Mapped["WorkAct"]                  = relationship("WorkAct", back_populates="items")
     service:   Mapped[Optional["ServiceCatalog"]] = relationship("ServiceCatalog", back_populates="work_act_items")
     part:      Mapped[Optional["SparePart"]]      = relationship("SparePart")
@@ -384,6 +407,7 @@ class SparePart(Base):
     name:         Mapped[str]             = mapped_column(String(255), nullable=False)
     category:     Mapped[Optional[str]]   = mapped_column(String(64))
     unit:         Mapped[str]             = mapped_column(String(16), default="шт", nullable=False)
+    # кэш суммы WarehouseStock по складам компании (app.services.stock), напрямую не пишется
     quantity:     Mapped[int]             = mapped_column(Integer, default=0, nullable=False)
     min_quantity: Mapped[int]             = mapped_column(Integer, default=0, nullable=False)
     unit_price:   Mapped[Decimal]         = mapped_column(DECIMAL(12, 2), nullable=False, default=0)
@@ -446,6 +470,10 @@ class Invoice(Base):
     created_at:   Mapped[datetime]        = mapped_column(DateTime, default=func.now(), nullable=False)
     updated_at:   Mapped[datetime]        = mapped_column(DateTime, default=func.now(), onupdate=func.now(), nullable=False)
 
+    __table_args__ = (
+        Index("ix_invoices_issue_client", "issue_date", "client_id", "status"),  # отчёт выручки
+    )
+
     client:  Mapped["Client"]            = relationship("Client", back_populates="invoices")
     creator: Mapped["User"]              = relationship("User", foreign_keys=[created_by], back_populates="created_invoices")
     items:   Mapped[List["InvoiceItem"]] = relationship("InvoiceItem", back_populates="invoice", cascade="all, delete-orphan")
@@ -506,6 +534,11 @@ class Notification(Base):
     is_read:    Mapped[bool]           = mapped_column(Boolean, default=False, nullable=False)
     created_at: Mapped[datetime]       = mapped_column(DateTime, default=func.now(), nullable=False)
 
+    __table_args__ = (
+        Index("ix_notifications_user_created", "user_id", "created_at"),
+        Index("ix_notifications_user_read_created", "user_id", "is_read", "created_at"),
+    )
+
     user:   Mapped["User"]             = relationship("User", back_populates="notifications")
     ticket: Mapped[Optional["Ticket"]] = relationship("Ticket", back_populates="notifications")
 
@@ -522,7 +555,13 @@ class AuditLog(Base):
     old_values:  Mapped[Optional[Any]]  = mapped_column(JSON)
     new_values:  Mapped[Optional[Any]]  = mapped_column(JSON)
     ip_address:  Mapped[Optional[str]]  = mapped_column(String(45))
-    created_at:  Mapped[datetime]       = mapped_column(DateTime, default=func.now(), nullable=False)
+    created_at:  Mapped[datetime]       = mapped_column(DateTime, default=func.now(), nullable=False, index=True)
+
+    __table_args__ = (
+        Index("ix_audit_log_user_created", "user_id", "created_at"),
+        Index("ix_audit_log_entity_created", "entity_type", "created_at"),
+        Index("ix_audit_log_action_created", "action", "created_at"),
+    )
 
     user: Mapped[Optional["User"]] = relationship("User", back_populates="audit_logs")
 
@@ -536,6 +575,71 @@ class SystemSetting(Base):
     updated_by: Mapped[Optional[int]] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
 
 
+# ── Ticket Stats Daily ────────────────────────────────────────────────────────
+class TicketStatsDaily(Base):
+    """Дневной срез заявок для отчётов (app.services.ticket_stats) — производная таблица."""
+    __tablename__ = "ticket_stats_daily"
+
+    id:                  Mapped[int]           = mapped_column(Integer, primary_key=True, autoincrement=True)
+    day:                 Mapped[date]          = mapped_column(Date, nullable=False)
+    client_id:           Mapped[int]           = mapped_column(Integer, nullable=False)
+    assigned_to:         Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    type:                Mapped[str]           = mapped_column(String(32), nullable=False)
+    priority:            Mapped[str]           = mapped_column(String(16), nullable=False)
+    status:              Mapped[str]           = mapped_column(String(32), nullable=False)
+    tickets:             Mapped[int]           = mapped_column(Integer, nullable=False)
+    reaction_total:      Mapped[int]           = mapped_column(Integer, nullable=False)
+    reaction_violated:   Mapped[int]           = mapped_column(Integer, nullable=False)
+    resolution_total:    Mapped[int]           = mapped_column(Integer, nullable=False)
+    resolution_violated: Mapped[int]           = mapped_column(Integer, nullable=False)
+    resolved:            Mapped[int]           = mapped_column(Integer, nullable=False)
+    resolution_seconds:  Mapped[int]           = mapped_column(BigInteger, nullable=False)
+
+    __table_args__ = (
+        Index("ix_ticket_stats_daily_day", "day", "client_id", "assigned_to"),
+    )
+
+
+# ── Export Jobs ───────────────────────────────────────────────────────────────
+class ExportJob(Base):
+    """Фоновая выгрузка (app.services.exports): файл — объект хранилища по storage_key."""
+    __tablename__ = "export_jobs"
+
+    id:           Mapped[int]                = mapped_column(Integer, primary_key=True, autoincrement=True)
+    kind:         Mapped[str]                = mapped_column(String(32), nullable=False)
+    params:       Mapped[Any]                = mapped_column(JSON, nullable=False)
+    params_hash:  Mapped[str]                = mapped_column(String(64), nullable=False)
+    status:       Mapped[str]                = mapped_column(
+        Enum("pending", "running", "done", "failed", name="export_job_status_enum"),
+        default="pending", nullable=False
+    )
+    progress:     Mapped[int]                = mapped_column(Integer, default=0, nullable=False)  # 0–100
+    rows:         Mapped[int]                = mapped_column(Integer, default=0, nullable=False)
+    file_name:    Mapped[Optional[str]]      = mapped_column(String(255))
+    storage_key:  Mapped[Optional[str]]      = mapped_column(String(64))  # sha256 в app.core.storage
+    file_size:    Mapped[Optional[int]]      = mapped_column(BigInteger)
+    error:        Mapped[Optional[str]]      = mapped_column(Text)
+    created_by:   Mapped[int]                = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    created_at:   Mapped[datetime]           = mapped_column(DateTime, default=func.now(), nullable=False)
+    started_at:   Mapped[Optional[datetime]] = mapped_column(DateTime)  # момент захвата воркером — метка владельца
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(DateTime)  # последняя отметка прогресса
+    finished_at:  Mapped[Optional[datetime]] = mapped_column(DateTime)
+
+    __table_args__ = (
+        Index("ix_export_jobs_hash_status", "params_hash", "status", "created_at"),
+        Index("ix_export_jobs_user_created", "created_by", "created_at"),
+    )
+
+
+# ── Document Counters ─────────────────────────────────────────────────────────
+class DocumentCounter(Base):
+    __tablename__ = "document_counters"
+
+    key:        Mapped[str]      = mapped_column(String(32), primary_key=True)
+    value:      Mapped[int]      = mapped_column(Integer, default=0, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=func.now(), onupdate=func.now(), nullable=False)
+
+
 # ── Exchange Rates ─────────────────────────────────────────────────────────────
 class ExchangeRate(Base):
     __tablename__ = "exchange_rates"
@@ -585,6 +689,33 @@ class WarehouseStock(Base):
     part:      Mapped["SparePart"]  = relationship("SparePart")
 
 
+# ── Stock Movement ─────────────────────────────────────────────────────────────
+class StockMovement(Base):
+    """Журнал движений остатков (только добавление); WarehouseStock — его проекция."""
+    __tablename__ = "stock_movements"
+
+    id:            Mapped[int]           = mapped_column(Integer, primary_key=True, autoincrement=True)
+    warehouse_id:  Mapped[int]           = mapped_column(ForeignKey("warehouses.id", ondelete="RESTRICT"), nullable=False)
+    part_id:       Mapped[int]           = mapped_column(ForeignKey("spare_parts.id", ondelete="RESTRICT"), nullable=False)
+    delta:         Mapped[int]           = mapped_column(Integer, nullable=False)
+    balance_after: Mapped[int]           = mapped_column(Integer, nullable=False)
+    reason:        Mapped[str]           = mapped_column(
+        Enum("opening", "receipt", "transfer", "work_act", "adjust", name="stock_movement_reason_enum"),
+        nullable=False,
+    )
+    doc_id:        Mapped[Optional[int]] = mapped_column(Integer)  # id прихода / передачи / акта по reason
+    note:          Mapped[Optional[str]] = mapped_column(String(255))
+    user_id:       Mapped[Optional[int]] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"))
+    created_at:    Mapped[datetime]      = mapped_column(DateTime, default=func.now(), nullable=False)
+
+    __table_args__ = (
+        # остаток на дату — последняя запись пары склад/запчасть не позже даты
+        Index("ix_stock_movements_wh_part_created", "warehouse_id", "part_id", "created_at"),
+        Index("ix_stock_movements_part_created", "part_id", "created_at"),
+        Index("ix_stock_movements_doc", "reason", "doc_id"),
+    )
+
+
 # ── Stock Receipt ──────────────────────────────────────────────────────────────
 class StockReceipt(Base):
     __tablename__ = "stock_receipts"
@@ -686,6 +817,61 @@ class MaintenanceSchedule(Base):
     creator:     Mapped[Optional["User"]]   = relationship("User", foreign_keys=[created_by])
 
 
+# ── Search Index ───────────────────────────────────────────────────────────────
+class SearchTerm(Base):
+    """Инвертированный индекс полнотекстового поиска (app.services.search)."""
+    __tablename__ = "search_terms"
+
+    # двоичное сравнение: «мой»/«мои», «cafe»/«café» — разные ключи (в utf8mb4_unicode_ci совпадают)
+    term:        Mapped[str] = mapped_column(String(64).with_variant(mysql.VARCHAR(64, collation="utf8mb4_bin"), "mysql"), primary_key=True)
+    entity_type: Mapped[str] = mapped_column(String(16), primary_key=True)  # ticket / comment / client / equipment
+    entity_id:   Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    weight:      Mapped[int] = mapped_column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_search_terms_entity", "entity_type", "entity_id"),
+    )
+
+
+class SuggestGram(Base):
+    """Триграммы серийных номеров, артикулов и названий клиентов для автодополнения (app.services.suggest)."""
+    __tablename__ = "suggest_grams"
+
+    entity_type: Mapped[str] = mapped_column(String(16), primary_key=True)  # serial / sku / client
+    # двоичное сравнение, как у suggest_values.value: «ай1»/«аи1» — разные триграммы
+    gram:        Mapped[str] = mapped_column(String(3).with_variant(mysql.VARCHAR(3, collation="utf8mb4_bin"), "mysql"), primary_key=True)
+    entity_id:   Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+
+    __table_args__ = (
+        Index("ix_suggest_grams_entity", "entity_type", "entity_id"),
+    )
+
+
+class SuggestValue(Base):
+    """Нормализованные значения для точной проверки и сортировки подсказок (app.services.suggest)."""
+    __tablename__ = "suggest_values"
+
+    entity_type: Mapped[str] = mapped_column(String(16), primary_key=True)  # serial / sku / client
+    entity_id:   Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    # двоичное сравнение: диапазон префикса [q, q + U+10FFFF) — по кодам символов, как в SQLite
+    value:       Mapped[str] = mapped_column(String(255).with_variant(mysql.VARCHAR(255, collation="utf8mb4_bin"), "mysql"), nullable=False)
+    length:      Mapped[int] = mapped_column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_suggest_values_order", "entity_type", "length", "value"),
+    )
+
+
+class SuggestGramCount(Base):
+    """Число значений с триграммой — выбор самой редкой одним чтением по ключу (app.services.suggest)."""
+    __tablename__ = "suggest_gram_counts"
+
+    entity_type: Mapped[str] = mapped_column(String(16), primary_key=True)  # serial / sku / client
+    # двоичное сравнение, как у suggest_values.value: «ай1»/«аи1» — разные триграммы
+    gram:        Mapped[str] = mapped_column(String(3).with_variant(mysql.VARCHAR(3, collation="utf8mb4_bin"), "mysql"), primary_key=True)
+    count:       Mapped[int] = mapped_column(Integer, nullable=False)
+
+
 __all__ = [
     "User",
     "Client",
@@ -710,12 +896,20 @@ __all__ = [
     "Notification",
     "AuditLog",
     "SystemSetting",
+    "TicketStatsDaily",
+    "ExportJob",
+    "DocumentCounter",
     "ExchangeRate",
     "MaintenanceSchedule",
     "Warehouse",
     "WarehouseStock",
+    "StockMovement",
     "StockReceipt",
     "StockReceiptItem",
     "PartsTransfer",
     "PartsTransferItem",
+    "SearchTerm",
+    "SuggestGram",
+    "SuggestValue",
+    "SuggestGramCount",
 ]
@@ -6,7 +6,7 @@ from __future__ import annotations
 
 from datetime import datetime, date
 from decimal import Decimal
-from typing import Any, Generic, List, Optional, TypeVar
+from typing import Any, Dict, Generic, List, Optional, TypeVar
 
 from pydantic import BaseModel, EmailStr, ConfigDict, Field, field_validator, model_validator
 
@@ -17,10 +17,11 @@ T = TypeVar("T")
 
 class PaginatedResponse(BaseModel, Generic[T]):
     items: List[T]
-    total: int
+    total: Optional[int]          # в курсорном режиме — только при with_total=true
     page: int
     size: int
-    pages: int
+    pages: Optional[int]
+    next_cursor: Optional[str] = None
 
 
 class ErrorResponse(BaseModel):
@@ -445,6 +446,28 @@ class TicketResponse(BaseModel):
     updated_at: datetime
 
 
+class TicketListRow(BaseModel):
+    """Строка списка заявок в режиме view=compact — плоская, без вложенных объектов."""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    number: str
+    title: str
+    type: str
+    priority: str
+    status: str
+    client_id: int
+    client_name: str
+    equipment_id: Optional[int]
+    equipment_serial: Optional[str]
+    assigned_to: Optional[int]
+    engineer_name: Optional[str]
+    sla_resolution_deadline: Optional[datetime]
+    sla_reaction_violated: bool
+    sla_resolution_violated: bool
+    created_at: datetime
+
+
 # ── Ticket Status History ─────────────────────────────────────────────────────
 
 class TicketStatusHistoryResponse(BaseModel):
@@ -555,7 +578,7 @@ class SparePartCreate(BaseModel):
     name: str
     category: Optional[str] = None
     unit: str = "шт"
-    quantity: int = 0
+    quantity: int = 0                  # начальный остаток на основном складе компании
     min_quantity: int = 0
     unit_price: Decimal = Decimal("0.00")
     currency: str = "RUB"
@@ -569,7 +592,7 @@ class SparePartUpdate(BaseModel):
     name: Optional[str] = None
     category: Optional[str] = None
     unit: Optional[str] = None
-    quantity: Optional[int] = None
+    quantity: Optional[int] = None     # проводится корректировкой на складе компании
     min_quantity: Optional[int] = None
     unit_price: Optional[Decimal] = None
     currency: Optional[str] = None
@@ -586,7 +609,7 @@ class SparePartResponse(BaseModel):
     name: str
     category: Optional[str]
     unit: str
-    quantity: int
+    quantity: int                      # сумма по складам компании
     min_quantity: int
     unit_price: float
     price: Optional[float] = None   # alias для фронтенда (number в JSON)
@@ -945,6 +968,117 @@ class TicketReportResponse(BaseModel):
     period_to: date
 
 
+class EngineerUtilizationRow(BaseModel):
+    engineer_id: int
+    engineer: str
+    acts: int
+    minutes: int
+    hours: float
+    avg_minutes: float
+    utilization_pct: Optional[float] = None
+
+
+class EngineerUtilizationReport(BaseModel):
+    period_from: date
+    period_to: date
+    capacity_hours: int           # рабочие часы периода на одного инженера
+    rows: List[EngineerUtilizationRow]
+
+
+class PartsConsumptionRow(BaseModel):
+    part_id: int
+    sku: str
+    part_name: str
+    warehouse_id: Optional[int]
+    warehouse: str
+    acts: int
+    quantity: Decimal
+    amount: Decimal
+
+
+class PartsConsumptionReport(BaseModel):
+    period_from: date
+    period_to: date
+    rows: List[PartsConsumptionRow]
+
+
+class RevenueRow(BaseModel):
+    client_id: int
+    client: str
+    year: int
+    month: int
+    invoices: int
+    total: Decimal
+    vat: Decimal
+    services: Decimal
+    parts: Decimal
+    paid: Decimal
+    outstanding: Decimal
+    overdue: Decimal
+
+
+class RevenueReport(BaseModel):
+    period_from: date
+    period_to: date
+    rows: List[RevenueRow]
+
+
+# ── Export Jobs ───────────────────────────────────────────────────────────────
+
+class TicketExportParams(BaseModel):
+    date_from: date
+    date_to: date
+    engineer_id: Optional[int] = None
+    client_id: Optional[int] = None
+
+
+class AuditLogExportParams(BaseModel):
+    user_id: Optional[int] = None
+    action: Optional[str] = None
+    entity_type: Optional[str] = None
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+    ip_address: Optional[str] = None
+
+
+class ExportJobCreate(BaseModel):
+    kind: str = Field(..., pattern="^(tickets_xlsx|audit_log_csv)$")
+    params: Dict[str, Any] = {}
+
+
+class ExportJobResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    kind: str
+    params: Dict[str, Any]
+    status: str                   # pending / running / done / failed
+    progress: int
+    rows: int
+    file_name: Optional[str]
+    file_size: Optional[int]
+    error: Optional[str]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+
+
+# ── Search ────────────────────────────────────────────────────────────────────
+
+class SearchHitResponse(BaseModel):
+    type: str                     # ticket / client / equipment
+    id: int
+    title: str
+    subtitle: Optional[str] = None
+    score: int
+
+
+class SuggestionResponse(BaseModel):
+    type: str                     # serial / sku / client
+    id: int
+    value: str
+
+
 # ── Maintenance Schedule ──────────────────────────────────────────────────────
 
 class MaintenanceScheduleCreate(BaseModel):
@@ -1016,12 +1150,48 @@ class WarehouseStockResponse(BaseModel):
     quantity: int
     unit_price_snapshot: Optional[Decimal]
 
-    @model_validator(mode="after")
-    def _fill_from_relations(self) -> "WarehouseStockResponse":
-        from app.models import WarehouseStock  # noqa: F401 — type-only use
-        obj = self
-        # filled from ORM relationships via model_validate
-        return obj
+
+class StockMatrixWarehouse(BaseModel):
+    id: int
+    name: str
+    type: str
+
+
+class StockMatrixRow(BaseModel):
+    part_id: int
+    sku: str
+    name: str
+    unit: str
+    category: Optional[str] = None
+    min_quantity: int
+    total: int                       # сумма по складам матрицы
+    quantities: Dict[int, int] = {}  # warehouse_id → количество; нет ключа — нет на складе
+
+
+class StockMatrixResponse(PaginatedResponse[StockMatrixRow]):
+    warehouses: List[StockMatrixWarehouse]   # столбцы матрицы
+
+
+class StockMovementResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    warehouse_id: int
+    part_id: int
+    delta: int
+    balance_after: int
+    reason: str
+    doc_id: Optional[int] = None
+    note: Optional[str] = None
+    user_id: Optional[int] = None
+    created_at: datetime
+
+
+class StockBalanceAtResponse(BaseModel):
+    part_id: int
+    part_sku: str
+    part_name: str
+    quantity: int
 
 
 # ── Stock Receipt ─────────────────────────────────────────────────────────────
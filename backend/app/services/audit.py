@@ -1,7 +1,9 @@
+import json
+from datetime import datetime
 from typing import Any, Optional
 
 from fastapi import Request
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 
 from app.models import AuditLog
 
@@ -35,3 +37,52 @@ def extract_ip(request: Request) -> Optional[str]:
     if xff:
         return xff.split(",")[0].strip()
     return request.client.host if request.client else None
+
+
+AUDIT_CSV_HEADER = [
+    "id", "created_at", "user_id", "user_email", "user_name",
+    "action", "entity_type", "entity_id", "ip_address",
+    "old_values", "new_values",
+]
+
+
+def audit_log_query(
+    db: Session,
+    user_id: Optional[int] = None,
+    action: Optional[str] = None,
+    entity_type: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    ip_address: Optional[str] = None,
+):
+    q = db.query(AuditLog).options(joinedload(AuditLog.user))
+    if user_id is not None:
+        q = q.filter(AuditLog.user_id == user_id)
+    if action:
+        q = q.filter(AuditLog.action == action)
+    if entity_type:
+        q = q.filter(AuditLog.entity_type == entity_type)
+    if date_from:
+        q = q.filter(AuditLog.created_at >= date_from)
+    if date_to:
+        q = q.filter(AuditLog.created_at <= date_to)
+    if ip_address:
+        q = q.filter(AuditLog.ip_address == ip_address)
+    return q
+
+
+def audit_csv_row(row: AuditLog) -> list:
+    """Строка CSV-выгрузки журнала в порядке AUDIT_CSV_HEADER."""
+    return [
+        row.id,
+        row.created_at.isoformat() if row.created_at else "",
+        row.user_id or "",
+        row.user.email if row.user else "",
+        row.user.full_name if row.user else "",
+        row.action,
+        row.entity_type,
+        row.entity_id or "",
+        row.ip_address or "",
+        json.dumps(row.old_values, ensure_ascii=False) if row.old_values else "",
+        json.dumps(row.new_values, ensure_ascii=False) if row.new_values else "",
+    ]
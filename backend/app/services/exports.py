@@ -0,0 +1,304 @@
+"""
+Фоновые выгрузки (export_jobs).
+
+POST /exports создаёт задание и ставит его в очередь Celery
+(app.tasks.exports.run_export); воркер пишет файл во временный файл,
+переносит его в хранилище (app.core.storage) и сообщает о готовности
+уведомлением. Пока задание выполняется, клиент опрашивает progress.
+
+Виды выгрузок — EXPORTS: схема параметров, роли (те же, что у
+синхронного эндпоинта), имя файла и функция записи с обратным вызовом
+прогресса progress(готово строк, всего строк).
+
+Кэш по параметрам: params_hash — sha256 от вида и нормализованных
+параметров. Готовая выгрузка с тем же хэшем, завершённая не раньше
+EXPORT_CACHE_TTL_MINUTES назад, отдаётся новому заданию сразу (тот же
+объект хранилища, без пересчёта); выполняющееся задание с тем же хэшем
+возвращается как есть, если оно не старше EXPORT_JOB_TIMEOUT_MINUTES.
+
+Зависшие задания (не ушло в очередь, воркер убит посреди выгрузки)
+не блокируют повторы: задание, не поставленное в очередь, сразу
+помечается failed; expire_stale (beat) переводит в failed задания старше
+таймаута и уведомляет автора. Воркер захватывает задание условным UPDATE
+и отмечается (heartbeat_at) на каждом шаге прогресса; повторно
+доставленная задача забирает running-задание, чей воркер не отмечался
+дольше EXPORT_JOB_HEARTBEAT_MINUTES, а пока отметки свежие — повторяется
+позже. Метка владельца — started_at захвата: прогресс и итог пишутся
+только при совпадении метки и статуса running, поэтому воркер, у которого
+задание забрали или провалили по таймауту, останавливается и не
+перезаписывает итог.
+
+Файлы выгрузок не копятся: purge_expired (beat) удаляет из хранилища
+объекты готовых заданий старше EXPORT_CACHE_TTL_MINUTES, если на тот же
+ключ (хранилище адресуется по содержимому) не ссылаются свежая выгрузка
+или вложение заявки; у заданий ключ обнуляется — скачивание отвечает 410.
+"""
+import csv
+import hashlib
+import io
+import json
+import logging
+import tempfile
+from datetime import datetime, timedelta
+from typing import BinaryIO, Callable, NamedTuple, Optional
+
+from pydantic import BaseModel
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.storage import get_storage
+from app.models import AuditLog, ExportJob, Notification, Ticket, TicketFile, User
+from app.schemas import AuditLogExportParams, TicketExportParams
+from app.services import reports as report_service
+from app.services import spreadsheet, ticket_stats
+from app.services.audit import AUDIT_CSV_HEADER, audit_csv_row, audit_log_query
+
+logger = logging.getLogger(__name__)
+
+IN_FLIGHT = ("pending", "running")
+CSV_BATCH = 500
+
+Progress = Callable[[int, int], None]
+
+
+class ExportKind(NamedTuple):
+    label: str
+    params: type[BaseModel]
+    roles: tuple[str, ...]
+    media_type: str
+    file_name: Callable[[BaseModel], str]
+    write: Callable[[Session, BaseModel, Progress], tuple[BinaryIO, int]]  # (файл, число строк)
+
+
+def _write_tickets_xlsx(db: Session, p: TicketExportParams, progress: Progress) -> tuple[BinaryIO, int]:
+    flt = report_service.TicketReportFilter(p.date_from, p.date_to, p.engineer_id, p.client_id)
+    # сводка может браться из среза (до 5 минут давности) — строки и прогресс считаются по заявкам
+    data = ticket_stats.report_summary(db, flt)
+    total = db.scalar(select(func.count()).select_from(Ticket).where(*flt.clauses()))
+    written = 0
+
+    def _progress(n: int) -> None:
+        nonlocal written
+        written = n
+        progress(n, total)
+
+    fh = report_service.tickets_xlsx(db, flt, data, progress=_progress)
+    return fh, written
+
+
+def _write_audit_log_csv(db: Session, p: AuditLogExportParams, progress: Progress) -> tuple[BinaryIO, int]:
+    q = audit_log_query(db, **p.model_dump())
+    total = q.count()
+    fh = tempfile.TemporaryFile()
+    text = io.TextIOWrapper(fh, encoding="utf-8", newline="")
+    writer = csv.writer(text)
+    writer.writerow(AUDIT_CSV_HEADER)
+    n = 0
+    for n, row in enumerate(q.order_by(AuditLog.created_at.desc(), AuditLog.id.desc()).yield_per(CSV_BATCH), 1):
+        writer.writerow(audit_csv_row(row))
+        if n % CSV_BATCH == 0:
+            progress(n, total)
+    text.flush()
+    text.detach()
+    fh.seek(0)
+    return fh, n
+
+
+EXPORTS: dict[str, ExportKind] = {
+    "tickets_xlsx": ExportKind(
+        "Отчёт по заявкам", TicketExportParams, ("director", "svc_mgr", "admin"), spreadsheet.MEDIA_TYPE,
+        lambda p: f"tickets_report_{p.date_from}_{p.date_to}.xlsx", _write_tickets_xlsx,
+    ),
+    "audit_log_csv": ExportKind(
+        "Журнал аудита", AuditLogExportParams, ("admin", "director"), "text/csv; charset=utf-8",
+        lambda p: "audit_log.csv", _write_audit_log_csv,
+    ),
+}
+
+
+def normalize_params(kind: str, raw: dict) -> dict:
+    """Проверить параметры схемой вида и привести к JSON (ValidationError — неверные параметры)."""
+    return EXPORTS[kind].params.model_validate(raw).model_dump(mode="json")
+
+
+def params_hash(kind: str, params: dict) -> str:
+    return hashlib.sha256(json.dumps([kind, params], sort_keys=True).encode()).hexdigest()
+
+
+def _stale(now: datetime):
+    """Условие «задание в работе дольше таймаута»: pending — с создания, running — с запуска."""
+    cutoff = now - timedelta(minutes=settings.export_job_timeout_minutes)
+    return or_(
+        and_(ExportJob.status == "pending", ExportJob.created_at < cutoff),
+        and_(ExportJob.status == "running", ExportJob.started_at < cutoff),
+    )
+
+
+def find_reusable(db: Session, digest: str, now: datetime) -> Optional[ExportJob]:
+    """Свежая готовая или ещё выполняющаяся выгрузка с тем же хэшем параметров."""
+    job = (
+        db.query(ExportJob)
+        .filter(
+            ExportJob.params_hash == digest,
+            or_(
+                and_(ExportJob.status == "done",
+                     ExportJob.finished_at >= now - timedelta(minutes=settings.export_cache_ttl_minutes)),
+                and_(ExportJob.status.in_(IN_FLIGHT), ~_stale(now)),
+            ),
+        )
+        .order_by(ExportJob.id.desc())
+        .first()
+    )
+    if job is not None and job.status == "done" and not get_storage().exists(job.storage_key):
+        return None
+    return job
+
+
+def create_job(db: Session, user: User, kind: str, params: dict) -> tuple[ExportJob, bool]:
+    """Задание на выгрузку. Возвращает (задание, нужно ли ставить его в очередь)."""
+    now = datetime.utcnow()
+    digest = params_hash(kind, params)
+    cached = find_reusable(db, digest, now)
+    if cached is not None and cached.status in IN_FLIGHT:
+        return cached, False
+    job = ExportJob(kind=kind, params=params, params_hash=digest, created_by=user.id, created_at=now)
+    if cached is not None:
+        job.status, job.progress, job.rows = "done", 100, cached.rows
+        job.file_name, job.storage_key, job.file_size = cached.file_name, cached.storage_key, cached.file_size
+        job.started_at = job.finished_at = now
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job, cached is None
+
+
+def _notify(db: Session, job: ExportJob, kind: ExportKind) -> None:
+    if job.status == "done":
+        title, body = f"Выгрузка готова: {job.file_name}", f"/api/v1/exports/{job.id}/download"
+    else:
+        title, body = f"Выгрузка не удалась: {kind.label}", job.error
+    db.add(Notification(user_id=job.created_by, event_type=f"export_{job.status}", title=title, body=body))
+
+
+def purge_expired(db: Session) -> int:
+    """Удалить файлы выгрузок, готовых раньше TTL кэша и никем больше не используемых. Возвращает число объектов."""
+    cutoff = datetime.utcnow() - timedelta(minutes=settings.export_cache_ttl_minutes)
+    expired = db.query(ExportJob).filter(
+        ExportJob.status == "done", ExportJob.storage_key.isnot(None), ExportJob.finished_at < cutoff,
+    ).all()
+    keys = {job.storage_key for job in expired}
+    if not keys:
+        return 0
+    live = {
+        key for (key,) in db.query(ExportJob.storage_key).filter(
+            ExportJob.storage_key.in_(keys), ExportJob.status == "done", ExportJob.finished_at >= cutoff,
+        )
+    } | {key for (key,) in db.query(TicketFile.storage_key).filter(TicketFile.storage_key.in_(keys))}
+    storage = get_storage()
+    for key in keys - live:
+        storage.delete(key)
+    for job in expired:
+        if job.storage_key not in live:
+            job.storage_key = None
+    db.commit()
+    return len(keys - live)
+
+
+def fail_job(db: Session, job: ExportJob, error: str) -> None:
+    job.status, job.error, job.finished_at = "failed", error, datetime.utcnow()
+    _notify(db, job, EXPORTS[job.kind])
+    db.commit()
+
+
+def _close(db: Session, job_id: int, claim, **values) -> bool:
+    """Перевести задание в конечный статус, если оно всё ещё удовлетворяет claim; уведомить автора."""
+    closed = (
+        db.query(ExportJob)
+        .filter(ExportJob.id == job_id, claim)
+        .update({**values, "finished_at": datetime.utcnow()}, synchronize_session=False)
+    )
+    if closed:
+        job = db.get(ExportJob, job_id)
+        db.refresh(job)
+        _notify(db, job, EXPORTS[job.kind])
+    db.commit()
+    return bool(closed)
+
+
+def expire_stale(db: Session) -> int:
+    """Перевести в failed задания, не завершившиеся за EXPORT_JOB_TIMEOUT_MINUTES. Возвращает их число."""
+    now = datetime.utcnow()
+    expired = 0
+    for job in db.query(ExportJob).filter(_stale(now)).all():
+        logger.warning("Выгрузка %s (задание %s) зависла в статусе %s", job.kind, job.id, job.status)
+        # условие повторяется в UPDATE: задание могло завершиться после выборки
+        expired += _close(db, job.id, _stale(now), status="failed",
+                          error=f"Выгрузка не завершилась за {settings.export_job_timeout_minutes} мин")
+    return expired
+
+
+class ClaimLost(Exception):
+    """Задание забрал другой воркер или провалил expire_stale — выполнение прекращается."""
+
+
+def run_job(db: Session, read_db: Session, job_id: int) -> bool:
+    """Выполнить задание: данные читаются через read_db, статус и прогресс коммитятся в db.
+
+    Берётся pending-задание или running, чей воркер не отмечался дольше
+    EXPORT_JOB_HEARTBEAT_MINUTES. False — задание выполняет живой воркер,
+    задачу стоит повторить позже; True — задание выполнено или больше не
+    требует работы.
+    """
+    # DATETIME без долей секунды: метка владельца сравнивается с тем, что сохранено
+    claimed_at = datetime.utcnow().replace(microsecond=0)
+    abandoned = and_(
+        ExportJob.status == "running",
+        ExportJob.heartbeat_at < claimed_at - timedelta(minutes=settings.export_job_heartbeat_minutes),
+    )
+    claimed = (
+        db.query(ExportJob)
+        .filter(ExportJob.id == job_id, or_(ExportJob.status == "pending", abandoned))
+        .update({"status": "running", "started_at": claimed_at, "heartbeat_at": claimed_at,
+                 "progress": 0, "rows": 0}, synchronize_session=False)
+    )
+    db.commit()
+    if not claimed:
+        return db.query(ExportJob.status).filter(ExportJob.id == job_id).scalar() != "running"
+    job = db.get(ExportJob, job_id)
+    db.refresh(job)
+    name, kind = job.kind, EXPORTS[job.kind]
+    owned = and_(ExportJob.status == "running", ExportJob.started_at == claimed_at)
+
+    def progress(done: int, total: int) -> None:
+        updated = (
+            db.query(ExportJob)
+            .filter(ExportJob.id == job_id, owned)
+            .update({"rows": done, "progress": min(99, done * 100 // total) if total else 0,
+                     "heartbeat_at": datetime.utcnow()}, synchronize_session=False)
+        )
+        db.commit()
+        if not updated:
+            raise ClaimLost
+
+    try:
+        params = kind.params.model_validate(job.params)
+        fh, rows = kind.write(read_db, params, progress)
+        progress(rows, rows)
+        with get_storage().writer() as out:
+            for chunk in spreadsheet.iter_file(fh):
+                out.write(chunk)
+            stored = out.commit()
+    except ClaimLost:
+        logger.warning("Выгрузка %s (задание %s) больше не принадлежит этому воркеру", name, job_id)
+        db.rollback()
+        return True
+    except Exception as exc:
+        logger.exception("Выгрузка %s (задание %s) не удалась", name, job_id)
+        db.rollback()
+        _close(db, job_id, owned, status="failed", error=str(exc)[:1000] or exc.__class__.__name__)
+        return True
+    if not _close(db, job_id, owned, status="done", progress=100, rows=rows, file_name=kind.file_name(params),
+                  storage_key=stored.key, file_size=stored.size):
+        logger.warning("Выгрузка %s (задание %s) завершена, но задание уже закрыто", name, job_id)
+    return True
@@ -0,0 +1,74 @@
+"""
+Нумерация документов (заявки, счета, приходы, передачи).
+
+Счётчики хранятся в таблице document_counters: одна строка на префикс
+периода (например, «T-20260417» или «INV-2026»). Номер выдаётся через
+SELECT ... FOR UPDATE по первичному ключу — O(1) независимо от размера
+таблицы документов, а параллельные создания сериализуются на блокировке
+строки вместо падения с IntegrityError на уникальном number.
+
+При первом обращении к новому префиксу счётчик засевается максимальным
+существующим номером — это сохраняет непрерывность нумерации для
+документов, созданных до появления таблицы счётчиков. Строка создаётся
+INSERT IGNORE до блокирующего чтения: SELECT ... FOR UPDATE по ещё не
+существующему ключу берёт в InnoDB gap-блокировку, и две транзакции с
+новым префиксом (первые заявки дня) взаимоблокировались бы на вставке.
+"""
+from typing import Optional
+
+from sqlalchemy import func, insert
+from sqlalchemy.orm import InstrumentedAttribute, Session
+
+from app.models import DocumentCounter
+
+
+def next_number(db: Session, prefix: str, width: int, column: InstrumentedAttribute) -> str:
+    """Выдать следующий номер вида «{prefix}-{seq:0{width}d}».
+
+    column — уникальная колонка номера (Ticket.number и т.п.), по ней
+    засевается счётчик нового префикса. Блокировка строки счётчика держится
+    до commit/rollback вызывающей транзакции.
+    """
+    counter = _lock_counter(db, prefix)
+    if counter is None:
+        _create_counter(db, prefix, column)
+        counter = _lock_counter(db, prefix)
+    counter.value += 1
+    db.flush()
+    return f"{prefix}-{counter.value:0{width}d}"
+
+
+def _lock_counter(db: Session, prefix: str) -> Optional[DocumentCounter]:
+    return (
+        db.query(DocumentCounter)
+        .filter(DocumentCounter.key == prefix)
+        .with_for_update()
+        .first()
+    )
+
+
+def _create_counter(db: Session, prefix: str, column: InstrumentedAttribute) -> None:
+    # Параллельная вставка того же ключа ждёт коммита первой и игнорируется
+    db.execute(
+        insert(DocumentCounter)
+        .values(key=prefix, value=_max_existing_seq(db, prefix, column))
+        .prefix_with("IGNORE", dialect="mysql")
+        .prefix_with("OR IGNORE", dialect="sqlite")
+    )
+
+
+def _max_existing_seq(db: Session, prefix: str, column: InstrumentedAttribute) -> int:
+    # Длина в приоритете: «-10000» лексикографически меньше «-9999»
+    last = (
+        db.query(column)
+        .filter(column.like(f"{prefix}-%"))
+        .order_by(func.length(column).desc(), column.desc())
+        .limit(1)
+        .scalar()
+    )
+    if not last:
+        return 0
+    try:
+        return int(last.rsplit("-", 1)[1])
+    except ValueError:
+        return 0
@@ -0,0 +1,414 @@
+"""
+Отчёты, посчитанные в БД.
+
+Отчёт по заявкам: сводка (разрезы по статусу, типу, приоритету и инженеру,
+соблюдение SLA, среднее время решения) — один GROUP BY по (статус, тип,
+приоритет, инженер) с условными SUM: в Python сворачиваются десятки-сотни
+групп, а не все заявки периода, поэтому память не зависит от длины
+периода. Строки заявок нужны только выгрузке и берутся узкой проекцией
+колонок (ticket_rows), пачками, в потоковую XLSX-книгу (tickets_xlsx).
+
+Табличные отчёты (TableReport) — загрузка инженеров по актам, расход
+запчастей по актам, выручка и задолженность по счетам — один GROUP BY
+каждый; колонки SELECT подписаны ключами строк, поэтому одни и те же
+строки отдаются в JSON и потоково выгружаются в XLSX/CSV (table_xlsx,
+table_csv).
+"""
+import csv
+import tempfile
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from io import TextIOWrapper
+from typing import BinaryIO, Callable, Iterator, NamedTuple, Optional
+
+from sqlalchemy import Integer, Select, and_, case, extract, func, literal, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import FunctionElement
+
+from app.models import (
+    Client, Invoice, InvoiceItem, SparePart, Ticket, User, Warehouse, WorkAct, WorkActItem,
+)
+from app.services import spreadsheet
+from app.services.sla import FINAL_STATUSES
+
+RESOLVED_STATUSES = ("closed", "completed")
+
+
+class seconds_between(FunctionElement):
+    """Целое число секунд от start до end (в каждом диалекте — своей функцией)."""
+    type = Integer()
+    inherit_cache = True
+
+    def __init__(self, start, end):
+        super().__init__(start, end)
+
+
+@compiles(seconds_between)
+def _seconds_between_default(element, compiler, **kw):
+    start, end = element.clauses
+    return f"CAST(EXTRACT(EPOCH FROM {compiler.process(end, **kw)} - {compiler.process(start, **kw)}) AS INTEGER)"
+
+
+@compiles(seconds_between, "mysql")
+def _seconds_between_mysql(element, compiler, **kw):
+    start, end = element.clauses
+    return f"TIMESTAMPDIFF(SECOND, {compiler.process(start, **kw)}, {compiler.process(end, **kw)})"
+
+
+@compiles(seconds_between, "sqlite")
+def _seconds_between_sqlite(element, compiler, **kw):
+    start, end = element.clauses
+    return (f"CAST(ROUND((julianday({compiler.process(end, **kw)}) - julianday({compiler.process(start, **kw)}))"
+            f" * 86400) AS INTEGER)")
+
+
+@dataclass
+class TicketReportFilter:
+    date_from: date
+    date_to: date
+    engineer_id: Optional[int] = None
+    client_id: Optional[int] = None
+
+    def clauses(self) -> list:
+        clauses = [
+            Ticket.is_deleted.is_(False),
+            Ticket.created_at >= datetime.combine(self.date_from, time.min),
+            Ticket.created_at <= datetime.combine(self.date_to, time.max),
+        ]
+        if self.engineer_id:
+            clauses.append(Ticket.assigned_to == self.engineer_id)
+        if self.client_id:
+            clauses.append(Ticket.client_id == self.client_id)
+        return clauses
+
+
+def _flag(condition):
+    return func.sum(case((condition, 1), else_=0))
+
+
+def sla_columns(now: datetime) -> list:
+    """Условные SUM по SLA и времени решения; заявки до новой SLA-системы — по старому sla_deadline."""
+    legacy_violated = and_(
+        Ticket.sla_deadline.is_not(None), Ticket.sla_deadline < now, Ticket.status.not_in(FINAL_STATUSES),
+    )
+    resolved = and_(Ticket.status.in_(RESOLVED_STATUSES), Ticket.closed_at.is_not(None))
+    return [
+        _flag(Ticket.sla_reaction_deadline.is_not(None) | Ticket.sla_deadline.is_not(None))
+        .label("reaction_total"),
+        _flag(case((Ticket.sla_reaction_deadline.is_not(None), Ticket.sla_reaction_violated), else_=legacy_violated))
+        .label("reaction_violated"),
+        _flag(Ticket.sla_resolution_deadline.is_not(None) | Ticket.sla_deadline.is_not(None))
+        .label("resolution_total"),
+        _flag(case((Ticket.sla_resolution_deadline.is_not(None), Ticket.sla_resolution_violated),
+                   else_=legacy_violated))
+        .label("resolution_violated"),
+        _flag(resolved).label("resolved"),
+        func.coalesce(func.sum(case((resolved, seconds_between(Ticket.created_at, Ticket.closed_at)), else_=0)), 0)
+        .label("resolution_seconds"),
+    ]
+
+
+def _pct(total: int, violated: int) -> Optional[float]:
+    return None if total == 0 else round(100 * (total - violated) / total, 2)
+
+
+def summarize(groups) -> dict:
+    """Свернуть сгруппированные строки (status, type, priority, engineer, count, SLA-суммы) в сводку."""
+    by_status: dict[str, int] = {}
+    by_type: dict[str, int] = {}
+    by_priority: dict[str, int] = {}
+    by_engineer: dict[str, int] = {}
+    sums = dict.fromkeys(("reaction_total", "reaction_violated", "resolution_total", "resolution_violated",
+                          "resolved", "resolution_seconds"), 0)
+    total = 0
+    for g in groups:
+        n = int(g.count)
+        total += n
+        by_status[g.status] = by_status.get(g.status, 0) + n
+        by_type[g.type] = by_type.get(g.type, 0) + n
+        by_priority[g.priority] = by_priority.get(g.priority, 0) + n
+        if g.engineer is not None:
+            by_engineer[g.engineer] = by_engineer.get(g.engineer, 0) + n
+        for key in sums:
+            sums[key] += int(getattr(g, key) or 0)
+
+    resolution_pct = _pct(sums["resolution_total"], sums["resolution_violated"])
+    return {
+        "total": total,
+        "by_status": by_status,
+        "by_type": by_type,
+        "by_priority": by_priority,
+        "by_engineer": by_engineer,
+        "sla_reaction_compliance_pct": _pct(sums["reaction_total"], sums["reaction_violated"]),
+        "sla_resolution_compliance_pct": resolution_pct,
+        "sla_compliance_pct": resolution_pct,  # backward compat
+        "avg_resolution_hours": (
+            None if not sums["resolved"] else round(sums["resolution_seconds"] / sums["resolved"] / 3600, 1)
+        ),
+    }
+
+
+def ticket_summary(db: Session, flt: TicketReportFilter, now: Optional[datetime] = None) -> dict:
+    """Сводка по заявкам периода одним GROUP BY."""
+    stmt = (
+        select(
+            Ticket.status, Ticket.type, Ticket.priority, User.full_name.label("engineer"),
+            func.count().label("count"), *sla_columns(now or datetime.utcnow()),
+        )
+        .outerjoin(User, User.id == Ticket.assigned_to)
+        .where(*flt.clauses())
+        .group_by(Ticket.status, Ticket.type, Ticket.priority, User.full_name)
+    )
+    return summarize(db.execute(stmt))
+
+
+def ticket_rows(flt: TicketReportFilter):
+    """Строки выгрузки: только нужные колонки, клиент и инженер — через JOIN."""
+    return (
+        select(
+            Ticket.number, Ticket.created_at, func.coalesce(Client.name, literal("")).label("client_name"),
+            Ticket.type, Ticket.priority, Ticket.status,
+            func.coalesce(User.full_name, literal("")).label("engineer"),
+            Ticket.sla_reaction_violated, Ticket.sla_resolution_violated,
+        )
+        .outerjoin(Client, Client.id == Ticket.client_id)
+        .outerjoin(User, User.id == Ticket.assigned_to)
+        .where(*flt.clauses())
+        .order_by(Ticket.created_at, Ticket.id)
+    )
+
+
+TICKET_COLUMNS = ["Номер", "Создана", "Клиент", "Тип", "Приоритет", "Статус",
+                  "Инженер", "SLA реакция нарушена", "SLA решение нарушено"]
+
+
+def _na(value):
+    return value if value is not None else "N/A"
+
+
+def tickets_xlsx(
+    db: Session, flt: TicketReportFilter, data: dict, progress: Optional[Callable[[int], None]] = None,
+) -> BinaryIO:
+    """XLSX-выгрузка (листы «Заявки» и «Сводка») во временный файл; data — сводка периода.
+
+    progress(n) вызывается после каждой пачки строк (и после последней,
+    неполной) с числом записанных строк.
+    """
+    return spreadsheet.build(lambda wb: _ticket_sheets(wb, db, flt, data, progress))
+
+
+def _ticket_sheets(
+    wb, db: Session, flt: TicketReportFilter, data: dict, progress: Optional[Callable[[int], None]],
+) -> None:
+    ws = wb.create_sheet("Заявки")
+    spreadsheet.append_header(ws, TICKET_COLUMNS)
+    rows = db.execute(ticket_rows(flt).execution_options(yield_per=spreadsheet.YIELD_PER))
+    n = 0
+    for n, t in enumerate(rows, 1):
+        ws.append([
+            t.number,
+            t.created_at.strftime("%d.%m.%Y %H:%M") if t.created_at else "",
+            t.client_name,
+            t.type,
+            t.priority,
+            t.status,
+            t.engineer,
+            "Да" if t.sla_reaction_violated else "Нет",
+            "Да" if t.sla_resolution_violated else "Нет",
+        ])
+        if progress and n % spreadsheet.YIELD_PER == 0:
+            progress(n)
+    if progress and n % spreadsheet.YIELD_PER:
+        progress(n)
+
+    ws2 = wb.create_sheet("Сводка")
+    ws2.append(["Показатель", "Значение"])
+    ws2.append(["Период с", str(flt.date_from)])
+    ws2.append(["Период по", str(flt.date_to)])
+    ws2.append(["Всего заявок", data["total"]])
+    ws2.append(["% соблюдения SLA реакции", _na(data["sla_reaction_compliance_pct"])])
+    ws2.append(["% соблюдения SLA решения", _na(data["sla_resolution_compliance_pct"])])
+    ws2.append(["Среднее время решения (ч)", _na(data["avg_resolution_hours"])])
+    ws2.append([])
+    ws2.append(["По статусам"])
+    for k, v in data["by_status"].items():
+        ws2.append([k, v])
+    ws2.append([])
+    ws2.append(["По инженерам"])
+    for k, v in data["by_engineer"].items():
+        ws2.append([k, v])
+
+
+# ── Табличные отчёты ──────────────────────────────────────────────────────────
+
+class TableReport(NamedTuple):
+    title: str
+    columns: list[tuple[str, str]]  # (метка колонки SELECT, заголовок в выгрузке)
+    stmt: Select
+
+
+def _between(column, date_from: date, date_to: date) -> list:
+    return [column >= datetime.combine(date_from, time.min), column <= datetime.combine(date_to, time.max)]
+
+
+def working_minutes(date_from: date, date_to: date, hours_per_day: int) -> int:
+    """Рабочее время периода в минутах: будни × hours_per_day."""
+    days = (date_to - date_from).days + 1
+    weekdays = sum(1 for i in range(days) if (date_from + timedelta(days=i)).weekday() < 5)
+    return weekdays * hours_per_day * 60
+
+
+def engineer_utilization(
+    date_from: date, date_to: date, capacity_minutes: int, engineer_id: Optional[int] = None,
+) -> TableReport:
+    """Загрузка инженеров: время по актам выполненных работ периода против рабочего времени."""
+    minutes = func.coalesce(func.sum(WorkAct.total_time_minutes), 0)
+    acts = func.count(WorkAct.id)
+    stmt = (
+        select(
+            User.id.label("engineer_id"), User.full_name.label("engineer"), acts.label("acts"),
+            minutes.label("minutes"),
+            func.round(minutes / 60.0, 1).label("hours"),
+            func.round(minutes * 1.0 / acts, 1).label("avg_minutes"),
+            func.round(minutes * 100.0 / capacity_minutes, 1).label("utilization_pct")
+            if capacity_minutes else literal(None).label("utilization_pct"),
+        )
+        .join(User, User.id == WorkAct.engineer_id)
+        .where(*_between(WorkAct.created_at, date_from, date_to))
+        .group_by(User.id, User.full_name)
+        .order_by(minutes.desc(), User.full_name)
+    )
+    if engineer_id:
+        stmt = stmt.where(WorkAct.engineer_id == engineer_id)
+    return TableReport("Загрузка инженеров", [
+        ("engineer", "Инженер"), ("acts", "Актов"), ("minutes", "Минут"), ("hours", "Часов"),
+        ("avg_minutes", "Минут на акт"), ("utilization_pct", "Загрузка, %"),
+    ], stmt)
+
+
+def parts_consumption(
+    date_from: date, date_to: date, warehouse_id: Optional[int] = None, part_id: Optional[int] = None,
+) -> TableReport:
+    """Расход запчастей по актам выполненных работ периода: по запчасти и складу списания."""
+    stmt = (
+        select(
+            SparePart.id.label("part_id"), SparePart.sku.label("sku"), SparePart.name.label("part_name"),
+            WorkActItem.warehouse_id.label("warehouse_id"),
+            func.coalesce(Warehouse.name, literal("")).label("warehouse"),
+            func.count(func.distinct(WorkActItem.work_act_id)).label("acts"),
+            func.sum(WorkActItem.quantity).label("quantity"),
+            func.sum(WorkActItem.total).label("amount"),
+        )
+        .select_from(WorkActItem)
+        .join(WorkAct, WorkAct.id == WorkActItem.work_act_id)
+        .join(SparePart, SparePart.id == WorkActItem.part_id)
+        .outerjoin(Warehouse, Warehouse.id == WorkActItem.warehouse_id)
+        .where(WorkActItem.item_type == "part", *_between(WorkAct.created_at, date_from, date_to))
+        .group_by(SparePart.id, SparePart.sku, SparePart.name, WorkActItem.warehouse_id, Warehouse.name)
+        .order_by(SparePart.sku, WorkActItem.warehouse_id)
+    )
+    if warehouse_id:
+        stmt = stmt.where(WorkActItem.warehouse_id == warehouse_id)
+    if part_id:
+        stmt = stmt.where(WorkActItem.part_id == part_id)
+    return TableReport("Расход запчастей", [
+        ("sku", "Артикул"), ("part_name", "Запчасть"), ("warehouse", "Склад"), ("acts", "Актов"),
+        ("quantity", "Количество"), ("amount", "Сумма"),
+    ], stmt)
+
+
+def revenue(date_from: date, date_to: date, client_id: Optional[int] = None,
+            today: Optional[date] = None) -> TableReport:
+    """Выручка и задолженность по выставленным счетам (без черновиков и отменённых): клиент × месяц.
+
+    Суммы — с НДС (total_amount); запчасти — позиции item_type=part, работы — остальные позиции.
+    Просрочено — неоплаченные счета в статусе overdue или с прошедшим due_date.
+    """
+    today = today or date.today()
+    period = [Invoice.status.not_in(("draft", "cancelled")),
+              Invoice.issue_date >= date_from, Invoice.issue_date <= date_to]
+    if client_id:
+        period.append(Invoice.client_id == client_id)
+    # позиции сворачиваются по счёту до соединения, чтобы суммы счёта не умножались на число позиций
+    items = (
+        select(
+            InvoiceItem.invoice_id,
+            func.sum(case((InvoiceItem.item_type == "part", InvoiceItem.total), else_=0)).label("parts"),
+        )
+        .join(Invoice, Invoice.id == InvoiceItem.invoice_id)
+        .where(*period)
+        .group_by(InvoiceItem.invoice_id)
+        .subquery()
+    )
+    year, month = extract("year", Invoice.issue_date), extract("month", Invoice.issue_date)
+    unpaid = Invoice.status != "paid"
+    parts = func.sum(func.coalesce(items.c.parts, 0))
+
+    def _amount(condition):
+        return func.sum(case((condition, Invoice.total_amount), else_=0))
+
+    stmt = (
+        select(
+            Client.id.label("client_id"), Client.name.label("client"), year.label("year"), month.label("month"),
+            func.count(Invoice.id).label("invoices"),
+            func.sum(Invoice.total_amount).label("total"),
+            func.sum(Invoice.vat_amount).label("vat"),
+            (func.sum(Invoice.total_amount) - parts).label("services"),
+            parts.label("parts"),
+            _amount(Invoice.status == "paid").label("paid"),
+            _amount(unpaid).label("outstanding"),
+            _amount(and_(unpaid, (Invoice.status == "overdue") | (Invoice.due_date < today))).label("overdue"),
+        )
+        .join(Client, Client.id == Invoice.client_id)
+        .outerjoin(items, items.c.invoice_id == Invoice.id)
+        .where(*period)
+        .group_by(Client.id, Client.name, year, month)
+        .order_by(year, month, Client.name)
+    )
+    return TableReport("Выручка", [
+        ("client", "Клиент"), ("year", "Год"), ("month", "Месяц"), ("invoices", "Счетов"),
+        ("total", "Выставлено"), ("vat", "в т.ч. НДС"), ("services", "Работы"), ("parts", "Запчасти"),
+        ("paid", "Оплачено"), ("outstanding", "Задолженность"), ("overdue", "Просрочено"),
+    ], stmt)
+
+
+def table_rows(db: Session, report: TableReport) -> list[dict]:
+    return [dict(row._mapping) for row in db.execute(report.stmt)]
+
+
+def _iter_values(db: Session, report: TableReport) -> Iterator[list]:
+    keys = [key for key, _ in report.columns]
+    for row in db.execute(report.stmt.execution_options(yield_per=spreadsheet.YIELD_PER)):
+        values = row._mapping
+        yield [values[key] for key in keys]
+
+
+def table_xlsx(db: Session, report: TableReport) -> BinaryIO:
+    """Потоковая XLSX-выгрузка табличного отчёта во временный файл."""
+    return spreadsheet.build(lambda wb: _table_sheet(wb, db, report))
+
+
+def _table_sheet(wb, db: Session, report: TableReport) -> None:
+    ws = wb.create_sheet(report.title)
+    spreadsheet.append_header(ws, [title for _, title in report.columns])
+    for values in _iter_values(db, report):
+        ws.append(values)
+
+
+def table_csv(db: Session, report: TableReport) -> BinaryIO:
+    """CSV-выгрузка табличного отчёта во временный файл (UTF-8); указатель — в начале файла.
+
+    Файл пишется целиком до ответа: сессия запроса закрывается раньше, чем
+    StreamingResponse начинает отдавать тело.
+    """
+    fh = tempfile.TemporaryFile()
+    text = TextIOWrapper(fh, encoding="utf-8", newline="")
+    writer = csv.writer(text)
+    writer.writerow([title for _, title in report.columns])
+    for values in _iter_values(db, report):
+        writer.writerow(values)
+    text.flush()
+    text.detach()
+    fh.seek(0)
+    return fh
@@ -0,0 +1,196 @@
+"""
+Полнотекстовый поиск по заявкам, комментариям, клиентам и оборудованию.
+
+Индекс — таблица search_terms: слово → (тип сущности, id, вес). Слово
+берётся из текста целиком (\\w+, нижний регистр, ё → е), поэтому
+кириллица индексируется без настройки парсера БД. Запрос ищет каждое
+слово как префикс (B-tree по term), сущность должна содержать все слова
+запроса; ранг — сумма весов полей, в которых слова найдены.
+
+Индекс обновляется на flush сессии (after_flush): новые, изменённые
+(только при изменении индексируемых полей) и удалённые объекты.
+Массовые UPDATE/INSERT в обход ORM индекс не видят — для них reindex_all.
+"""
+import re
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from sqlalchemy import and_, delete, event, func, insert, inspect, literal, or_, select, union_all
+from sqlalchemy.orm import Session
+
+from app.models import Client, Equipment, SearchTerm, Ticket, TicketComment
+
+# модель → (entity_type, {поле: вес})
+INDEXED = {
+    Ticket:        ("ticket",    {"number": 5, "title": 3, "description": 1}),
+    TicketComment: ("comment",   {"text": 1}),
+    Client:        ("client",    {"name": 3, "inn": 5, "city": 1}),
+    Equipment:     ("equipment", {"serial_number": 5, "location": 1, "notes": 1}),
+}
+
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = 64
+MAX_QUERY_TERMS = 8
+
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(text: Optional[str]) -> list[str]:
+    if not text:
+        return []
+    words = _WORD.findall(text.lower().replace("ё", "е"))
+    return [w[:MAX_TERM_LENGTH] for w in words if len(w) >= MIN_TERM_LENGTH]
+
+
+def entity_terms(model, values) -> dict[str, int]:
+    """Слова объекта с весами: вес поля × число вхождений. values — поле → текст."""
+    _, fields = INDEXED[model]
+    weights: dict[str, int] = defaultdict(int)
+    for field, weight in fields.items():
+        for term in tokenize(values[field]):
+            weights[term] += weight
+    return weights
+
+
+def _rows(model, entity_id: int, values) -> list[dict]:
+    entity_type, _ = INDEXED[model]
+    return [
+        {"term": term, "entity_type": entity_type, "entity_id": entity_id, "weight": weight}
+        for term, weight in entity_terms(model, values).items()
+    ]
+
+
+def _object_rows(obj) -> list[dict]:
+    _, fields = INDEXED[type(obj)]
+    return _rows(type(obj), obj.id, {field: getattr(obj, field) for field in fields})
+
+
+def _delete_stmt(entity_type: str, ids: Iterable[int]):
+    return delete(SearchTerm).where(SearchTerm.entity_type == entity_type, SearchTerm.entity_id.in_(list(ids)))
+
+
+def _text_changed(obj) -> bool:
+    _, fields = INDEXED[type(obj)]
+    state = inspect(obj)
+    return any(state.attrs[field].history.has_changes() for field in fields)
+
+
+@event.listens_for(Session, "after_flush")
+def _update_index(session: Session, _flush_context) -> None:
+    stale: dict[str, set[int]] = defaultdict(set)
+    fresh = []
+    for obj in session.deleted:
+        if type(obj) in INDEXED:
+            stale[INDEXED[type(obj)][0]].add(obj.id)
+    for obj in session.dirty:
+        if type(obj) in INDEXED and _text_changed(obj):
+            stale[INDEXED[type(obj)][0]].add(obj.id)
+            fresh.append(obj)
+    fresh += [obj for obj in session.new if type(obj) in INDEXED]
+    if not stale and not fresh:
+        return
+
+    conn = session.connection()
+    for entity_type, ids in stale.items():
+        conn.execute(_delete_stmt(entity_type, ids))
+    rows = [row for obj in fresh for row in _object_rows(obj)]
+    if rows:
+        conn.execute(insert(SearchTerm), rows)
+
+
+def reindex_all(db: Session, batch_size: int = 500) -> int:
+    """Перестроить индекс целиком (после миграции или массовых правок). Возвращает число объектов."""
+    total = 0
+    for model, (entity_type, fields) in INDEXED.items():
+        db.execute(delete(SearchTerm).where(SearchTerm.entity_type == entity_type))
+        rows = []
+        for record in db.execute(select(model.id, *[getattr(model, f) for f in fields])).yield_per(batch_size):
+            rows += _rows(model, record.id, record._mapping)
+            total += 1
+            if len(rows) >= batch_size:
+                db.execute(insert(SearchTerm), rows)
+                rows = []
+        if rows:
+            db.execute(insert(SearchTerm), rows)
+    db.commit()
+    return total
+
+
+def _term_hits(index: int, term: str, hide_internal: bool):
+    """Сущности, содержащие слово с данным префиксом; комментарии засчитываются своей заявке."""
+    match = SearchTerm.term.startswith(term, autoescape=True)
+    direct = select(
+        SearchTerm.entity_type.label("entity_type"),
+        SearchTerm.entity_id.label("entity_id"),
+        SearchTerm.weight.label("weight"),
+    ).where(match, SearchTerm.entity_type != "comment")
+    via_comment = (
+        select(
+            literal("ticket").label("entity_type"),
+            TicketComment.ticket_id.label("entity_id"),
+            SearchTerm.weight.label("weight"),
+        )
+        .join(TicketComment, and_(SearchTerm.entity_type == "comment", SearchTerm.entity_id == TicketComment.id))
+        .where(match)
+    )
+    if hide_internal:
+        via_comment = via_comment.where(TicketComment.is_internal.is_(False))
+    hits = union_all(direct, via_comment).subquery(f"hits_{index}")
+    # одно слово запроса даёт сущности вес лучшего совпадения, а не сумму всех форм
+    return select(
+        hits.c.entity_type, hits.c.entity_id, func.max(hits.c.weight).label("weight"),
+    ).group_by(hits.c.entity_type, hits.c.entity_id)
+
+
+def search(
+    db: Session,
+    query: str,
+    *,
+    types: Optional[Iterable[str]] = None,
+    client_scope: Optional[int] = None,
+    assigned_to: Optional[int] = None,
+    limit: int = 20,
+) -> list[tuple[str, int, int]]:
+    """Найти сущности по всем словам запроса.
+
+    client_scope — client_id пользователя портала (видит только свою
+    организацию и не видит внутренние комментарии); assigned_to —
+    инженер, которому видны только назначенные ему заявки.
+    Возвращает [(entity_type, entity_id, score)] по убыванию ранга.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+    if not terms:
+        return []
+
+    per_term = union_all(*[
+        _term_hits(i, term, hide_internal=client_scope is not None) for i, term in enumerate(terms)
+    ]).subquery("per_term")
+    ranked = (
+        select(per_term.c.entity_type, per_term.c.entity_id, func.sum(per_term.c.weight).label("score"))
+        .group_by(per_term.c.entity_type, per_term.c.entity_id)
+        .having(func.count() == len(terms))
+        .subquery("ranked")
+    )
+
+    ticket_visible = and_(ranked.c.entity_type == "ticket", Ticket.is_deleted.is_(False))
+    client_visible = and_(ranked.c.entity_type == "client", Client.is_deleted.is_(False))
+    equipment_visible = and_(ranked.c.entity_type == "equipment", Equipment.is_deleted.is_(False))
+    if client_scope is not None:
+        ticket_visible = and_(ticket_visible, Ticket.client_id == client_scope)
+        client_visible = and_(client_visible, Client.id == client_scope)
+        equipment_visible = and_(equipment_visible, Equipment.client_id == client_scope)
+    elif assigned_to is not None:
+        ticket_visible = and_(ticket_visible, Ticket.assigned_to == assigned_to)
+
+    stmt = (
+        select(ranked.c.entity_type, ranked.c.entity_id, ranked.c.score)
+        .outerjoin(Ticket, and_(ranked.c.entity_type == "ticket", Ticket.id == ranked.c.entity_id))
+        .outerjoin(Client, and_(ranked.c.entity_type == "client", Client.id == ranked.c.entity_id))
+        .outerjoin(Equipment, and_(ranked.c.entity_type == "equipment", Equipment.id == ranked.c.entity_id))
+        .where(or_(ticket_visible, client_visible, equipment_visible))
+        .order_by(ranked.c.score.desc(), ranked.c.entity_type, ranked.c.entity_id.desc())
+        .limit(limit)
+    )
+    if types is not None:
+        stmt = stmt.where(ranked.c.entity_type.in_(list(types)))
+    return [tuple(row) for row in db.execute(stmt)]
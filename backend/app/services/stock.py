@@ -0,0 +1,270 @@
+"""
+Движение остатков по складам пакетом строк (warehouse_id, part_id, delta)
+и журнал движений stock_movements.
+
+Строки с одинаковой парой склад/запчасть сворачиваются в чистую дельту —
+при правке акта возврат старых позиций и списание новых дают одно
+изменение (или ни одного). Затронутые строки WarehouseStock блокируются
+одним SELECT ... FOR UPDATE в порядке (warehouse_id, part_id): все пути
+берут блокировки в одном порядке, поэтому встречные транзакции ждут друг
+друга, а не взаимоблокируются. Нехватка проверяется в памяти до первой
+записи; изменения уходят пакетными UPDATE/INSERT при flush.
+
+Каждое применённое изменение дописывается в журнал (одним INSERT на
+пакет) вместе с остатком после него. WarehouseStock — проекция журнала:
+verify_balances сверяет их, rebuild_balances пересобирает проекцию, а
+остаток на дату (balances_at) — это последняя запись каждой пары не позже
+даты, точечное чтение по индексу (warehouse_id, part_id, created_at).
+
+SparePart.quantity — не отдельный остаток, а кэш суммы по складам
+компании: apply_movements ведёт его приращением, refresh_part_quantities
+пересчитывает для заданных запчастей, reconcile_part_quantities находит
+и исправляет расхождения пакетно.
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import bindparam, func, insert, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from app.core import warehouse_cache
+from app.models import SparePart, StockMovement, Warehouse, WarehouseStock
+
+
+@dataclass
+class InsufficientStock(Exception):
+    warehouse_name: str
+    part_name: str
+    available: int
+    requested: int
+
+    def __str__(self) -> str:
+        return (
+            f"На складе «{self.warehouse_name}» доступно {self.available} шт. «{self.part_name}», "
+            f"запрошено {self.requested}"
+        )
+
+
+def net_deltas(lines: Iterable[tuple[int, int, int]]) -> dict[tuple[int, int], int]:
+    """(warehouse_id, part_id) → суммарная дельта; нулевые отбрасываются."""
+    net: dict[tuple[int, int], int] = defaultdict(int)
+    for warehouse_id, part_id, delta in lines:
+        net[warehouse_id, part_id] += delta
+    return {key: delta for key, delta in sorted(net.items()) if delta}
+
+
+def apply_movements(
+    db: Session,
+    lines: Iterable[tuple[int, int, int]],
+    reason: str,
+    *,
+    doc_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    note: Optional[str] = None,
+) -> dict[tuple[int, int], WarehouseStock]:
+    """Применить движения и записать их в журнал; при нехватке — InsufficientStock, ничего не изменив.
+
+    reason и doc_id — основание (приход, передача, акт, корректировка) для
+    журнала, note — комментарий. Возвращает затронутые строки WarehouseStock по (склад, запчасть).
+    """
+    net = net_deltas(lines)
+    if not net:
+        return {}
+
+    # тип склада читается той же блокирующей выборкой: каталог складов процесса
+    # может отставать от смены типа, а от него зависит приращение кэша SparePart.quantity
+    locked = (
+        db.query(WarehouseStock, Warehouse.type)
+        .join(Warehouse, WarehouseStock.warehouse_id == Warehouse.id)
+        .filter(tuple_(WarehouseStock.warehouse_id, WarehouseStock.part_id).in_(list(net)))
+        .order_by(WarehouseStock.warehouse_id, WarehouseStock.part_id)
+        .with_for_update(of=WarehouseStock)
+        .all()
+    )
+    stocks = {(s.warehouse_id, s.part_id): s for s, _ in locked}
+    types = {s.warehouse_id: wh_type for s, wh_type in locked}
+    # каталог — только для складов без строк остатков (и для имени в сообщении о нехватке)
+    missing = {w for w, _ in net} - set(types)
+    if missing:
+        types.update((w, wh.type) for w, wh in warehouse_cache.warehouses.get_many(db, missing).items())
+
+    for (warehouse_id, part_id), delta in net.items():
+        stock = stocks.get((warehouse_id, part_id))
+        available = stock.quantity if stock else 0
+        if available + delta < 0:
+            wh = warehouse_cache.warehouses.get(db, warehouse_id)
+            part_name = db.query(SparePart.name).filter(SparePart.id == part_id).scalar()
+            raise InsufficientStock(
+                warehouse_name=wh.name if wh else f"id={warehouse_id}",
+                part_name=part_name or f"id={part_id}",
+                available=available,
+                requested=-delta,
+            )
+
+    company: dict[int, int] = defaultdict(int)
+    journal = []
+    for (warehouse_id, part_id), delta in net.items():
+        stock = stocks.get((warehouse_id, part_id))
+        if stock is None:
+            stock = stocks[warehouse_id, part_id] = WarehouseStock(
+                warehouse_id=warehouse_id, part_id=part_id, quantity=delta,
+            )
+            db.add(stock)
+        else:
+            stock.quantity += delta
+        journal.append({
+            "warehouse_id": warehouse_id, "part_id": part_id, "delta": delta,
+            "balance_after": stock.quantity, "reason": reason, "doc_id": doc_id, "user_id": user_id, "note": note,
+        })
+        if types.get(warehouse_id) == "company":
+            company[part_id] += delta
+
+    # кэш SparePart.quantity ведётся приращением в том же пакете
+    company = {part_id: delta for part_id, delta in company.items() if delta}
+    if company:
+        parts = SparePart.__table__
+        db.execute(
+            update(parts)
+            .where(parts.c.id == bindparam("part_id"))
+            .values(quantity=parts.c.quantity + bindparam("delta")),
+            [{"part_id": part_id, "delta": delta} for part_id, delta in company.items()],
+        )
+    db.execute(insert(StockMovement), journal)
+    db.flush()
+    return {key: stocks[key] for key in net}
+
+
+def balances_at(db: Session, warehouse_id: int, at: datetime,
+                part_ids: Optional[Iterable[int]] = None) -> dict[int, int]:
+    """part_id → остаток на складе на момент at (по журналу; нулевые не включаются).
+
+    Пары склад/запчасть берутся из warehouse_stock (строка заводится при
+    первом движении), для каждой — одна запись журнала: ORDER BY created_at
+    DESC, id DESC LIMIT 1 по ix_stock_movements_wh_part_created. Стоимость
+    зависит от числа позиций склада, а не от длины истории.
+    """
+    balance = (
+        select(StockMovement.balance_after)
+        .where(
+            StockMovement.warehouse_id == WarehouseStock.warehouse_id,
+            StockMovement.part_id == WarehouseStock.part_id,
+            StockMovement.created_at <= at,
+        )
+        .order_by(StockMovement.created_at.desc(), StockMovement.id.desc())
+        .limit(1)
+        .correlate(WarehouseStock)
+        .scalar_subquery()
+    )
+    stmt = select(WarehouseStock.part_id, balance).where(WarehouseStock.warehouse_id == warehouse_id)
+    if part_ids is not None:
+        stmt = stmt.where(WarehouseStock.part_id.in_(list(part_ids)))
+    return {part_id: qty for part_id, qty in db.execute(stmt) if qty}
+
+
+def _ledger_totals():
+    return (
+        select(StockMovement.warehouse_id, StockMovement.part_id, func.sum(StockMovement.delta).label("qty"))
+        .group_by(StockMovement.warehouse_id, StockMovement.part_id)
+        .subquery()
+    )
+
+
+def verify_balances(db: Session) -> list[tuple[int, int, int, int]]:
+    """Расхождения проекции с журналом: [(warehouse_id, part_id, в warehouse_stock, по журналу)]."""
+    ledger = _ledger_totals()
+    stock_qty = func.coalesce(WarehouseStock.quantity, 0)
+    ledger_qty = func.coalesce(ledger.c.qty, 0)
+    # FULL OUTER JOIN есть не везде — две половины: строки остатков и записи журнала без строки остатка
+    with_stock = (
+        select(WarehouseStock.warehouse_id, WarehouseStock.part_id, stock_qty, ledger_qty)
+        .outerjoin(ledger, (ledger.c.warehouse_id == WarehouseStock.warehouse_id)
+                   & (ledger.c.part_id == WarehouseStock.part_id))
+        .where(stock_qty != ledger_qty)
+    )
+    without_stock = (
+        select(ledger.c.warehouse_id, ledger.c.part_id, stock_qty, ledger.c.qty)
+        .outerjoin(WarehouseStock, (ledger.c.warehouse_id == WarehouseStock.warehouse_id)
+                   & (ledger.c.part_id == WarehouseStock.part_id))
+        .where(WarehouseStock.id.is_(None), ledger.c.qty != 0)
+    )
+    rows = list(db.execute(with_stock)) + list(db.execute(without_stock))
+    return sorted(tuple(r) for r in rows)
+
+
+def rebuild_balances(db: Session) -> int:
+    """Привести warehouse_stock к сумме журнала. Возвращает число исправленных строк."""
+    diffs = verify_balances(db)
+    existing = {}
+    if diffs:
+        keys = [(warehouse_id, part_id) for warehouse_id, part_id, _, _ in diffs]
+        existing = {
+            (s.warehouse_id, s.part_id): s
+            for s in db.query(WarehouseStock).filter(
+                tuple_(WarehouseStock.warehouse_id, WarehouseStock.part_id).in_(keys)
+            )
+        }
+    for warehouse_id, part_id, _, qty in diffs:
+        stock = existing.get((warehouse_id, part_id))
+        if stock is None:
+            db.add(WarehouseStock(warehouse_id=warehouse_id, part_id=part_id, quantity=qty))
+        else:
+            stock.quantity = qty
+    db.commit()
+    return len(diffs)
+
+
+# ── SparePart.quantity — кэш суммы по складам компании ────────────────────────
+
+def main_company_warehouse_id(db: Session) -> Optional[int]:
+    """Основной склад компании — первый активный склад типа company."""
+    return next(
+        (w.id for w in warehouse_cache.warehouses.all(db) if w.type == "company" and w.is_active), None,
+    )
+
+
+def company_warehouse_for(db: Session, part_id: int) -> Optional[int]:
+    """Склад компании для корректировки запчасти: где её больше всего, иначе основной."""
+    warehouse_id = (
+        db.query(WarehouseStock.warehouse_id)
+        .join(Warehouse, WarehouseStock.warehouse_id == Warehouse.id)
+        .filter(WarehouseStock.part_id == part_id, Warehouse.type == "company", Warehouse.is_active.is_(True))
+        .order_by(WarehouseStock.quantity.desc(), WarehouseStock.warehouse_id)
+        .limit(1)
+        .scalar()
+    )
+    return warehouse_id or main_company_warehouse_id(db)
+
+
+def _company_total(part_id):
+    return (
+        select(func.coalesce(func.sum(WarehouseStock.quantity), 0))
+        .join(Warehouse, WarehouseStock.warehouse_id == Warehouse.id)
+        .where(WarehouseStock.part_id == part_id, Warehouse.type == "company")
+        .scalar_subquery()
+    )
+
+
+def refresh_part_quantities(db: Session, part_ids) -> None:
+    """Пересчитать кэш для part_ids (список или подзапрос) одним UPDATE."""
+    parts = SparePart.__table__
+    db.execute(update(parts).where(parts.c.id.in_(part_ids)).values(quantity=_company_total(parts.c.id)))
+
+
+def part_quantity_drift(db: Session) -> list[tuple[int, int, int]]:
+    """Расхождения кэша: [(part_id, SparePart.quantity, сумма по складам компании)]."""
+    total = _company_total(SparePart.id)
+    rows = db.execute(
+        select(SparePart.id, SparePart.quantity, total).where(SparePart.quantity != total).order_by(SparePart.id)
+    )
+    return [tuple(r) for r in rows]
+
+
+def reconcile_part_quantities(db: Session, batch_size: int = 1000) -> int:
+    """Исправить все расхождения кэша. Возвращает число исправленных запчастей."""
+    part_ids = [part_id for part_id, _, _ in part_quantity_drift(db)]
+    for i in range(0, len(part_ids), batch_size):
+        refresh_part_quantities(db, part_ids[i:i + batch_size])
+    db.commit()
+    return len(part_ids)
@@ -0,0 +1,234 @@
+"""
+Автодополнение по серийному номеру оборудования, артикулу запчасти и
+названию клиента — по префиксу и по подстроке.
+
+Нормализованное значение (нижний регистр, ё → е) и его длина хранятся в
+suggest_values; порядок выдачи — «короче, затем по алфавиту» — это порядок
+индекса (entity_type, length, value). Префикс ищется по этому индексу:
+для каждой длины совпадения лежат одним диапазоном [query, query + U+10FFFF),
+поэтому LIMIT останавливает чтение на первых строках, сколько бы значений
+ни начиналось с query.
+
+Подстрока (от 3 символов) ищется по триграммам значения из suggest_grams:
+запрос превращается в соединение по триграммам (каждая — точечный поиск по
+первичному ключу), начиная с самой редкой. Частоты триграмм хранятся в
+suggest_gram_counts, поэтому выбор самой редкой — одно чтение по ключу. Триграммы только сужают
+выборку: точное вхождение (LIKE по suggest_values.value), порядок и LIMIT
+выполняются в том же запросе. Сначала выдаются совпадения по префиксу.
+
+Все три таблицы обновляются на flush сессии, как и индекс полнотекстового поиска
+(app.services.search); для массовых правок в обход ORM — rebuild_all.
+"""
+from collections import Counter, defaultdict
+from typing import Optional
+
+from sqlalchemy import and_, delete, event, func, insert, inspect, select
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session, aliased
+
+from app.models import Client, Equipment, SparePart, SuggestGram, SuggestGramCount, SuggestValue
+
+# entity_type → (модель, колонка значения)
+KINDS = {
+    "serial": (Equipment, "serial_number"),
+    "sku":    (SparePart, "sku"),
+    "client": (Client, "name"),
+}
+_BY_MODEL = {model: (kind, field) for kind, (model, field) in KINDS.items()}
+
+MAX_QUERY_GRAMS = 8
+# верхняя граница диапазона префикса: больше любого символа значения
+PREFIX_END = chr(0x10FFFF)
+
+
+def normalize(value: Optional[str]) -> str:
+    return (value or "").lower().replace("ё", "е")
+
+
+def value_grams(value: Optional[str]) -> set[str]:
+    value = normalize(value)
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+def _rows(kind: str, entity_id: int, value: Optional[str]) -> list[dict]:
+    return [{"entity_type": kind, "gram": g, "entity_id": entity_id} for g in value_grams(value)]
+
+
+def _value_row(kind: str, entity_id: int, value: Optional[str]) -> dict:
+    value = normalize(value)
+    return {"entity_type": kind, "entity_id": entity_id, "value": value, "length": len(value)}
+
+
+@event.listens_for(Session, "after_flush")
+def _update_grams(session: Session, _flush_context) -> None:
+    stale: dict[str, set[int]] = defaultdict(set)
+    fresh = []
+    for obj in session.deleted:
+        if type(obj) in _BY_MODEL:
+            stale[_BY_MODEL[type(obj)][0]].add(obj.id)
+    for obj in session.dirty:
+        if type(obj) in _BY_MODEL:
+            kind, field = _BY_MODEL[type(obj)]
+            if inspect(obj).attrs[field].history.has_changes():
+                stale[kind].add(obj.id)
+                fresh.append(obj)
+    fresh += [obj for obj in session.new if type(obj) in _BY_MODEL]
+    if not stale and not fresh:
+        return
+
+    conn = session.connection()
+    counts: Counter = Counter()
+    for kind, ids in stale.items():
+        removed = conn.execute(
+            select(SuggestGram.gram, func.count())
+            .where(SuggestGram.entity_type == kind, SuggestGram.entity_id.in_(ids))
+            .group_by(SuggestGram.gram)
+        )
+        counts.update({(kind, gram): -n for gram, n in removed})
+        conn.execute(delete(SuggestGram).where(SuggestGram.entity_type == kind, SuggestGram.entity_id.in_(ids)))
+        conn.execute(delete(SuggestValue).where(SuggestValue.entity_type == kind, SuggestValue.entity_id.in_(ids)))
+    rows, values = [], []
+    for obj in fresh:
+        kind, field = _BY_MODEL[type(obj)]
+        rows += _rows(kind, obj.id, getattr(obj, field))
+        values.append(_value_row(kind, obj.id, getattr(obj, field)))
+    counts.update((row["entity_type"], row["gram"]) for row in rows)
+    if rows:
+        conn.execute(insert(SuggestGram), rows)
+    if values:
+        conn.execute(insert(SuggestValue), values)
+    _add_counts(conn, counts)
+
+
+def _add_counts(conn: Connection, counts: Counter) -> None:
+    """Прибавить к suggest_gram_counts; ключи по порядку — одинаковый порядок блокировок строк."""
+    rows = [{"entity_type": kind, "gram": gram, "count": n} for (kind, gram), n in sorted(counts.items()) if n]
+    if not rows:
+        return
+    if conn.dialect.name == "mysql":
+        stmt = mysql.insert(SuggestGramCount)
+        stmt = stmt.on_duplicate_key_update(count=SuggestGramCount.count + stmt.inserted["count"])
+    else:
+        stmt = sqlite.insert(SuggestGramCount)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["entity_type", "gram"], set_={"count": SuggestGramCount.count + stmt.excluded["count"]},
+        )
+    conn.execute(stmt, rows)
+
+
+def rebuild_all(db: Session, batch_size: int = 1000) -> int:
+    """Пересобрать триграммы, их частоты и значения целиком. Возвращает число значений."""
+    total = 0
+    for kind, (model, field) in KINDS.items():
+        db.execute(delete(SuggestGram).where(SuggestGram.entity_type == kind))
+        db.execute(delete(SuggestValue).where(SuggestValue.entity_type == kind))
+        db.execute(delete(SuggestGramCount).where(SuggestGramCount.entity_type == kind))
+        rows, values = [], []
+        for entity_id, value in db.execute(select(model.id, getattr(model, field))).yield_per(batch_size):
+            rows += _rows(kind, entity_id, value)
+            values.append(_value_row(kind, entity_id, value))
+            total += 1
+            if len(values) >= batch_size:
+                db.execute(insert(SuggestGram), rows)
+                db.execute(insert(SuggestValue), values)
+                rows, values = [], []
+        if values:
+            db.execute(insert(SuggestGram), rows)
+            db.execute(insert(SuggestValue), values)
+        db.execute(insert(SuggestGramCount).from_select(
+            ["entity_type", "gram", "count"],
+            select(SuggestGram.entity_type, SuggestGram.gram, func.count())
+            .where(SuggestGram.entity_type == kind)
+            .group_by(SuggestGram.entity_type, SuggestGram.gram),
+        ))
+    db.commit()
+    return total
+
+
+def _visible(kind: str, client_scope: Optional[int]):
+    if kind == "serial":
+        cond = Equipment.is_deleted.is_(False)
+        return cond if client_scope is None else and_(cond, Equipment.client_id == client_scope)
+    if kind == "client":
+        cond = Client.is_deleted.is_(False)
+        return cond if client_scope is None else and_(cond, Client.id == client_scope)
+    return SparePart.is_active.is_(True)
+
+
+def _prefix(db: Session, kind: str, text: str, client_scope: Optional[int], limit: int) -> list[tuple[int, str]]:
+    """Начинающиеся с text: по длине — диапазон индекса ix_suggest_values_order, LIKE — точная проверка."""
+    model, field = KINDS[kind]
+    stmt = (
+        select(model.id, getattr(model, field))
+        .select_from(SuggestValue)
+        .join(model, model.id == SuggestValue.entity_id)
+        .where(
+            SuggestValue.entity_type == kind,
+            SuggestValue.length.in_(range(len(text), getattr(model, field).type.length + 1)),
+            SuggestValue.value >= text, SuggestValue.value < text + PREFIX_END,
+            SuggestValue.value.startswith(text, autoescape=True),
+            _visible(kind, client_scope),
+        )
+        .order_by(SuggestValue.length, SuggestValue.value, model.id)
+        .limit(limit)
+    )
+    return [tuple(row) for row in db.execute(stmt)]
+
+
+def _rarest_grams(db: Session, kind: str, text: str) -> list[str]:
+    """До MAX_QUERY_GRAMS самых редких триграмм text, от редкой к частой (нет в таблице — ни одного значения)."""
+    grams = list(dict.fromkeys(text[i:i + 3] for i in range(len(text) - 2)))
+    found = dict(db.execute(
+        select(SuggestGramCount.gram, SuggestGramCount.count)
+        .where(SuggestGramCount.entity_type == kind, SuggestGramCount.gram.in_(grams))
+    ).all())
+    return sorted(grams, key=lambda gram: found.get(gram, 0))[:MAX_QUERY_GRAMS]
+
+
+def _substring(db: Session, kind: str, text: str, exclude: set[int], client_scope: Optional[int],
+               limit: int) -> list[tuple[int, str]]:
+    """Содержащие text: триграммы сужают выборку (соединение от самой редкой), LIKE отбирает точно.
+
+    Кандидаты — пересечение триграмм по ключу — собираются до чтения
+    значений: иначе планировщик читает suggest_values и модель для каждой
+    строки самой редкой триграммы (в SQLite — MATERIALIZED, в MySQL —
+    STRAIGHT_JOIN в порядке FROM).
+    """
+    model, field = KINDS[kind]
+    grams = _rarest_grams(db, kind, text)
+    tables = [aliased(SuggestGram) for _ in grams]
+    first = tables[0]
+    candidates = select(first.entity_id).where(first.entity_type == kind, first.gram == grams[0])
+    for table, gram in zip(tables[1:], grams[1:]):
+        candidates = candidates.join(table, and_(
+            table.entity_type == kind, table.gram == gram, table.entity_id == first.entity_id,
+        ))
+    candidates = candidates.cte("candidates").prefix_with("MATERIALIZED", dialect="sqlite")
+    stmt = (
+        select(model.id, getattr(model, field))
+        .prefix_with("STRAIGHT_JOIN", dialect="mysql")
+        .select_from(candidates)
+        .join(SuggestValue, and_(SuggestValue.entity_type == kind,
+                                 SuggestValue.entity_id == candidates.c.entity_id))
+        .join(model, model.id == candidates.c.entity_id)
+        .where(SuggestValue.value.contains(text, autoescape=True), _visible(kind, client_scope))
+        .order_by(SuggestValue.length, SuggestValue.value, model.id)
+        .limit(limit)
+    )
+    if exclude:
+        stmt = stmt.where(model.id.notin_(exclude))
+    return [tuple(row) for row in db.execute(stmt)]
+
+
+def suggest(db: Session, kind: str, query: str, *, client_scope: Optional[int] = None,
+            limit: int = 10) -> list[tuple[int, str]]:
+    """[(id, значение)]: сначала начинающиеся с query, затем содержащие; внутри — короче и по алфавиту."""
+    text = normalize(query).strip()
+    if not text:
+        return []
+
+    found = _prefix(db, kind, text, client_scope, limit)
+    if len(found) < limit and len(text) >= 3:
+        found += _substring(db, kind, text, {i for i, _ in found}, client_scope, limit - len(found))
+    return found
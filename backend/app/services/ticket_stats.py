@@ -0,0 +1,198 @@
+"""
+Дневной срез заявок ticket_stats_daily для отчёта по заявкам.
+
+Строка среза — заявки одного дня создания с одинаковыми (клиент,
+инженер, тип, приоритет, статус): их число, суммы по SLA и время решения
+в секундах, то есть те же колонки, что считает reports.sla_columns.
+Отчёт за любой период складывает срезы его дней (summary) и сворачивает
+их тем же reports.summarize, поэтому читает сотни строк, а не заявки.
+
+День пересчитывается целиком: DELETE срезов дня и INSERT ... SELECT с
+GROUP BY по заявкам дня — пересчёт идемпотентен. refresh пересчитывает
+только затронутые дни:
+
+  • дни заявок с updated_at позже водяного знака (с запасом _OVERLAP на
+    транзакции, закоммиченные с опозданием);
+  • дни открытых заявок старой SLA-системы, чей sla_deadline истёк с
+    прошлого пересчёта, — их нарушение зависит от времени, а не от
+    изменения строки.
+
+Водяные знаки хранятся в system_settings. Пока первого заполнения не
+было (backfill), отчёт считается по заявкам напрямую.
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, func, insert, or_, select
+from sqlalchemy.orm import Session
+
+from app.models import SystemSetting, Ticket, TicketStatsDaily, User
+from app.services import reports as report_service
+from app.services.sla import FINAL_STATUSES
+
+WATERMARK_KEY = "ticket_stats_updated_at"
+SLA_CHECKED_KEY = "ticket_stats_sla_checked_at"
+
+_OVERLAP = timedelta(minutes=5)
+_DAYS_PER_BATCH = 100
+
+_MEASURES = ("reaction_total", "reaction_violated", "resolution_total", "resolution_violated",
+             "resolved", "resolution_seconds")
+
+
+def _as_date(value) -> date:
+    # SQLite отдаёт date() строкой
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _get_mark(db: Session, key: str) -> Optional[datetime]:
+    row = db.get(SystemSetting, key)
+    return datetime.fromisoformat(row.value) if row else None
+
+
+def _set_mark(db: Session, key: str, value: datetime) -> None:
+    row = db.get(SystemSetting, key)
+    if row is None:
+        db.add(SystemSetting(key=key, value=value.isoformat()))
+    else:
+        row.value = value.isoformat()
+
+
+def is_ready(db: Session) -> bool:
+    """Срез заполнен (был backfill) — отчёт можно читать из него."""
+    return db.get(SystemSetting, WATERMARK_KEY) is not None
+
+
+def _day_ranges(days: list[date]):
+    return or_(*(
+        Ticket.created_at.between(datetime.combine(d, time.min), datetime.combine(d, time.max)) for d in days
+    ))
+
+
+def _aggregate(where: list, now: datetime):
+    day = func.date(Ticket.created_at)
+    return (
+        select(
+            day, Ticket.client_id, Ticket.assigned_to, Ticket.type, Ticket.priority, Ticket.status,
+            func.count(), *report_service.sla_columns(now),
+        )
+        .where(Ticket.is_deleted.is_(False), *where)
+        .group_by(day, Ticket.client_id, Ticket.assigned_to, Ticket.type, Ticket.priority, Ticket.status)
+    )
+
+
+def _insert(db: Session, where: list, now: datetime) -> None:
+    columns = ["day", "client_id", "assigned_to", "type", "priority", "status", "tickets", *_MEASURES]
+    db.execute(insert(TicketStatsDaily).from_select(columns, _aggregate(where, now)))
+
+
+def rebuild_days(db: Session, days: Iterable[date], now: Optional[datetime] = None) -> int:
+    """Пересчитать срезы заданных дней. Возвращает число дней."""
+    now = now or datetime.utcnow()
+    days = sorted(set(days))
+    for i in range(0, len(days), _DAYS_PER_BATCH):
+        batch = days[i:i + _DAYS_PER_BATCH]
+        db.execute(delete(TicketStatsDaily).where(TicketStatsDaily.day.in_(batch)))
+        _insert(db, [_day_ranges(batch)], now)
+    return len(days)
+
+
+def backfill(db: Session, date_from: Optional[date] = None, date_to: Optional[date] = None) -> int:
+    """Пересобрать срез за период пакетами дней (rebuild_days), коммитя каждый пакет.
+
+    Один INSERT ... SELECT по всем заявкам держал бы в InnoDB разделяемые
+    блокировки на каждой прочитанной строке до конца транзакции, то есть
+    останавливал бы запись заявок на всё время заполнения. Без границ —
+    весь срез; водяные знаки выставляются в конце (на момент начала), и
+    только тогда отчёт начинает читать срез. Возвращает число дней.
+    """
+    db_now = db.scalar(select(func.now()))
+    now = datetime.utcnow()
+    ticket_days = select(func.date(Ticket.created_at)).distinct()
+    stats_days = select(TicketStatsDaily.day).distinct()
+    if date_from:
+        ticket_days = ticket_days.where(Ticket.created_at >= datetime.combine(date_from, time.min))
+        stats_days = stats_days.where(TicketStatsDaily.day >= date_from)
+    if date_to:
+        ticket_days = ticket_days.where(Ticket.created_at <= datetime.combine(date_to, time.max))
+        stats_days = stats_days.where(TicketStatsDaily.day <= date_to)
+    # дни срезов без заявок тоже пересчитываются — их строки удаляются
+    days = sorted({_as_date(d) for d in db.scalars(ticket_days)} | {_as_date(d) for d in db.scalars(stats_days)})
+    db.commit()
+    for i in range(0, len(days), _DAYS_PER_BATCH):
+        rebuild_days(db, days[i:i + _DAYS_PER_BATCH], now)
+        db.commit()
+    if date_from is None and date_to is None:
+        _set_mark(db, WATERMARK_KEY, db_now)
+        _set_mark(db, SLA_CHECKED_KEY, now)
+        db.commit()
+    return len(days)
+
+
+def dirty_days(db: Session, updated_since: datetime, sla_checked_at: datetime, now: datetime) -> set[date]:
+    """Дни, срезы которых могли устареть с прошлого пересчёта."""
+    day = func.date(Ticket.created_at)
+    changed = select(day).where(Ticket.updated_at > updated_since - _OVERLAP).distinct()
+    overdue = (
+        select(day)
+        .where(
+            or_(Ticket.sla_reaction_deadline.is_(None), Ticket.sla_resolution_deadline.is_(None)),
+            Ticket.sla_deadline > sla_checked_at - _OVERLAP,
+            Ticket.sla_deadline <= now,
+            Ticket.status.not_in(FINAL_STATUSES),
+            Ticket.is_deleted.is_(False),
+        )
+        .distinct()
+    )
+    return {_as_date(d) for d in db.scalars(changed)} | {_as_date(d) for d in db.scalars(overdue)}
+
+
+def refresh(db: Session) -> int:
+    """Инкрементальный пересчёт по водяным знакам; без них — полный backfill. Возвращает число дней."""
+    updated_since = _get_mark(db, WATERMARK_KEY)
+    sla_checked_at = _get_mark(db, SLA_CHECKED_KEY)
+    if updated_since is None or sla_checked_at is None:
+        return backfill(db)
+    db_now = db.scalar(select(func.now()))
+    now = datetime.utcnow()
+    days = dirty_days(db, updated_since, sla_checked_at, now)
+    rebuild_days(db, days, now)
+    _set_mark(db, WATERMARK_KEY, db_now)
+    _set_mark(db, SLA_CHECKED_KEY, now)
+    db.commit()
+    return len(days)
+
+
+def summary(db: Session, flt: report_service.TicketReportFilter) -> dict:
+    """Сводка отчёта по заявкам из срезов дней периода."""
+    stmt = (
+        select(
+            TicketStatsDaily.status, TicketStatsDaily.type, TicketStatsDaily.priority,
+            User.full_name.label("engineer"), func.sum(TicketStatsDaily.tickets).label("count"),
+            *(func.sum(getattr(TicketStatsDaily, m)).label(m) for m in _MEASURES),
+        )
+        .outerjoin(User, User.id == TicketStatsDaily.assigned_to)
+        .where(TicketStatsDaily.day >= flt.date_from, TicketStatsDaily.day <= flt.date_to)
+        .group_by(TicketStatsDaily.status, TicketStatsDaily.type, TicketStatsDaily.priority, User.full_name)
+    )
+    if flt.engineer_id:
+        stmt = stmt.where(TicketStatsDaily.assigned_to == flt.engineer_id)
+    if flt.client_id:
+        stmt = stmt.where(TicketStatsDaily.client_id == flt.client_id)
+    return report_service.summarize(db.execute(stmt))
+
+
+def report_summary(db: Session, flt: report_service.TicketReportFilter) -> dict:
+    """Сводка отчёта по заявкам: из среза, пока он не заполнен — по заявкам."""
+    return summary(db, flt) if is_ready(db) else report_service.ticket_summary(db, flt)
+
+
+def check(db: Session, flt: report_service.TicketReportFilter) -> list[tuple[str, object, object]]:
+    """Сверить сводку из срезов с расчётом по заявкам: [(показатель, из среза, по заявкам)].
+
+    Время для старой SLA-системы — момент последнего пересчёта, поэтому
+    свежий срез совпадает с расчётом по заявкам точно.
+    """
+    live = report_service.ticket_summary(db, flt, now=_get_mark(db, SLA_CHECKED_KEY))
+    rolled = summary(db, flt)
+    return [(key, rolled[key], live[key]) for key in live if rolled[key] != live[key]]
@@ -0,0 +1,47 @@
+from celery import shared_task
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal, read_session_factory
+from app.services import exports
+
+
+# подтверждение после выполнения: задача, чей воркер погиб, доставляется повторно
+# и забирает задание, как только его отметки прогресса устареют (exports.run_job);
+# до тех пор — повторяется, но не дольше таймаута выгрузки
+@shared_task(
+    name="app.tasks.exports.run_export", bind=True, acks_late=True, reject_on_worker_lost=True,
+    default_retry_delay=settings.export_job_heartbeat_minutes * 60,
+    max_retries=settings.export_job_timeout_minutes // settings.export_job_heartbeat_minutes + 1,
+)
+def run_export(self, job_id: int) -> None:
+    """Выполнить фоновую выгрузку: данные — с реплики (если не отстаёт), статус — в primary."""
+    db: Session = SessionLocal()
+    read_db: Session = read_session_factory()()
+    try:
+        done = exports.run_job(db, read_db, job_id)
+    finally:
+        read_db.close()
+        db.close()
+    if not done:
+        raise self.retry()
+
+
+@shared_task(name="app.tasks.exports.expire_stale_exports")
+def expire_stale_exports() -> int:
+    """Перевести в failed выгрузки, не завершившиеся за EXPORT_JOB_TIMEOUT_MINUTES, и уведомить авторов."""
+    db: Session = SessionLocal()
+    try:
+        return exports.expire_stale(db)
+    finally:
+        db.close()
+
+
+@shared_task(name="app.tasks.exports.purge_expired_exports")
+def purge_expired_exports() -> int:
+    """Удалить из хранилища файлы выгрузок старше EXPORT_CACHE_TTL_MINUTES, на которые никто не ссылается."""
+    db: Session = SessionLocal()
+    try:
+        return exports.purge_expired(db)
+    finally:
+        db.close()
@@ -6,6 +6,7 @@ from sqlalchemy.orm import Session
 from app.core.database import SessionLocal
 from app.models import Equipment, MaintenanceSchedule, Notification, Ticket, User
 from app.services.maintenance import calculate_next_date
+from app.services.numbering import next_number
 
 
 @shared_task(name="app.tasks.maintenance.run_maintenance_scheduler")
@@ -42,9 +43,8 @@ def _create_maintenance_ticket(db: Session, schedule: MaintenanceSchedule):
     if not eq or eq.is_deleted:
         return None
 
-    today_str = date.today().strftime("%Y%m%d")
-    count = db.query(Ticket).filter(Ticket.number.like(f"T-{today_str}-%")).count()
-    number = f"T-{today_str}-{count + 1:04d}"
+    today_str = datetime.utcnow().strftime("%Y%m%d")
+    number = next_number(db, f"T-{today_str}", 4, Ticket.number)
 
     FREQ_LABELS = {
         "monthly": "ежемесячное",
@@ -0,0 +1,39 @@
+import logging
+
+from celery import shared_task
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.services.stock import (
+    part_quantity_drift, rebuild_balances, reconcile_part_quantities, verify_balances,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name="app.tasks.stock.verify_stock_ledger")
+def verify_stock_ledger(repair: bool = False) -> int:
+    """Сверить warehouse_stock с журналом движений; repair=True — пересобрать проекцию по журналу."""
+    db: Session = SessionLocal()
+    try:
+        diffs = verify_balances(db)
+        for warehouse_id, part_id, stock_qty, ledger_qty in diffs[:50]:
+            logger.warning("Остаток склада %s / запчасти %s: %s в warehouse_stock, %s по журналу",
+                           warehouse_id, part_id, stock_qty, ledger_qty)
+        if diffs and repair:
+            rebuild_balances(db)
+        return len(diffs)
+    finally:
+        db.close()
+
+
+@shared_task(name="app.tasks.stock.reconcile_part_quantities")
+def reconcile_part_quantities_task() -> int:
+    """Найти и исправить расхождения кэша SparePart.quantity с остатками складов компании."""
+    db: Session = SessionLocal()
+    try:
+        for part_id, cached, actual in part_quantity_drift(db)[:50]:
+            logger.warning("Запчасть %s: в карточке %s, на складах компании %s", part_id, cached, actual)
+        return reconcile_part_quantities(db)
+    finally:
+        db.close()
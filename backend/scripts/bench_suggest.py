@@ -0,0 +1,103 @@
+"""
+Замер автодополнения (app.services.suggest) на N единицах оборудования:
+время ответа suggest() по префиксу и подстроке — медиана и 95-й процентиль
+по серии запросов из случайных фрагментов существующих серийных номеров.
+
+Данные — отдельная SQLite-база (создаётся при первом запуске, триграммы
+строятся rebuild_all). Запускать:
+  python scripts/bench_suggest.py [--rows 500000] [--db /tmp/bench_suggest.sqlite] [--queries 200]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+BATCH = 10000
+VENDORS = ("NCR", "WN", "HYO", "DBL", "GRG", "KAL")
+
+
+def _session(path: str):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+
+    return Session(create_engine(f"sqlite:///{path}"))
+
+
+def _serial(rnd: random.Random, i: int) -> str:
+    return f"{rnd.choice(VENDORS)}-{rnd.randrange(36 ** 4):04X}{i:07d}"
+
+
+def populate(path: str, rows: int) -> None:
+    from sqlalchemy import insert
+
+    from app.core.database import Base
+    from app.models import Client, Equipment, EquipmentModel
+    from app.services.suggest import rebuild_all
+
+    rnd = random.Random(1)
+    db = _session(path)
+    Base.metadata.create_all(db.get_bind())
+    db.execute(insert(Client), [{"name": f"Клиент {i}"} for i in range(50)])
+    db.execute(insert(EquipmentModel), [{"name": "Банкомат"}])
+    for offset in range(0, rows, BATCH):
+        db.execute(insert(Equipment), [
+            {"client_id": 1 + i % 50, "model_id": 1, "serial_number": _serial(rnd, i),
+             "status": "active", "is_deleted": False}
+            for i in range(offset, min(offset + BATCH, rows))
+        ])
+    db.commit()
+    rebuild_all(db)
+    db.close()
+
+
+def _queries(db, count: int) -> dict[str, list[str]]:
+    from sqlalchemy import func, select
+
+    from app.models import Equipment
+
+    rnd = random.Random(2)
+    serials = list(db.scalars(select(Equipment.serial_number).order_by(func.random()).limit(count)))
+    return {
+        "префикс 2": [s[:2] for s in serials],
+        "префикс 6": [s[:6] for s in serials],
+        "подстрока 5": [s[(k := rnd.randrange(4, len(s) - 5)):k + 5] for s in serials],
+        "подстрока 8": [s[-8:] for s in serials],
+    }
+
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "bench_suggest.sqlite"))
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    from app.services.suggest import suggest
+
+    if not os.path.exists(args.db):
+        print(f"Заполнение {args.db}: {args.rows} единиц оборудования...")
+        populate(args.db, args.rows)
+    db = _session(args.db)
+    for name, queries in _queries(db, args.queries).items():
+        timings = []
+        for q in queries:
+            started = time.perf_counter()
+            hits = suggest(db, "serial", q)
+            timings.append((time.perf_counter() - started) * 1000)
+            assert hits, q
+        timings.sort()
+        print(f"{name:12} медиана {statistics.median(timings):6.2f} мс  "
+              f"p95 {timings[int(len(timings) * 0.95) - 1]:6.2f} мс  макс {timings[-1]:6.2f} мс")
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+    os.environ.setdefault("SECRET_KEY", "bench")
+    os.environ.setdefault("AUTH_CACHE_SYNC", "false")
+    os.environ.setdefault("WAREHOUSE_CACHE_SYNC", "false")
+    run()
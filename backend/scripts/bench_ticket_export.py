@@ -0,0 +1,130 @@
+"""
+Замер выгрузки отчёта по заявкам в XLSX: время, размер файла и пиковая
+память процесса (ru_maxrss) для потоковой write_only-книги и для прежней
+книги в памяти (Workbook + BytesIO).
+
+Данные — отдельная SQLite-база с N заявками (создаётся при первом запуске),
+каждый режим выполняется в отдельном процессе, чтобы пики не смешивались.
+Запускать:
+  python scripts/bench_ticket_export.py [--rows 500000] [--db /tmp/bench_tickets.sqlite]
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from io import BytesIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+BATCH = 10000
+PERIOD = (date(2025, 1, 1), date(2025, 12, 31))
+
+
+def _peak_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux: КБ
+
+
+def _session(path: str):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+
+    return Session(create_engine(f"sqlite:///{path}"))
+
+
+def populate(path: str, rows: int) -> None:
+    from sqlalchemy import insert
+
+    from app.core.database import Base
+    from app.models import Client, Ticket, User
+
+    db = _session(path)
+    Base.metadata.create_all(db.get_bind())
+    db.execute(insert(Client), [{"name": f"Клиент {i}"} for i in range(50)])
+    db.execute(insert(User), [
+        {"email": f"eng{i}@bench.local", "password_hash": "-", "full_name": f"Инженер {i}", "roles": ["engineer"]}
+        for i in range(30)
+    ])
+    start = datetime.combine(PERIOD[0], datetime.min.time())
+    step = (PERIOD[1] - PERIOD[0]).total_seconds() / rows
+    for offset in range(0, rows, BATCH):
+        db.execute(insert(Ticket), [
+            {
+                "number": f"T-{i:07d}", "client_id": 1 + i % 50, "assigned_to": 1 + i % 30, "created_by": 1,
+                "title": "Заявка", "type": ("repair", "maintenance", "diagnostics")[i % 3],
+                "priority": ("low", "medium", "high", "critical")[i % 4],
+                "status": ("new", "in_progress", "completed", "closed")[i % 4],
+                "created_at": start + timedelta(seconds=i * step),
+                "sla_reaction_violated": i % 7 == 0, "sla_resolution_violated": i % 11 == 0,
+            }
+            for i in range(offset, min(offset + BATCH, rows))
+        ])
+        db.commit()
+    db.close()
+
+
+def _export_stream(db, flt, data) -> int:
+    from app.services import reports as report_service
+    from app.services import spreadsheet
+
+    return sum(len(chunk) for chunk in spreadsheet.iter_file(report_service.tickets_xlsx(db, flt, data)))
+
+
+def _export_inmemory(db, flt, data) -> int:
+    from openpyxl import Workbook
+
+    from app.services import reports as report_service
+
+    wb = Workbook()
+    ws = wb.active
+    ws.append(report_service.TICKET_COLUMNS)
+    for t in db.execute(report_service.ticket_rows(flt)):
+        ws.append([
+            t.number, t.created_at.strftime("%d.%m.%Y %H:%M"), t.client_name, t.type, t.priority, t.status,
+            t.engineer, "Да" if t.sla_reaction_violated else "Нет", "Да" if t.sla_resolution_violated else "Нет",
+        ])
+    buf = BytesIO()
+    wb.save(buf)
+    return len(buf.getvalue())
+
+
+def run_mode(path: str, mode: str) -> None:
+    from app.services import reports as report_service
+
+    db = _session(path)
+    flt = report_service.TicketReportFilter(*PERIOD)
+    data = report_service.ticket_summary(db, flt)
+    before = _peak_mb()
+    started = time.perf_counter()
+    size = (_export_stream if mode == "stream" else _export_inmemory)(db, flt, data)
+    elapsed = time.perf_counter() - started
+    print(f"{mode:9} строк {data['total']:>8}  {elapsed:6.1f} с  файл {size / 2**20:6.1f} МБ  "
+          f"пик RSS {_peak_mb():7.1f} МБ (до выгрузки {before:.1f} МБ)")
+
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "bench_tickets.sqlite"))
+    parser.add_argument("--mode", choices=["stream", "inmemory"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.db, args.mode)
+        return
+    if not os.path.exists(args.db):
+        print(f"Заполнение {args.db}: {args.rows} заявок...")
+        populate(args.db, args.rows)
+    for mode in ("stream", "inmemory"):
+        subprocess.run([sys.executable, __file__, "--db", args.db, "--mode", mode], check=True)
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+    os.environ.setdefault("SECRET_KEY", "bench")
+    os.environ.setdefault("AUTH_CACHE_SYNC", "false")
+    os.environ.setdefault("WAREHOUSE_CACHE_SYNC", "false")
+    run()
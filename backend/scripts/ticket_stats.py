@@ -0,0 +1,45 @@
+"""
+Дневной срез заявок ticket_stats_daily.
+Запускать:
+  python scripts/ticket_stats.py backfill [--from 2025-01-01] [--to 2025-12-31]
+  python scripts/ticket_stats.py refresh
+  python scripts/ticket_stats.py check --from 2025-01-01 --to 2025-12-31
+"""
+import argparse
+import sys, os
+from datetime import date
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.database import SessionLocal
+from app.services import ticket_stats
+from app.services.reports import TicketReportFilter
+
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["backfill", "refresh", "check"])
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat)
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.command == "backfill":
+            print(f"Срез пересобран, дней: {ticket_stats.backfill(db, args.date_from, args.date_to)}")
+        elif args.command == "refresh":
+            print(f"Пересчитано дней: {ticket_stats.refresh(db)}")
+        else:
+            if not (args.date_from and args.date_to):
+                parser.error("для check нужны --from и --to")
+            ticket_stats.refresh(db)
+            diffs = ticket_stats.check(db, TicketReportFilter(args.date_from, args.date_to))
+            for key, rolled, live in diffs:
+                print(f"  !!  {key}: в срезе {rolled}, по заявкам {live}")
+            print("Расхождений нет." if not diffs else f"Расхождений: {len(diffs)}")
+            sys.exit(1 if diffs else 0)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    run()
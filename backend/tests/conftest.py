@@ -5,6 +5,7 @@ Uses SQLite in-memory database — no external services required.
 Run: pytest backend/tests/ -v
 """
 import os
+import tempfile
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine, event
@@ -16,12 +17,16 @@ os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
 os.environ.setdefault("SECRET_KEY", "test-secret-key-not-for-production")
 os.environ.setdefault("ALGORITHM", "HS256")
 os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+os.environ.setdefault("STORAGE_PATH", tempfile.mkdtemp(prefix="servicedesk-storage-"))
+os.environ.setdefault("AUTH_CACHE_SYNC", "false")
+os.environ.setdefault("WAREHOUSE_CACHE_SYNC", "false")
 
 from sqlalchemy import text  # noqa: E402
-from app.core.database import Base, get_db  # noqa: E402
+from app.core.database import Base, get_db, get_read_db  # noqa: E402
 from app.main import app                    # noqa: E402
 from app.models import User, Client, Equipment, EquipmentModel, Ticket, SparePart, Vendor, WorkTemplate, WorkTemplateStep, NotificationSetting, ServiceCatalog  # noqa: E402
 from app.core.security import hash_password, create_access_token  # noqa: E402
+from app.core import query_counter  # noqa: E402
 
 # ── In-memory SQLite engine ───────────────────────────────────────────────────
 
@@ -58,6 +63,16 @@ def db():
         Base.metadata.drop_all(bind=engine)
 
 
+@pytest.fixture(autouse=True)
+def _reset_auth_cache():
+    """id пользователей и складов повторяются между тестами — кэши не должны переживать тест."""
+    from app.core import auth_cache, warehouse_cache
+    auth_cache.principals.clear()
+    auth_cache.revoked.clear()
+    warehouse_cache.warehouses.invalidate()
+    yield
+
+
 @pytest.fixture(scope="function")
 def client(db):
     """FastAPI TestClient wired to the test DB."""
@@ -68,11 +83,18 @@ def client(db):
             pass
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     with TestClient(app) as c:
         yield c
     app.dependency_overrides.clear()
 
 
+@pytest.fixture
+def assert_max_queries():
+    """with assert_max_queries(n[, max_repeats=k]): — падает, если блок выполнил больше n SQL-запросов."""
+    return query_counter.assert_max_queries
+
+
 # ── User factories ────────────────────────────────────────────────────────────
 
 def make_user(db, email="user@test.com", full_name="Test User",
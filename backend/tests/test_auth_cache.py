@@ -0,0 +1,155 @@
+"""
+Tests — app/core/auth_cache.py
+Covers: повторный запрос с тем же токеном без SELECT users, инвалидация при
+удалении/смене ролей/смене пароля, отзыв токенов без Redis, события pub/sub.
+"""
+import json
+import time
+
+from sqlalchemy import event
+
+from app.core import auth_cache
+from tests.conftest import engine, make_admin, make_engineer, make_user, auth_headers
+
+
+def _statements(fn):
+    statements = []
+
+    def _capture(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _capture)
+    try:
+        result = fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", _capture)
+    return result, statements
+
+
+def _users_selects(statements):
+    return [s for s in statements if "FROM users" in s]
+
+
+def _login(client, email, password):
+    res = client.post("/api/v1/auth/login", json={"email": email, "password": password})
+    assert res.status_code == 200, res.text
+    return {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+
+class TestPrincipalCache:
+    def test_repeat_request_skips_users_select(self, client, db):
+        admin = make_admin(db)
+        hdrs = auth_headers(admin.id, admin.roles)
+        assert client.get("/api/v1/auth/me", headers=hdrs).status_code == 200
+        db.expunge_all()  # как в проде: новая сессия на каждый запрос
+        res, statements = _statements(lambda: client.get("/api/v1/auth/me", headers=hdrs))
+        assert res.status_code == 200
+        assert res.json()["email"] == "admin@test.com"
+        assert _users_selects(statements) == []
+
+    def test_new_token_is_loaded_from_db(self, client, db):
+        admin = make_admin(db)
+        client.get("/api/v1/auth/me", headers=auth_headers(admin.id, admin.roles))
+        other = auth_headers(admin.id, admin.roles)  # новый jti
+        db.expunge_all()
+        _, statements = _statements(lambda: client.get("/api/v1/auth/me", headers=other))
+        assert len(_users_selects(statements)) == 1
+
+    def test_zero_ttl_disables_cache(self, client, db, monkeypatch):
+        monkeypatch.setattr(auth_cache.principals, "ttl", 0)
+        admin = make_admin(db)
+        hdrs = auth_headers(admin.id, admin.roles)
+        client.get("/api/v1/auth/me", headers=hdrs)
+        db.expunge_all()
+        _, statements = _statements(lambda: client.get("/api/v1/auth/me", headers=hdrs))
+        assert len(_users_selects(statements)) == 1
+
+    def test_cached_principal_can_be_modified(self, client, db):
+        """Принципал из кэша присоединён к сессии — смена пароля сохраняется."""
+        make_user(db, email="pw@test.com", password="oldpass123")
+        hdrs = _login(client, "pw@test.com", "oldpass123")
+        client.get("/api/v1/auth/me", headers=hdrs)
+        db.expunge_all()
+        res = client.post("/api/v1/auth/change-password", headers=hdrs, json={
+            "current_password": "oldpass123", "new_password": "newpass123",
+        })
+        assert res.status_code == 204
+        _login(client, "pw@test.com", "newpass123")
+
+    def test_deleted_user_rejected_immediately(self, client, db):
+        admin = make_admin(db)
+        eng = make_engineer(db)
+        admin_hdrs, eng_hdrs, eng_id = auth_headers(admin.id, admin.roles), auth_headers(eng.id, eng.roles), eng.id
+        assert client.get("/api/v1/auth/me", headers=eng_hdrs).status_code == 200
+        db.expunge_all()
+        assert client.delete(f"/api/v1/users/{eng_id}", headers=admin_hdrs).status_code == 204
+        db.expunge_all()
+        assert client.get("/api/v1/auth/me", headers=eng_hdrs).status_code == 401
+
+    def test_role_change_applies_immediately(self, client, db):
+        admin = make_admin(db)
+        eng = make_engineer(db)
+        admin_hdrs, eng_hdrs, eng_id = auth_headers(admin.id, admin.roles), auth_headers(eng.id, eng.roles), eng.id
+        assert client.get("/api/v1/users", headers=eng_hdrs).status_code == 403
+        db.expunge_all()
+        res = client.put(f"/api/v1/users/{eng_id}", headers=admin_hdrs, json={"roles": ["svc_mgr"]})
+        assert res.status_code == 200
+        db.expunge_all()
+        assert client.get("/api/v1/users", headers=eng_hdrs).status_code == 200
+
+
+class TestRevocation:
+    def test_logout_revokes_token_without_redis(self, client, db):
+        make_user(db, email="out@test.com", password="pass12345")
+        hdrs = _login(client, "out@test.com", "pass12345")
+        assert client.get("/api/v1/auth/me", headers=hdrs).status_code == 200
+        assert client.post("/api/v1/auth/logout", headers=hdrs).status_code == 204
+        assert client.get("/api/v1/auth/me", headers=hdrs).status_code == 401
+
+    def test_change_password_revokes_token(self, client, db):
+        make_user(db, email="cp@test.com", password="oldpass123")
+        hdrs = _login(client, "cp@test.com", "oldpass123")
+        client.post("/api/v1/auth/change-password", headers=hdrs, json={
+            "current_password": "oldpass123", "new_password": "newpass123",
+        })
+        assert client.get("/api/v1/auth/me", headers=hdrs).status_code == 401
+
+    def test_synced_set_answers_without_redis(self, client, db, monkeypatch):
+        def _no_redis():
+            raise AssertionError("при синхронизированном блоклисте Redis не опрашивается")
+
+        monkeypatch.setattr(auth_cache, "get_redis", _no_redis)
+        monkeypatch.setattr(auth_cache.revoked, "synced", True)
+        admin = make_admin(db)
+        assert client.get("/api/v1/auth/me", headers=auth_headers(admin.id, admin.roles)).status_code == 200
+
+    def test_expired_revocations_pruned(self):
+        auth_cache.revoked.add("old", time.time() - 1)
+        auth_cache.revoked.add("fresh", time.time() + 60)
+        assert "old" not in auth_cache.revoked
+        auth_cache.revoked.prune()
+        assert "fresh" in auth_cache.revoked
+        assert "old" not in auth_cache.revoked._jtis
+
+
+class TestPubSubEvents:
+    def test_revoke_event_from_other_worker(self, client, db, monkeypatch):
+        monkeypatch.setattr(auth_cache.revoked, "synced", True)
+        admin = make_admin(db)
+        token = auth_headers(admin.id, admin.roles)
+        assert client.get("/api/v1/auth/me", headers=token).status_code == 200
+        jti = next(iter(auth_cache.principals._entries))[1]
+        auth_cache._handle(json.dumps({"event": "revoke", "jti": jti, "exp": time.time() + 60}))
+        assert auth_cache.principals._entries == {}
+        assert client.get("/api/v1/auth/me", headers=token).status_code == 401
+
+    def test_user_event_drops_cached_principal(self, client, db):
+        admin = make_admin(db)
+        client.get("/api/v1/auth/me", headers=auth_headers(admin.id, admin.roles))
+        assert auth_cache.principals._entries
+        auth_cache._handle(json.dumps({"event": "user", "id": admin.id}))
+        assert auth_cache.principals._entries == {}
+
+    def test_malformed_event_ignored(self):
+        auth_cache._handle("not json")
+        auth_cache._handle(json.dumps({"event": "user"}))
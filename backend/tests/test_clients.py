@@ -1,10 +1,15 @@
 """
 Unit tests — /api/v1/clients
-Covers: CRUD, soft-delete, search, RBAC, 404.
+Covers: CRUD, soft-delete, search, RBAC, 404, постраничные вложенные списки
+заявок и оборудования клиента (число SQL-запросов не растёт с числом строк).
 """
+from datetime import datetime, timedelta
+
 import pytest
+
+from app.models import Equipment, Ticket
 from tests.conftest import (
-    make_admin, make_user, make_engineer, make_client,
+    make_admin, make_user, make_engineer, make_client, make_equipment_model,
     auth_headers,
 )
 
@@ -273,3 +278,62 @@ class TestDeleteClient:
         res = client.get("/api/v1/clients", headers=headers)
         names = [x["name"] for x in res.json()["items"]]
         assert "ToDelete" not in names
+
+
+class TestClientSubResources:
+    def _seed(self, db, n):
+        admin = make_admin(db)
+        eng = make_engineer(db)
+        cl = make_client(db)
+        other = make_client(db, name="Другой")
+        model = make_equipment_model(db)
+        for i in range(n):
+            eq = Equipment(client_id=cl.id, model_id=model.id, serial_number=f"SN-{i:05d}", status="active")
+            db.add(eq)
+            db.flush()
+            db.add(Ticket(number=f"T-20260301-{i:04d}", client_id=cl.id, equipment_id=eq.id,
+                          created_by=admin.id, assigned_to=eng.id, title=f"t{i}",
+                          created_at=datetime(2026, 3, 1) + timedelta(minutes=i)))
+        db.add(Equipment(client_id=other.id, model_id=model.id, serial_number="SN-OTHER", status="active"))
+        db.commit()
+        return cl, auth_headers(admin.id, admin.roles)
+
+    @pytest.mark.parametrize("resource", ["tickets", "equipment"])
+    def test_paginated(self, client, db, resource):
+        cl, hdrs = self._seed(db, 7)
+        body = client.get(f"/api/v1/clients/{cl.id}/{resource}?size=5", headers=hdrs).json()
+        assert (body["total"], body["pages"], len(body["items"])) == (7, 2, 5)
+        body = client.get(f"/api/v1/clients/{cl.id}/{resource}?size=5&page=2", headers=hdrs).json()
+        assert len(body["items"]) == 2
+
+    @pytest.mark.parametrize("resource", ["tickets", "equipment"])
+    def test_cursor_walk(self, client, db, resource):
+        cl, hdrs = self._seed(db, 7)
+        ids, cursor = [], ""
+        while cursor is not None:
+            body = client.get(f"/api/v1/clients/{cl.id}/{resource}?size=3&cursor={cursor}", headers=hdrs).json()
+            ids += [item["id"] for item in body["items"]]
+            cursor = body["next_cursor"]
+        assert len(ids) == len(set(ids)) == 7
+
+    def test_tickets_fully_serialized(self, client, db):
+        cl, hdrs = self._seed(db, 1)
+        item = client.get(f"/api/v1/clients/{cl.id}/tickets", headers=hdrs).json()["items"][0]
+        assert item["client"]["id"] == cl.id
+        assert item["equipment"]["model"]["name"]
+        assert item["engineer"]["email"] == "engineer@test.com"
+        assert item["created_by"]["email"] == "admin@test.com"
+
+    @pytest.mark.parametrize("resource", ["tickets", "equipment"])
+    def test_query_count_independent_of_rows(self, client, db, resource, assert_max_queries):
+        cl, hdrs = self._seed(db, 40)
+        url = f"/api/v1/clients/{cl.id}/{resource}"
+        client.get(url, headers=hdrs)  # прогрев кэша принципалов
+        counts = []
+        for size in (2, 40):
+            db.expunge_all()  # сессия теста общая с запросом — начинаем с пустой identity map
+            # клиент, его менеджер (ленивая загрузка, один раз), COUNT, страница с join-ами
+            with assert_max_queries(4, max_repeats=1) as log:
+                assert client.get(f"{url}?size={size}", headers=hdrs).status_code == 200
+            counts.append(log.count)
+        assert counts[0] == counts[1], counts
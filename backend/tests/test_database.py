@@ -0,0 +1,98 @@
+"""
+Unit tests — app/core/database.py
+Covers: профили пула (api / worker / beat), сброс пулов primary и реплики
+в дочернем процессе Celery, метрики ожидания соединения, таймаут
+исчерпанного пула, pool_status в GET /settings/db-pool (только admin).
+"""
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import NullPool
+
+from app.core import database
+from app.core.config import settings
+from app.core.database import TimedQueuePool, create_db_engine, pool_options, pool_stats
+from tests.conftest import auth_headers, make_admin, make_engineer
+
+URL_POOL = "/api/v1/settings/db-pool"
+
+
+@pytest.fixture(autouse=True)
+def _reset_stats():
+    pool_stats.reset()
+    yield
+    pool_stats.reset()
+
+
+class TestPoolProfiles:
+    def test_api_profile_uses_settings(self, monkeypatch):
+        monkeypatch.setattr(settings, "db_pool_size", 12)
+        monkeypatch.setattr(settings, "db_max_overflow", 28)
+        opts = pool_options("api")
+        assert opts["poolclass"] is TimedQueuePool
+        assert (opts["pool_size"], opts["max_overflow"]) == (12, 28)
+        assert opts["pool_timeout"] == settings.db_pool_timeout
+        assert opts["pool_recycle"] == settings.db_pool_recycle
+
+    def test_worker_profile_is_small(self):
+        opts = pool_options("worker")
+        assert (opts["pool_size"], opts["max_overflow"]) == (
+            settings.db_worker_pool_size, settings.db_worker_max_overflow,
+        )
+
+    def test_beat_profile_has_no_pool(self):
+        assert pool_options("beat") == {"poolclass": NullPool}
+
+    def test_worker_fork_resets_both_pools(self, tmp_path, monkeypatch):
+        from app.celery_app import _reset_db_pool
+
+        disposed = []
+        for name in ("engine", "read_engine"):
+            eng = create_db_engine(f"sqlite:///{tmp_path / name}.db", "worker")
+            monkeypatch.setattr(eng, "dispose", lambda close=True, name=name: disposed.append((name, close)))
+            monkeypatch.setattr(database, name, eng)
+        _reset_db_pool()
+        assert disposed == [("engine", False), ("read_engine", False)]
+
+
+class TestCheckoutMetrics:
+    def test_checkouts_recorded(self, tmp_path):
+        eng = create_db_engine(f"sqlite:///{tmp_path / 'pool.db'}", "api")
+        try:
+            for _ in range(3):
+                with eng.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+        finally:
+            eng.dispose()
+        stats = pool_stats.snapshot()
+        assert stats["checkouts"] == 3
+        assert stats["timeouts"] == 0
+        assert stats["wait_max_ms"] >= stats["wait_avg_ms"] >= 0
+
+    def test_exhausted_pool_counts_timeout(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "db_worker_pool_size", 1)
+        monkeypatch.setattr(settings, "db_worker_max_overflow", 0)
+        monkeypatch.setattr(settings, "db_pool_timeout", 0.05)
+        eng = create_db_engine(f"sqlite:///{tmp_path / 'pool.db'}", "worker")
+        try:
+            held = eng.connect()
+            with pytest.raises(PoolTimeoutError):
+                eng.connect()
+            held.close()
+        finally:
+            eng.dispose()
+        stats = pool_stats.snapshot()
+        assert stats["timeouts"] == 1
+        assert stats["wait_max_ms"] >= 40
+
+
+def test_pool_stats_admin_only(client, db):
+    assert "db_pool" not in client.get("/health").json()
+    engineer = make_engineer(db)
+    assert client.get(URL_POOL, headers=auth_headers(engineer.id, engineer.roles)).status_code == 403
+    admin = make_admin(db)
+    res = client.get(URL_POOL, headers=auth_headers(admin.id, admin.roles))
+    assert res.status_code == 200
+    pool = res.json()
+    assert pool["profile"] == "api"
+    assert {"checkouts", "timeouts", "wait_avg_ms", "wait_max_ms"} <= set(pool)
@@ -0,0 +1,80 @@
+"""
+Unit tests — app/api/deps.py
+Covers: разбор ролей в frozenset один раз на объект User, сброс при смене ролей,
+один разбор токена на запрос при require_roles + get_client_scope, get_engineer_scope.
+"""
+import pytest
+
+from app.api import deps
+from app.api.deps import _get_user_roles
+from app.models import User
+from tests.conftest import make_admin, make_client, make_client_user, auth_headers
+
+
+class TestGetUserRoles:
+    @pytest.mark.parametrize("raw, expected", [
+        (["admin", "engineer"], {"admin", "engineer"}),
+        ('["svc_mgr"]', {"svc_mgr"}),
+        ("engineer", {"engineer"}),
+        (None, set()),
+        ({"admin": True}, set()),
+    ])
+    def test_normalizes_to_frozenset(self, raw, expected):
+        roles = _get_user_roles(User(roles=raw))
+        assert isinstance(roles, frozenset)
+        assert roles == expected
+
+    def test_parsed_once_per_object(self, monkeypatch):
+        user = User(roles='["admin"]')
+        first = _get_user_roles(user)
+        monkeypatch.setattr(deps.json, "loads", lambda _: pytest.fail("роли разобраны повторно"))
+        assert _get_user_roles(user) is first
+
+    def test_reassigned_roles_recomputed(self):
+        user = User(roles=["engineer"])
+        assert _get_user_roles(user) == {"engineer"}
+        user.roles = ["engineer", "admin"]
+        assert _get_user_roles(user) == {"engineer", "admin"}
+
+
+class TestSinglePrincipalPerRequest:
+    def _count_decodes(self, monkeypatch):
+        calls = []
+        real = deps.decode_token
+
+        def _decode(token):
+            calls.append(token)
+            return real(token)
+
+        monkeypatch.setattr(deps, "decode_token", _decode)
+        return calls
+
+    def test_require_roles_and_client_scope_share_principal(self, client, db, monkeypatch):
+        admin = make_admin(db)
+        hdrs = auth_headers(admin.id, admin.roles)
+        calls = self._count_decodes(monkeypatch)
+        res = client.get("/api/v1/invoices", headers=hdrs)
+        assert res.status_code == 200
+        assert len(calls) == 1
+
+    def test_client_scope_applied(self, client, db, monkeypatch):
+        cl = make_client(db)
+        portal = make_client_user(db, cl.id)
+        calls = self._count_decodes(monkeypatch)
+        res = client.get("/api/v1/parts/1/price-history", headers=auth_headers(portal.id, portal.roles))
+        assert res.status_code == 403
+        assert len(calls) == 1
+
+
+class TestEngineerScope:
+    @pytest.mark.parametrize("roles, client_id, scoped", [
+        (["engineer"], None, True),
+        (["engineer", "svc_mgr"], None, False),
+        (["director"], None, False),
+        (["client_user"], 5, False),
+        # client_user без организации ограничивается как инженер — как и раньше в list_tickets
+        (["client_user"], None, True),
+    ])
+    def test_scope(self, roles, client_id, scoped):
+        user = User(id=42, roles=roles, client_id=client_id)
+        assert deps.get_engineer_scope(user) == (42 if scoped else None)
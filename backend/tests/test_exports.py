@@ -0,0 +1,261 @@
+"""
+Tests — /api/v1/exports, app/services/exports.py
+Covers: постановка задания в очередь, выполнение с прогрессом и уведомлением,
+скачивание из хранилища, повторная отдача готового файла по хэшу параметров,
+одно задание на одинаковые параметры в работе, ошибка выгрузки, зависшие
+задания (очередь недоступна, таймаут, повторная доставка, воркер без
+владения заданием), удаление
+файлов после TTL и 410 при скачивании удалённого файла, права.
+"""
+import csv
+from datetime import datetime, timedelta
+from io import BytesIO, StringIO
+
+import pytest
+
+from app.celery_app import celery_app
+from app.core.storage import get_storage
+from app.models import ExportJob, Notification, Ticket
+from app.services import exports, spreadsheet, ticket_stats
+from app.services import reports as report_service
+from app.services.audit import log_action
+from tests.conftest import (
+    make_admin, make_engineer, make_user, auth_headers, make_client, make_equipment_model, make_equipment,
+)
+
+URL = "/api/v1/exports"
+TICKETS = {"kind": "tickets_xlsx", "params": {"date_from": "2026-03-01", "date_to": "2026-03-31"}}
+
+
+@pytest.fixture
+def queued(monkeypatch):
+    """Задания, отправленные в очередь Celery (без брокера)."""
+    sent = []
+    monkeypatch.setattr(celery_app, "send_task", lambda name, args: sent.append((name, *args)))
+    return sent
+
+
+@pytest.fixture
+def admin(db):
+    admin = make_admin(db)
+    cl = make_client(db)
+    eq = make_equipment(db, cl.id, make_equipment_model(db).id)
+    for i in range(5):
+        db.add(Ticket(number=f"T-{i:03d}", client_id=cl.id, equipment_id=eq.id, created_by=admin.id, title="t",
+                      type="repair", priority="low", status="new", created_at=datetime(2026, 3, 10 + i)))
+    db.commit()
+    return admin
+
+
+class TestExportJob:
+    def test_run_and_download(self, client, db, admin, queued, monkeypatch):
+        from openpyxl import load_workbook
+
+        hdrs = auth_headers(admin.id, admin.roles)
+        res = client.post(URL, headers=hdrs, json=TICKETS)
+        assert res.status_code == 202
+        job_id = res.json()["id"]
+        assert res.json()["status"] == "pending"
+        assert queued == [("app.tasks.exports.run_export", job_id)]
+        assert client.get(f"{URL}/{job_id}/download", headers=hdrs).status_code == 409
+
+        seen = []
+        monkeypatch.setattr(spreadsheet, "YIELD_PER", 2)
+        original = report_service.tickets_xlsx
+
+        def _tickets_xlsx(*args, progress):
+            return original(*args, progress=lambda n: (progress(n), seen.append(db.get(ExportJob, job_id).progress)))
+
+        monkeypatch.setattr(report_service, "tickets_xlsx", _tickets_xlsx)
+        exports.run_job(db, db, job_id)
+
+        body = client.get(f"{URL}/{job_id}", headers=hdrs).json()
+        assert (body["status"], body["progress"], body["rows"]) == ("done", 100, 5)
+        assert body["file_name"] == "tickets_report_2026-03-01_2026-03-31.xlsx"
+        assert seen == [40, 80, 99]
+        res = client.get(f"{URL}/{job_id}/download", headers=hdrs)
+        assert res.headers["content-type"] == spreadsheet.MEDIA_TYPE
+        rows = list(load_workbook(BytesIO(res.content))["Заявки"].iter_rows(values_only=True))
+        assert [r[0] for r in rows[1:]] == [f"T-{i:03d}" for i in range(5)]
+        note = db.query(Notification).filter(Notification.user_id == admin.id).one()
+        assert (note.event_type, note.body) == ("export_done", f"/api/v1/exports/{job_id}/download")
+
+    def test_rows_counted_as_written_with_stale_rollup(self, client, db, admin, queued):
+        ticket_stats.backfill(db)
+        ticket = db.query(Ticket).first()
+        db.add(Ticket(number="T-005", client_id=ticket.client_id, equipment_id=ticket.equipment_id,
+                      created_by=admin.id, title="t", type="repair", priority="low", status="new",
+                      created_at=datetime(2026, 3, 20)))
+        db.commit()  # срез ещё не пересчитан: в нём 5 заявок
+        job_id = client.post(URL, headers=auth_headers(admin.id, admin.roles), json=TICKETS).json()["id"]
+        exports.run_job(db, db, job_id)
+        assert db.get(ExportJob, job_id).rows == 6
+
+    def test_audit_log_csv(self, client, db, admin, queued):
+        for i in range(1, 4):
+            log_action(db, admin.id, "update", "ticket", i)
+        db.commit()
+        hdrs = auth_headers(admin.id, admin.roles)
+        res = client.post(URL, headers=hdrs, json={"kind": "audit_log_csv", "params": {"action": "update"}})
+        job_id = res.json()["id"]
+        exports.run_job(db, db, job_id)
+        text = client.get(f"{URL}/{job_id}/download", headers=hdrs).content.decode("utf-8")
+        rows = list(csv.reader(StringIO(text)))
+        assert rows[0][0] == "id" and [r[7] for r in rows[1:]] == ["3", "2", "1"]
+        assert db.get(ExportJob, job_id).rows == 3
+
+    def test_failure_notifies(self, client, db, admin, queued, monkeypatch):
+        def _broken(*args, **kwargs):
+            raise RuntimeError("диск заполнен")
+
+        monkeypatch.setattr(report_service, "tickets_xlsx", _broken)
+        job_id = client.post(URL, headers=auth_headers(admin.id, admin.roles), json=TICKETS).json()["id"]
+        exports.run_job(db, db, job_id)
+        job = db.get(ExportJob, job_id)
+        assert (job.status, job.error, job.storage_key) == ("failed", "диск заполнен", None)
+        assert db.query(Notification).one().event_type == "export_failed"
+
+
+class TestCache:
+    def test_done_export_reused(self, client, db, admin, queued):
+        hdrs = auth_headers(admin.id, admin.roles)
+        first = client.post(URL, headers=hdrs, json=TICKETS).json()["id"]
+        exports.run_job(db, db, first)
+        # те же параметры в другом порядке и с явными значениями по умолчанию — тот же хэш
+        other = make_user(db, email="director@test.com", roles=["director"])
+        same = {"kind": "tickets_xlsx",
+                "params": {"client_id": None, "date_to": "2026-03-31", "date_from": "2026-03-01"}}
+        res = client.post(URL, headers=auth_headers(other.id, other.roles), json=same)
+        assert res.status_code == 202 and res.json()["status"] == "done" and res.json()["id"] != first
+        assert db.get(ExportJob, res.json()["id"]).storage_key == db.get(ExportJob, first).storage_key
+        assert len(queued) == 1
+
+    def test_in_flight_export_shared(self, client, db, admin, queued):
+        hdrs = auth_headers(admin.id, admin.roles)
+        ids = {client.post(URL, headers=hdrs, json=TICKETS).json()["id"] for _ in range(2)}
+        assert len(ids) == 1 and len(queued) == 1
+
+    def test_ttl_expired_recomputes(self, client, db, admin, queued, monkeypatch):
+        hdrs = auth_headers(admin.id, admin.roles)
+        exports.run_job(db, db, client.post(URL, headers=hdrs, json=TICKETS).json()["id"])
+        monkeypatch.setattr(exports.settings, "export_cache_ttl_minutes", 0)
+        assert client.post(URL, headers=hdrs, json=TICKETS).json()["status"] == "pending"
+        assert len(queued) == 2
+
+
+class TestPurge:
+    def test_expired_file_deleted_unless_shared(self, client, db, admin, queued):
+        hdrs = auth_headers(admin.id, admin.roles)
+        first = client.post(URL, headers=hdrs, json=TICKETS).json()["id"]
+        exports.run_job(db, db, first)
+        key = db.get(ExportJob, first).storage_key
+        # вторая выгрузка с тем же содержимым получает тот же ключ и ещё свежа
+        second = client.post(URL, headers=hdrs, json=TICKETS).json()["id"]
+        assert db.get(ExportJob, second).storage_key == key
+        db.get(ExportJob, first).finished_at = datetime.utcnow() - timedelta(minutes=16)
+        db.commit()
+        assert exports.purge_expired(db) == 0
+        assert get_storage().exists(key) and db.get(ExportJob, first).storage_key == key
+
+        db.get(ExportJob, second).finished_at = datetime.utcnow() - timedelta(minutes=16)
+        db.commit()
+        assert exports.purge_expired(db) == 1
+        assert not get_storage().exists(key)
+        assert {db.get(ExportJob, i).storage_key for i in (first, second)} == {None}
+        res = client.get(f"{URL}/{first}/download", headers=hdrs)
+        assert res.status_code == 410 and res.json()["error"] == "NOT_FOUND"
+
+    def test_missing_object_is_410(self, client, db, admin, queued):
+        hdrs = auth_headers(admin.id, admin.roles)
+        job_id = client.post(URL, headers=hdrs, json=TICKETS).json()["id"]
+        exports.run_job(db, db, job_id)
+        get_storage().delete(db.get(ExportJob, job_id).storage_key)
+        assert client.get(f"{URL}/{job_id}/download", headers=hdrs).status_code == 410
+
+
+class TestStuckJobs:
+    def test_enqueue_failure_fails_job(self, client, db, admin, monkeypatch):
+        def _broker_down(name, args):
+            raise ConnectionError("redis недоступен")
+
+        monkeypatch.setattr(celery_app, "send_task", _broker_down)
+        res = client.post(URL, headers=auth_headers(admin.id, admin.roles), json=TICKETS)
+        assert res.status_code == 503 and res.json()["error"] == "QUEUE_UNAVAILABLE"
+        job = db.query(ExportJob).one()
+        assert (job.status, job.error) == ("failed", "Очередь выгрузок недоступна")
+        assert db.query(Notification).one().event_type == "export_failed"
+
+    def test_expire_stale(self, client, db, admin, queued):
+        hdrs = auth_headers(admin.id, admin.roles)
+        job_id = client.post(URL, headers=hdrs, json=TICKETS).json()["id"]
+        assert exports.expire_stale(db) == 0
+        job = db.get(ExportJob, job_id)
+        job.status, job.started_at = "running", datetime.utcnow() - timedelta(minutes=61)
+        db.commit()
+        # зависшее задание не держит повторы: создаётся новое
+        assert client.post(URL, headers=hdrs, json=TICKETS).json()["id"] != job_id
+        assert exports.expire_stale(db) == 1
+        assert db.get(ExportJob, job_id).status == "failed"
+        note = db.query(Notification).filter(Notification.user_id == admin.id).one()
+        assert note.event_type == "export_failed"
+        exports.run_job(db, db, job_id)  # поздняя доставка не оживляет проваленное задание
+        assert db.get(ExportJob, job_id).status == "failed"
+
+    def test_redelivered_task_takes_over(self, client, db, admin, queued):
+        job_id = client.post(URL, headers=auth_headers(admin.id, admin.roles), json=TICKETS).json()["id"]
+        job = db.get(ExportJob, job_id)
+        now = datetime.utcnow()
+        job.status, job.started_at, job.heartbeat_at = "running", now - timedelta(minutes=7), now - timedelta(minutes=1)
+        db.commit()
+        assert exports.run_job(db, db, job_id) is False  # воркер ещё отмечается — задачу повторить позже
+        assert db.get(ExportJob, job_id).status == "running"
+        job.heartbeat_at = now - timedelta(minutes=6)  # отметки устарели задолго до таймаута
+        db.commit()
+        assert exports.run_job(db, db, job_id) is True
+        assert (db.get(ExportJob, job_id).status, db.get(ExportJob, job_id).rows) == ("done", 5)
+
+    def test_expired_worker_does_not_reopen_job(self, client, db, admin, queued, monkeypatch):
+        job_id = client.post(URL, headers=auth_headers(admin.id, admin.roles), json=TICKETS).json()["id"]
+        original = spreadsheet.iter_file
+
+        def _iter_file(fh):
+            # файл уже записан — тем временем beat проваливает задание по таймауту
+            monkeypatch.setattr(exports.settings, "export_job_timeout_minutes", -1)
+            assert exports.expire_stale(db) == 1
+            return original(fh)
+
+        monkeypatch.setattr(spreadsheet, "iter_file", _iter_file)
+        assert exports.run_job(db, db, job_id) is True
+        assert db.get(ExportJob, job_id).status == "failed"
+        assert [n.event_type for n in db.query(Notification)] == ["export_failed"]
+
+    def test_worker_stops_when_job_taken_over(self, client, db, admin, queued, monkeypatch):
+        job_id = client.post(URL, headers=auth_headers(admin.id, admin.roles), json=TICKETS).json()["id"]
+        original = report_service.tickets_xlsx
+
+        def _tickets_xlsx(*args, progress):
+            # другой воркер забрал задание: новая метка владельца
+            db.get(ExportJob, job_id).started_at = datetime(2030, 1, 1)
+            db.commit()
+            return original(*args, progress=progress)
+
+        monkeypatch.setattr(report_service, "tickets_xlsx", _tickets_xlsx)
+        assert exports.run_job(db, db, job_id) is True
+        job = db.get(ExportJob, job_id)
+        assert (job.status, job.started_at, job.storage_key) == ("running", datetime(2030, 1, 1), None)
+        assert db.query(Notification).count() == 0
+
+
+class TestAccess:
+    def test_roles_and_params(self, client, db, admin, queued):
+        eng = make_engineer(db)
+        eng_hdrs = auth_headers(eng.id, eng.roles)
+        assert client.post(URL, headers=eng_hdrs, json=TICKETS).status_code == 403
+        hdrs = auth_headers(admin.id, admin.roles)
+        res = client.post(URL, headers=hdrs, json={"kind": "tickets_xlsx", "params": {"date_from": "вчера"}})
+        assert res.status_code == 422 and res.json()["error"] == "VALIDATION_ERROR"
+        assert client.post(URL, headers=hdrs, json={"kind": "clients_csv", "params": {}}).status_code == 422
+        job_id = client.post(URL, headers=hdrs, json=TICKETS).json()["id"]
+        assert client.get(f"{URL}/{job_id}", headers=eng_hdrs).status_code == 403
+        assert client.get(URL, headers=hdrs).json()["items"][0]["id"] == job_id
+        assert queued == [("app.tasks.exports.run_export", job_id)]
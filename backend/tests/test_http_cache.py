@@ -0,0 +1,118 @@
+"""
+Tests — app/core/http_cache.py
+Covers: ETag и 304 для справочников (модели оборудования, склады, прайс услуг,
+валюта, курсы), смена ETag после изменения данных, разбор If-None-Match.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from starlette.requests import Request
+
+from app.core.http_cache import is_not_modified
+from app.models import ExchangeRate, SystemSetting, Warehouse
+from tests.conftest import (
+    make_admin, make_equipment_model, make_service_catalog_item, auth_headers,
+)
+
+REFERENCE_URLS = [
+    "/api/v1/equipment/models",
+    "/api/v1/warehouses",
+    "/api/v1/service-catalog",
+    "/api/v1/settings/currency",
+    "/api/v1/settings/exchange-rates",
+]
+
+
+def _seed(db):
+    admin = make_admin(db)
+    make_equipment_model(db)
+    make_service_catalog_item(db)
+    db.add(Warehouse(name="Основной склад", type="company"))
+    for key, value in [("currency_code", "RUB"), ("currency_name", "Российский рубль")]:
+        db.add(SystemSetting(key=key, value=value))
+    db.add(ExchangeRate(currency="USD", rate=90, set_by=admin.id, set_at=datetime.now()))
+    db.commit()
+    return auth_headers(admin.id, admin.roles)
+
+
+def _request(headers: dict) -> Request:
+    raw = [(k.lower().encode(), v.encode()) for k, v in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+class TestReferenceEtags:
+    @pytest.mark.parametrize("url", REFERENCE_URLS)
+    def test_revalidation_returns_304(self, client, db, url):
+        hdrs = _seed(db)
+        first = client.get(url, headers=hdrs)
+        assert first.status_code == 200
+        etag = first.headers["etag"]
+        assert etag.startswith('W/"')
+        assert first.headers["cache-control"] == "private, no-cache"
+
+        again = client.get(url, headers={**hdrs, "If-None-Match": etag})
+        assert again.status_code == 304
+        assert again.content == b""
+        assert again.headers["etag"] == etag
+
+    @pytest.mark.parametrize("url", REFERENCE_URLS)
+    def test_stale_etag_returns_body(self, client, db, url):
+        hdrs = _seed(db)
+        res = client.get(url, headers={**hdrs, "If-None-Match": 'W/"outdated"'})
+        assert res.status_code == 200
+        assert res.json()
+
+    def test_body_matches_response_model(self, client, db):
+        hdrs = _seed(db)
+        data = client.get("/api/v1/service-catalog", headers=hdrs).json()
+        assert data["total"] == 1
+        assert data["items"][0]["unit_price"] == "1500.00"
+        assert set(data["items"][0]) >= {"id", "code", "name", "created_at", "updated_at"}
+
+    def test_etag_changes_after_update(self, client, db):
+        hdrs = _seed(db)
+        etag = client.get("/api/v1/equipment/models", headers=hdrs).headers["etag"]
+        make_equipment_model(db, name="Wincor ProCash 2100")
+        res = client.get("/api/v1/equipment/models", headers={**hdrs, "If-None-Match": etag})
+        assert res.status_code == 200
+        assert res.headers["etag"] != etag
+        assert len(res.json()) == 2
+
+    def test_etag_depends_on_query(self, client, db):
+        hdrs = _seed(db)
+        db.add(Warehouse(name="Склад банка", type="bank"))
+        db.commit()
+        all_wh = client.get("/api/v1/warehouses", headers=hdrs).headers["etag"]
+        company = client.get("/api/v1/warehouses?type=company", headers=hdrs).headers["etag"]
+        assert all_wh != company
+
+    def test_unauthenticated_still_blocked(self, client, db):
+        _seed(db)
+        res = client.get("/api/v1/equipment/models", headers={"If-None-Match": "*"})
+        assert res.status_code == 401
+
+
+class TestIsNotModified:
+    def test_weak_comparison(self):
+        assert is_not_modified(_request({"If-None-Match": '"abc"'}), 'W/"abc"')
+        assert is_not_modified(_request({"If-None-Match": 'W/"abc"'}), '"abc"')
+
+    def test_list_and_wildcard(self):
+        assert is_not_modified(_request({"If-None-Match": '"x", W/"abc"'}), '"abc"')
+        assert is_not_modified(_request({"If-None-Match": "*"}), '"abc"')
+        assert not is_not_modified(_request({"If-None-Match": '"x"'}), '"abc"')
+
+    def test_if_modified_since(self):
+        modified = datetime(2026, 5, 1, 12, 0, 0, 500000)
+        since = "Fri, 01 May 2026 12:00:00 GMT"
+        assert is_not_modified(_request({"If-Modified-Since": since}), '"abc"', modified)
+        newer = modified + timedelta(seconds=5)
+        assert not is_not_modified(_request({"If-Modified-Since": since}), '"abc"', newer)
+
+    def test_if_none_match_takes_precedence(self):
+        modified = datetime(2026, 5, 1, 12, 0, 0)
+        headers = {"If-None-Match": '"other"', "If-Modified-Since": "Fri, 01 May 2026 12:00:00 GMT"}
+        assert not is_not_modified(_request(headers), '"abc"', modified)
+
+    def test_invalid_date_ignored(self):
+        assert not is_not_modified(_request({"If-Modified-Since": "yesterday"}), '"abc"', datetime(2026, 1, 1))
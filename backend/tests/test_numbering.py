@@ -0,0 +1,71 @@
+"""
+Unit tests — app/services/numbering.py
+Covers: последовательная выдача номеров, засев счётчика из существующих документов,
+независимые периоды, порядок при переполнении ширины.
+"""
+from datetime import datetime
+
+from app.models import DocumentCounter, Ticket, Invoice
+from app.services.numbering import _create_counter, next_number
+from tests.conftest import (
+    make_admin, make_client, make_equipment_model, make_equipment, make_ticket,
+    auth_headers,
+)
+
+
+def _create_ticket(client_fixture, headers, client_id, equipment_id):
+    res = client_fixture.post("/api/v1/tickets", headers=headers, json={
+        "client_id": client_id,
+        "equipment_id": equipment_id,
+        "title": "Numbering",
+        "description": "d",
+        "type": "repair",
+        "priority": "medium",
+    })
+    assert res.status_code == 201, res.text
+    return res.json()
+
+
+class TestNextNumber:
+    def test_sequential_numbers(self, db):
+        assert next_number(db, "INV-2030", 5, Invoice.number) == "INV-2030-00001"
+        assert next_number(db, "INV-2030", 5, Invoice.number) == "INV-2030-00002"
+        db.commit()
+        assert db.get(DocumentCounter, "INV-2030").value == 2
+
+    def test_periods_are_independent(self, db):
+        assert next_number(db, "INV-2030", 5, Invoice.number) == "INV-2030-00001"
+        assert next_number(db, "INV-2031", 5, Invoice.number) == "INV-2031-00001"
+
+    def test_counter_seeded_from_existing_documents(self, db):
+        admin = make_admin(db)
+        cl = make_client(db)
+        eq = make_equipment(db, cl.id, make_equipment_model(db).id)
+        make_ticket(db, cl.id, eq.id, admin.id)   # T-{today}-0001
+        today = datetime.utcnow().strftime("%Y%m%d")
+        assert next_number(db, f"T-{today}", 4, Ticket.number) == f"T-{today}-0002"
+
+    def test_seed_orders_by_length_beyond_width(self, db):
+        admin = make_admin(db)
+        cl = make_client(db)
+        for number in ("T-20300101-9999", "T-20300101-10000"):
+            db.add(Ticket(number=number, client_id=cl.id, created_by=admin.id, title="x"))
+        db.commit()
+        assert next_number(db, "T-20300101", 4, Ticket.number) == "T-20300101-10001"
+
+    def test_create_counter_keeps_existing_row(self, db):
+        # параллельная транзакция успела создать счётчик — вставка игнорируется
+        assert next_number(db, "INV-2030", 5, Invoice.number) == "INV-2030-00001"
+        _create_counter(db, "INV-2030", Invoice.number)
+        assert next_number(db, "INV-2030", 5, Invoice.number) == "INV-2030-00002"
+
+
+class TestTicketNumbersViaApi:
+    def test_consecutive_creates_get_distinct_numbers(self, client, db):
+        admin = make_admin(db)
+        hdrs = auth_headers(admin.id, admin.roles)
+        cl = make_client(db)
+        eq = make_equipment(db, cl.id, make_equipment_model(db).id)
+        numbers = [_create_ticket(client, hdrs, cl.id, eq.id)["number"] for _ in range(3)]
+        today = datetime.utcnow().strftime("%Y%m%d")
+        assert numbers == [f"T-{today}-0001", f"T-{today}-0002", f"T-{today}-0003"]
@@ -0,0 +1,158 @@
+"""
+Tests — app/api/pagination.py
+Covers: курсорный режим (cursor=) для заявок, журнала аудита, уведомлений,
+счетов и оборудования — обход всех страниц без пропусков и повторов при
+одинаковом created_at, next_cursor, опциональный total, некорректный курсор.
+"""
+import base64
+import json
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.api.pagination import decode_cursor, encode_cursor
+from app.models import AuditLog, Invoice, Notification, Ticket
+from tests.conftest import (
+    make_admin, make_client, make_equipment_model, make_equipment, auth_headers,
+)
+
+BASE = datetime(2026, 3, 1, 9, 0, 0)
+
+
+def _walk(client, url, hdrs, size):
+    """Пройти все страницы курсором; вернуть id в порядке выдачи и число запросов."""
+    ids, cursor, calls = [], "", 0
+    while cursor is not None:
+        sep = "&" if "?" in url else "?"
+        res = client.get(f"{url}{sep}size={size}&cursor={cursor}", headers=hdrs)
+        assert res.status_code == 200, res.text
+        body = res.json()
+        assert body["total"] is None
+        ids += [item["id"] for item in body["items"]]
+        cursor = body["next_cursor"]
+        calls += 1
+    return ids, calls
+
+
+@pytest.fixture
+def admin(db):
+    user = make_admin(db)
+    return user, auth_headers(user.id, user.roles)
+
+
+class TestTicketsCursor:
+    def _seed(self, db, admin_id, n=25):
+        cl = make_client(db)
+        for i in range(n):
+            # по три заявки на одну секунду — проверка тай-брейка по id
+            db.add(Ticket(number=f"T-20260301-{i:04d}", client_id=cl.id, created_by=admin_id,
+                          title=f"t{i}", created_at=BASE + timedelta(seconds=i // 3)))
+        db.commit()
+
+    def test_walk_matches_offset_order(self, client, db, admin):
+        user, hdrs = admin
+        self._seed(db, user.id)
+        ids, calls = _walk(client, "/api/v1/tickets", hdrs, size=10)
+        offset = client.get("/api/v1/tickets?size=100", headers=hdrs).json()
+        assert ids == [t["id"] for t in offset["items"]]
+        assert len(ids) == len(set(ids)) == 25
+        assert calls == 3
+
+    def test_exact_multiple_ends_without_empty_page(self, client, db, admin):
+        user, hdrs = admin
+        self._seed(db, user.id, n=20)
+        first = client.get("/api/v1/tickets?size=10&cursor=", headers=hdrs).json()
+        second = client.get(f"/api/v1/tickets?size=10&cursor={first['next_cursor']}", headers=hdrs).json()
+        assert len(second["items"]) == 10
+        assert second["next_cursor"] is None
+
+    def test_with_total(self, client, db, admin):
+        user, hdrs = admin
+        self._seed(db, user.id)
+        body = client.get("/api/v1/tickets?size=10&cursor=&with_total=true", headers=hdrs).json()
+        assert (body["total"], body["pages"]) == (25, 3)
+
+    def test_filters_apply(self, client, db, admin):
+        user, hdrs = admin
+        self._seed(db, user.id)
+        db.query(Ticket).filter(Ticket.title.in_(["t1", "t2", "t20"])).update({"priority": "high"})
+        db.commit()
+        ids, _ = _walk(client, "/api/v1/tickets?priority=high", hdrs, size=2)
+        assert len(ids) == 3
+
+    def test_offset_mode_unchanged(self, client, db, admin):
+        user, hdrs = admin
+        self._seed(db, user.id)
+        body = client.get("/api/v1/tickets?page=2&size=10", headers=hdrs).json()
+        assert (body["total"], body["page"], body["pages"]) == (25, 2, 3)
+        assert body["next_cursor"] is None
+
+    @pytest.mark.parametrize("cursor", ["garbage", encode_cursor([1]), "W10"])
+    def test_invalid_cursor(self, client, db, admin, cursor):
+        _, hdrs = admin
+        res = client.get(f"/api/v1/tickets?cursor={cursor}", headers=hdrs)
+        assert res.status_code == 400
+        assert res.json()["error"] == "INVALID_CURSOR"
+
+
+class TestOtherListsCursor:
+    def test_audit_log(self, client, db, admin):
+        user, hdrs = admin
+        for i in range(12):
+            db.add(AuditLog(user_id=user.id, entity_type="ticket", entity_id=i, action="UPDATE",
+                            created_at=BASE + timedelta(seconds=i // 4)))
+        db.commit()
+        ids, calls = _walk(client, "/api/v1/audit-log?entity_type=ticket", hdrs, size=5)
+        assert ids == sorted(ids, reverse=True)  # при равном времени — по убыванию id
+        assert len(set(ids)) == 12 and calls == 3
+
+    def test_notifications_scoped_to_user(self, client, db, admin):
+        user, hdrs = admin
+        other = make_admin(db, email="other@test.com")
+        for i in range(7):
+            db.add(Notification(user_id=user.id, event_type="x", title=f"n{i}", created_at=BASE))
+            db.add(Notification(user_id=other.id, event_type="x", title=f"o{i}", created_at=BASE))
+        db.commit()
+        ids, _ = _walk(client, "/api/v1/notifications", hdrs, size=3)
+        owned = {n.id for n in db.query(Notification).filter(Notification.user_id == user.id)}
+        assert set(ids) == owned and len(ids) == 7
+
+    def test_invoices(self, client, db, admin):
+        user, hdrs = admin
+        cl = make_client(db)
+        for i in range(6):
+            db.add(Invoice(number=f"INV-2026-{i:05d}", client_id=cl.id, issue_date=date(2026, 3, 1),
+                           created_by=user.id, created_at=BASE + timedelta(minutes=i)))
+        db.commit()
+        ids, _ = _walk(client, "/api/v1/invoices", hdrs, size=4)
+        assert len(ids) == 6
+        assert ids == sorted(ids, reverse=True)
+
+    @pytest.mark.parametrize("values", [
+        [{"dec": "x"}, 1], [[1], [2]], [{"dt": "2020-01-01T00:00:00"}, [1]], [{"dt": "2020-01-01"}, {"id": 1}],
+    ])
+    def test_invoices_crafted_cursor(self, client, db, admin, values):
+        _, hdrs = admin
+        raw = base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+        res = client.get(f"/api/v1/invoices?cursor={raw}", headers=hdrs)
+        assert res.status_code == 400
+        assert res.json()["error"] == "INVALID_CURSOR"
+
+    def test_equipment_ascending_by_id(self, client, db, admin):
+        _, hdrs = admin
+        cl = make_client(db)
+        model = make_equipment_model(db)
+        for i in range(5):
+            make_equipment(db, cl.id, model.id, serial=f"SN-{i}")
+        ids, _ = _walk(client, "/api/v1/equipment", hdrs, size=2)
+        assert ids == sorted(ids) and len(ids) == 5
+
+
+class TestCursorCodec:
+    def test_roundtrip_types(self):
+        values = [datetime(2026, 3, 1, 9, 0, 0, 123456), date(2026, 3, 1), 42]
+        assert decode_cursor(encode_cursor(values), 3) == values
+
+    def test_cursor_is_url_safe(self):
+        cursor = encode_cursor([BASE, 10**6])
+        assert cursor.replace("-", "").replace("_", "").isalnum()
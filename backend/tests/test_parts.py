@@ -1,8 +1,12 @@
 """
 Unit tests — /api/v1/parts
 Covers: CRUD, количество, low_stock фильтр, корректировка остатка, RBAC.
+Количество — сумма по складам компании: создание, правка и корректировка
+проводятся движениями по складу.
 """
 import pytest
+
+from app.models import StockMovement, Warehouse, WarehouseStock
 from tests.conftest import (
     make_admin, make_engineer, make_user,
     make_spare_part, make_vendor,
@@ -25,6 +29,22 @@ def _warehouse(db):
     return auth_headers(u.id, u.roles)
 
 
+def _main_warehouse(db):
+    wh = Warehouse(name="Основной склад", type="company")
+    db.add(wh)
+    db.commit()
+    return wh
+
+
+def _stocked_part(db, quantity=10):
+    """Запчасть, чьё количество лежит на основном складе компании."""
+    wh = _main_warehouse(db)
+    p = make_spare_part(db, quantity=quantity)
+    db.add(WarehouseStock(warehouse_id=wh.id, part_id=p.id, quantity=quantity))
+    db.commit()
+    return p
+
+
 class TestListParts:
     def test_all_authenticated_can_list(self, client, db):
         make_spare_part(db)
@@ -57,6 +77,7 @@ class TestListParts:
 
 class TestCreatePart:
     def test_admin_creates_part(self, client, db):
+        wh = _main_warehouse(db)
         res = client.post("/api/v1/parts", headers=_admin(db), json={
             "sku": "NEW-SKU-001",
             "name": "Test Part",
@@ -69,8 +90,26 @@ class TestCreatePart:
         })
         assert res.status_code == 201
         assert res.json()["sku"] == "NEW-SKU-001"
+        assert res.json()["quantity"] == 5
+        stock = db.query(WarehouseStock).one()
+        assert (stock.warehouse_id, stock.quantity) == (wh.id, 5)
+        assert db.query(StockMovement.reason, StockMovement.delta).one() == ("opening", 5)
+
+    def test_create_with_quantity_needs_company_warehouse(self, client, db):
+        res = client.post("/api/v1/parts", headers=_admin(db), json={
+            "sku": "NO-WH-001", "name": "X", "unit": "шт", "quantity": 2, "unit_price": "10.00",
+        })
+        assert res.status_code == 422
+        assert res.json()["error"] == "VALIDATION_ERROR"
+
+    def test_create_without_quantity_needs_no_warehouse(self, client, db):
+        res = client.post("/api/v1/parts", headers=_admin(db), json={
+            "sku": "ZERO-001", "name": "X", "unit": "шт", "unit_price": "10.00",
+        })
+        assert res.status_code == 201 and res.json()["quantity"] == 0
 
     def test_warehouse_creates_part(self, client, db):
+        _main_warehouse(db)
         res = client.post("/api/v1/parts", headers=_warehouse(db), json={
             "sku": "WH-SKU-001",
             "name": "WH Part",
@@ -113,11 +152,13 @@ class TestGetPart:
 
 class TestUpdatePart:
     def test_admin_updates(self, client, db):
-        p = make_spare_part(db)
+        p = _stocked_part(db)
         res = client.put(f"/api/v1/parts/{p.id}", headers=_admin(db),
                          json={"quantity": 99})
         assert res.status_code == 200
         assert res.json()["quantity"] == 99
+        assert db.query(WarehouseStock.quantity).scalar() == 99
+        assert db.query(StockMovement.reason, StockMovement.delta).one() == ("adjust", 89)
 
     def test_engineer_cannot_update(self, client, db):
         p = make_spare_part(db)
@@ -128,14 +169,14 @@ class TestUpdatePart:
 
 class TestAdjustStock:
     def test_positive_adjustment(self, client, db):
-        p = make_spare_part(db, quantity=10)
+        p = _stocked_part(db, quantity=10)
         res = client.post(f"/api/v1/parts/{p.id}/adjust", headers=_warehouse(db),
                           json={"delta": 5, "reason": "Приход от поставщика"})
         assert res.status_code == 200
         assert res.json()["quantity"] == 15
 
     def test_negative_adjustment(self, client, db):
-        p = make_spare_part(db, quantity=10)
+        p = _stocked_part(db, quantity=10)
         res = client.post(f"/api/v1/parts/{p.id}/adjust", headers=_warehouse(db),
                           json={"delta": -3, "reason": "Списание"})
         assert res.status_code == 200
@@ -143,7 +184,7 @@ class TestAdjustStock:
 
     def test_adjustment_below_zero_rejected(self, client, db):
         """Количество не может стать отрицательным."""
-        p = make_spare_part(db, quantity=2)
+        p = _stocked_part(db, quantity=2)
         res = client.post(f"/api/v1/parts/{p.id}/adjust", headers=_warehouse(db),
                           json={"delta": -5, "reason": "Overuse"})
         assert res.status_code == 400
@@ -0,0 +1,139 @@
+"""
+Tests — app/core/query_counter.py
+Covers: нормализация формы запроса, подсчёт и поиск повторов (N+1),
+фикстура / декоратор assert_max_queries, dev-middleware (заголовок и лог).
+"""
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.query_counter import (
+    QueryDebugMiddleware, assert_max_queries as assert_max_queries_cls, count_queries, statement_shape,
+)
+from app.models import Equipment
+from tests.conftest import (
+    TestingSessionLocal, make_admin, make_client, make_equipment, make_equipment_model, auth_headers,
+)
+
+
+def _seed(db, n=6):
+    model = make_equipment_model(db)
+    for i in range(n):
+        cl = make_client(db, name=f"Клиент {i}")
+        make_equipment(db, cl.id, model.id, serial=f"SN-{i:03d}")
+    db.expunge_all()
+
+
+def _lazy_clients(db):
+    """Классический N+1: связь client грузится отдельно для каждой строки."""
+    return [e.client.name for e in db.query(Equipment).all()]
+
+
+class TestStatementShape:
+    def test_in_lists_collapsed(self):
+        assert statement_shape("SELECT * FROM t WHERE id IN (?, ?, ?)") == statement_shape(
+            "SELECT * FROM t WHERE id IN (?)")
+        assert statement_shape("SELECT * FROM t WHERE id IN (%s, %s)") == "SELECT * FROM t WHERE id IN (?)"
+
+    def test_whitespace_normalized(self):
+        assert statement_shape("SELECT a\n  FROM t\n WHERE x = ?") == "SELECT a FROM t WHERE x = ?"
+
+
+class TestCountQueries:
+    def test_counts_and_detects_repeats(self, db):
+        _seed(db)
+        with count_queries() as log:
+            names = _lazy_clients(db)
+        assert len(names) == 6
+        assert log.count == 7
+        (shape, n, _), = log.repeated(3)
+        assert n == 6 and "FROM clients" in shape
+        assert "6×" in log.report()
+
+    def test_call_site_points_to_app_code(self, client, db):
+        admin = make_admin(db)
+        with count_queries() as log:
+            client.get("/api/v1/clients", headers=auth_headers(admin.id, admin.roles))
+        assert any(s.site and s.site.startswith("app/api/endpoints/clients.py:") for s in log.statements)
+
+    def test_nothing_recorded_outside_block(self, db):
+        with count_queries() as log:
+            pass
+        _seed(db, 1)
+        assert log.count == 0
+
+
+class TestAssertMaxQueries:
+    def test_fixture_passes_within_budget(self, db, assert_max_queries):
+        _seed(db)
+        with assert_max_queries(1):
+            db.query(Equipment).all()
+
+    def test_fixture_fails_on_n_plus_one(self, db, assert_max_queries):
+        _seed(db)
+        with pytest.raises(AssertionError, match="Ожидалось не больше 3 запросов"):
+            with assert_max_queries(3):
+                _lazy_clients(db)
+
+    def test_max_repeats(self, db):
+        _seed(db)
+        with pytest.raises(AssertionError, match="N\\+1"):
+            with assert_max_queries_cls(100, max_repeats=2):
+                _lazy_clients(db)
+
+    def test_as_decorator(self, db):
+        _seed(db)
+
+        @assert_max_queries_cls(2)
+        def load():
+            return _lazy_clients(db)
+
+        with pytest.raises(AssertionError):
+            load()
+
+    def test_own_exception_not_masked(self, db):
+        with pytest.raises(ZeroDivisionError):
+            with assert_max_queries_cls(0):
+                db.query(Equipment).all()
+                1 / 0
+
+
+class TestQueryDebugMiddleware:
+    @pytest.fixture
+    def debug_app(self, db):
+        _seed(db)
+        app = FastAPI()
+        app.add_middleware(QueryDebugMiddleware, max_queries=30, repeat_threshold=5)
+
+        @app.get("/lazy")
+        def lazy():
+            # синхронный эндпоинт — выполняется в пуле потоков, журнал должен дойти и туда
+            session = TestingSessionLocal()
+            try:
+                return _lazy_clients(session)
+            finally:
+                session.close()
+
+        @app.get("/eager")
+        def eager():
+            session = TestingSessionLocal()
+            try:
+                return [e.serial_number for e in session.query(Equipment).all()]
+            finally:
+                session.close()
+
+        return TestClient(app)
+
+    def test_header_and_warning_on_n_plus_one(self, debug_app, caplog):
+        with caplog.at_level(logging.WARNING, logger="app.core.query_counter"):
+            res = debug_app.get("/lazy")
+        assert res.headers["X-Query-Count"] == "7"
+        assert "GET /lazy" in caplog.text and "6×" in caplog.text
+
+    def test_quiet_endpoint_not_logged(self, debug_app, caplog):
+        with caplog.at_level(logging.WARNING, logger="app.core.query_counter"):
+            res = debug_app.get("/eager")
+        assert res.headers["X-Query-Count"] == "1"
+        assert caplog.text == ""
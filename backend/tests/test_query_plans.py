@@ -0,0 +1,175 @@
+"""
+Tests — составные индексы списков (app/models, миграция f6a1b2c3d4e5)
+Covers: основной запрос (с LIMIT) списков заявок, журнала аудита и
+уведомлений на большом наборе данных не сканирует таблицу целиком и не
+сортирует всю выборку — EXPLAIN QUERY PLAN после ANALYZE.
+"""
+import re
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, insert, text
+
+from app.models import AuditLog, Notification, Ticket, User
+from tests.conftest import (
+    engine, make_admin, make_engineer, make_client, make_client_user, auth_headers,
+)
+
+BASE = datetime(2025, 1, 1)
+N_TICKETS = 3000
+N_CLIENTS = 30
+STATUSES = ["new", "assigned", "in_progress", "waiting_part", "on_review", "completed", "closed", "cancelled"]
+PRIORITIES = ["low", "medium", "high", "critical"]
+ACTIONS = ["CREATE", "UPDATE", "DELETE", "LOGIN"]
+ENTITIES = ["ticket", "client", "equipment", "invoice", "user"]
+
+
+@pytest.fixture
+def seeded(db):
+    admin = make_admin(db)
+    first = make_engineer(db, email="eng0@test.com")
+    # остальные инженеры — без повторного bcrypt, он здесь дороже всего наполнения
+    db.execute(insert(User), [
+        {"email": f"eng{i}@test.com", "full_name": f"Engineer {i}", "password_hash": first.password_hash,
+         "roles": ["engineer"], "is_active": True, "is_deleted": False}
+        for i in range(1, 10)
+    ])
+    engineers = db.query(User).filter(User.email.like("eng%")).order_by(User.id).all()
+    clients = [make_client(db, name=f"Клиент {i}") for i in range(N_CLIENTS)]
+    portal = make_client_user(db, clients[0].id)
+
+    db.execute(insert(Ticket), [
+        {
+            "number": f"T-{i:06d}",
+            "client_id": clients[i % N_CLIENTS].id,
+            "assigned_to": engineers[i % len(engineers)].id,
+            "created_by": admin.id,
+            "title": f"Заявка {i}",
+            "status": STATUSES[i % len(STATUSES)],
+            "priority": PRIORITIES[i % len(PRIORITIES)],
+            "is_deleted": i % 50 == 0,
+            "created_at": BASE + timedelta(minutes=i),
+            "updated_at": BASE + timedelta(minutes=i),
+        }
+        for i in range(N_TICKETS)
+    ])
+    db.execute(insert(AuditLog), [
+        {
+            "user_id": (admin.id, engineers[i % len(engineers)].id)[i % 2],
+            "entity_type": ENTITIES[i % len(ENTITIES)],
+            "entity_id": i,
+            "action": ACTIONS[i % len(ACTIONS)],
+            "created_at": BASE + timedelta(minutes=i),
+        }
+        for i in range(N_TICKETS)
+    ])
+    db.execute(insert(Notification), [
+        {
+            "user_id": (admin.id, engineers[i % len(engineers)].id)[i % 2],
+            "event_type": "ticket_assigned",
+            "title": f"n{i}",
+            "is_read": i % 3 != 0,
+            "created_at": BASE + timedelta(minutes=i),
+        }
+        for i in range(N_TICKETS)
+    ])
+    db.commit()
+    db.execute(text("ANALYZE"))
+    return {
+        "admin": auth_headers(admin.id, admin.roles),
+        "engineer": auth_headers(engineers[0].id, engineers[0].roles),
+        "portal": auth_headers(portal.id, portal.roles),
+        "client_id": clients[3].id,
+        "engineer_id": engineers[2].id,
+        "admin_id": admin.id,
+    }
+
+
+def _main_query_plan(client, url, hdrs, table):
+    """Выполнить запрос к API и вернуть EXPLAIN QUERY PLAN его основного SELECT ... LIMIT."""
+    captured = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        if re.match(rf"SELECT\b.*\bFROM {table}\b.*\bLIMIT\b", statement, re.S):
+            captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", _capture)
+    try:
+        res = client.get(url, headers=hdrs)
+    finally:
+        event.remove(engine, "before_cursor_execute", _capture)
+    assert res.status_code == 200, res.text
+    assert res.json()["items"], "пустая выдача — план не показателен"
+    assert captured, f"основной запрос к {table} не найден"
+
+    statement, parameters = captured[-1]
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        cur.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return [row[-1] for row in cur.fetchall()]
+    finally:
+        raw.close()
+
+
+def assert_indexed(plan, table):
+    """Таблица читается по индексу, порядок ORDER BY берётся из него же."""
+    for line in plan:
+        assert not re.fullmatch(rf"SCAN {table}", line), f"полный скан {table}: {plan}"
+        assert "TEMP B-TREE FOR ORDER BY" not in line, f"сортировка всей выборки: {plan}"
+    assert any(line.startswith((f"SEARCH {table} USING", f"SCAN {table} USING")) for line in plan), plan
+
+
+class TestTicketListPlans:
+    @pytest.mark.parametrize("query", [
+        "",
+        "?status=in_progress",
+        "?priority=critical",
+        "?client_id={client_id}",
+        "?assigned_to={engineer_id}",
+        "?cursor=",
+    ])
+    def test_manager_filters(self, client, seeded, query):
+        url = "/api/v1/tickets" + query.format(**seeded)
+        assert_indexed(_main_query_plan(client, url, seeded["admin"], "tickets"), "tickets")
+
+    def test_engineer_own_tickets(self, client, seeded):
+        plan = _main_query_plan(client, "/api/v1/tickets", seeded["engineer"], "tickets")
+        assert_indexed(plan, "tickets")
+
+    def test_client_portal(self, client, seeded):
+        plan = _main_query_plan(client, "/api/v1/tickets", seeded["portal"], "tickets")
+        assert_indexed(plan, "tickets")
+
+
+class TestAuditLogPlans:
+    @pytest.mark.parametrize("query", [
+        "",
+        "?entity_type=invoice",
+        "?action=DELETE",
+        "?user_id={admin_id}",
+        "?entity_type=ticket&cursor=",
+    ])
+    def test_filters(self, client, seeded, query):
+        url = "/api/v1/audit-log" + query.format(**seeded)
+        assert_indexed(_main_query_plan(client, url, seeded["admin"], "audit_log"), "audit_log")
+
+
+class TestNotificationPlans:
+    @pytest.mark.parametrize("query", ["", "?is_read=false", "?cursor="])
+    def test_own_notifications(self, client, seeded, query):
+        url = "/api/v1/notifications" + query
+        plan = _main_query_plan(client, url, seeded["admin"], "notifications")
+        assert_indexed(plan, "notifications")
+
+
+def test_harness_detects_missing_index(client, db, seeded):
+    """Без составных индексов заявок проверка должна падать — иначе она ничего не ловит."""
+    for index in Ticket.__table__.indexes:
+        if index.name.endswith("_created"):
+            db.execute(text(f"DROP INDEX {index.name}"))
+    db.execute(text("ANALYZE"))
+    db.commit()
+    plan = _main_query_plan(client, "/api/v1/tickets?status=new", seeded["admin"], "tickets")
+    with pytest.raises(AssertionError):
+        assert_indexed(plan, "tickets")
@@ -0,0 +1,161 @@
+"""
+Integration tests — get_read_db (app/core/database.py)
+Covers: тяжёлые чтения (список заявок, отчёты, журнал аудита, остатки) идут
+на реплику, запись — на primary; защита от отставания реплики и кэш проверки.
+Primary и реплика — два файла SQLite с заранее расходящимися данными.
+"""
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.core import database
+from app.core.database import Base, get_db
+from app.main import app
+from app.models import AuditLog, Ticket
+from tests.conftest import (
+    make_admin, make_client, make_equipment_model, make_equipment, make_ticket, auth_headers,
+)
+
+
+def _seed(session_factory, title):
+    """Одинаковые пользователь/клиент/оборудование; заявка с отличающимся заголовком."""
+    with session_factory() as s:
+        admin = make_admin(s)
+        cl = make_client(s)
+        eq = make_equipment(s, cl.id, make_equipment_model(s).id)
+        t = make_ticket(s, cl.id, eq.id, admin.id)
+        t.title = title
+        s.add(AuditLog(user_id=admin.id, action="UPDATE", entity_type=title, entity_id=t.id))
+        s.commit()
+        return admin.id, admin.roles, cl.id, eq.id
+
+
+@pytest.fixture
+def routed(tmp_path, monkeypatch):
+    engines = {}
+    factories = {}
+    for name in ("primary", "replica"):
+        eng = create_engine(f"sqlite:///{tmp_path / name}.db", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=eng)
+        engines[name] = eng
+        factories[name] = sessionmaker(autocommit=False, autoflush=False, bind=eng)
+
+    admin_id, roles, client_id, equipment_id = _seed(factories["primary"], "on-primary")
+    _seed(factories["replica"], "on-replica")
+
+    def _primary_db():
+        db = factories["primary"]()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    monkeypatch.setattr(database, "SessionLocal", factories["primary"])
+    monkeypatch.setattr(database, "ReadSessionLocal", factories["replica"])
+    database.replica_guard.reset()
+    app.dependency_overrides[get_db] = _primary_db
+    try:
+        with TestClient(app) as c:
+            yield c, auth_headers(admin_id, roles), factories, (client_id, equipment_id)
+    finally:
+        app.dependency_overrides.clear()
+        database.replica_guard.reset()
+        for eng in engines.values():
+            eng.dispose()
+
+
+def _ticket_titles(client, hdrs):
+    res = client.get("/api/v1/tickets", headers=hdrs)
+    assert res.status_code == 200, res.text
+    return [t["title"] for t in res.json()["items"]]
+
+
+class TestRouting:
+    def test_list_tickets_reads_replica(self, routed):
+        client, hdrs, _, _ = routed
+        assert _ticket_titles(client, hdrs) == ["on-replica"]
+
+    def test_audit_log_reads_replica(self, routed):
+        client, hdrs, _, _ = routed
+        res = client.get("/api/v1/audit-log", headers=hdrs)
+        assert res.status_code == 200
+        assert [r["entity_type"] for r in res.json()["items"]] == ["on-replica"]
+
+    def test_report_reads_replica(self, routed, monkeypatch):
+        client, hdrs, factories, _ = routed
+        with factories["replica"]() as s:
+            s.query(Ticket).update({"status": "closed"})
+            s.commit()
+        today = date.today().isoformat()
+        res = client.get(f"/api/v1/reports/tickets?date_from={today}&date_to={today}", headers=hdrs)
+        assert res.status_code == 200
+        assert res.json()["by_status"] == {"closed": 1}
+
+    def test_writes_go_to_primary(self, routed):
+        client, hdrs, factories, (client_id, equipment_id) = routed
+        res = client.post("/api/v1/tickets", headers=hdrs, json={
+            "client_id": client_id, "equipment_id": equipment_id, "title": "new",
+            "description": "d", "type": "repair", "priority": "medium",
+        })
+        assert res.status_code == 201, res.text
+        with factories["primary"]() as s:
+            assert s.query(Ticket).filter(Ticket.title == "new").count() == 1
+        with factories["replica"]() as s:
+            assert s.query(Ticket).filter(Ticket.title == "new").count() == 0
+
+
+class TestFreshnessGuard:
+    @pytest.mark.parametrize("lag", [120.0, None])
+    def test_lagging_or_unknown_replica_falls_back_to_primary(self, routed, monkeypatch, lag):
+        client, hdrs, _, _ = routed
+        monkeypatch.setattr(database, "replica_lag_seconds", lambda _: lag)
+        assert _ticket_titles(client, hdrs) == ["on-primary"]
+
+    def test_lag_check_is_cached(self, routed, monkeypatch):
+        client, hdrs, _, _ = routed
+        calls = []
+
+        def _lag(_):
+            calls.append(1)
+            return 0.0
+
+        monkeypatch.setattr(database, "replica_lag_seconds", _lag)
+        for _ in range(3):
+            _ticket_titles(client, hdrs)
+        assert len(calls) == 1
+
+    def test_unreachable_replica_falls_back(self, routed, monkeypatch):
+        client, hdrs, _, _ = routed
+        broken = sessionmaker(bind=create_engine("sqlite:////nonexistent-dir/replica.db"))
+        monkeypatch.setattr(database, "ReadSessionLocal", broken)
+        assert _ticket_titles(client, hdrs) == ["on-primary"]
+
+    def test_missing_replication_client_privilege(self, caplog):
+        """SHOW REPLICA STATUS без REPLICATION CLIENT: отставание неизвестно, в логе — что выдать."""
+        denied = OperationalError("SHOW REPLICA STATUS", {}, Exception(
+            1227, "Access denied; you need (at least one of) the SUPER, REPLICATION CLIENT privilege(s)"))
+
+        class _Session:
+            bind = SimpleNamespace(dialect=SimpleNamespace(name="mysql"))
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *_):
+                return False
+
+            def execute(self, _):
+                raise denied
+
+        assert database.replica_lag_seconds(_Session) is None
+        assert "REPLICATION CLIENT" in caplog.text
+
+    def test_no_replica_configured(self, routed, monkeypatch):
+        client, hdrs, _, _ = routed
+        monkeypatch.setattr(database, "ReadSessionLocal", None)
+        assert _ticket_titles(client, hdrs) == ["on-primary"]
@@ -0,0 +1,217 @@
+"""
+Tests — /api/v1/reports/{engineers,parts,revenue}, табличные отчёты app/services/reports.py
+Covers: загрузка инженеров по актам (рабочее время периода, фильтр инженера),
+расход запчастей по запчасти и складу, выручка и задолженность по клиенту и
+месяцу (без черновиков и отменённых, суммы счёта не умножаются на позиции),
+каждый отчёт — один запрос по индексу, выгрузка XLSX/CSV, права.
+"""
+import csv
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+
+import pytest
+from sqlalchemy import event
+
+from app.models import Invoice, InvoiceItem, Ticket, Warehouse, WorkAct, WorkActItem
+from app.services import reports as report_service
+from tests.conftest import (
+    engine, make_admin, make_engineer, make_user, auth_headers, make_client, make_equipment_model,
+    make_equipment, make_spare_part,
+)
+
+URL = "/api/v1/reports"
+MARCH = "date_from=2026-03-01&date_to=2026-03-31"
+
+
+@pytest.fixture
+def seeded(db):
+    admin = make_admin(db)
+    eng = make_engineer(db)
+    other = make_user(db, email="eng2@test.com", full_name="Второй", roles=["engineer"])
+    cl = make_client(db)
+    cl2 = make_client(db, name="Другой")
+    eq = make_equipment(db, cl.id, make_equipment_model(db).id)
+    main = Warehouse(name="Основной", type="company")
+    van = Warehouse(name="Машина", type="company")
+    db.add_all([main, van])
+    db.flush()
+    part, belt = make_spare_part(db, sku="P-1"), make_spare_part(db, sku="P-2")
+    # (инженер, минут, день, [(запчасть, склад, кол-во, сумма)])
+    acts = [
+        (eng, 120, datetime(2026, 3, 2, 10), [(part, main, 2, 1000), (belt, main, 1, 300)]),
+        (eng, 60, datetime(2026, 3, 20, 10), [(part, van, 1, 500)]),
+        (other, 30, datetime(2026, 3, 31, 18), [(part, main, 3, 1500)]),
+        (other, 999, datetime(2026, 4, 1, 9), [(part, main, 9, 4500)]),  # вне периода
+    ]
+    for i, (engineer, minutes, created, items) in enumerate(acts):
+        ticket = Ticket(number=f"T-{i:03d}", client_id=cl.id, equipment_id=eq.id, created_by=admin.id, title="t")
+        db.add(ticket)
+        db.flush()
+        act = WorkAct(ticket_id=ticket.id, engineer_id=engineer.id, total_time_minutes=minutes, created_at=created)
+        act.items = [WorkActItem(item_type="service", name="Работа", quantity=1, unit_price=700, total=700)] + [
+            WorkActItem(item_type="part", part_id=p.id, warehouse_id=w.id, name=p.name, quantity=q, unit_price=500,
+                        total=t)
+            for p, w, q, t in items
+        ]
+        db.add(act)
+    # (клиент, дата, статус, срок оплаты, [(тип позиции, сумма)])
+    invoices = [
+        (cl, date(2026, 3, 5), "paid", None, [("service", 1000), ("part", 200), ("part", 300)]),
+        (cl, date(2026, 3, 25), "sent", date.today() + timedelta(days=30), [("service", 400), ("manual", 100)]),
+        (cl, date(2026, 2, 10), "overdue", date(2026, 3, 1), [("part", 800)]),
+        (cl2, date(2026, 3, 7), "sent", date(2026, 3, 10), [("part", 250)]),  # срок прошёл
+        (cl2, date(2026, 3, 8), "draft", None, [("service", 9999)]),
+        (cl2, date(2026, 3, 9), "cancelled", None, [("service", 9999)]),
+    ]
+    for i, (client_, issued, status, due, items) in enumerate(invoices):
+        total = sum(Decimal(a) for _, a in items)
+        db.add(Invoice(
+            number=f"INV-{i:03d}", client_id=client_.id, status=status, issue_date=issued, due_date=due,
+            total_amount=total, vat_amount=(total * 22 / 122).quantize(Decimal("0.01")), created_by=admin.id,
+            items=[InvoiceItem(description="x", item_type=t, unit_price=a, total=a) for t, a in items],
+        ))
+    db.commit()
+    return admin, eng, other, cl, cl2, part, main, van
+
+
+class TestEngineerUtilization:
+    def test_report(self, client, db, seeded):
+        admin, eng, other, *_ = seeded
+        hdrs = auth_headers(admin.id, admin.roles)
+        body = client.get(f"{URL}/engineers?{MARCH}", headers=hdrs).json()
+        assert body["capacity_hours"] == 22 * 8  # будни марта 2026
+        rows = {r["engineer"]: r for r in body["rows"]}
+        row = rows[eng.full_name]
+        assert (row["acts"], row["minutes"], row["hours"], row["avg_minutes"]) == (2, 180, 3.0, 90.0)
+        assert row["utilization_pct"] == round(180 * 100 / (22 * 8 * 60), 1)
+        assert rows["Второй"]["minutes"] == 30  # акт 31.03 18:00 — в периоде, апрельский — нет
+        assert [r["engineer"] for r in body["rows"]] == [eng.full_name, "Второй"]
+
+        body = client.get(f"{URL}/engineers?{MARCH}&engineer_id={other.id}&hours_per_day=4", headers=hdrs).json()
+        assert [r["engineer_id"] for r in body["rows"]] == [other.id] and body["capacity_hours"] == 88
+
+    def test_working_minutes(self):
+        assert report_service.working_minutes(date(2026, 3, 7), date(2026, 3, 8), 8) == 0  # выходные
+        assert report_service.working_minutes(date(2026, 3, 2), date(2026, 3, 6), 8) == 5 * 480
+
+
+class TestPartsConsumption:
+    def test_by_part_and_warehouse(self, client, db, seeded):
+        admin, *_, part, main, van = seeded
+        hdrs = auth_headers(admin.id, admin.roles)
+        rows = client.get(f"{URL}/parts?{MARCH}", headers=hdrs).json()["rows"]
+        got = [(r["sku"], r["warehouse"], r["acts"], Decimal(r["quantity"]), Decimal(r["amount"])) for r in rows]
+        assert got == [
+            ("P-1", "Основной", 2, 5, 2500),
+            ("P-1", "Машина", 1, 1, 500),
+            ("P-2", "Основной", 1, 1, 300),
+        ]
+        url = f"{URL}/parts?{MARCH}&warehouse_id={van.id}&part_id={part.id}"
+        rows = client.get(url, headers=hdrs).json()["rows"]
+        assert [(r["warehouse_id"], r["acts"]) for r in rows] == [(van.id, 1)]
+
+
+class TestRevenue:
+    def test_by_client_and_month(self, client, db, seeded):
+        admin, _, _, cl, cl2, *_ = seeded
+        rows = client.get(f"{URL}/revenue?date_from=2026-02-01&date_to=2026-03-31",
+                          headers=auth_headers(admin.id, admin.roles)).json()["rows"]
+        got = {(r["client"], r["month"]): {k: Decimal(r[k]) for k in
+               ("total", "services", "parts", "paid", "outstanding", "overdue")} | {"invoices": r["invoices"]}
+               for r in rows}
+        assert [(r["year"], r["month"]) for r in rows] == [(2026, 2), (2026, 3), (2026, 3)]
+        assert got[(cl.name, 3)] == {"invoices": 2, "total": 2000, "services": 1500, "parts": 500, "paid": 1500,
+                                     "outstanding": 500, "overdue": 0}
+        assert got[(cl.name, 2)] == {"invoices": 1, "total": 800, "services": 0, "parts": 800, "paid": 0,
+                                     "outstanding": 800, "overdue": 800}
+        assert got[(cl2.name, 3)]["invoices"] == 1  # черновик и отменённый не учитываются
+        assert got[(cl2.name, 3)]["overdue"] == 250
+
+    def test_roles(self, client, db, seeded):
+        accountant = make_user(db, email="acc@test.com", roles=["accountant"])
+        eng = seeded[1]
+        acc_hdrs = auth_headers(accountant.id, accountant.roles)
+        assert client.get(f"{URL}/revenue?{MARCH}", headers=acc_hdrs).status_code == 200
+        assert client.get(f"{URL}/revenue?{MARCH}", headers=auth_headers(eng.id, eng.roles)).status_code == 403
+        assert client.get(f"{URL}/engineers?{MARCH}", headers=auth_headers(eng.id, eng.roles)).status_code == 403
+
+
+class TestQueries:
+    @pytest.mark.parametrize("report, index", [
+        (lambda: report_service.engineer_utilization(date(2026, 3, 1), date(2026, 3, 31), 10560),
+         "ix_work_acts_created_engineer"),
+        (lambda: report_service.parts_consumption(date(2026, 3, 1), date(2026, 3, 31)),
+         "ix_work_acts_created_engineer"),
+        (lambda: report_service.revenue(date(2026, 3, 1), date(2026, 3, 31)), "ix_invoices_issue_client"),
+    ])
+    def test_single_indexed_query(self, db, seeded, report, index):
+        captured = []
+
+        def _capture(conn, cursor, statement, parameters, context, executemany):
+            captured.append((statement, parameters))
+
+        event.listen(engine, "before_cursor_execute", _capture)
+        try:
+            assert report_service.table_rows(db, report())
+        finally:
+            event.remove(engine, "before_cursor_execute", _capture)
+        assert len(captured) == 1
+        raw = engine.raw_connection()
+        try:
+            cur = raw.cursor()
+            cur.execute(f"EXPLAIN QUERY PLAN {captured[0][0]}", captured[0][1])
+            plan = [row[-1] for row in cur.fetchall()]
+        finally:
+            raw.close()
+        assert any(index in line for line in plan), plan
+
+
+class TestExport:
+    def test_xlsx(self, client, db, seeded):
+        from openpyxl import load_workbook
+
+        admin = seeded[0]
+        res = client.get(f"{URL}/parts/export/xlsx?{MARCH}", headers=auth_headers(admin.id, admin.roles))
+        assert res.status_code == 200
+        ws = load_workbook(BytesIO(res.content))["Расход запчастей"]
+        rows = list(ws.iter_rows(values_only=True))
+        assert rows[0] == ("Артикул", "Запчасть", "Склад", "Актов", "Количество", "Сумма") and ws["A1"].font.bold
+        assert rows[1][0] == "P-1" and rows[1][2:] == ("Основной", 2, 5, 2500)
+
+    def test_csv(self, client, db, seeded):
+        admin = seeded[0]
+        res = client.get(f"{URL}/engineers/export/csv?{MARCH}", headers=auth_headers(admin.id, admin.roles))
+        assert res.headers["content-type"].startswith("text/csv")
+        rows = list(csv.reader(StringIO(res.text)))
+        assert rows[0][:3] == ["Инженер", "Актов", "Минут"] and len(rows) == 3
+        assert client.get(f"{URL}/engineers/export/pdf?{MARCH}",
+                          headers=auth_headers(admin.id, admin.roles)).status_code == 422
+
+    def test_csv_written_before_session_closes(self, client, db, seeded):
+        """Тело ответа отдаётся после закрытия сессии запроса — запросов к базе в этот момент быть не должно."""
+        from app.core.database import get_read_db
+        from app.main import app
+
+        admin = seeded[0]
+        state = {"closed": False, "late": 0}
+
+        def read_db():
+            try:
+                yield db
+            finally:
+                state["closed"] = True
+
+        def count_late(*_):
+            state["late"] += state["closed"]
+
+        previous = app.dependency_overrides[get_read_db]
+        app.dependency_overrides[get_read_db] = read_db
+        event.listen(engine, "before_cursor_execute", count_late)
+        try:
+            res = client.get(f"{URL}/engineers/export/csv?{MARCH}", headers=auth_headers(admin.id, admin.roles))
+        finally:
+            event.remove(engine, "before_cursor_execute", count_late)
+            app.dependency_overrides[get_read_db] = previous
+        assert res.status_code == 200 and state["closed"] and state["late"] == 0
+        assert len(list(csv.reader(StringIO(res.text)))) == 3
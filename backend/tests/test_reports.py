@@ -0,0 +1,156 @@
+"""
+Tests — /api/v1/reports/tickets, app/services/reports.py
+Covers: сводка одним GROUP BY (разрезы, SLA по новым и старым полям, среднее
+время решения), фильтры периода / инженера / клиента, потоковая выгрузка
+XLSX из узкой проекции пачками.
+"""
+from datetime import date, datetime, timedelta
+from io import BytesIO
+
+import pytest
+from sqlalchemy import event
+
+from app.models import Ticket
+from app.services import reports as report_service
+from tests.conftest import (
+    engine, make_admin, make_engineer, auth_headers, make_client, make_equipment_model, make_equipment,
+)
+
+URL = "/api/v1/reports/tickets"
+DAY = datetime(2026, 3, 10, 9, 0)
+PERIOD = "date_from=2026-03-01&date_to=2026-03-31"
+
+
+@pytest.fixture
+def seeded(db):
+    """Шесть заявок марта и одна апрельская (вне периода)."""
+    admin = make_admin(db)
+    eng = make_engineer(db)
+    cl = make_client(db)
+    other = make_client(db, name="Другой")
+    eq = make_equipment(db, cl.id, make_equipment_model(db).id)
+    specs = [
+        # (клиент, инженер, тип, приоритет, статус, поля SLA, часов до закрытия)
+        (cl, eng, "repair", "high", "closed",
+         dict(sla_reaction_deadline=DAY, sla_resolution_deadline=DAY, sla_resolution_violated=True), 10),
+        (cl, eng, "repair", "medium", "completed",
+         dict(sla_reaction_deadline=DAY, sla_resolution_deadline=DAY, sla_reaction_violated=True), 4),
+        (cl, None, "maintenance", "medium", "new",
+         dict(sla_reaction_deadline=DAY, sla_resolution_deadline=DAY), None),
+        # старая SLA-система: просроченный sla_deadline у незакрытой заявки — нарушение
+        (other, eng, "repair", "low", "in_progress", dict(sla_deadline=DAY), None),
+        (other, None, "diagnostics", "low", "cancelled", dict(sla_deadline=DAY), None),
+        (other, eng, "repair", "low", "new", {}, None),
+    ]
+    for i, (client_, engineer, type_, priority, status, sla, hours) in enumerate(specs):
+        created = DAY + timedelta(days=i)
+        db.add(Ticket(
+            number=f"T-{i:03d}", client_id=client_.id, equipment_id=eq.id, created_by=admin.id,
+            assigned_to=engineer.id if engineer else None, title="t", description="d",
+            type=type_, priority=priority, status=status, created_at=created,
+            closed_at=created + timedelta(hours=hours) if hours else None, **sla,
+        ))
+    db.add(Ticket(number="T-APR", client_id=cl.id, equipment_id=eq.id, created_by=admin.id, title="t",
+                  description="d", type="repair", priority="low", status="new", created_at=datetime(2026, 4, 2)))
+    db.commit()
+    return admin, eng, cl, other
+
+
+class TestTicketSummary:
+    def test_summary(self, client, db, seeded):
+        admin, eng, *_ = seeded
+        body = client.get(f"{URL}?{PERIOD}", headers=auth_headers(admin.id, admin.roles)).json()
+        assert body["total"] == 6
+        assert body["by_status"] == {"closed": 1, "completed": 1, "new": 2, "in_progress": 1, "cancelled": 1}
+        assert body["by_type"] == {"repair": 4, "maintenance": 1, "diagnostics": 1}
+        assert body["by_priority"] == {"high": 1, "medium": 2, "low": 3}
+        assert body["by_engineer"] == {eng.full_name: 4}
+        # реакция: 3 по новым полям (1 нарушение) + 2 по sla_deadline (1 нарушение — открытая)
+        assert body["sla_reaction_compliance_pct"] == 60.0
+        assert body["sla_resolution_compliance_pct"] == 60.0 == body["sla_compliance_pct"]
+        assert body["avg_resolution_hours"] == 7.0
+        assert (body["period_from"], body["period_to"]) == ("2026-03-01", "2026-03-31")
+
+    def test_filters(self, client, db, seeded):
+        admin, eng, cl, other = seeded
+        hdrs = auth_headers(admin.id, admin.roles)
+        body = client.get(f"{URL}?{PERIOD}&engineer_id={eng.id}", headers=hdrs).json()
+        assert body["total"] == 4
+        body = client.get(f"{URL}?{PERIOD}&client_id={other.id}", headers=hdrs).json()
+        assert (body["total"], body["avg_resolution_hours"], body["sla_reaction_compliance_pct"]) == (3, None, 50.0)
+        body = client.get(f"{URL}?date_from=2026-05-01&date_to=2026-05-31", headers=hdrs).json()
+        assert body["total"] == 0 and body["sla_compliance_pct"] is None
+
+    def test_single_grouped_query(self, db, seeded, assert_max_queries):
+        flt = report_service.TicketReportFilter(date(2026, 3, 1), date(2026, 3, 31))
+        db.expunge_all()
+        with assert_max_queries(1) as log:
+            data = report_service.ticket_summary(db, flt)
+        assert data["total"] == 6
+        assert "GROUP BY" in log.statements[0].sql
+        assert not any(isinstance(obj, Ticket) for obj in db.identity_map.values())
+
+    def test_engineer_forbidden(self, client, db, seeded):
+        eng = seeded[1]
+        assert client.get(f"{URL}?{PERIOD}", headers=auth_headers(eng.id, eng.roles)).status_code == 403
+
+
+class TestTicketExport:
+    def test_xlsx(self, client, db, seeded):
+        from openpyxl import load_workbook
+
+        admin, eng, cl, _ = seeded
+        res = client.get(f"{URL}/export/xlsx?{PERIOD}", headers=auth_headers(admin.id, admin.roles))
+        assert res.status_code == 200
+        wb = load_workbook(BytesIO(res.content))
+        rows = list(wb["Заявки"].iter_rows(values_only=True))
+        assert len(rows) == 7
+        assert rows[1] == ("T-000", "10.03.2026 09:00", cl.name, "repair", "high", "closed", eng.full_name,
+                           "Нет", "Да")
+        assert rows[3][6] is None  # без инженера — пустая ячейка
+        summary = dict(r[:2] for r in wb["Сводка"].iter_rows(values_only=True) if r[0])
+        assert summary["Всего заявок"] == 6
+
+    def test_xlsx_streams_in_batches(self, client, db, seeded, monkeypatch):
+        from openpyxl import load_workbook
+
+        from app.services import spreadsheet
+
+        admin = seeded[0]
+        monkeypatch.setattr(spreadsheet, "YIELD_PER", 4)  # 6 строк — две пачки
+        batched = []
+
+        def _capture(conn, cursor, statement, parameters, context, executemany):
+            if "FROM tickets" in statement and "tickets.number" in statement:
+                batched.append(context.execution_options.get("yield_per"))
+
+        event.listen(engine, "after_cursor_execute", _capture)
+        try:
+            with client.stream("GET", f"{URL}/export/xlsx?{PERIOD}",
+                               headers=auth_headers(admin.id, admin.roles)) as res:
+                assert res.headers["content-type"] == spreadsheet.MEDIA_TYPE
+                content = b"".join(res.iter_bytes())
+        finally:
+            event.remove(engine, "after_cursor_execute", _capture)
+        # строки заявок читаются одним запросом пачками по YIELD_PER, а не целиком
+        assert batched == [4]
+        ws = load_workbook(BytesIO(content))["Заявки"]
+        assert ws["A1"].font.bold
+        assert [r[0] for r in ws.iter_rows(min_row=2, values_only=True)] == [f"T-{i:03d}" for i in range(6)]
+
+    def test_aborted_export_removes_temp_files(self, db, seeded, tmp_path, monkeypatch):
+        import tempfile
+
+        from app.services import spreadsheet
+
+        monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+        monkeypatch.setattr(spreadsheet, "YIELD_PER", 4)
+
+        def _abort(n):
+            raise RuntimeError("задание забрал другой воркер")
+
+        flt = report_service.TicketReportFilter(date(2026, 3, 1), date(2026, 3, 31))
+        with pytest.raises(RuntimeError):
+            report_service.tickets_xlsx(db, flt, {}, progress=_abort)
+        # листы write_only-книги пишутся во временные openpyxl.* — после сбоя их не остаётся
+        assert list(tmp_path.glob("openpyxl.*")) == []
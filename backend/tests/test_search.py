@@ -0,0 +1,161 @@
+"""
+Tests — app/services/search.py, GET /api/v1/search
+Covers: токенизация, обновление индекса на flush (создание, правка, удаление),
+поиск по описанию / комментариям / серийному номеру / ИНН, ранжирование,
+видимость (client_user, инженер, внутренние комментарии), reindex_all.
+"""
+import pytest
+from sqlalchemy.dialects import mysql
+from sqlalchemy.schema import CreateTable
+
+from app.models import Client, SearchTerm, TicketComment
+from app.services.search import reindex_all, tokenize
+from tests.conftest import (
+    make_admin, make_engineer, make_client, make_client_user, make_equipment_model,
+    make_equipment, make_ticket, auth_headers,
+)
+
+
+def _search(client, hdrs, q, **params):
+    res = client.get("/api/v1/search", headers=hdrs, params={"q": q, **params})
+    assert res.status_code == 200, res.text
+    return [(hit["type"], hit["id"]) for hit in res.json()]
+
+
+@pytest.fixture
+def world(db):
+    admin = make_admin(db)
+    acme = make_client(db, name="Альфа Банк")
+    acme.inn = "7701234567"
+    other = make_client(db, name="Бета Сервис")
+    eq = make_equipment(db, acme.id, make_equipment_model(db).id, serial="NCR-55AB12")
+    t1 = make_ticket(db, acme.id, eq.id, admin.id)
+    t1.number = "T-20260301-0001"
+    db.commit()
+    t1.title = "Замена диспенсера"
+    t1.description = "Банкомат не выдаёт купюры"
+    t2 = make_ticket(db, other.id, None, admin.id)
+    t2.number = "T-20260301-0002"
+    t2.title = "Диагностика терминала"
+    db.commit()
+    return {"admin": admin, "acme": acme, "other": other, "eq": eq, "t1": t1, "t2": t2,
+            "hdrs": auth_headers(admin.id, admin.roles)}
+
+
+class TestTokenize:
+    def test_lowercase_yo_and_short_words(self):
+        assert tokenize("Ёлка в Банкомате, S/N 12") == ["елка", "банкомате", "12"]
+
+    def test_empty(self):
+        assert tokenize(None) == [] and tokenize("") == []
+
+
+class TestIndexMaintenance:
+    def test_created_objects_indexed(self, db, world):
+        terms = {t.term for t in db.query(SearchTerm).filter_by(entity_type="ticket", entity_id=world["t1"].id)}
+        assert {"замена", "диспенсера", "банкомат", "выдает", "купюры"} <= terms
+
+    def test_update_replaces_terms(self, db, world):
+        world["t1"].title = "Ремонт принтера"
+        db.commit()
+        terms = {t.term for t in db.query(SearchTerm).filter_by(entity_type="ticket", entity_id=world["t1"].id)}
+        assert "принтера" in terms and "диспенсера" not in terms
+
+    def test_unrelated_update_keeps_index(self, db, world):
+        before = db.query(SearchTerm).count()
+        world["t1"].status = "in_progress"
+        db.commit()
+        assert db.query(SearchTerm).count() == before
+
+    def test_delete_removes_terms(self, db, world):
+        comment = TicketComment(ticket_id=world["t2"].id, user_id=world["admin"].id, text="Проверить питание")
+        db.add(comment)
+        db.commit()
+        db.delete(comment)
+        db.commit()
+        assert db.query(SearchTerm).filter_by(entity_type="comment").count() == 0
+
+    def test_diacritic_pairs_are_distinct_terms(self, db, world):
+        world["t2"].description = "мой мои cafe café"
+        db.commit()
+        terms = {t.term for t in db.query(SearchTerm).filter_by(entity_type="ticket", entity_id=world["t2"].id)}
+        assert {"мой", "мои", "cafe", "café"} <= terms
+        # в MySQL utf8mb4_unicode_ci такие пары равны и дают дубликат первичного ключа
+        ddl = str(CreateTable(SearchTerm.__table__).compile(dialect=mysql.dialect()))
+        assert "term VARCHAR(64) COLLATE utf8mb4_bin NOT NULL" in ddl
+
+    def test_reindex_all_after_bulk_update(self, db, world):
+        db.query(Client).filter(Client.id == world["other"].id).update({"name": "Гамма Плюс"})
+        db.commit()
+        assert reindex_all(db) > 0
+        assert db.query(SearchTerm).filter_by(term="гамма", entity_type="client").count() == 1
+        assert db.query(SearchTerm).filter_by(term="бета").count() == 0
+
+
+class TestSearchEndpoint:
+    def test_description_and_prefix(self, client, world):
+        assert _search(client, world["hdrs"], "банкомат") == [("ticket", world["t1"].id)]
+        assert ("ticket", world["t1"].id) in _search(client, world["hdrs"], "диспенс")
+
+    def test_all_words_required(self, client, world):
+        assert _search(client, world["hdrs"], "замена терминала") == []
+
+    def test_serial_and_inn(self, client, world):
+        assert _search(client, world["hdrs"], "55ab12") == [("equipment", world["eq"].id)]
+        assert _search(client, world["hdrs"], "7701234567") == [("client", world["acme"].id)]
+
+    def test_comment_hits_roll_up_to_ticket(self, client, db, world):
+        db.add(TicketComment(ticket_id=world["t2"].id, user_id=world["admin"].id, text="Заменён блок питания"))
+        db.commit()
+        assert _search(client, world["hdrs"], "питания диагностика") == [("ticket", world["t2"].id)]
+
+    def test_ranking_by_field_weight(self, client, db, world):
+        world["t2"].description = "Возможно, нужна замена"
+        db.commit()
+        hits = _search(client, world["hdrs"], "замена")
+        assert hits == [("ticket", world["t1"].id), ("ticket", world["t2"].id)]
+
+    def test_type_filter(self, client, world):
+        assert _search(client, world["hdrs"], "альфа", type="ticket") == []
+        assert _search(client, world["hdrs"], "альфа", type="client") == [("client", world["acme"].id)]
+
+    def test_hit_titles(self, client, world):
+        res = client.get("/api/v1/search", headers=world["hdrs"], params={"q": "ncr"})
+        assert res.json()[0]["title"] == "NCR-55AB12"
+        assert res.json()[0]["subtitle"] == "NCR SelfServ 6683"
+
+    def test_soft_deleted_hidden(self, client, db, world):
+        world["t1"].is_deleted = True
+        db.commit()
+        assert _search(client, world["hdrs"], "банкомат") == []
+
+    def test_query_too_short(self, client, world):
+        res = client.get("/api/v1/search", headers=world["hdrs"], params={"q": "a"})
+        assert res.status_code == 422
+
+
+class TestSearchVisibility:
+    def test_client_user_sees_own_organisation_only(self, client, db, world):
+        portal = make_client_user(db, world["acme"].id)
+        hdrs = auth_headers(portal.id, portal.roles)
+        assert _search(client, hdrs, "диагностика") == []
+        assert _search(client, hdrs, "бета") == []
+        assert _search(client, hdrs, "банкомат") == [("ticket", world["t1"].id)]
+
+    def test_client_user_does_not_match_internal_comments(self, client, db, world):
+        db.add(TicketComment(ticket_id=world["t1"].id, user_id=world["admin"].id,
+                             text="Клиент конфликтный", is_internal=True))
+        db.commit()
+        portal = make_client_user(db, world["acme"].id)
+        assert _search(client, auth_headers(portal.id, portal.roles), "конфликтный") == []
+        assert _search(client, world["hdrs"], "конфликтный") == [("ticket", world["t1"].id)]
+
+    def test_engineer_sees_assigned_tickets_only(self, client, db, world):
+        eng = make_engineer(db)
+        world["t1"].assigned_to = eng.id
+        db.commit()
+        hdrs = auth_headers(eng.id, eng.roles)
+        assert _search(client, hdrs, "замена") == [("ticket", world["t1"].id)]
+        assert _search(client, hdrs, "диагностика") == []
+        # справочники клиентов и оборудования инженеру видны целиком
+        assert _search(client, hdrs, "бета") == [("client", world["other"].id)]
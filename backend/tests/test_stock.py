@@ -0,0 +1,394 @@
+"""
+Tests — app/services/stock.py
+Covers: чистые дельты, блокировка одним упорядоченным SELECT ... FOR UPDATE,
+нехватка без частичных изменений, SparePart.quantity по складам компании,
+списание и возврат остатков актом выполненных работ, журнал движений
+(приход, передача, корректировка), остаток на дату, сверка и пересборка
+проекции warehouse_stock, кэш SparePart.quantity (смена типа склада,
+пакетное исправление расхождений).
+"""
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import event, text, update
+
+from app.models import (
+    PartsTransfer, PartsTransferItem, SparePart, StockMovement, StockReceipt, StockReceiptItem,
+    Warehouse, WarehouseStock,
+)
+from app.core import warehouse_cache
+from app.services import stock as stock_service
+from tests.conftest import (
+    engine, make_admin, auth_headers, make_client, make_equipment_model, make_equipment, make_ticket,
+    make_spare_part,
+)
+
+
+def _warehouses(db):
+    company = Warehouse(name="Основной", type="company")
+    bank = Warehouse(name="Склад банка", type="bank")
+    db.add_all([company, bank])
+    db.commit()
+    return company, bank
+
+
+def _put(db, warehouse, part, qty):
+    db.add(WarehouseStock(warehouse_id=warehouse.id, part_id=part.id, quantity=qty))
+    db.commit()
+
+
+def _qty(db, warehouse, part):
+    return db.query(WarehouseStock.quantity).filter_by(warehouse_id=warehouse.id, part_id=part.id).scalar()
+
+
+class TestNetDeltas:
+    def test_nets_and_sorts(self):
+        lines = [(2, 1, -3), (1, 5, 2), (2, 1, 3), (1, 5, 1), (1, 2, -1)]
+        assert stock_service.net_deltas(lines) == {(1, 2): -1, (1, 5): 3}
+        assert list(stock_service.net_deltas(lines)) == [(1, 2), (1, 5)]
+
+
+class TestApplyMovements:
+    def test_applies_and_syncs_company_part_quantity(self, db):
+        company, bank = _warehouses(db)
+        part = make_spare_part(db, quantity=10)
+        _put(db, company, part, 10)
+        _put(db, bank, part, 4)
+
+        stock_service.apply_movements(db, [(company.id, part.id, -3), (bank.id, part.id, -4)], "adjust")
+        db.commit()
+        assert (_qty(db, company, part), _qty(db, bank, part)) == (7, 0)
+        db.expire_all()
+        assert db.get(SparePart, part.id).quantity == 7
+
+    def test_creates_missing_row_on_income(self, db):
+        company, _ = _warehouses(db)
+        part = make_spare_part(db, quantity=0)
+        stock_service.apply_movements(db, [(company.id, part.id, 5)], "receipt")
+        db.commit()
+        assert _qty(db, company, part) == 5
+
+    def test_insufficient_changes_nothing(self, db):
+        company, bank = _warehouses(db)
+        a = make_spare_part(db, sku="A", quantity=5)
+        b = make_spare_part(db, sku="B", quantity=0)
+        _put(db, company, a, 5)
+        _put(db, bank, b, 1)
+
+        with pytest.raises(stock_service.InsufficientStock) as exc:
+            stock_service.apply_movements(db, [(company.id, a.id, -2), (bank.id, b.id, -3)], "adjust")
+        assert (exc.value.warehouse_name, exc.value.available, exc.value.requested) == ("Склад банка", 1, 3)
+        assert "доступно 1 шт. «Test Part», запрошено 3" in str(exc.value)
+        db.rollback()
+        assert _qty(db, company, a) == 5
+        assert db.query(StockMovement).count() == 0
+
+    def test_zero_net_is_noop(self, db, assert_max_queries):
+        company, _ = _warehouses(db)
+        part = make_spare_part(db)
+        _put(db, company, part, 1)
+        lines = [(company.id, part.id, 5), (company.id, part.id, -5)]
+        with assert_max_queries(0):
+            assert stock_service.apply_movements(db, lines, "adjust") == {}
+
+    def test_single_ordered_lock_and_bulk_writes(self, db, assert_max_queries):
+        company, bank = _warehouses(db)
+        parts = [make_spare_part(db, sku=f"P{i}", quantity=10) for i in range(6)]
+        for part in parts:
+            _put(db, company, part, 10)
+            _put(db, bank, part, 10)
+        db.expire_all()
+
+        lines = [(wh.id, part.id, -1) for part in reversed(parts) for wh in (bank, company)]
+        # блокировка, склады, INSERT журнала, UPDATE остатков, UPDATE SparePart
+        with assert_max_queries(5) as log:
+            stock_service.apply_movements(db, lines, "adjust")
+        lock = log.statements[0].sql
+        assert "warehouse_stock" in lock and "ORDER BY warehouse_stock.warehouse_id, warehouse_stock.part_id" in lock
+        db.commit()
+        assert {_qty(db, wh, p) for p in parts for wh in (company, bank)} == {9}
+
+
+class TestWorkActStock:
+    @pytest.fixture
+    def setup(self, client, db):
+        admin = make_admin(db)
+        cl = make_client(db)
+        eq = make_equipment(db, cl.id, make_equipment_model(db).id)
+        ticket = make_ticket(db, cl.id, eq.id, admin.id)
+        db.execute(text("UPDATE tickets SET status='in_progress' WHERE id=:id"), {"id": ticket.id})
+        company, _ = _warehouses(db)
+        part = make_spare_part(db, quantity=10)
+        _put(db, company, part, 10)
+        return ticket, company, part, auth_headers(admin.id, admin.roles)
+
+    @staticmethod
+    def _items(part, warehouse, qty):
+        return [{"item_type": "part", "part_id": part.id, "warehouse_id": warehouse.id, "name": "Ролик",
+                 "quantity": str(qty), "unit": "шт", "unit_price": "100.00"}]
+
+    def test_create_deducts(self, client, db, setup):
+        ticket, company, part, hdrs = setup
+        r = client.post(f"/api/v1/tickets/{ticket.id}/work-act",
+                        json={"work_description": "x", "items": self._items(part, company, 3)}, headers=hdrs)
+        assert r.status_code == 201
+        assert _qty(db, company, part) == 7
+        assert db.get(SparePart, part.id).quantity == 7
+
+    def test_create_insufficient(self, client, db, setup):
+        ticket, company, part, hdrs = setup
+        r = client.post(f"/api/v1/tickets/{ticket.id}/work-act",
+                        json={"work_description": "x", "items": self._items(part, company, 11)}, headers=hdrs)
+        assert r.status_code == 422
+        assert r.json()["error"] == "INSUFFICIENT_STOCK"
+        assert _qty(db, company, part) == 10
+
+    @pytest.mark.parametrize("new_qty, left", [(5, 5), (3, 7), (1, 9)])
+    def test_edit_applies_net_delta(self, client, db, setup, new_qty, left):
+        ticket, company, part, hdrs = setup
+        client.post(f"/api/v1/tickets/{ticket.id}/work-act",
+                    json={"work_description": "x", "items": self._items(part, company, 3)}, headers=hdrs)
+        r = client.patch(f"/api/v1/tickets/{ticket.id}/work-act",
+                         json={"items": self._items(part, company, new_qty)}, headers=hdrs)
+        assert r.status_code == 200
+        assert _qty(db, company, part) == left
+        assert db.get(SparePart, part.id).quantity == left
+
+    def test_edit_can_use_returned_stock(self, client, db, setup):
+        """Возвращаемые позиции засчитываются при проверке: после списания 3 на складе 7, но правка до 10 проходит."""
+        ticket, company, part, hdrs = setup
+        client.post(f"/api/v1/tickets/{ticket.id}/work-act",
+                    json={"work_description": "x", "items": self._items(part, company, 3)}, headers=hdrs)
+        r = client.patch(f"/api/v1/tickets/{ticket.id}/work-act",
+                         json={"items": self._items(part, company, 10)}, headers=hdrs)
+        assert r.status_code == 200
+        assert _qty(db, company, part) == 0
+        r = client.patch(f"/api/v1/tickets/{ticket.id}/work-act",
+                         json={"items": self._items(part, company, 11)}, headers=hdrs)
+        assert r.status_code == 422
+
+    def test_work_act_journal(self, client, db, setup):
+        ticket, company, part, hdrs = setup
+        act = client.post(f"/api/v1/tickets/{ticket.id}/work-act",
+                          json={"work_description": "x", "items": self._items(part, company, 3)}, headers=hdrs).json()
+        client.patch(f"/api/v1/tickets/{ticket.id}/work-act",
+                     json={"items": self._items(part, company, 5)}, headers=hdrs)
+        rows = db.query(StockMovement).order_by(StockMovement.id).all()
+        assert [(m.reason, m.doc_id, m.delta, m.balance_after) for m in rows] == [
+            ("work_act", act["id"], -3, 7), ("work_act", act["id"], -2, 5),
+        ]
+
+
+class TestJournal:
+    def test_rows_per_net_movement(self, db):
+        company, bank = _warehouses(db)
+        part = make_spare_part(db, quantity=10)
+        _put(db, company, part, 10)
+        admin = make_admin(db)
+        stock_service.apply_movements(
+            db, [(company.id, part.id, -4), (bank.id, part.id, 4), (company.id, part.id, 1)], "transfer",
+            doc_id=7, user_id=admin.id,
+        )
+        db.commit()
+        rows = db.query(StockMovement).order_by(StockMovement.warehouse_id).all()
+        assert [(m.warehouse_id, m.delta, m.balance_after, m.reason, m.doc_id, m.user_id) for m in rows] == [
+            (company.id, -3, 7, "transfer", 7, admin.id), (bank.id, 4, 4, "transfer", 7, admin.id),
+        ]
+
+    def test_receipt_post(self, client, db):
+        admin = make_admin(db)
+        company, _ = _warehouses(db)
+        part = make_spare_part(db, quantity=0)
+        receipt = StockReceipt(receipt_number="RCP-2026-0001", warehouse_id=company.id, receipt_date=date.today(),
+                               created_by=admin.id, items=[StockReceiptItem(part_id=part.id, quantity=4, unit_price=250)])
+        db.add(receipt)
+        db.commit()
+        r = client.post(f"/api/v1/stock-receipts/{receipt.id}/post", headers=auth_headers(admin.id, admin.roles))
+        assert r.status_code == 200
+        stock = db.query(WarehouseStock).one()
+        assert (stock.quantity, str(stock.unit_price_snapshot)) == (4, "250.00")
+        assert db.get(SparePart, part.id).quantity == 4
+        m = db.query(StockMovement).one()
+        assert (m.reason, m.doc_id, m.delta, m.balance_after) == ("receipt", receipt.id, 4, 4)
+
+    def test_transfer_post(self, client, db):
+        admin = make_admin(db)
+        company, bank = _warehouses(db)
+        part = make_spare_part(db, quantity=5)
+        _put(db, company, part, 5)
+        transfer = PartsTransfer(transfer_number="TRF-2026-0001", from_warehouse_id=company.id,
+                                 to_warehouse_id=bank.id, transfer_date=date.today(), created_by=admin.id,
+                                 items=[PartsTransferItem(part_id=part.id, quantity=2, unit_price_snapshot=300)])
+        db.add(transfer)
+        db.commit()
+        hdrs = auth_headers(admin.id, admin.roles)
+        assert client.post(f"/api/v1/parts-transfers/{transfer.id}/post", headers=hdrs).status_code == 200
+        assert (_qty(db, company, part), _qty(db, bank, part)) == (3, 2)
+        assert db.get(SparePart, part.id).quantity == 3
+        dst = db.query(WarehouseStock).filter_by(warehouse_id=bank.id).one()
+        assert str(dst.unit_price_snapshot) == "300.00"
+        assert sorted(m.delta for m in db.query(StockMovement).filter_by(reason="transfer", doc_id=transfer.id)) == [-2, 2]
+
+    def test_transfer_insufficient(self, client, db):
+        admin = make_admin(db)
+        company, bank = _warehouses(db)
+        part = make_spare_part(db, quantity=1)
+        _put(db, company, part, 1)
+        transfer = PartsTransfer(transfer_number="TRF-2026-0001", from_warehouse_id=company.id,
+                                 to_warehouse_id=bank.id, transfer_date=date.today(), created_by=admin.id,
+                                 items=[PartsTransferItem(part_id=part.id, quantity=2)])
+        db.add(transfer)
+        db.commit()
+        r = client.post(f"/api/v1/parts-transfers/{transfer.id}/post", headers=auth_headers(admin.id, admin.roles))
+        assert r.status_code == 422
+        assert r.json()["error"] == "INSUFFICIENT_STOCK"
+
+    def test_adjust_with_company_stock(self, client, db):
+        admin = make_admin(db)
+        company, _ = _warehouses(db)
+        part = make_spare_part(db, quantity=10)
+        _put(db, company, part, 10)
+        r = client.post(f"/api/v1/parts/{part.id}/adjust", headers=auth_headers(admin.id, admin.roles),
+                        json={"delta": -4, "reason": "Инвентаризация"})
+        assert r.status_code == 200 and r.json()["quantity"] == 6
+        assert _qty(db, company, part) == 6
+        m = db.query(StockMovement).one()
+        assert (m.reason, m.delta, m.note, m.user_id) == ("adjust", -4, "Инвентаризация", admin.id)
+
+
+class TestPointInTime:
+    @pytest.fixture
+    def history(self, db):
+        """Остаток основного склада: 10 (1 марта), 6 (5 марта), 9 (10 марта)."""
+        company, _ = _warehouses(db)
+        part = make_spare_part(db, quantity=0)
+        for day, delta in ((1, 10), (5, -4), (10, 3)):
+            stock_service.apply_movements(db, [(company.id, part.id, delta)], "adjust")
+            db.execute(update(StockMovement).where(StockMovement.created_at > datetime(2026, 3, 31))
+                       .values(created_at=datetime(2026, 3, day, 12)))
+        db.commit()
+        return company, part
+
+    @pytest.mark.parametrize("at, expected", [
+        (datetime(2026, 2, 28), {}),
+        (datetime(2026, 3, 1, 12), 10),
+        (datetime(2026, 3, 7), 6),
+        (datetime(2026, 4, 1), 9),
+    ])
+    def test_balances_at(self, db, history, at, expected):
+        company, part = history
+        balances = stock_service.balances_at(db, company.id, at)
+        assert balances == ({part.id: expected} if expected else {})
+
+    def test_endpoint(self, client, db, history):
+        company, part = history
+        admin = make_admin(db)
+        r = client.get(f"/api/v1/warehouses/{company.id}/stock-at?at=2026-03-07T00:00:00",
+                       headers=auth_headers(admin.id, admin.roles))
+        assert r.json() == [{"part_id": part.id, "part_sku": "SKU-001", "part_name": "Test Part", "quantity": 6}]
+
+    def test_indexed_read(self, db, history):
+        warehouse_id = history[0].id
+        captured = []
+
+        def _capture(conn, cursor, statement, parameters, context, executemany):
+            captured.append((statement, parameters))
+
+        event.listen(engine, "before_cursor_execute", _capture)
+        try:
+            stock_service.balances_at(db, warehouse_id, datetime(2026, 3, 7))
+        finally:
+            event.remove(engine, "before_cursor_execute", _capture)
+        with engine.connect() as conn:
+            conn.execute(text("ANALYZE"))
+            plan = [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {captured[0][0]}", captured[0][1])]
+        # одна запись журнала на пару — поиск по всему индексу, без группировки истории склада
+        assert any("ix_stock_movements_wh_part_created (warehouse_id=? AND part_id=? AND created_at<?)" in line
+                   for line in plan), plan
+        assert not any("GROUP BY" in line for line in plan), plan
+
+    def test_journal_endpoint(self, client, db, history):
+        company, part = history
+        admin = make_admin(db)
+        hdrs = auth_headers(admin.id, admin.roles)
+        body = client.get(f"/api/v1/warehouses/stock/movements?part_id={part.id}&date_from=2026-03-02T00:00:00",
+                          headers=hdrs).json()
+        assert [(m["delta"], m["balance_after"]) for m in body["items"]] == [(3, 9), (-4, 6)]
+        body = client.get("/api/v1/warehouses/stock/movements?size=2&cursor=", headers=hdrs).json()
+        assert len(body["items"]) == 2 and body["next_cursor"]
+
+
+class TestVerifyRebuild:
+    def test_detects_and_repairs_drift(self, db):
+        company, bank = _warehouses(db)
+        a = make_spare_part(db, sku="A", quantity=0)
+        b = make_spare_part(db, sku="B", quantity=0)
+        stock_service.apply_movements(db, [(company.id, a.id, 5), (bank.id, b.id, 2)], "receipt")
+        db.commit()
+        assert stock_service.verify_balances(db) == []
+
+        # правка в обход журнала и потерянная строка проекции
+        db.execute(update(WarehouseStock).where(WarehouseStock.part_id == a.id).values(quantity=50))
+        db.query(WarehouseStock).filter(WarehouseStock.part_id == b.id).delete()
+        db.commit()
+        assert stock_service.verify_balances(db) == [(company.id, a.id, 50, 5), (bank.id, b.id, 0, 2)]
+
+        assert stock_service.rebuild_balances(db) == 2
+        assert stock_service.verify_balances(db) == []
+        assert (_qty(db, company, a), _qty(db, bank, b)) == (5, 2)
+
+
+class TestPartQuantityCache:
+    def test_reconcile_repairs_drift(self, db):
+        company, bank = _warehouses(db)
+        a = make_spare_part(db, sku="A", quantity=3)      # на складах 3 — совпадает
+        b = make_spare_part(db, sku="B", quantity=10)     # на складах компании 4
+        c = make_spare_part(db, sku="C", quantity=7)      # только на складе банка
+        _put(db, company, a, 3)
+        _put(db, company, b, 4)
+        _put(db, bank, c, 7)
+        assert stock_service.part_quantity_drift(db) == [(b.id, 10, 4), (c.id, 7, 0)]
+
+        assert stock_service.reconcile_part_quantities(db, batch_size=1) == 2
+        assert stock_service.part_quantity_drift(db) == []
+        db.expire_all()
+        assert [db.get(SparePart, p.id).quantity for p in (a, b, c)] == [3, 4, 0]
+
+    def test_warehouse_type_change_refreshes_cache(self, client, db):
+        admin = make_admin(db)
+        company, bank = _warehouses(db)
+        part = make_spare_part(db, quantity=2)
+        _put(db, company, part, 2)
+        _put(db, bank, part, 5)
+        r = client.put(f"/api/v1/warehouses/{bank.id}", headers=auth_headers(admin.id, admin.roles),
+                       json={"type": "company"})
+        assert r.status_code == 200
+        db.expire_all()
+        assert db.get(SparePart, part.id).quantity == 7
+        assert stock_service.part_quantity_drift(db) == []
+
+    def test_stale_directory_type_ignored_for_existing_rows(self, db):
+        company, bank = _warehouses(db)
+        part = make_spare_part(db, quantity=0)
+        _put(db, bank, part, 5)
+        warehouse_cache.warehouses.get_many(db, [bank.id])  # справочник процесса помнит type=bank
+        db.execute(update(Warehouse).where(Warehouse.id == bank.id).values(type="company"))
+        stock_service.refresh_part_quantities(db, [part.id])
+        db.commit()
+        stock_service.apply_movements(db, [(bank.id, part.id, -2)], "adjust")
+        db.commit()
+        db.expire_all()
+        assert db.get(SparePart, part.id).quantity == 3
+        assert stock_service.part_quantity_drift(db) == []
+
+    def test_company_warehouse_for(self, db):
+        company, bank = _warehouses(db)
+        second = Warehouse(name="Второй", type="company")
+        db.add(second)
+        db.commit()
+        part = make_spare_part(db, quantity=0)
+        assert stock_service.company_warehouse_for(db, part.id) == company.id
+        _put(db, company, part, 1)
+        _put(db, second, part, 6)
+        _put(db, bank, part, 50)
+        assert stock_service.company_warehouse_for(db, part.id) == second.id
@@ -0,0 +1,192 @@
+"""
+Tests — app/services/suggest.py, GET /api/v1/search/suggest
+Covers: триграммы, поиск по префиксу (с 1 символа) и подстроке (с 3),
+порядок выдачи и LIMIT в SQL, обновление триграмм и их частот на flush, видимость для client_user,
+запрет артикулов для портала, rebuild_all, объём в несколько тысяч строк
+и план запроса по префиксу.
+"""
+import time
+
+import pytest
+from sqlalchemy import event, func, insert
+from sqlalchemy.dialects import mysql
+from sqlalchemy.schema import CreateTable
+
+from app.models import Equipment, SuggestGram, SuggestGramCount
+from app.services.suggest import rebuild_all, suggest, value_grams
+from tests.conftest import (
+    engine, make_admin, make_client, make_client_user, make_equipment_model, make_equipment,
+    make_spare_part, auth_headers,
+)
+
+
+def _suggest(client, hdrs, field, q, **params):
+    res = client.get("/api/v1/search/suggest", headers=hdrs, params={"field": field, "q": q, **params})
+    assert res.status_code == 200, res.text
+    return [hit["value"] for hit in res.json()]
+
+
+@pytest.fixture
+def world(db):
+    admin = make_admin(db)
+    acme = make_client(db, name="Альфа Банк")
+    other = make_client(db, name="Бета Банк")
+    model = make_equipment_model(db)
+    for serial, owner in [("NCR-55AB12", acme), ("NCR-55AB1", acme), ("WN-1155AB", acme), ("NCR-7788", other)]:
+        make_equipment(db, owner.id, model.id, serial=serial)
+    return {"admin": admin, "acme": acme, "other": other, "model": model,
+            "hdrs": auth_headers(admin.id, admin.roles)}
+
+
+def test_value_grams_normalized():
+    assert value_grams("AbЁ1") == {"abе", "bе1"}
+
+
+class TestSuggest:
+    def test_short_prefix(self, client, world):
+        assert _suggest(client, world["hdrs"], "serial", "n") == ["NCR-7788", "NCR-55AB1", "NCR-55AB12"]
+        assert _suggest(client, world["hdrs"], "serial", "wn") == ["WN-1155AB"]
+        # два символа из середины значения — не префикс, подстрока ищется от трёх
+        assert _suggest(client, world["hdrs"], "serial", "55") == []
+
+    def test_prefix_before_substring(self, client, db, world):
+        make_equipment(db, world["acme"].id, world["model"].id, serial="55AB-999999")
+        assert _suggest(client, world["hdrs"], "serial", "55ab") == [
+            "55AB-999999", "NCR-55AB1", "WN-1155AB", "NCR-55AB12",
+        ]
+
+    def test_substring(self, client, world):
+        assert _suggest(client, world["hdrs"], "serial", "5ab1") == ["NCR-55AB1", "NCR-55AB12"]
+        assert _suggest(client, world["hdrs"], "serial", "155ab") == ["WN-1155AB"]
+
+    def test_case_and_limit(self, client, world):
+        assert _suggest(client, world["hdrs"], "serial", "NCR", limit=2) == ["NCR-7788", "NCR-55AB1"]
+
+    def test_client_names_cyrillic(self, client, world):
+        assert _suggest(client, world["hdrs"], "client", "банк") == ["Бета Банк", "Альфа Банк"]
+        assert _suggest(client, world["hdrs"], "client", "аль") == ["Альфа Банк"]
+
+    def test_order_and_limit_in_sql(self, client, db, world):
+        # больше limit * 3 совпадений по префиксу; самое короткое добавлено последним (наибольший id)
+        db.execute(insert(Equipment), [
+            {"client_id": world["other"].id, "model_id": world["model"].id, "serial_number": f"DBL-{i:04d}-X",
+             "status": "active", "is_deleted": False}
+            for i in range(40)
+        ])
+        db.commit()
+        rebuild_all(db)
+        make_equipment(db, world["other"].id, world["model"].id, serial="DBL-1")
+        hits = _suggest(client, world["hdrs"], "serial", "dbl", limit=3)
+        assert hits == ["DBL-1", "DBL-0000-X", "DBL-0001-X"]
+        # все триграммы «dbl-1» есть, но не подряд — такие значения не занимают места в выдаче
+        db.execute(insert(Equipment), [
+            {"client_id": world["other"].id, "model_id": world["model"].id, "serial_number": f"ZDBL-0 L-1-{i:02d}",
+             "status": "active", "is_deleted": False}
+            for i in range(40)
+        ])
+        db.commit()
+        rebuild_all(db)
+        make_equipment(db, world["other"].id, world["model"].id, serial="QDBL-1")
+        assert _suggest(client, world["hdrs"], "serial", "dbl-1", limit=3) == ["DBL-1", "QDBL-1"]
+
+    def test_like_wildcards_escaped(self, client, db, world):
+        make_spare_part(db, sku="A_B%1")
+        make_spare_part(db, sku="AXB-1")
+        assert _suggest(client, world["hdrs"], "sku", "a_b") == ["A_B%1"]
+
+    def test_sku(self, client, db, world):
+        make_spare_part(db, sku="FLT-0042")
+        make_spare_part(db, sku="BLT-0042")
+        assert _suggest(client, world["hdrs"], "sku", "0042") == ["BLT-0042", "FLT-0042"]
+
+    def test_renamed_and_deleted(self, client, db, world):
+        eq = db.query(Equipment).filter_by(serial_number="NCR-7788").one()
+        eq.serial_number = "HYO-7788"
+        db.commit()
+        assert _suggest(client, world["hdrs"], "serial", "hyo") == ["HYO-7788"]
+        assert "NCR-7788" not in _suggest(client, world["hdrs"], "serial", "ncr")
+        eq.is_deleted = True
+        db.commit()
+        assert _suggest(client, world["hdrs"], "serial", "hyo") == []
+        db.delete(eq)
+        db.commit()
+        assert db.query(SuggestGram).filter_by(entity_type="serial", entity_id=eq.id).count() == 0
+
+    def test_gram_counts_follow_flush(self, db, world):
+        def counts():
+            kept = db.query(SuggestGramCount).filter(SuggestGramCount.count != 0)
+            return {(c.entity_type, c.gram): c.count for c in kept}
+
+        def actual():
+            rows = db.query(SuggestGram.entity_type, SuggestGram.gram, func.count()).group_by(
+                SuggestGram.entity_type, SuggestGram.gram)
+            return {(kind, gram): n for kind, gram, n in rows}
+
+        assert counts()[("serial", "55a")] == 3
+        eq = db.query(Equipment).filter_by(serial_number="NCR-55AB1").one()
+        eq.serial_number = "HYO-55AB1"
+        db.delete(db.query(Equipment).filter_by(serial_number="NCR-7788").one())
+        db.commit()
+        assert counts() == actual()
+        assert ("serial", "778") not in counts() and counts()[("serial", "ncr")] == 1
+        rebuild_all(db)
+        assert counts() == actual()
+
+    def test_diacritic_grams_are_distinct(self, client, db, world):
+        make_client(db, name="Мой Сервис")
+        make_client(db, name="Мои Сервис")
+        grams = {g.gram for g in db.query(SuggestGram).filter_by(entity_type="client")}
+        assert {"мой", "мои", "ой ", "ои "} <= grams
+        assert _suggest(client, world["hdrs"], "client", "мой") == ["Мой Сервис"]
+        # в MySQL utf8mb4_unicode_ci «й» = «и»: дубликат ключа при вставке и общая частота
+        for table in (SuggestGram.__table__, SuggestGramCount.__table__):
+            assert "gram VARCHAR(3) COLLATE utf8mb4_bin NOT NULL" in str(CreateTable(table).compile(dialect=mysql.dialect()))
+
+
+class TestSuggestVisibility:
+    def test_client_user_own_equipment_only(self, client, db, world):
+        portal = make_client_user(db, world["acme"].id)
+        hdrs = auth_headers(portal.id, portal.roles)
+        assert _suggest(client, hdrs, "serial", "ncr") == ["NCR-55AB1", "NCR-55AB12"]
+        assert _suggest(client, hdrs, "client", "банк") == ["Альфа Банк"]
+
+    def test_client_user_cannot_suggest_sku(self, client, db, world):
+        portal = make_client_user(db, world["acme"].id)
+        res = client.get("/api/v1/search/suggest", headers=auth_headers(portal.id, portal.roles),
+                         params={"field": "sku", "q": "flt"})
+        assert res.status_code == 403
+
+
+def test_rebuild_after_bulk_insert_at_scale(client, db, world):
+    db.execute(insert(Equipment), [
+        {"client_id": world["other"].id, "model_id": world["model"].id, "serial_number": f"ATM-{i:06d}",
+         "status": "active", "is_deleted": False}
+        for i in range(5000)
+    ])
+    db.commit()
+    assert rebuild_all(db) >= 5000
+
+    started = time.perf_counter()
+    hits = _suggest(client, world["hdrs"], "serial", "004217")
+    elapsed = time.perf_counter() - started
+    assert hits == ["ATM-004217"]
+    assert elapsed < 1.0
+
+    # префикс из 5000 совпадений — диапазон индекса в порядке выдачи, без сортировки всей выборки
+    captured = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", _capture)
+    try:
+        assert len(suggest(db, "serial", "atm")) == 10
+    finally:
+        event.remove(engine, "before_cursor_execute", _capture)
+    raw = engine.raw_connection()
+    try:
+        plan = [row[-1] for row in raw.cursor().execute(f"EXPLAIN QUERY PLAN {captured[0][0]}", captured[0][1])]
+    finally:
+        raw.close()
+    assert any("ix_suggest_values_order" in line for line in plan), plan
+    assert not any("ORDER BY" in line and "RIGHT PART" not in line for line in plan), plan
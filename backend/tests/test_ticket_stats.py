@@ -0,0 +1,138 @@
+"""
+Tests — app/services/ticket_stats.py
+Covers: заполнение среза и сверка с расчётом по заявкам (фильтры, подпериоды),
+отчёт из среза, инкрементальный пересчёт по updated_at и по истёкшему
+sla_deadline старой SLA-системы, backfill пакетами дней, частичный backfill.
+"""
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from app.models import SystemSetting, Ticket, TicketStatsDaily
+from app.services import ticket_stats
+from app.services.reports import TicketReportFilter
+from tests.conftest import (
+    make_admin, make_engineer, make_user, auth_headers, make_client, make_equipment_model, make_equipment,
+)
+
+MARCH = TicketReportFilter(date(2026, 3, 1), date(2026, 3, 31))
+OLD = datetime(2026, 3, 20)
+STATUSES = ["new", "assigned", "in_progress", "completed", "closed", "cancelled"]
+
+
+@pytest.fixture
+def seeded(db):
+    """40 заявок за 1–5 марта: два клиента, два инженера и без инженера, новые и старые поля SLA."""
+    admin = make_admin(db)
+    engineers = [make_engineer(db), make_user(db, email="eng2@test.com", full_name="Второй", roles=["engineer"])]
+    clients = [make_client(db), make_client(db, name="Другой")]
+    eq = make_equipment(db, clients[0].id, make_equipment_model(db).id)
+    for i in range(40):
+        created = datetime(2026, 3, 1 + i % 5, 8 + i % 9, 15)
+        status = STATUSES[i % len(STATUSES)]
+        sla = (
+            dict(sla_reaction_deadline=created, sla_resolution_deadline=created,
+                 sla_reaction_violated=i % 3 == 0, sla_resolution_violated=i % 4 == 0)
+            if i % 2 else dict(sla_deadline=created + timedelta(hours=4))
+        )
+        db.add(Ticket(
+            number=f"T-{i:03d}", client_id=clients[i % 2].id, equipment_id=eq.id, created_by=admin.id,
+            assigned_to=engineers[i % 3].id if i % 3 < 2 else None, title="t", type=["repair", "maintenance"][i % 2],
+            priority=["low", "medium", "high", "critical"][i % 4], status=status, created_at=created,
+            closed_at=created + timedelta(hours=i) if status in ("completed", "closed") else None,
+            is_deleted=i == 39, **sla,
+        ))
+    db.commit()
+    db.execute(update(Ticket).values(updated_at=OLD))
+    db.commit()
+    return admin, engineers, clients
+
+
+def _touch(db, number, **values):
+    db.execute(update(Ticket).where(Ticket.number == number).values(updated_at=datetime.utcnow(), **values))
+    db.commit()
+
+
+class TestBackfill:
+    def test_matches_live_report(self, db, seeded):
+        _, engineers, clients = seeded
+        ticket_stats.backfill(db)
+        assert ticket_stats.is_ready(db)
+        for flt in (
+            MARCH,
+            TicketReportFilter(date(2026, 3, 2), date(2026, 3, 3)),
+            TicketReportFilter(date(2026, 3, 1), date(2026, 3, 31), engineer_id=engineers[1].id),
+            TicketReportFilter(date(2026, 3, 1), date(2026, 3, 31), client_id=clients[0].id),
+        ):
+            assert ticket_stats.check(db, flt) == []
+        assert ticket_stats.summary(db, MARCH)["total"] == 39
+
+    def test_commits_per_batch_and_marks_last(self, db, seeded, monkeypatch):
+        monkeypatch.setattr(ticket_stats, "_DAYS_PER_BATCH", 2)
+        # срез дня, где заявок больше нет, удаляется
+        db.add(TicketStatsDaily(day=date(2026, 2, 1), client_id=seeded[2][0].id, type="repair", priority="low",
+                                status="new", tickets=1, **dict.fromkeys(ticket_stats._MEASURES, 0)))
+        db.commit()
+        seen = []
+        commit = db.commit
+        monkeypatch.setattr(db, "commit", lambda: (seen.append(ticket_stats.is_ready(db)), commit()))
+        assert ticket_stats.backfill(db) == 6
+        # отбор дней, три пакета по два дня, водяные знаки — отдельным последним коммитом
+        assert seen == [False, False, False, False, False]
+        assert ticket_stats.is_ready(db)
+        assert date(2026, 2, 1) not in {d for d, in db.query(TicketStatsDaily.day).distinct()}
+        assert ticket_stats.check(db, MARCH) == []
+
+    def test_partial_backfill_keeps_report_live(self, db, seeded):
+        ticket_stats.backfill(db, date(2026, 3, 2), date(2026, 3, 2))
+        assert not ticket_stats.is_ready(db)
+        assert {d for d, in db.query(TicketStatsDaily.day).distinct()} == {date(2026, 3, 2)}
+
+
+class TestReportFromRollup:
+    def test_endpoint_reads_rollup(self, client, db, seeded, assert_max_queries):
+        admin = seeded[0]
+        hdrs = auth_headers(admin.id, admin.roles)
+        url = "/api/v1/reports/tickets?date_from=2026-03-01&date_to=2026-03-31"
+        live = client.get(url, headers=hdrs).json()
+        ticket_stats.backfill(db)
+        with assert_max_queries(3) as log:  # признак готовности, сводка из среза, принципал
+            rolled = client.get(url, headers=hdrs).json()
+        assert rolled == live
+        assert not any("FROM tickets" in s.sql for s in log.statements)
+
+
+class TestRefresh:
+    def test_first_refresh_backfills(self, db, seeded):
+        assert ticket_stats.refresh(db) == 5
+        assert ticket_stats.check(db, MARCH) == []
+
+    def test_only_touched_days_rebuilt(self, db, seeded):
+        ticket_stats.backfill(db)
+        assert ticket_stats.refresh(db) == 0
+        _touch(db, "T-002", status="closed", closed_at=datetime(2026, 3, 4))
+        _touch(db, "T-010", is_deleted=True)
+        assert ticket_stats.dirty_days(db, OLD + timedelta(days=1), datetime.utcnow(), datetime.utcnow()) == {
+            date(2026, 3, 1), date(2026, 3, 3),
+        }
+        assert ticket_stats.refresh(db) == 2
+        assert ticket_stats.check(db, MARCH) == []
+        assert ticket_stats.summary(db, MARCH)["total"] == 38
+
+    def test_legacy_deadline_expiry_rebuilds_day(self, db, seeded):
+        soon = datetime.utcnow() + timedelta(hours=1)
+        # открытая заявка старой SLA-системы, срок ещё не истёк
+        db.execute(update(Ticket).where(Ticket.number == "T-000").values(sla_deadline=soon, updated_at=OLD))
+        db.commit()
+        ticket_stats.backfill(db)
+        before = ticket_stats.summary(db, MARCH)["sla_reaction_compliance_pct"]
+        # срок истёк с прошлого пересчёта: сдвигаем отметку и срок в прошлое, сама заявка не менялась
+        checked = db.get(SystemSetting, ticket_stats.SLA_CHECKED_KEY)
+        checked.value = (datetime.utcnow() - timedelta(hours=2)).isoformat()
+        db.execute(update(Ticket).where(Ticket.number == "T-000")
+                   .values(sla_deadline=datetime.utcnow() - timedelta(hours=1), updated_at=OLD))
+        db.commit()
+        assert ticket_stats.refresh(db) == 1
+        assert ticket_stats.summary(db, MARCH)["sla_reaction_compliance_pct"] < before
+        assert ticket_stats.check(db, MARCH) == []
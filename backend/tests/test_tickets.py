@@ -9,6 +9,7 @@ from tests.conftest import (
     make_client, make_equipment_model, make_equipment, make_ticket,
     auth_headers,
 )
+from app.models import Ticket
 
 
 # ── Helpers ───────────────────────────────────────────────────────────────────
@@ -146,6 +147,65 @@ class TestListTickets:
         assert data["pages"] > 1
 
 
+class TestListTicketsCompact:
+    def _seed(self, db, eq, created_by, assigned_to=None, n=3):
+        for i in range(n):
+            db.add(Ticket(number=f"T-20260301-{i:04d}", client_id=eq.client_id, equipment_id=eq.id,
+                          created_by=created_by, assigned_to=assigned_to, title=f"Заявка {i}",
+                          description="Подробное описание неисправности " * 5,
+                          created_at=datetime(2026, 3, 1) + timedelta(minutes=i)))
+        db.commit()
+
+    def test_flat_rows_match_full_view(self, client, db):
+        _, svc_hdrs, _, cl, eq, eng = _setup(db)
+        self._seed(db, eq, eng.id, assigned_to=eng.id)
+        full = client.get("/api/v1/tickets", headers=svc_hdrs).json()
+        res = client.get("/api/v1/tickets", headers=svc_hdrs, params={"view": "compact"})
+        assert res.status_code == 200
+        compact = res.json()
+        assert compact["total"] == full["total"] == 3
+        assert [r["id"] for r in compact["items"]] == [t["id"] for t in full["items"]]
+        row = compact["items"][0]
+        assert row["client_name"] == cl.name
+        assert row["equipment_serial"] == eq.serial_number
+        assert row["engineer_name"] == eng.full_name
+        assert "description" not in row and "client" not in row
+
+    def test_unassigned_and_scoped(self, client, db):
+        _, svc_hdrs, eng_hdrs, _, eq, eng = _setup(db)
+        self._seed(db, eq, eng.id, n=2)
+        rows = client.get("/api/v1/tickets", headers=svc_hdrs, params={"view": "compact"}).json()["items"]
+        assert {r["engineer_name"] for r in rows} == {None}
+        own = client.get("/api/v1/tickets", headers=eng_hdrs, params={"view": "compact"}).json()
+        assert own["items"] == []
+
+    def test_cursor_mode(self, client, db):
+        _, svc_hdrs, _, _, eq, eng = _setup(db)
+        self._seed(db, eq, eng.id, n=3)
+        page = client.get("/api/v1/tickets", headers=svc_hdrs,
+                          params={"view": "compact", "size": 2, "cursor": ""}).json()
+        assert len(page["items"]) == 2 and page["next_cursor"]
+        rest = client.get("/api/v1/tickets", headers=svc_hdrs,
+                          params={"view": "compact", "size": 2, "cursor": page["next_cursor"]}).json()
+        assert len(rest["items"]) == 1 and rest["next_cursor"] is None
+
+    def test_payload_much_smaller(self, client, db):
+        _, svc_hdrs, _, _, eq, eng = _setup(db)
+        self._seed(db, eq, eng.id, assigned_to=eng.id, n=200)
+        params = {"size": 200}
+        full = client.get("/api/v1/tickets", headers=svc_hdrs, params=params)
+        compact = client.get("/api/v1/tickets", headers=svc_hdrs, params={**params, "view": "compact"})
+        assert len(compact.json()["items"]) == 200
+        assert len(compact.content) * 5 < len(full.content)
+
+    def test_openapi_lists_both_item_schemas(self, client):
+        schema = client.get("/openapi.json").json()
+        content = schema["paths"]["/api/v1/tickets"]["get"]["responses"]["200"]["content"]["application/json"]
+        page = content["schema"]["$ref"].rsplit("/", 1)[-1]
+        items = schema["components"]["schemas"][page]["properties"]["items"]["items"]
+        assert {ref["$ref"].rsplit("/", 1)[-1] for ref in items["anyOf"]} == {"TicketResponse", "TicketListRow"}
+
+
 # ── Assign engineer ───────────────────────────────────────────────────────────
 
 class TestAssignTicket:
@@ -605,6 +665,166 @@ class TestTicketFilesDownload:
         assert res.status_code == 404
 
 
+class TestTicketFilesStorage:
+    """Вложения хранятся в файловом хранилище по sha256, а не в BLOB."""
+
+    def _ticket(self, client, db):
+        _, svc_hdrs, _, cl, eq, _ = _setup(db)
+        ticket = _create_ticket(client, svc_hdrs, cl.id, eq.id)
+        return ticket, svc_hdrs
+
+    def test_upload_stores_bytes_outside_db(self, client, db):
+        import hashlib
+        from app.core.storage import get_storage
+        from app.models import TicketFile
+        ticket, svc_hdrs = self._ticket(client, db)
+        payload = b"stored outside mysql"
+        file_id = _upload(client, svc_hdrs, ticket["id"], "s.txt", payload, "text/plain").json()["id"]
+        f = db.query(TicketFile).filter(TicketFile.id == file_id).one()
+        assert f.file_data is None
+        assert f.storage_key == hashlib.sha256(payload).hexdigest()
+        assert get_storage().read(f.storage_key) == payload
+
+    def test_identical_uploads_deduplicated(self, client, db):
+        from app.models import TicketFile
+        ticket, svc_hdrs = self._ticket(client, db)
+        _upload(client, svc_hdrs, ticket["id"], "a.txt", b"same bytes", "text/plain")
+        _upload(client, svc_hdrs, ticket["id"], "b.txt", b"same bytes", "text/plain")
+        keys = {f.storage_key for f in db.query(TicketFile).all()}
+        assert len(keys) == 1
+
+    def test_large_file_roundtrip(self, client, db):
+        """Файл из нескольких чанков загрузки скачивается без искажений."""
+        ticket, svc_hdrs = self._ticket(client, db)
+        payload = bytes(range(256)) * (3 * 4096 + 7)
+        url = _upload(client, svc_hdrs, ticket["id"], "big.bin", payload, "application/octet-stream").json()["file_url"]
+        res = client.get(url, headers=svc_hdrs)
+        assert res.status_code == 200
+        assert res.content == payload
+
+    def test_oversized_upload_leaves_no_temp_files(self, client, db):
+        from app.core.storage import get_storage
+        ticket, svc_hdrs = self._ticket(client, db)
+        big = b"x" * (21 * 1024 * 1024)
+        res = _upload(client, svc_hdrs, ticket["id"], "big.bin", big, "application/octet-stream")
+        assert res.status_code == 400
+        assert list((get_storage().root / "tmp").iterdir()) == []
+
+
+class TestAttachmentListingNoBlobs:
+    """Регрессия: список вложений не выбирает file_data, число запросов не зависит от N."""
+
+    def _legacy_files(self, db, ticket_id, uploader_id, n):
+        from app.models import TicketFile
+        blob = b"\xff" * (256 * 1024)
+        for i in range(n):
+            db.add(TicketFile(ticket_id=ticket_id, uploaded_by=uploader_id, file_name=f"p{i}.jpg",
+                              file_type="image/jpeg", file_size=len(blob), file_data=blob))
+        db.commit()
+
+    def _list_statements(self, client, hdrs, ticket_id):
+        from sqlalchemy import event
+        from tests.conftest import engine
+        statements = []
+
+        def _capture(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", _capture)
+        try:
+            res = client.get(f"/api/v1/tickets/{ticket_id}/attachments", headers=hdrs)
+        finally:
+            event.remove(engine, "before_cursor_execute", _capture)
+        assert res.status_code == 200
+        return res.json(), statements
+
+    @pytest.mark.parametrize("n", [3, 30])
+    def test_listing_never_selects_file_data(self, client, db, n):
+        _, svc_hdrs, _, cl, eq, eng = _setup(db)
+        ticket = _create_ticket(client, svc_hdrs, cl.id, eq.id)
+        self._legacy_files(db, ticket["id"], eng.id, n)
+        files, statements = self._list_statements(client, svc_hdrs, ticket["id"])
+        assert len(files) == n
+        file_selects = [s for s in statements if "FROM ticket_files" in s]
+        assert len(file_selects) == 1
+        assert not any("file_data" in s for s in statements)
+
+    def test_query_count_independent_of_attachment_count(self, client, db):
+        _, svc_hdrs, _, cl, eq, eng = _setup(db)
+        small = _create_ticket(client, svc_hdrs, cl.id, eq.id)
+        large = _create_ticket(client, svc_hdrs, cl.id, eq.id)
+        self._legacy_files(db, small["id"], eng.id, 2)
+        self._legacy_files(db, large["id"], eng.id, 40)
+        _, small_stmts = self._list_statements(client, svc_hdrs, small["id"])
+        _, large_stmts = self._list_statements(client, svc_hdrs, large["id"])
+        assert len(small_stmts) == len(large_stmts)
+
+    def test_legacy_blob_still_downloadable(self, client, db):
+        _, svc_hdrs, _, cl, eq, eng = _setup(db)
+        ticket = _create_ticket(client, svc_hdrs, cl.id, eq.id)
+        self._legacy_files(db, ticket["id"], eng.id, 1)
+        files, _ = self._list_statements(client, svc_hdrs, ticket["id"])
+        res = client.get(files[0]["file_url"], headers=svc_hdrs)
+        assert res.status_code == 200
+        assert res.content == b"\xff" * (256 * 1024)
+
+
+class TestAttachmentConditionalGet:
+    """Вложения отдаются с сильным ETag (sha256) и 304 при совпадении."""
+
+    def test_etag_is_content_hash(self, client, db):
+        import hashlib
+        _, svc_hdrs, _, cl, eq, _ = _setup(db)
+        ticket = _create_ticket(client, svc_hdrs, cl.id, eq.id)
+        payload = b"immutable bytes"
+        url = _upload(client, svc_hdrs, ticket["id"], "e.txt", payload, "text/plain").json()["file_url"]
+        res = client.get(url, headers=svc_hdrs)
+        assert res.status_code == 200
+        assert res.headers["etag"] == f'"{hashlib.sha256(payload).hexdigest()}"'
+        assert "immutable" in res.headers["cache-control"]
+        assert "last-modified" in res.headers
+
+    @pytest.mark.parametrize("suffix", ["", "/download"])
+    def test_if_none_match_returns_304_without_storage(self, client, db, monkeypatch, suffix):
+        from app.api.endpoints import tickets as tickets_module
+        _, svc_hdrs, _, cl, eq, _ = _setup(db)
+        ticket = _create_ticket(client, svc_hdrs, cl.id, eq.id)
+        file_id = _upload(client, svc_hdrs, ticket["id"], "e.txt", b"cached", "text/plain").json()["id"]
+        url = f"/api/v1/tickets/{ticket['id']}/attachments/{file_id}{suffix}"
+        etag = client.get(url, headers=svc_hdrs).headers["etag"]
+
+        def _no_storage():
+            raise AssertionError("хранилище не должно читаться для 304")
+
+        monkeypatch.setattr(tickets_module, "get_storage", _no_storage)
+        res = client.get(url, headers={**svc_hdrs, "If-None-Match": etag})
+        assert res.status_code == 304
+        assert res.content == b""
+        assert res.headers["etag"] == etag
+
+    def test_if_modified_since_returns_304(self, client, db):
+        _, svc_hdrs, _, cl, eq, _ = _setup(db)
+        ticket = _create_ticket(client, svc_hdrs, cl.id, eq.id)
+        url = _upload(client, svc_hdrs, ticket["id"], "e.txt", b"dated", "text/plain").json()["file_url"]
+        last_modified = client.get(url, headers=svc_hdrs).headers["last-modified"]
+        res = client.get(url, headers={**svc_hdrs, "If-Modified-Since": last_modified})
+        assert res.status_code == 304
+
+    def test_legacy_blob_gets_content_etag(self, client, db):
+        import hashlib
+        from app.models import TicketFile
+        _, svc_hdrs, _, cl, eq, eng = _setup(db)
+        ticket = _create_ticket(client, svc_hdrs, cl.id, eq.id)
+        f = TicketFile(ticket_id=ticket["id"], uploaded_by=eng.id, file_name="old.txt",
+                       file_type="text/plain", file_size=3, file_data=b"old")
+        db.add(f)
+        db.commit()
+        url = f"/api/v1/tickets/{ticket['id']}/attachments/{f.id}"
+        etag = client.get(url, headers=svc_hdrs).headers["etag"]
+        assert etag == f'"{hashlib.sha256(b"old").hexdigest()}"'
+        assert client.get(url, headers={**svc_hdrs, "If-None-Match": etag}).status_code == 304
+
+
 # ── 404 handling ──────────────────────────────────────────────────────────────
 
 class TestTicket404:
@@ -0,0 +1,123 @@
+"""
+Tests — app/core/warehouse_cache.py
+Covers: позиции акта/счёта без SELECT warehouses на строку, сброс при
+создании/изменении склада, версия (загрузка, пересёкшаяся со сбросом, не
+кэшируется), перезагрузка по неизвестному id, TTL без синхронизации,
+рассылка события.
+"""
+import json
+
+from sqlalchemy import event, text
+
+from app.core import warehouse_cache
+from app.core.query_counter import count_queries
+from app.core.warehouse_cache import warehouses
+from app.models import Warehouse, WarehouseStock
+from tests.conftest import (
+    engine, make_admin, auth_headers, make_client, make_equipment_model, make_equipment, make_ticket,
+    make_spare_part,
+)
+
+
+def _warehouse_selects(log):
+    return [s for s in log.statements if "FROM warehouses" in s.sql]
+
+
+def _add(db, name, type_="company", **kw):
+    wh = Warehouse(name=name, type=type_, **kw)
+    db.add(wh)
+    db.commit()
+    return wh
+
+
+class TestLineItems:
+    def test_invoice_from_act_single_warehouse_load(self, client, db):
+        admin = make_admin(db)
+        hdrs = auth_headers(admin.id, admin.roles)
+        cl = make_client(db)
+        eq = make_equipment(db, cl.id, make_equipment_model(db).id)
+        ticket = make_ticket(db, cl.id, eq.id, admin.id)
+        db.execute(text("UPDATE tickets SET status='in_progress' WHERE id=:id"), {"id": ticket.id})
+        bank = _add(db, "Склад банка", "bank", client_id=cl.id)
+        items = []
+        for i in range(8):
+            part = make_spare_part(db, sku=f"P-{i}")
+            db.add(WarehouseStock(warehouse_id=bank.id, part_id=part.id, quantity=5))
+            items.append({"item_type": "part", "part_id": part.id, "warehouse_id": bank.id, "name": f"Деталь {i}",
+                          "quantity": "1", "unit": "шт", "unit_price": "500.00"})
+        db.commit()
+        with count_queries() as log:
+            r = client.post(f"/api/v1/tickets/{ticket.id}/work-act", headers=hdrs,
+                            json={"work_description": "Замена", "items": items})
+            assert r.status_code == 201, r.text
+            r = client.post(f"/api/v1/invoices/from-act/{ticket.id}", headers=hdrs)
+        assert r.status_code == 201
+        assert {i["total"] for i in r.json()["items"]} == {"0.00"}  # BR-P-010
+        assert len(_warehouse_selects(log)) == 1
+
+    def test_lookups_after_load_hit_no_db(self, db):
+        ids = [_add(db, f"Склад {i}").id for i in range(5)]
+        warehouses.get_many(db, ids)
+        with count_queries() as log:
+            for _ in range(3):
+                assert [warehouses.get(db, i).name for i in ids] == [f"Склад {i}" for i in range(5)]
+            assert warehouses.get(db, None) is None
+        assert log.count == 0
+
+
+class TestInvalidation:
+    def test_update_and_create_endpoints_reset(self, client, db):
+        admin = make_admin(db)
+        hdrs = auth_headers(admin.id, admin.roles)
+        wh = _add(db, "Склад")
+        assert warehouses.get(db, wh.id).type == "company"
+        client.put(f"/api/v1/warehouses/{wh.id}", headers=hdrs, json={"type": "bank", "name": "Банк"})
+        assert warehouses.get(db, wh.id)[1:3] == ("Банк", "bank")
+        version = warehouses.version
+        r = client.post("/api/v1/warehouses", headers=hdrs, json={"name": "Новый", "type": "company"})
+        assert warehouses.version == version + 1
+        assert warehouses.get(db, r.json()["id"]).name == "Новый"
+
+    def test_unknown_id_reloads(self, db):
+        warehouses.get(db, _add(db, "Первый").id)
+        second = _add(db, "Второй")  # создан в обход эндпоинта (другим воркером)
+        assert warehouses.get(db, second.id).name == "Второй"
+        assert warehouses.get(db, 999999) is None
+
+    def test_load_racing_invalidation_not_cached(self, db):
+        _add(db, "Склад")
+
+        def _invalidate(*args):
+            warehouses.invalidate()
+
+        event.listen(engine, "before_cursor_execute", _invalidate)
+        try:
+            assert warehouses.all(db)
+        finally:
+            event.remove(engine, "before_cursor_execute", _invalidate)
+        assert warehouses._by_id is None
+
+    def test_ttl_applies_only_while_unsynced(self, db, monkeypatch):
+        wh = _add(db, "Склад")
+        monkeypatch.setattr(warehouses, "ttl", 0)
+        warehouses.get(db, wh.id)
+        with count_queries() as log:
+            warehouses.get(db, wh.id)
+        assert log.count == 1
+        monkeypatch.setattr(warehouses, "synced", True)
+        with count_queries() as log:
+            warehouses.get(db, wh.id)
+        assert log.count == 0
+
+    def test_invalidate_publishes_event(self, db, monkeypatch):
+        published = []
+
+        class _Redis:
+            def publish(self, channel, data):
+                published.append((channel, json.loads(data)))
+
+        monkeypatch.setattr(warehouse_cache, "get_redis", _Redis)
+        warehouses.get(db, _add(db, "Склад").id)
+        warehouse_cache.invalidate()
+        assert warehouses._by_id is None
+        assert published == [("warehouse:events", {"event": "warehouse"})]
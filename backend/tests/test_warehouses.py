@@ -0,0 +1,112 @@
+"""
+Tests — /api/v1/warehouses/stock
+Covers: список остатков одним SELECT-ом (поля, фильтры, число запросов),
+матрица запчасти × склады (столбцы, итоги, фильтры, постраничность).
+"""
+import pytest
+
+from app.models import SparePart, Warehouse, WarehouseStock
+from tests.conftest import admin_headers
+
+URL = "/api/v1/warehouses/stock"
+
+
+def _seed(db, n_parts=3):
+    """Склады: два компании (один неактивный) и банк; запчасть i лежит на основном складе в количестве i."""
+    main = Warehouse(name="Основной", type="company")
+    closed = Warehouse(name="Закрытый", type="company", is_active=False)
+    bank = Warehouse(name="Склад банка", type="bank")
+    db.add_all([main, closed, bank])
+    parts = [
+        SparePart(sku=f"SKU-{i:03d}", name=f"Деталь {i:03d}", category="consumable" if i % 2 else "spare",
+                  unit="шт", min_quantity=2, unit_price=100)
+        for i in range(n_parts)
+    ]
+    db.add_all(parts)
+    db.flush()
+    for i, part in enumerate(parts):
+        db.add(WarehouseStock(warehouse_id=main.id, part_id=part.id, quantity=i, unit_price_snapshot=150))
+        db.add(WarehouseStock(warehouse_id=closed.id, part_id=part.id, quantity=100))
+    db.add(WarehouseStock(warehouse_id=bank.id, part_id=parts[0].id, quantity=5))
+    db.commit()
+    return main, bank, parts
+
+
+class TestStockList:
+    def test_fields_from_single_select(self, client, db):
+        main, bank, parts = _seed(db, 1)
+        body = client.get(f"{URL}/list", headers=admin_headers(db)).json()
+        assert body["total"] == 2  # неактивный склад не показывается
+        row = next(r for r in body["items"] if r["warehouse_id"] == main.id)
+        assert row == {
+            "id": row["id"], "warehouse_id": main.id, "warehouse_name": "Основной", "warehouse_type": "company",
+            "part_id": parts[0].id, "part_sku": "SKU-000", "part_name": "Деталь 000", "part_unit": "шт",
+            "part_category": "spare", "part_min_quantity": 2, "quantity": 0, "unit_price_snapshot": "150.00",
+        }
+
+    def test_filters(self, client, db):
+        main, bank, parts = _seed(db, 4)
+        hdrs = admin_headers(db)
+        assert client.get(f"{URL}/list?warehouse_id={bank.id}", headers=hdrs).json()["total"] == 1
+        assert client.get(f"{URL}/list?part_id={parts[3].id}", headers=hdrs).json()["total"] == 1
+        body = client.get(f"{URL}/list?category=consumable", headers=hdrs).json()
+        assert {r["part_category"] for r in body["items"]} == {"consumable"}
+        body = client.get(f"{URL}/list?low_stock=true", headers=hdrs).json()
+        assert sorted(r["quantity"] for r in body["items"]) == [0, 1, 2]
+
+    def test_query_count_independent_of_rows(self, client, db, assert_max_queries):
+        _seed(db, 30)
+        hdrs = admin_headers(db)
+        client.get(f"{URL}/list", headers=hdrs)  # прогрев кэша принципалов
+        db.expunge_all()
+        with assert_max_queries(2):  # COUNT и страница
+            body = client.get(f"{URL}/list?size=200", headers=hdrs).json()
+        assert len(body["items"]) == 31
+
+
+class TestStockMatrix:
+    def test_matrix(self, client, db):
+        main, bank, parts = _seed(db, 3)
+        body = client.get(f"{URL}/matrix", headers=admin_headers(db)).json()
+        assert [(w["name"], w["type"]) for w in body["warehouses"]] == [("Склад банка", "bank"), ("Основной", "company")]
+        assert [r["sku"] for r in body["items"]] == ["SKU-000", "SKU-001", "SKU-002"]
+        first, _, last = body["items"]
+        assert first["quantities"] == {str(main.id): 0, str(bank.id): 5}
+        assert first["total"] == 5
+        assert last["quantities"] == {str(main.id): 2} and last["total"] == 2
+
+    def test_part_without_stock_is_a_row(self, client, db):
+        _seed(db, 1)
+        db.add(SparePart(sku="SKU-NEW", name="Новая", unit="шт", min_quantity=1, unit_price=1))
+        db.commit()
+        body = client.get(f"{URL}/matrix", headers=admin_headers(db)).json()
+        row = next(r for r in body["items"] if r["sku"] == "SKU-NEW")
+        assert (row["total"], row["quantities"]) == (0, {})
+
+    def test_warehouse_type_filter(self, client, db):
+        main, bank, parts = _seed(db, 3)
+        body = client.get(f"{URL}/matrix?warehouse_type=company", headers=admin_headers(db)).json()
+        assert [w["id"] for w in body["warehouses"]] == [main.id]
+        assert body["items"][0]["quantities"] == {str(main.id): 0}
+        assert body["items"][0]["total"] == 0
+
+    @pytest.mark.parametrize("params, skus", [
+        ("category=consumable", ["SKU-001", "SKU-003"]),
+        ("low_stock=true", ["SKU-001", "SKU-002"]),
+        ("low_stock=true&warehouse_type=company", ["SKU-000", "SKU-001", "SKU-002"]),
+    ])
+    def test_filters(self, client, db, params, skus):
+        _seed(db, 4)
+        body = client.get(f"{URL}/matrix?{params}", headers=admin_headers(db)).json()
+        assert [r["sku"] for r in body["items"]] == skus
+        assert body["total"] == len(skus)
+
+    def test_pagination_and_query_count(self, client, db, assert_max_queries):
+        _seed(db, 45)
+        hdrs = admin_headers(db)
+        client.get(f"{URL}/matrix", headers=hdrs)
+        db.expunge_all()
+        with assert_max_queries(4):  # COUNT, страница запчастей, ячейки, склады
+            body = client.get(f"{URL}/matrix?size=20&page=3", headers=hdrs).json()
+        assert (body["total"], body["pages"], len(body["items"])) == (45, 3, 5)
+        assert body["items"][0]["sku"] == "SKU-040"
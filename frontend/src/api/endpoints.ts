@@ -33,6 +33,7 @@ import type {
   MaintenanceFrequency,
   Warehouse,
   WarehouseStock,
+  StockMatrixResponse,
   StockReceipt,
   StockReceiptCreate,
   PartsTransfer,
@@ -149,8 +150,8 @@ export const deactivateEquipmentModel = (id: number): Promise<EquipmentModel> =>
 export const activateEquipmentModel = (id: number): Promise<EquipmentModel> =>
   api.patch<EquipmentModel>(`/equipment/models/${id}/activate`).then(r => r.data)
 
-export const getClientEquipment = (clientId: number): Promise<Equipment[]> =>
-  api.get<Equipment[]>(`/clients/${clientId}/equipment`).then(r => r.data)
+export const getClientEquipment = (clientId: number, params?: Record<string, unknown>): Promise<PaginatedResponse<Equipment>> =>
+  api.get<PaginatedResponse<Equipment>>(`/clients/${clientId}/equipment`, { params }).then(r => r.data)
 
 export interface EquipmentLookupResult {
   equipment_id: number
@@ -250,8 +251,8 @@ export const signWorkAct = (
     .post<WorkAct>(`/tickets/${ticketId}/work-act/sign`, { role })
     .then(r => r.data)
 
-export const getClientTickets = (clientId: number): Promise<Ticket[]> =>
-  api.get<Ticket[]>(`/clients/${clientId}/tickets`).then(r => r.data)
+export const getClientTickets = (clientId: number, params?: Record<string, unknown>): Promise<PaginatedResponse<Ticket>> =>
+  api.get<PaginatedResponse<Ticket>>(`/clients/${clientId}/tickets`, { params }).then(r => r.data)
 
 // ===== Work Templates =====
 
@@ -468,6 +469,9 @@ export const getWarehouses = (params?: { type?: string; active_only?: boolean })
 export const getWarehouseStock = (params?: Record<string, unknown>): Promise<PaginatedResponse<WarehouseStock>> =>
   api.get<PaginatedResponse<WarehouseStock>>('/warehouses/stock/list', { params }).then(r => r.data)
 
+export const getStockMatrix = (params?: Record<string, unknown>): Promise<StockMatrixResponse> =>
+  api.get<StockMatrixResponse>('/warehouses/stock/matrix', { params }).then(r => r.data)
+
 // ===== Stock Receipts =====
 
 export const getStockReceipts = (params?: Record<string, unknown>): Promise<PaginatedResponse<StockReceipt>> =>
@@ -398,10 +398,11 @@ export interface NotificationSetting {
 
 export interface PaginatedResponse<T> {
   items: T[]
-  total: number
+  total: number | null  // курсорный режим: только при with_total=true
   page: number
   size: number
-  pages: number
+  pages: number | null
+  next_cursor?: string | null  // курсорный режим (cursor=): null — страниц больше нет
 }
 
 export interface LoginResponse {
@@ -473,6 +474,27 @@ export interface WarehouseStock {
   unit_price_snapshot?: string
 }
 
+export interface StockMatrixWarehouse {
+  id: number
+  name: string
+  type: 'company' | 'bank'
+}
+
+export interface StockMatrixRow {
+  part_id: number
+  sku: string
+  name: string
+  unit: string
+  category?: string
+  min_quantity: number
+  total: number
+  quantities: Record<string, number>
+}
+
+export interface StockMatrixResponse extends PaginatedResponse<StockMatrixRow> {
+  warehouses: StockMatrixWarehouse[]
+}
+
 export interface StockReceiptItem {
   id: number
   part_id: number
@@ -1,7 +1,7 @@
 interface PaginationProps {
   page: number
-  pages: number
-  total: number
+  pages: number | null  // null — без подсчёта (курсорный режим без with_total)
+  total: number | null
   size: number
   onPageChange: (page: number) => void
 }
@@ -13,7 +13,7 @@ export default function Pagination({
   size,
   onPageChange,
 }: PaginationProps) {
-  if (pages <= 1) return null
+  if (pages == null || total == null || pages <= 1) return null
 
   const from = (page - 1) * size + 1
   const to = Math.min(page * size, total)
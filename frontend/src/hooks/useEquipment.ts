@@ -1,4 +1,4 @@
-import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query'
+import { useQuery, useInfiniteQuery, useMutation, useQueryClient } from '@tanstack/react-query'
 import * as api from '../api/endpoints'
 
 export function useEquipment(params?: Record<string, unknown>) {
@@ -57,10 +57,14 @@ export function useActivateEquipmentModel() {
   })
 }
 
+// Курсорные страницы по 50; общее число — только с первой страницей (with_total)
 export function useClientEquipment(clientId: number) {
-  return useQuery({
+  return useInfiniteQuery({
     queryKey: ['client-equipment', clientId],
-    queryFn: () => api.getClientEquipment(clientId),
+    queryFn: ({ pageParam }) =>
+      api.getClientEquipment(clientId, { size: 50, cursor: pageParam, with_total: pageParam === '' }),
+    initialPageParam: '',
+    getNextPageParam: last => last.next_cursor,
     enabled: !!clientId,
   })
 }
@@ -1,4 +1,4 @@
-import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query'
+import { useQuery, useInfiniteQuery, useMutation, useQueryClient } from '@tanstack/react-query'
 import * as api from '../api/endpoints'
 import type { TicketStatus } from '../api/types'
 
@@ -154,10 +154,14 @@ export function useWorkTemplates() {
   })
 }
 
+// Курсорные страницы по 50; общее число — только с первой страницей (with_total)
 export function useClientTickets(clientId: number) {
-  return useQuery({
+  return useInfiniteQuery({
     queryKey: ['client-tickets', clientId],
-    queryFn: () => api.getClientTickets(clientId),
+    queryFn: ({ pageParam }) =>
+      api.getClientTickets(clientId, { size: 50, cursor: pageParam, with_total: pageParam === '' }),
+    initialPageParam: '',
+    getNextPageParam: last => last.next_cursor,
     enabled: !!clientId,
   })
 }
@@ -79,8 +79,12 @@ export default function ClientDetailPage() {
 
   const { data: client, isLoading, isError } = useClient(clientId)
   const { data: contacts } = useClientContacts(clientId)
-  const { data: equipment } = useClientEquipment(clientId)
-  const { data: tickets } = useClientTickets(clientId)
+  const equipmentQuery = useClientEquipment(clientId)
+  const ticketsQuery = useClientTickets(clientId)
+  const equipment = equipmentQuery.data?.pages.flatMap(p => p.items)
+  const tickets = ticketsQuery.data?.pages.flatMap(p => p.items)
+  const equipmentTotal = equipmentQuery.data?.pages[0].total ?? equipment?.length ?? 0
+  const ticketsTotal = ticketsQuery.data?.pages[0].total ?? tickets?.length ?? 0
   const updateClient = useUpdateClient(clientId)
   const createContact = useCreateClientContact(clientId)
   const updateContact = useUpdateClientContact(clientId)
@@ -217,8 +221,8 @@ export default function ClientDetailPage() {
         {([
           { key: 'info', label: 'Информация' },
           { key: 'contacts', label: `Контакты (${contacts?.length ?? 0})` },
-          { key: 'equipment', label: `Оборудование (${equipment?.length ?? 0})` },
-          { key: 'tickets', label: `Заявки (${tickets?.length ?? 0})` },
+          { key: 'equipment', label: `Оборудование (${equipmentTotal})` },
+          { key: 'tickets', label: `Заявки (${ticketsTotal})` },
         ] as { key: Tab; label: string }[]).map(tab => (
           <button
             key={tab.key}
@@ -609,6 +613,17 @@ export default function ClientDetailPage() {
               })}
             </tbody>
           </table>
+          {equipmentQuery.hasNextPage && (
+            <div style={{ textAlign: 'center', padding: 12 }}>
+              <button
+                className="btn btn-secondary btn-sm"
+                disabled={equipmentQuery.isFetchingNextPage}
+                onClick={() => equipmentQuery.fetchNextPage()}
+              >
+                {equipmentQuery.isFetchingNextPage ? 'Загрузка...' : `Показать ещё (${equipment?.length ?? 0} из ${equipmentTotal})`}
+              </button>
+            </div>
+          )}
         </div>
       )}
 
@@ -733,6 +748,17 @@ export default function ClientDetailPage() {
               ))}
             </tbody>
           </table>
+          {ticketsQuery.hasNextPage && (
+            <div style={{ textAlign: 'center', padding: 12 }}>
+              <button
+                className="btn btn-secondary btn-sm"
+                disabled={ticketsQuery.isFetchingNextPage}
+                onClick={() => ticketsQuery.fetchNextPage()}
+              >
+                {ticketsQuery.isFetchingNextPage ? 'Загрузка...' : `Показать ещё (${tickets?.length ?? 0} из ${ticketsTotal})`}
+              </button>
+            </div>
+          )}
         </div>
       )}
       <div style={{ marginTop: 24 }}>
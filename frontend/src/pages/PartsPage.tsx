@@ -7,6 +7,7 @@ import {
   getPartPriceHistory,
   getWarehouses,
   getWarehouseStock,
+  getStockMatrix,
   getStockReceipts,
   createStockReceipt,
   postStockReceipt,
@@ -32,6 +33,7 @@ import { useAuth } from '../context/AuthContext'
 import { useCurrency } from '../context/CurrencyContext'
 
 type Tab = 'parts' | 'receipts' | 'transfers'
+type StockView = 'list' | 'matrix'
 type PriceTarget = { id: number; name: string; sku: string; unit_price: string }
 
 const STATUS_LABEL: Record<string, string> = {
@@ -79,7 +81,9 @@ export default function PartsPage() {
   const [activeTab, setActiveTab] = useState<Tab>('parts')
 
   // ── Parts tab state ───────────────────────────────────────────────────────────
+  const [stockView, setStockView] = useState<StockView>('list')
   const [stockPage, setStockPage] = useState(1)
+  const [matrixWarehouseType, setMatrixWarehouseType] = useState('')
   const [stockWarehouseId, setStockWarehouseId] = useState<number | ''>('')
   const [category, setCategory] = useState('')
   const [lowStock, setLowStock] = useState(false)
@@ -139,12 +143,19 @@ export default function PartsPage() {
 
   // ── Stock queries (unified view for Запчасти tab) ─────────────────────────────
   const stockParams: Record<string, unknown> = { page: stockPage, size: 50 }
-  if (stockWarehouseId) stockParams.warehouse_id = stockWarehouseId
+  if (category) stockParams.category = category
   if (lowStock) stockParams.low_stock = true
+  if (stockView === 'list' && stockWarehouseId) stockParams.warehouse_id = stockWarehouseId
+  if (stockView === 'matrix' && matrixWarehouseType) stockParams.warehouse_type = matrixWarehouseType
   const { data: stockData, isLoading: stockLoading } = useQuery({
-    queryKey: ['warehouse-stock', stockPage, stockWarehouseId, lowStock],
+    queryKey: ['warehouse-stock', stockPage, stockWarehouseId, category, lowStock],
     queryFn: () => getWarehouseStock(stockParams),
-    enabled: activeTab === 'parts',
+    enabled: activeTab === 'parts' && stockView === 'list',
+  })
+  const { data: matrixData, isLoading: matrixLoading } = useQuery({
+    queryKey: ['warehouse-stock', 'matrix', stockPage, matrixWarehouseType, category, lowStock],
+    queryFn: () => getStockMatrix(stockParams),
+    enabled: activeTab === 'parts' && stockView === 'matrix',
   })
 
   // ── Receipt queries / mutations ───────────────────────────────────────────────
@@ -356,9 +367,7 @@ export default function PartsPage() {
     createTrfMut.mutate(payload)
   }
 
-  const categories = stockData
-    ? [...new Set(stockData.items.map(s => s.part_category).filter(Boolean))]
-    : []
+  const categories = [...new Set(allParts.map(p => p.category).filter(Boolean))]
   const adjustPart = stockData?.items.find(
     s => s.part_id === adjustPartId && s.warehouse_type === 'company'
   )
@@ -404,20 +413,40 @@ export default function PartsPage() {
           <div className="filters-bar">
             <select
               className="form-select"
-              value={stockWarehouseId}
-              onChange={e => { setStockWarehouseId(e.target.value ? parseInt(e.target.value) : ''); setStockPage(1) }}
+              value={stockView}
+              onChange={e => { setStockView(e.target.value as StockView); setStockPage(1) }}
             >
-              <option value="">Все склады</option>
-              {warehouseList.map(w => (
-                <option key={w.id} value={w.id}>
-                  {w.name} ({w.type === 'company' ? 'компания' : 'банк'})
-                </option>
-              ))}
+              <option value="list">Списком</option>
+              <option value="matrix">Запчасти × склады</option>
             </select>
+            {stockView === 'list' ? (
+              <select
+                className="form-select"
+                value={stockWarehouseId}
+                onChange={e => { setStockWarehouseId(e.target.value ? parseInt(e.target.value) : ''); setStockPage(1) }}
+              >
+                <option value="">Все склады</option>
+                {warehouseList.map(w => (
+                  <option key={w.id} value={w.id}>
+                    {w.name} ({w.type === 'company' ? 'компания' : 'банк'})
+                  </option>
+                ))}
+              </select>
+            ) : (
+              <select
+                className="form-select"
+                value={matrixWarehouseType}
+                onChange={e => { setMatrixWarehouseType(e.target.value); setStockPage(1) }}
+              >
+                <option value="">Все склады</option>
+                <option value="company">Склады компании</option>
+                <option value="bank">Склады банков</option>
+              </select>
+            )}
             <select
               className="form-select"
               value={category}
-              onChange={e => setCategory(e.target.value)}
+              onChange={e => { setCategory(e.target.value); setStockPage(1) }}
             >
               <option value="">Все категории</option>
               {categories.map(c => (
@@ -436,7 +465,55 @@ export default function PartsPage() {
 
           {stockLoading && <div className="loading-center"><span className="spinner spinner-lg" /></div>}
 
-          {stockData && (
+          {stockView === 'matrix' && matrixLoading && <div className="loading-center"><span className="spinner spinner-lg" /></div>}
+
+          {stockView === 'matrix' && matrixData && (
+            <>
+              <div className="table-wrap">
+                <table className="table">
+                  <thead>
+                    <tr>
+                      <th>SKU</th>
+                      <th>Название</th>
+                      {matrixData.warehouses.map(w => (
+                        <th key={w.id} title={w.type === 'company' ? 'компания' : 'банк'}>{w.name}</th>
+                      ))}
+                      <th>Итого</th>
+                      <th>Мин.</th>
+                    </tr>
+                  </thead>
+                  <tbody>
+                    {matrixData.items.length === 0 && (
+                      <tr>
+                        <td colSpan={matrixData.warehouses.length + 4} style={{ textAlign: 'center', padding: '40px', color: 'var(--text-muted)' }}>
+                          Запчасти не найдены
+                        </td>
+                      </tr>
+                    )}
+                    {matrixData.items.map(r => {
+                      const isLow = r.total <= r.min_quantity
+                      return (
+                        <tr key={r.part_id} className={isLow ? 'part-row-low' : ''}>
+                          <td><span style={{ fontFamily: 'monospace', fontSize: 12 }}>{r.sku}</span></td>
+                          <td style={{ fontWeight: 500 }}>{r.name}</td>
+                          {matrixData.warehouses.map(w => (
+                            <td key={w.id} style={{ color: r.quantities[w.id] ? 'inherit' : 'var(--text-muted)' }}>
+                              {r.quantities[w.id] ?? '—'}
+                            </td>
+                          ))}
+                          <td><span className={isLow ? 'qty-low' : 'qty-ok'}>{r.total}</span></td>
+                          <td style={{ color: 'var(--text-muted)' }}>{r.min_quantity}</td>
+                        </tr>
+                      )
+                    })}
+                  </tbody>
+                </table>
+              </div>
+              <Pagination page={matrixData.page} pages={matrixData.pages} total={matrixData.total} size={matrixData.size} onPageChange={setStockPage} />
+            </>
+          )}
+
+          {stockView === 'list' && stockData && (
             <>
               <div className="table-wrap">
                 <table className="table">
@@ -462,12 +539,11 @@ export default function PartsPage() {
                       </tr>
                     )}
                     {stockData.items
-                      .filter(s => !category || s.part_category === category)
                       .map(s => {
                         const isBank = s.warehouse_type === 'bank'
                         const price = isBank ? 0 : parseFloat(s.unit_price_snapshot ?? '0')
                         const hasPriceSet = !isBank && price > 0
-                        const isLow = s.quantity < s.part_min_quantity
+                        const isLow = s.quantity <= s.part_min_quantity
                         return (
                           <tr key={s.id} className={isLow && !isBank ? 'part-row-low' : ''}>
                             <td>
@@ -65,7 +65,7 @@ export default function SettingsPage() {
     try {
       const data = await getExchangeRateHistory(cur, page, 10)
       setHistory(data.items)
-      setHistoryTotal(data.total)
+      setHistoryTotal(data.total ?? 0)
     } finally {
       setHistoryLoading(false)
     }
@@ -36,7 +36,7 @@ export default function TicketFormPage() {
   const [serialLocked, setSerialLocked] = useState(false)
   const [serialError, setSerialError] = useState<string | null>(null)
 
-  const { data: clientEquipmentData } = useClientEquipment(selectedClientId)
+  const clientEquipmentQuery = useClientEquipment(selectedClientId)
   // client_user: get own equipment via GET /equipment (backend filters by org)
   const { data: ownEquipmentData } = useEquipment(isClientUser ? { size: 200 } : undefined)
 
@@ -87,7 +87,7 @@ export default function TicketFormPage() {
   const clients = clientsData?.items ?? []
   const equipment = isClientUser
     ? (ownEquipmentData?.items ?? [])
-    : (clientEquipmentData ?? [])
+    : (clientEquipmentQuery.data?.pages.flatMap(p => p.items) ?? [])
 
   // Apply lookup result
   useEffect(() => {
@@ -285,6 +285,12 @@ export default function TicketFormPage() {
                         {eq.model?.name ?? 'Без модели'} (s/n: {eq.serial_number})
                       </option>
                     ))}
+                    {/* найденное по серийному номеру может быть ещё не загружено в список */}
+                    {serialLocked && lookupResult && !equipment.some(eq => eq.id === lookupResult.equipment_id) && (
+                      <option value={lookupResult.equipment_id}>
+                        {lookupResult.model_name} (s/n: {lookupResult.serial_number})
+                      </option>
+                    )}
                   </select>
                   {serialLocked && (
                     <span style={{
@@ -303,6 +309,17 @@ export default function TicketFormPage() {
                     )}
                   </span>
                 )}
+                {!isClientUser && !serialLocked && clientEquipmentQuery.hasNextPage && (
+                  <button
+                    type="button"
+                    className="btn btn-secondary btn-sm"
+                    style={{ marginTop: 4 }}
+                    disabled={clientEquipmentQuery.isFetchingNextPage}
+                    onClick={() => clientEquipmentQuery.fetchNextPage()}
+                  >
+                    {clientEquipmentQuery.isFetchingNextPage ? 'Загрузка...' : 'Показать ещё оборудование'}
+                  </button>
+                )}
               </div>
             </div>
 
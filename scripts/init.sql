@@ -445,6 +445,18 @@ BEGIN
 END //
 DELIMITER ;
 
+-- ============================================================
+-- ПОЛЬЗОВАТЕЛЬ ДЛЯ РЕПЛИКИ ЧТЕНИЯ (DATABASE_READ_URL)
+-- ============================================================
+
+-- Только чтение. REPLICATION CLIENT — для SHOW REPLICA STATUS: по нему
+-- backend проверяет отставание реплики (app/core/database.py); без привилегии
+-- отставание неизвестно и все чтения уходят на primary.
+-- ВАЖНО: пароль как в .env.example — сменить в рабочем окружении.
+CREATE USER IF NOT EXISTS 'sduser_ro'@'%' IDENTIFIED BY 'sdpass';
+GRANT SELECT ON servicedesk.* TO 'sduser_ro'@'%';
+GRANT REPLICATION CLIENT ON *.* TO 'sduser_ro'@'%';
+
 -- ============================================================
 -- НАЧАЛЬНЫЕ ДАННЫЕ
 -- ============================================================